@@ -0,0 +1,29 @@
+"""Link per-file index jobs to their bulk-ingest parent
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "002"
+down_revision: Union[str, None] = "001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("index_jobs") as batch:
+        batch.add_column(sa.Column("parent_id", sa.String, nullable=True))
+        batch.create_foreign_key("fk_jobs_parent", "index_jobs", ["parent_id"], ["id"], ondelete="CASCADE")
+    op.create_index("idx_jobs_parent", "index_jobs", ["parent_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_jobs_parent", "index_jobs")
+    with op.batch_alter_table("index_jobs") as batch:
+        batch.drop_constraint("fk_jobs_parent", type_="foreignkey")
+        batch.drop_column("parent_id")
@@ -0,0 +1,43 @@
+"""Durable job queue columns on index_jobs
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "003"
+down_revision: Union[str, None] = "002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("index_jobs") as batch:
+        batch.add_column(sa.Column("kind", sa.String(20), nullable=True))
+        batch.add_column(sa.Column("payload", sa.Text, nullable=True))
+        batch.add_column(sa.Column("attempts", sa.Integer, server_default="0"))
+        batch.add_column(sa.Column("run_after", sa.DateTime, nullable=True))
+        batch.add_column(sa.Column("leased_until", sa.DateTime, nullable=True))
+        batch.add_column(sa.Column("lease_owner", sa.String(64), nullable=True))
+    op.create_index("idx_jobs_queue", "index_jobs", ["status", "run_after"])
+
+    # BackgroundTasks jobs that were in flight when the API last stopped can never
+    # finish now — close them out instead of leaving them pending forever
+    op.execute(
+        sa.text(
+            "UPDATE index_jobs SET status='failed', error='Interrupted by restart', completed_at=:now "
+            "WHERE status IN ('pending', 'indexing')"
+        ).bindparams(now=datetime.now().isoformat())
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_jobs_queue", "index_jobs")
+    with op.batch_alter_table("index_jobs") as batch:
+        for column in ("lease_owner", "leased_until", "run_after", "attempts", "payload", "kind"):
+            batch.drop_column(column)
@@ -0,0 +1,22 @@
+"""Look up sources by type + path for incremental re-indexing
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+
+revision: str = "004"
+down_revision: Union[str, None] = "003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("idx_sources_type_path", "sources", ["type", "path"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_sources_type_path", "sources")
@@ -0,0 +1,27 @@
+"""Progress columns for long-running index jobs
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "005"
+down_revision: Union[str, None] = "004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("index_jobs") as batch:
+        batch.add_column(sa.Column("total", sa.Integer, nullable=True))
+        batch.add_column(sa.Column("rate", sa.Float, nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("index_jobs") as batch:
+        batch.drop_column("rate")
+        batch.drop_column("total")
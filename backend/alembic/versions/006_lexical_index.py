@@ -0,0 +1,29 @@
+"""Lexical (full-text) index over chunk text for hybrid retrieval
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+
+from database.models import LEXICAL_DDL, LEXICAL_DROP
+
+revision: str = "006"
+down_revision: Union[str, None] = "005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing chunks are backfilled from Chroma by POST /api/admin/rebuild-lexical
+    for statement in LEXICAL_DDL[op.get_bind().dialect.name]:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    for statement in LEXICAL_DROP:
+        if dialect == "sqlite" or "TRIGGER" not in statement:
+            op.execute(statement)
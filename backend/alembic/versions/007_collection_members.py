@@ -0,0 +1,24 @@
+"""Look up a collection's members without scanning source_collections
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+
+revision: str = "007"
+down_revision: Union[str, None] = "006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Per-collection Chroma sub-indexes for collections that predate them are
+    # built by POST /api/admin/rebuild-collection-indexes
+    op.create_index("idx_source_collections_collection", "source_collections", ["collection_id", "source_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_source_collections_collection", "source_collections")
@@ -0,0 +1,34 @@
+"""Persistent cache of scraped web pages
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "008"
+down_revision: Union[str, None] = "007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "page_cache",
+        sa.Column("url", sa.Text, primary_key=True),
+        sa.Column("title", sa.Text),
+        sa.Column("content", sa.Text, nullable=False),
+        sa.Column("max_length", sa.Integer, nullable=False),
+        sa.Column("etag", sa.Text),
+        sa.Column("last_modified", sa.Text),
+        sa.Column("checked_at", sa.DateTime, nullable=False),
+    )
+    op.create_index("idx_page_cache_checked", "page_cache", ["checked_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_page_cache_checked", "page_cache")
+    op.drop_table("page_cache")
@@ -24,29 +24,34 @@ def _blocklist_key(token: str) -> str:
     return f"devflow:blocked:{hashlib.sha256(token.encode()).hexdigest()[:32]}"
 
 
+def _blocklist_ttl(token: str) -> int:
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    return max(int(payload.get("exp", 0)) - int(datetime.utcnow().timestamp()), 1)
+
+
 def revoke_token(token: str) -> bool:
-    from cache.redis_cache import get_redis
+    from cache.redis_cache import set_flag
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        exp = int(payload.get("exp", 0))
-        ttl = max(exp - int(datetime.utcnow().timestamp()), 1)
-        r = get_redis()
-        if r:
-            r.setex(_blocklist_key(token), ttl, "1")
-        return True
-    except Exception:
+        ttl = _blocklist_ttl(token)
+    except JWTError:
         return False
+    set_flag(_blocklist_key(token), ttl)
+    return True
 
 
-def _is_revoked(token: str) -> bool:
-    from cache.redis_cache import get_redis
-    r = get_redis()
-    if not r:
-        return False
+async def arevoke_token(token: str) -> bool:
+    from cache.redis_cache import aset_flag
     try:
-        return bool(r.exists(_blocklist_key(token)))
-    except Exception:
+        ttl = _blocklist_ttl(token)
+    except JWTError:
         return False
+    await aset_flag(_blocklist_key(token), ttl)
+    return True
+
+
+async def _is_revoked(token: str) -> bool:
+    from cache.redis_cache import aexists
+    return await aexists(_blocklist_key(token))
 
 
 def init_users_table():
@@ -60,11 +65,11 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Security(security)) -> Optional[dict]:
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Security(security)) -> Optional[dict]:
     if not credentials:
         return None
     token = credentials.credentials
-    if _is_revoked(token):
+    if await _is_revoked(token):
         return None
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -76,8 +81,8 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Security(securi
         return None
 
 
-def require_auth(credentials: HTTPAuthorizationCredentials = Security(security)) -> dict:
-    user = get_current_user(credentials)
+async def require_auth(credentials: HTTPAuthorizationCredentials = Security(security)) -> dict:
+    user = await get_current_user(credentials)
     if not user:
         raise HTTPException(status_code=401, detail="Authentication required")
     return user
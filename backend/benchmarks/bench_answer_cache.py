@@ -0,0 +1,120 @@
+"""
+Answer-cache tiers on the search handler's lookup path, against the Redis at
+--url (default REDIS_URL):
+  hits       — previous path: version read + afetch of the answer from Redis and
+               json.loads on every request, vs the in-process tier (L1) in front
+  stampede   — N concurrent requests for one uncached query; the pipeline
+               (retrieve + rerank + LLM) is a --pipeline-ms sleep. Previous path:
+               every request runs it. Single-flight: one runs, the rest wait on it.
+
+    python benchmarks/bench_answer_cache.py --url redis://localhost:6379 --stampede 1 16 64
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cache.redis_cache as redis_cache  # noqa: E402
+from cache.redis_cache import INDEX_VERSION  # noqa: E402
+from cache.tiered_cache import TieredCache  # noqa: E402
+
+# Roughly what /api/search returns: an answer plus five source metadata dicts
+ANSWER = {
+    "answer": "Add CORSMiddleware with the allowed origins before the routers. " * 12,
+    "sources": [{"title": f"FastAPI docs part {i}", "url": f"https://fastapi.tiangolo.com/tutorial/cors/#{i}",
+                 "source_type": "web", "source_id": i, "chunk_index": i} for i in range(5)],
+    "model": "gemini-flash", "query": "how do I enable CORS", "cached": False,
+}
+
+
+async def _hit_latencies(lookup, requests: int):
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        await lookup()
+        latencies.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(latencies), statistics.quantiles(latencies, n=20)[-1]
+
+
+async def bench_hits(requests: int):
+    key = redis_cache.make_cache_key("search", {"q": "bench"}, await redis_cache.aget_versions(INDEX_VERSION))
+    tiered = TieredCache()
+
+    async def compute(extras):
+        return ANSWER, True
+
+    await tiered.get_or_compute(key, compute)        # computes once, writes L1 + Redis
+
+    async def previous():
+        await redis_cache.aget_versions(INDEX_VERSION)
+        redis_cache._versions.clear()                   # previous path read the version every time
+        await redis_cache.afetch(("json", key), ("array", None))
+
+    async def l2():
+        await redis_cache.aget_versions(INDEX_VERSION)
+        tiered.l1.clear()
+        await tiered.get_or_compute(key, compute)
+
+    async def l1():
+        await redis_cache.aget_versions(INDEX_VERSION)
+        await tiered.get_or_compute(key, compute)
+
+    print(f"Cache hit, {requests} sequential requests ({len(str(ANSWER))} B answer)")
+    print(f"{'path':>26} | {'p50 µs':>7} | {'p95 µs':>7}")
+    for name, lookup in [("Redis only (previous)", previous), ("tiered, L1 miss → Redis", l2),
+                         ("tiered, L1 hit", l1)]:
+        p50, p95 = await _hit_latencies(lookup, requests)
+        print(f"{name:>26} | {p50:>7.0f} | {p95:>7.0f}")
+
+
+async def bench_stampede(levels, pipeline_ms: float):
+    print(f"\nStampede: N identical uncached requests, pipeline = {pipeline_ms:.0f} ms")
+    print(f"{'N':>4} | {'path':>13} | {'pipeline runs':>13} | {'wall ms':>8}")
+    for n in levels:
+        for name in ("previous", "single-flight"):
+            runs = 0
+            key = redis_cache.make_cache_key("search", {"q": f"stampede {name} {n} {time.time()}"})
+            tiered = TieredCache()
+
+            async def compute(extras):
+                nonlocal runs
+                runs += 1
+                await asyncio.sleep(pipeline_ms / 1000)
+                return ANSWER, True
+
+            async def previous():
+                cached, = await redis_cache.afetch(("json", key))
+                if cached is None:
+                    value, _ = await compute([])
+                    await redis_cache.aset_cached(key, value)
+
+            async def coalesced():
+                await tiered.get_or_compute(key, compute)
+
+            start = time.perf_counter()
+            await asyncio.gather(*[(previous if name == "previous" else coalesced)() for _ in range(n)])
+            wall = (time.perf_counter() - start) * 1000
+            print(f"{n:>4} | {name:>13} | {runs:>13} | {wall:>8.0f}")
+
+
+async def main(url: str, levels, requests: int, pipeline_ms: float):
+    redis_cache.REDIS_URL = url
+    if not await redis_cache.aping():
+        sys.exit(f"Redis at {url} is not reachable")
+    await bench_hits(requests)
+    await bench_stampede(levels, pipeline_ms)
+    await redis_cache.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=os.getenv("REDIS_URL", "redis://localhost:6379"))
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--stampede", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--pipeline-ms", type=float, default=800)
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.stampede, args.requests, args.pipeline_ms))
@@ -0,0 +1,109 @@
+"""
+Chunking throughput and retrieval recall: the previous whitespace splitter
+(400-word windows, 50-word overlap) vs the token-bounded, structure-aware
+Chunker, on a synthetic corpus of markdown manuals — headed sections of prose
+and code, each section stating one fact about a unique identifier.
+
+  throughput — MB/s and chunks over the whole corpus
+  truncated  — share of chunks longer than the embedder reads, and of the
+               corpus's tokens the embedder never sees because of it
+  recall@k   — "what does <identifier> do": a hit when one of the top k chunks
+               (dense, cosine over the chunk embeddings) contains the fact
+
+    python benchmarks/bench_chunking.py --docs 200 --queries 200 --k 5
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["EMBED_STORE_DIR"] = tempfile.mkdtemp(prefix="devflow_bench_chunking_")
+
+import numpy as np  # noqa: E402
+
+from rag.indexer import Indexer  # noqa: E402
+
+TOPICS = ["connection pool", "retry budget", "cache eviction", "token refresh", "rate limiter",
+          "file upload", "search ranking", "session store", "background worker", "schema migration"]
+PROSE = (
+    "when the service starts it loads settings from the environment and opens a pool of "
+    "connections so requests can share them while a background task keeps the cache warm "
+    "and old entries expire after a while unless the operator changes the default limits"
+).split()
+
+
+def _previous(text: str, chunk_size: int = 400, overlap: int = 50):
+    words = text.split()
+    chunks = []
+    i = 0
+    while i < len(words):
+        chunk = " ".join(words[i:i + chunk_size])
+        if chunk:
+            chunks.append(chunk)
+        i += chunk_size - overlap
+    return chunks
+
+
+def _corpus(n_docs: int, seed: int):
+    rng = random.Random(seed)
+    docs, facts = [], []
+    for d in range(n_docs):
+        parts = [f"# Manual {d}"]
+        for s in range(rng.randint(4, 10)):
+            ident, topic = f"{rng.choice(['pool', 'cache', 'auth', 'queue'])}_{d}_{s}", rng.choice(TOPICS)
+            fact = f"The {ident} option sets the {topic} limit."
+            facts.append((ident, topic, fact))
+            paragraphs = [" ".join(rng.choice(PROSE) for _ in range(rng.randint(40, 160)))
+                          for _ in range(rng.randint(1, 5))]
+            paragraphs.insert(rng.randrange(len(paragraphs) + 1), fact)
+            parts.append(f"## {topic.title()} {s}")
+            parts.extend(paragraphs)
+            if rng.random() < 0.3:
+                parts.append("```python\n" + "\n".join(f"settings.{ident}_{i} = {i}" for i in range(rng.randint(3, 30)))
+                             + "\n```")
+        docs.append("\n\n".join(parts))
+    return docs, facts
+
+
+def _recall(indexer: Indexer, chunks, facts, k: int, rng: random.Random, n_queries: int):
+    embeddings = indexer.generate_embeddings([f"passage: {c}" for c in chunks])
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    sample = rng.sample(facts, min(n_queries, len(facts)))
+    queries = indexer.model.encode([f"query: what does {ident} set for the {topic}" for ident, topic, _ in sample])
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    top = np.argsort(-queries @ embeddings.T, axis=1)[:, :k]
+    return sum(any(fact in chunks[i] for i in row) for row, (*_, fact) in zip(top, sample)) / len(sample)
+
+
+def main(n_docs: int, n_queries: int, k: int, seed: int):
+    indexer = Indexer()
+    tokenizer = indexer.chunker.tokenizer
+    limit = tokenizer.model_max_length - 2        # what the embedder reads, prefix included
+    docs, facts = _corpus(n_docs, seed)
+    size_mb = sum(len(d.encode()) for d in docs) / 1e6
+    print(f"{n_docs} manuals, {len(facts)} facts, {size_mb:.1f} MB; embedder reads {limit} tokens; k={k}")
+    print(f"{'chunker':>10} | {'MB/s':>6} | {'chunks':>6} | {'over limit':>10} | {'tokens lost':>11} | {'recall@k':>8}")
+
+    for name, chunk in [("previous", _previous), ("token", indexer.chunk_text)]:
+        start = time.perf_counter()
+        chunks = [c for doc in docs for c in chunk(doc)]
+        elapsed = time.perf_counter() - start
+        encoded = tokenizer([f"passage: {c}" for c in chunks], add_special_tokens=False, verbose=False)
+        lengths = [len(ids) for ids in encoded["input_ids"]]
+        over = sum(n > limit for n in lengths) / len(lengths)
+        lost = sum(max(0, n - limit) for n in lengths) / sum(lengths)
+        recall = _recall(indexer, chunks, facts, k, random.Random(seed + 1), n_queries)
+        print(f"{name:>10} | {size_mb / elapsed:>6.2f} | {len(chunks):>6} | {over:>10.1%} | {lost:>11.1%} | {recall:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    main(args.docs, args.queries, args.k, args.seed)
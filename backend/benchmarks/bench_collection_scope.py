@@ -0,0 +1,116 @@
+"""
+Collection-scoped retrieval as a collection grows, in a throwaway Chroma store
+and SQLite database holding --sources single-chunk sources:
+  previous  — what chat did per message: page the members out of SQL
+              (get_sources, LIMIT 50) and query Chroma with a $in over their ids
+  id list   — the same without the LIMIT (every member reachable): the SQL read
+              and the $in both grow with the collection
+  sub-index — the collection's own Chroma collection (copies of the members'
+              chunks), which is what a scoped search queries now
+
+"reachable" is the share of members the scoped search can return at all.
+
+    python benchmarks/bench_collection_scope.py --sources 20000 --sizes 10 100 1000 5000
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["CHROMA_PATH"] = tempfile.mkdtemp(prefix="devflow_bench_scope_")
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='devflow_bench_scope_db_')}/bench.db"
+os.environ.pop("CHROMA_HOST", None)
+os.environ["REDIS_URL"] = ""
+
+import numpy as np  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+from database.db import Database  # noqa: E402
+from rag.retriever import Retriever  # noqa: E402
+
+
+def _populate(db: Database, retriever: Retriever, n_sources: int, dim: int, rng: np.random.Generator):
+    with db._conn() as conn:
+        conn.execute(text("INSERT INTO sources (id, type, path, name, status) VALUES (:id, 'bench', :p, :p, 'indexed')"),
+                     [{"id": sid, "p": f"bench-{sid}"} for sid in range(1, n_sources + 1)])
+    batch = 5000
+    for start in range(1, n_sources + 1, batch):
+        sids = list(range(start, min(start + batch, n_sources + 1)))
+        vectors = rng.standard_normal((len(sids), dim)).astype(np.float32)
+        retriever.collection.add(
+            ids=[f"bench_{sid}" for sid in sids], embeddings=vectors,
+            documents=[f"chunk of source {sid}" for sid in sids],
+            metadatas=[{"source_id": sid, "chunk_index": 0} for sid in sids],
+        )
+
+
+def _add_members(db: Database, retriever: Retriever, collection_id: int, source_ids):
+    with db._conn() as conn:
+        conn.execute(text("INSERT INTO source_collections (source_id, collection_id) VALUES (:sid, :cid)"),
+                     [{"sid": sid, "cid": collection_id} for sid in source_ids])
+    retriever._copy_sources(list(source_ids), collection_id)
+
+
+def _time(fn, queries):
+    latencies, found = [], set()
+    for q in queries:
+        start = time.perf_counter()
+        found |= fn(q)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies), found
+
+
+def main(n_sources: int, sizes, n_queries: int, dim: int, seed: int):
+    rng = np.random.default_rng(seed)
+    db = Database()
+    retriever = Retriever(db)
+    start = time.perf_counter()
+    _populate(db, retriever, n_sources, dim, rng)
+    print(f"{n_sources} single-chunk sources, {dim}-dim, indexed in {time.perf_counter() - start:.1f}s; "
+          f"{n_queries} queries per size, n_results=6")
+    print(f"{'members':>8} | {'path':>9} | {'p50 ms':>7} | {'reachable':>9}")
+
+    for size in sizes:
+        cid = db.create_collection(f"bench-{size}")
+        members = sorted(rng.choice(np.arange(1, n_sources + 1), size=size, replace=False).tolist())
+        _add_members(db, retriever, cid, members)
+        queries = [[rng.standard_normal(dim).astype(np.float32).tolist()] for _ in range(n_queries)]
+
+        def hits(result):
+            return {m["source_id"] for m in result["metadatas"]}
+
+        def previous(q):
+            ids = [s["id"] for s in db.get_sources(collection_id=cid)]
+            return hits(retriever._query_collection(q, min(6, len(ids)), ids))
+
+        def id_list(q):
+            ids = db.get_collection_source_ids(cid)
+            return hits(retriever._query_collection(q, 6, ids))
+
+        def subindex(q):
+            return hits(retriever._query_collection(q, 6, collection=retriever._subindex(cid)))
+
+        # what each path can ever return: the size of its filter's scope
+        scope = {
+            "previous": len(db.get_sources(collection_id=cid)),
+            "id list": len(db.get_collection_source_ids(cid)),
+            "sub-index": retriever._subindex(cid).count(),
+        }
+        for name, fn in [("previous", previous), ("id list", id_list), ("sub-index", subindex)]:
+            _time(fn, queries[:5])  # warm
+            p50, _ = _time(fn, queries)
+            print(f"{size:>8} | {name:>9} | {p50:>7.1f} | {scope[name] / size:>9.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sources", type=int, default=20000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    main(args.sources, args.sizes, args.queries, args.dim, args.seed)
@@ -0,0 +1,80 @@
+"""
+Embedding throughput with and without dynamic micro-batching.
+
+Simulates N concurrent searches, each repeatedly encoding a "query: ..." string,
+and reports queries/sec for:
+  unbatched — one model.encode([q]) per search on the inference pool (previous path)
+  batched   — BatchedEmbedder.aencode, coalescing concurrent queries into one pass
+
+    python benchmarks/bench_embedding_batching.py --levels 1 8 32 128
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sentence_transformers import SentenceTransformer  # noqa: E402
+from rag.indexer import BatchedEmbedder, EMBED_MAX_WAIT_MS, EMBEDDING_MODEL_NAME  # noqa: E402
+from rag.inference import run_inference  # noqa: E402
+
+QUERIES = [
+    "How do I configure CORS for the frontend origin?",
+    "What does the reranker do with retrieved chunks?",
+    "Wie setze ich den Cache-TTL?",
+    "¿Cómo indexo una URL en la base de conocimiento?",
+    "Which embedding model does DevFlow use and why?",
+]
+
+
+async def _throughput(encode, concurrency: int, duration: float) -> float:
+    done = 0
+    deadline = time.perf_counter() + duration
+
+    async def search(worker: int):
+        nonlocal done
+        i = worker
+        while time.perf_counter() < deadline:
+            await encode(f"query: {QUERIES[i % len(QUERIES)]}")
+            done += 1
+            i += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[search(w) for w in range(concurrency)])
+    return done / (time.perf_counter() - start)
+
+
+async def main(levels, duration: float, max_batch: int, max_wait_ms: float):
+    model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    batched = BatchedEmbedder(model, max_batch=max_batch, max_wait_ms=max_wait_ms)
+
+    async def unbatched_encode(text):
+        return await run_inference(model.encode, [text])
+
+    async def batched_encode(text):
+        return await batched.aencode([text])
+
+    await unbatched_encode("query: warm up")
+    await batched_encode("query: warm up")
+
+    print(f"{'concurrency':>11} | {'unbatched q/s':>13} | {'batched q/s':>11} | {'speedup':>7} | mean batch")
+    for n in levels:
+        before = batched.stats()
+        base = await _throughput(unbatched_encode, n, duration)
+        fast = await _throughput(batched_encode, n, duration)
+        after = batched.stats()
+        batches = after["batches"] - before["batches"]
+        mean = (after["items"] - before["items"]) / batches if batches else 0
+        print(f"{n:>11} | {base:>13.1f} | {fast:>11.1f} | {fast / base:>6.2f}x | {mean:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per measurement")
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=EMBED_MAX_WAIT_MS)
+    args = parser.parse_args()
+    asyncio.run(main(args.levels, args.duration, args.max_batch, args.max_wait_ms))
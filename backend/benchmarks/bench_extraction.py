@@ -0,0 +1,106 @@
+"""
+PDF text extraction throughput (pages/sec) on synthetic manuals of --pages
+pages, each page ~--lines lines of text:
+  previous — FileProcessor before the pool: one PdfReader in the calling
+             process, text += page.extract_text() per page
+  pool N   — ExtractionPool with N worker processes: page ranges extracted in
+             parallel and streamed back in page order (pool already started)
+
+"first page" is how long the caller waits before it has any text to chunk.
+
+    python benchmarks/bench_extraction.py --pages 100 300 500 --workers 1 2 4
+"""
+import io
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pypdf import PdfReader  # noqa: E402
+
+from connectors.extraction import EXTRACT_PAGES_PER_TASK, ExtractionPool  # noqa: E402
+
+WORDS = (
+    "configure the worker pool size timeout retry cache index chunk embedding vector "
+    "request handler upload source collection query response latency throughput"
+).split()
+
+
+def _manual(n_pages: int, n_lines: int, seed: int) -> bytes:
+    rng = random.Random(seed)
+    objs = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for _ in range(n_pages):
+        lines = [" ".join(rng.choice(WORDS) for _ in range(12)) for _ in range(n_lines)]
+        body = "BT /F1 9 Tf 11 TL 40 800 Td " + " ".join(f"({line}) '" for line in lines) + " ET"
+        objs.append(f"<< /Length {len(body)} >>\nstream\n{body}\nendstream")
+        objs.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Contents {len(objs)} 0 R "
+                    "/Resources << /Font << /F1 3 0 R >> >> >>")
+        kids.append(f"{len(objs)} 0 R")
+    objs[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+    out, offsets = bytearray(b"%PDF-1.4\n"), []
+    for i, obj in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{obj}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def _previous(data: bytes):
+    start = time.perf_counter()
+    first = None
+    text = ""
+    for page in PdfReader(io.BytesIO(data)).pages:
+        text += page.extract_text() + "\n"
+        first = first or time.perf_counter() - start
+    return time.perf_counter() - start, first, len(text.strip())
+
+
+def _pooled(pool: ExtractionPool, data: bytes):
+    start = time.perf_counter()
+    first = None
+    pages = []
+    for page in pool.iter_pdf_pages(data):
+        pages.append(page)
+        first = first or time.perf_counter() - start
+    return time.perf_counter() - start, first, len("\n".join(pages).strip())
+
+
+def main(page_counts, worker_counts, n_lines: int, pages_per_task: int, seed: int):
+    print(f"{os.cpu_count()} CPU(s), ~{n_lines} lines/page, {pages_per_task} pages per pool task")
+    print(f"{'pages':>5} | {'path':>9} | {'pages/s':>8} | {'total s':>7} | {'first page ms':>13}")
+    pools = {n: ExtractionPool(workers=n, pages_per_task=pages_per_task) for n in worker_counts}
+    warm = _manual(pages_per_task * max(worker_counts), 5, seed)
+    for pool in pools.values():
+        list(pool.iter_pdf_pages(warm))      # start the workers outside the timing
+    try:
+        for n_pages in page_counts:
+            data = _manual(n_pages, n_lines, seed)
+            runs = [("previous", lambda: _previous(data))]
+            runs += [(f"pool {n}", lambda pool=pool: _pooled(pool, data)) for n, pool in pools.items()]
+            chars = None
+            for name, run in runs:
+                total, first, length = run()
+                assert chars is None or length == chars, f"{name} extracted different text"
+                chars = length
+                print(f"{n_pages:>5} | {name:>9} | {n_pages / total:>8.0f} | {total:>7.2f} | {first * 1000:>13.0f}")
+    finally:
+        for pool in pools.values():
+            pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[100, 300, 500])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--lines", type=int, default=60)
+    parser.add_argument("--pages-per-task", type=int, default=EXTRACT_PAGES_PER_TASK)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    main(args.pages, args.workers, args.lines, args.pages_per_task, args.seed)
@@ -0,0 +1,101 @@
+"""
+Latency, throughput and memory of the inference backends, for the e5 embedder
+and the mMiniLM reranker:
+  torch      — SentenceTransformer / CrossEncoder, fp32 (current default)
+  onnx-fp32  — ONNX Runtime, exported graph without quantization
+  onnx-int8  — ONNX Runtime, dynamic int8 quantization (INFERENCE_BACKEND=onnx)
+
+Each backend runs in its own process so peak RSS is not shared; ONNX graphs
+are exported to --cache-dir first (outside the timed runs).
+
+    python benchmarks/bench_inference_backend.py --passages 256 --queries 100
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_ingest import _corpus  # noqa: E402
+
+BACKENDS = ("torch", "onnx-fp32", "onnx-int8")
+
+
+def _load(backend: str, cache_dir: str):
+    from rag.indexer import EMBEDDING_MODEL_NAME
+    from rag.reranker import RERANK_MAX_LENGTH, RERANK_MODEL_NAME
+    if backend == "torch":
+        from sentence_transformers import CrossEncoder, SentenceTransformer
+        return SentenceTransformer(EMBEDDING_MODEL_NAME), CrossEncoder(RERANK_MODEL_NAME, max_length=RERANK_MAX_LENGTH)
+    from rag.onnx_backend import OnnxCrossEncoder, OnnxEncoder
+    quantize = backend == "onnx-int8"
+    return (OnnxEncoder(EMBEDDING_MODEL_NAME, cache_dir=cache_dir, quantize=quantize),
+            OnnxCrossEncoder(RERANK_MODEL_NAME, max_length=RERANK_MAX_LENGTH, cache_dir=cache_dir, quantize=quantize))
+
+
+def _child(backend: str, cache_dir: str, n_passages: int, n_queries: int):
+    texts, _, _ = _corpus(n_passages)
+    passages = [f"passage: {' '.join(t.split()[:400])}" for t in texts]
+    queries = [f"query: question {i} about {texts[i % len(texts)].split()[0]}" for i in range(n_queries)]
+    pairs = [(q, p) for q, p in zip(queries, passages[:10] * (n_queries // 10 + 1))]
+
+    start = time.perf_counter()
+    encoder, cross_encoder = _load(backend, cache_dir)
+    load = time.perf_counter() - start
+    encoder.encode(["query: warm up"])
+    cross_encoder.predict([("warm up", "warm up")])
+
+    latencies = []
+    for q in queries:
+        start = time.perf_counter()
+        encoder.encode([q])
+        latencies.append((time.perf_counter() - start) * 1000)
+    start = time.perf_counter()
+    encoder.encode(passages, batch_size=32)
+    embed_rate = len(passages) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(0, len(pairs), 10):
+        cross_encoder.predict(pairs[i:i + 10], batch_size=16)
+    rerank_ms = (time.perf_counter() - start) * 1000 / (len(pairs) / 10)
+
+    print(json.dumps({
+        "load_s": load,
+        "query_p50_ms": statistics.median(latencies),
+        "passages_per_s": embed_rate,
+        "rerank_10_ms": rerank_ms,
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def main(cache_dir: str, n_passages: int, n_queries: int):
+    _load("onnx-int8", cache_dir)  # export + quantize once, untimed
+    print(f"{n_passages} passages, {n_queries} queries, rerank batches of 10 pairs")
+    print(f"{'backend':>9} | {'load s':>6} | {'query p50 ms':>12} | {'passages/s':>10} | {'rerank 10 ms':>12} | {'peak RSS MB':>11}")
+    for backend in BACKENDS:
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", backend, "--cache-dir", cache_dir,
+             "--passages", str(n_passages), "--queries", str(n_queries)],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip().splitlines()[-1]
+        r = json.loads(out)
+        print(f"{backend:>9} | {r['load_s']:>6.1f} | {r['query_p50_ms']:>12.2f} | {r['passages_per_s']:>10.1f} | "
+              f"{r['rerank_10_ms']:>12.1f} | {r['rss_mb']:>11.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--passages", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--cache-dir", default="./onnx_models")
+    parser.add_argument("--child", choices=BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child(args.child, args.cache_dir, args.passages, args.queries)
+    else:
+        main(args.cache_dir, args.passages, args.queries)
@@ -0,0 +1,86 @@
+"""
+Ingestion throughput (chunks/sec) for Indexer.prepare_documents.
+
+Builds a synthetic corpus of many short, mixed-length documents and compares:
+  per-document — chunk, detect language and encode one document at a time,
+                 converting embeddings to lists (previous path)
+  batched      — prepare_documents: chunk everything, then encode all passages
+                 as one length-sorted stream in fixed-size batches
+
+    python benchmarks/bench_ingest.py --docs 2000 --batch-size 64
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag.indexer import Indexer, INDEX_ENCODE_BATCH  # noqa: E402
+from rag.lang import detect_language  # noqa: E402
+
+WORDS = (
+    "the request handler reads a config value from the environment and retries the "
+    "upload when the cache misses so every worker shares one connection pool while "
+    "the index stores vectors for each chunk of text in the collection"
+).split()
+
+
+def _corpus(n_docs: int, seed: int = 0):
+    rng = random.Random(seed)
+    # Mostly short docs (snippets, notes) with a long tail of multi-chunk pages
+    lengths = [rng.choice([20, 40, 80, 150, 300]) if rng.random() < 0.9 else rng.randint(400, 1500) for _ in range(n_docs)]
+    texts = [" ".join(rng.choice(WORDS) for _ in range(n)) for n in lengths]
+    titles = [f"doc {i}" for i in range(n_docs)]
+    urls = [f"bench://doc/{i}" for i in range(n_docs)]
+    return texts, titles, urls
+
+
+def _per_document(indexer: Indexer, texts, titles, urls) -> int:
+    count = 0
+    for text, title, url in zip(texts, titles, urls):
+        chunks = indexer.chunk_text(text)
+        if not chunks:
+            continue
+        detect_language(text)
+        embeddings = indexer.model.encode([f"passage: {c}" for c in chunks], batch_size=32, show_progress_bar=False)
+        count += len(embeddings.tolist())
+    return count
+
+
+def main(n_docs: int, batch_size: int, seed: int):
+    indexer = Indexer()
+    texts, titles, urls = _corpus(n_docs, seed)
+    indexer.generate_embeddings(["passage: warm up"] * batch_size, batch_size=batch_size)
+
+    start = time.perf_counter()
+    for text in texts:
+        indexer.chunk_text(text)
+        detect_language(text)
+    prep = time.perf_counter() - start
+
+    start = time.perf_counter()
+    base_chunks = _per_document(indexer, texts, titles, urls)
+    base = time.perf_counter() - start
+
+    indexer.encode_batch = batch_size
+    start = time.perf_counter()
+    chunks, embeddings, _, _ = indexer.prepare_documents(texts, titles, urls, source_id=0, source_type="bench")
+    fast = time.perf_counter() - start
+    assert len(chunks) == base_chunks == embeddings.shape[0]
+
+    print(f"{n_docs} docs → {len(chunks)} chunks (chunk + detect_language: {prep:.2f}s)")
+    print(f"{'mode':>12} | {'seconds':>8} | {'chunks/s':>9}")
+    print(f"{'per-document':>12} | {base:>8.2f} | {base_chunks / base:>9.1f}")
+    print(f"{'batched':>12} | {fast:>8.2f} | {len(chunks) / fast:>9.1f}")
+    print(f"speedup: {base / fast:.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=INDEX_ENCODE_BATCH)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    main(args.docs, args.batch_size, args.seed)
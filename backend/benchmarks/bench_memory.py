@@ -0,0 +1,106 @@
+"""
+API process memory with per-module service instances vs the shared container.
+
+Builds a throwaway Chroma store with --docs random embedding-sized vectors, then in a
+fresh interpreter per layout creates the services and runs one query through
+every retriever (so each HNSW index is actually loaded):
+  duplicated — what main, chat, analytics, GraphQL, history, collections,
+               ingest and an inline worker each used to create on their own
+  shared     — services.get_services(), used by all of them
+
+    python benchmarks/bench_memory.py --docs 50000
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+_CHILD = """
+import os, json, time, resource
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        line = next(l for l in f if l.startswith("VmRSS"))
+    return int(line.split()[1]) / 1024
+
+base = rss_mb()
+start = time.perf_counter()
+if "{layout}" == "duplicated":
+    from database.db import Database
+    from rag.indexer import Indexer
+    from rag.retriever import Retriever
+    from rag.reranker import Reranker
+    from rag.generator import GeminiRAG
+    from connectors.web_search import WebSearcher
+    dbs = [Database() for _ in range(7)]           # main, history, collections, analytics, chat, ingest, GraphQL
+    retrievers = [Retriever(dbs[0]), Retriever(), Retriever(), Retriever(), Retriever(dbs[6])]  # + inline worker
+    rerankers = [Reranker() for _ in range(3)]     # main, chat, GraphQL
+    rags = [GeminiRAG() for _ in range(3)]
+    searchers = [WebSearcher() for _ in range(3)]  # main, chat, inline worker
+    indexers = [Indexer(), Indexer()]              # main, inline worker
+else:
+    from services import get_services
+    services = get_services()
+    retrievers = [services.get("retriever")]
+    for name in ("indexer", "reranker", "rag", "web_searcher"):
+        services.get(name)
+setup = time.perf_counter() - start
+for r in retrievers:
+    r.search("warm up the index", n_results=5)
+print(json.dumps({{"rss_mb": rss_mb(), "import_base_mb": base, "setup_s": setup,
+                  "peak_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                  "retrievers": len(retrievers)}}))
+"""
+
+
+def _populate(path: str, n_docs: int, batch: int = 5000):
+    import numpy as np
+    import chromadb
+    from chromadb.config import Settings
+    from rag.indexer import get_embedding_model
+    from rag.retriever import COLLECTION_NAME
+    dim = get_embedding_model().get_sentence_embedding_dimension()
+    client = chromadb.PersistentClient(path=path, settings=Settings(anonymized_telemetry=False))
+    collection = client.get_or_create_collection(COLLECTION_NAME, metadata={"hnsw:space": "cosine"})
+    rng = np.random.default_rng(0)
+    for start in range(0, n_docs, batch):
+        n = min(batch, n_docs - start)
+        collection.add(
+            ids=[f"bench_{i}" for i in range(start, start + n)],
+            embeddings=rng.standard_normal((n, dim), dtype=np.float32).tolist(),
+            documents=[f"document {i}" for i in range(start, start + n)],
+            metadatas=[{"source_id": i} for i in range(start, start + n)],
+        )
+
+
+def main(n_docs: int):
+    tmp = tempfile.mkdtemp(prefix="devflow_bench_memory_")
+    env = dict(os.environ, CHROMA_PATH=os.path.join(tmp, "chroma"),
+               DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+               EMBED_STORE_DIR=os.path.join(tmp, "embeddings"), QUERY_EMBED_CACHE_REDIS="false")
+    env.pop("CHROMA_HOST", None)
+    env.setdefault("GEMINI_API_KEY", "bench")
+    os.environ.update(env)
+    _populate(env["CHROMA_PATH"], n_docs)
+
+    print(f"{n_docs} vectors in Chroma")
+    print(f"{'layout':>10} | {'retrievers':>10} | {'setup s':>7} | {'RSS MB':>7} | {'peak MB':>7}")
+    for layout in ("duplicated", "shared"):
+        out = subprocess.run([sys.executable, "-c", _CHILD.format(layout=layout)], cwd=BACKEND, env=env,
+                             capture_output=True, text=True)
+        if out.returncode:
+            sys.exit(out.stderr)
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        print(f"{layout:>10} | {r['retrievers']:>10} | {r['setup_s']:>7.2f} | {r['rss_mb']:>7.0f} | {r['peak_mb']:>7.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=50000)
+    args = parser.parse_args()
+    main(args.docs)
@@ -0,0 +1,121 @@
+"""
+Memory and latency of N API worker processes, each with its own models vs all
+of them using one model host (MODEL_HOST_SOCKET):
+  local — every worker loads the embedder and the cross-encoder (today's
+          uvicorn --workers N)
+  host  — one `python model_host.py` process owns the models; workers send
+          encode/rerank requests over the unix socket
+
+Each worker imports main and warms its services, waits until every worker is
+up, then runs --queries searches' worth of model calls (encode one query,
+rerank 10 passages). Memory is the summed PSS of all processes (the host
+included), read while they are all still alive, so shared pages count once.
+
+    python benchmarks/bench_model_host.py --workers 4 --queries 50
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+_WORKER = """
+import sys, json, time
+import main
+embedder = main.services.get("indexer").model
+cross_encoder = main.services.get("reranker").model
+embedder.encode(["query: warm up"])
+cross_encoder.predict([("warm up", "warm up")])
+print(json.dumps({"ready": True}), flush=True)
+sys.stdin.readline()
+latencies = []
+for i in range(int(sys.argv[1])):
+    start = time.perf_counter()
+    embedder.encode([f"query: question {i} about caching"])
+    cross_encoder.predict([(f"question {i}", f"passage {j} on cache TTLs and Redis") for j in range(10)])
+    latencies.append((time.perf_counter() - start) * 1000)
+print(json.dumps({"latencies": latencies, "torch_loaded": "torch" in sys.modules}), flush=True)
+sys.stdin.readline()
+"""
+
+
+def _pss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        line = next(l for l in f if l.startswith("Pss:"))
+    return int(line.split()[1]) / 1024
+
+
+def _read(worker: subprocess.Popen, key: str) -> dict:
+    # skip log lines; main's logger writes to stdout too
+    for line in worker.stdout:
+        if line.startswith("{") and key in line:
+            return json.loads(line)
+    sys.exit(worker.stderr.read())
+
+
+def _run(layout: str, n_workers: int, n_queries: int, env: dict) -> dict:
+    env = dict(env)
+    host = None
+    if layout == "host":
+        env["MODEL_HOST_SOCKET"] = os.path.join(tempfile.mkdtemp(prefix="devflow_bench_host_"), "models.sock")
+        host = subprocess.Popen([sys.executable, "model_host.py", "--socket", env["MODEL_HOST_SOCKET"]],
+                                cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    else:
+        env.pop("MODEL_HOST_SOCKET", None)
+    start = time.perf_counter()
+    workers = [subprocess.Popen([sys.executable, "-c", _WORKER, str(n_queries)], cwd=BACKEND, env=env,
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+               for _ in range(n_workers)]
+    try:
+        for w in workers:
+            _read(w, "ready")
+        ready = time.perf_counter() - start
+        start = time.perf_counter()
+        for w in workers:
+            w.stdin.write("go\n")
+            w.stdin.flush()
+        results = [_read(w, "latencies") for w in workers]
+        wall = time.perf_counter() - start
+        pss = sum(_pss_mb(w.pid) for w in workers) + (_pss_mb(host.pid) if host else 0)
+        host_pss = _pss_mb(host.pid) if host else 0
+    finally:
+        for w in workers:
+            w.stdin.close()
+            w.wait(10)
+        if host:
+            host.terminate()
+            host.wait(10)
+    latencies = [ms for r in results for ms in r["latencies"]]
+    return {"ready_s": ready, "pss_mb": pss, "host_pss_mb": host_pss, "p50_ms": statistics.median(latencies),
+            "p95_ms": statistics.quantiles(latencies, n=20)[-1], "qps": len(latencies) / wall,
+            "torch_in_workers": any(r["torch_loaded"] for r in results)}
+
+
+def main(worker_counts, n_queries: int):
+    tmp = tempfile.mkdtemp(prefix="devflow_bench_model_host_")
+    env = dict(os.environ, CHROMA_PATH=os.path.join(tmp, "chroma"), DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+               EMBED_STORE_DIR=os.path.join(tmp, "embeddings"), QUERY_EMBED_CACHE_REDIS="false", STARTUP_WARMUP="lazy")
+    env.setdefault("GEMINI_API_KEY", "bench")
+    print(f"{n_queries} searches per worker (encode 1 query + rerank 10 passages), {os.cpu_count()} CPUs")
+    print(f"{'workers':>7} | {'layout':>6} | {'startup s':>9} | {'total PSS MB':>12} | {'host PSS MB':>11} | "
+          f"{'p50 ms':>6} | {'p95 ms':>6} | {'searches/s':>10} | torch in workers")
+    for n in worker_counts:
+        for layout in ("local", "host"):
+            r = _run(layout, n, n_queries, env)
+            host_pss = f"{r['host_pss_mb']:.0f}" if layout == "host" else "-"
+            print(f"{n:>7} | {layout:>6} | {r['ready_s']:>9.1f} | {r['pss_mb']:>12.0f} | {host_pss:>11} | "
+                  f"{r['p50_ms']:>6.1f} | {r['p95_ms']:>6.1f} | {r['qps']:>10.1f} | {r['torch_in_workers']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+    main(args.workers, args.queries)
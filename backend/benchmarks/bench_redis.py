@@ -0,0 +1,138 @@
+"""
+Per-request Redis overhead of the search handler's cache phase, at several
+levels of concurrency, against the Redis at --url (default REDIS_URL):
+  sync       — previous path: blocking redis.Redis GET of the answer on the event
+               loop, then the query-embedding GET on the threadpool
+  async      — pooled redis.asyncio client, the same two GETs awaited in turn
+  pipelined  — afetch: both lookups in one round trip (current path)
+
+"max loop lag" is how late a 1 ms timer on the same loop fires: the stall every
+other request (SSE streams included) sees while Redis is being waited on.
+
+Then the same handler with Redis unreachable: the previous client dropped the
+connection and re-pinged on every call; the circuit breaker skips Redis until
+REDIS_RETRY_AFTER has passed.
+
+    python benchmarks/bench_redis.py --url redis://localhost:6379 --levels 1 16 64
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import redis  # noqa: E402
+from starlette.concurrency import run_in_threadpool  # noqa: E402
+
+import cache.redis_cache as redis_cache  # noqa: E402
+
+ANSWER_KEY = "devflow:search:bench"
+EMBED_KEY = "devflow:qemb:bench"
+
+
+class _LegacyClient:
+    """The previous module-level client: drop it on any error, reconnect with a
+    blocking ping() on the next call."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.client = None
+
+    def get(self, key: str):
+        if self.client is None:
+            try:
+                self.client = redis.from_url(self.url, decode_responses=True)
+                self.client.ping()
+            except Exception:
+                self.client = None
+                return None
+        try:
+            return self.client.get(key)
+        except Exception:
+            self.client = None
+            return None
+
+
+async def _measure(handler, concurrency: int, requests: int) -> dict:
+    latencies = []
+    remaining = iter(range(requests))
+
+    async def client():
+        for _ in remaining:
+            start = time.perf_counter()
+            await handler()
+            latencies.append((time.perf_counter() - start) * 1e6)
+
+    lags = []
+
+    async def ticker():
+        # how late a 1 ms timer fires: time the loop spent blocked by someone else
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append((time.perf_counter() - start - 0.001) * 1e6)
+
+    tick = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    wall = time.perf_counter() - start
+    tick.cancel()
+    return {"p50_us": statistics.median(latencies), "p95_us": statistics.quantiles(latencies, n=20)[-1],
+            "rps": requests / wall, "lag_max_us": max(lags, default=0)}
+
+
+def _handlers(url: str):
+    legacy = _LegacyClient(url)
+
+    async def sync():
+        legacy.get(ANSWER_KEY)
+        await run_in_threadpool(legacy.get, EMBED_KEY)
+
+    async def async_():
+        await redis_cache.aget_cached(ANSWER_KEY + ":miss")
+        await redis_cache.aget_array(EMBED_KEY)
+
+    async def pipelined():
+        await redis_cache.afetch(("json", ANSWER_KEY + ":miss"), ("array", EMBED_KEY))
+
+    return {"sync": sync, "async": async_, "pipelined": pipelined}
+
+
+async def main(url: str, levels, requests: int):
+    redis_cache.REDIS_URL = url
+    if not await redis_cache.aping():
+        sys.exit(f"Redis at {url} is not reachable")
+    await redis_cache.aset_array(EMBED_KEY, np.ones(768, dtype=np.float32))
+
+    print(f"{requests} requests per level; answer-cache miss + query-embedding hit (768-dim)")
+    print(f"{'concurrency':>11} | {'path':>9} | {'p50 µs':>7} | {'p95 µs':>7} | {'requests/s':>10} | {'max loop lag µs':>15}")
+    for concurrency in levels:
+        for name, handler in _handlers(url).items():
+            await _measure(handler, concurrency, min(requests, 200))  # warm the pools
+            r = await _measure(handler, concurrency, requests)
+            print(f"{concurrency:>11} | {name:>9} | {r['p50_us']:>7.0f} | {r['p95_us']:>7.0f} | {r['rps']:>10.0f} | "
+                  f"{r['lag_max_us']:>15.0f}")
+
+    down = "redis://127.0.0.1:1"
+    await redis_cache.aclose()
+    redis_cache.REDIS_URL = down
+    print(f"\nRedis unreachable ({down}), concurrency 1")
+    print(f"{'path':>18} | {'p50 µs':>7} | {'requests/s':>10}")
+    r = await _measure(_handlers(down)["sync"], 1, requests)
+    print(f"{'sync, reconnect':>18} | {r['p50_us']:>7.0f} | {r['rps']:>10.0f}")
+    r = await _measure(_handlers(down)["pipelined"], 1, requests)
+    print(f"{'circuit breaker':>18} | {r['p50_us']:>7.0f} | {r['rps']:>10.0f}")
+    await redis_cache.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=os.getenv("REDIS_URL", "redis://localhost:6379"))
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.levels, args.requests))
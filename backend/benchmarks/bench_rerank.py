@@ -0,0 +1,65 @@
+"""
+Cross-encoder reranking cost per search: unsorted vs length-bucketed batches,
+and a repeated (hot) query answered from the score memo.
+
+Each search reranks `--candidates` chunks of mixed length, like the dense
+results of /api/search. Modes:
+  unsorted  — pairs in retrieval order, one predict() call (previous path)
+  bucketed  — Reranker.score: pairs sorted by length before batching
+  hot       — the same queries again; scores come from the (query, chunk) LRU
+
+    python benchmarks/bench_rerank.py --queries 30 --candidates 10
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag.reranker import Reranker, RERANK_BATCH_SIZE  # noqa: E402
+from benchmarks.bench_ingest import _corpus  # noqa: E402
+
+
+def _timed(fn, searches):
+    latencies = []
+    for query, docs, ids in searches:
+        start = time.perf_counter()
+        fn(query, docs, ids)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies), sum(latencies) / 1000
+
+
+def main(n_queries: int, n_candidates: int, seed: int):
+    rng = random.Random(seed)
+    texts, _, _ = _corpus(n_queries * n_candidates, seed)
+    # retrieved chunks range from a sentence to a full 400-word chunk
+    chunks = [" ".join(t.split()[:rng.randint(20, 400)]) for t in texts]
+    searches = []
+    for q in range(n_queries):
+        docs = chunks[q * n_candidates:(q + 1) * n_candidates]
+        searches.append((f"question {q} about {rng.choice(docs).split()[0]}", docs,
+                         [f"q{q}_c{i}" for i in range(len(docs))]))
+
+    reranker = Reranker()
+    reranker.model.predict([("warm up", "warm up")], show_progress_bar=False)
+
+    def unsorted(query, docs, ids):
+        reranker.model.predict([(query, d) for d in docs], batch_size=RERANK_BATCH_SIZE, show_progress_bar=False)
+
+    print(f"{n_queries} searches × {n_candidates} candidates, batch_size={RERANK_BATCH_SIZE}")
+    print(f"{'mode':>9} | {'p50 ms':>7} | {'total s':>7}")
+    for name, fn in (("unsorted", unsorted), ("bucketed", reranker.score), ("hot", reranker.score)):
+        p50, total = _timed(fn, searches)
+        print(f"{name:>9} | {p50:>7.1f} | {total:>7.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--candidates", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    main(args.queries, args.candidates, args.seed)
@@ -0,0 +1,76 @@
+"""
+Reranking throughput with and without cross-request batching.
+
+Simulates N concurrent searches, each reranking `--candidates` chunks for a
+fresh query (so the score memo never hits), and reports searches/sec for:
+  per-request — one CrossEncoder.predict per search on the inference pool (previous path)
+  batched     — BatchedCrossEncoder.apredict, coalescing concurrent searches' pairs
+
+    python benchmarks/bench_rerank_batching.py --levels 1 8 32 --candidates 10
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import itertools
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sentence_transformers import CrossEncoder  # noqa: E402
+from rag.reranker import BatchedCrossEncoder, RERANK_BATCH_SIZE, RERANK_MAX_LENGTH, RERANK_MAX_WAIT_MS, RERANK_MODEL_NAME  # noqa: E402
+from rag.inference import run_inference  # noqa: E402
+from benchmarks.bench_ingest import _corpus  # noqa: E402
+
+
+async def _throughput(rerank, concurrency: int, duration: float, chunks, candidates: int) -> float:
+    done = 0
+    counter = itertools.count()
+    deadline = time.perf_counter() + duration
+
+    async def search():
+        nonlocal done
+        while time.perf_counter() < deadline:
+            i = next(counter)
+            docs = [chunks[(i * candidates + j) % len(chunks)] for j in range(candidates)]
+            await rerank([(f"question {i} about {docs[0].split()[0]}", d) for d in docs])
+            done += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[search() for _ in range(concurrency)])
+    return done / (time.perf_counter() - start)
+
+
+async def main(levels, duration: float, candidates: int, max_batch: int, max_wait_ms: float):
+    model = CrossEncoder(RERANK_MODEL_NAME, max_length=RERANK_MAX_LENGTH)
+    batched = BatchedCrossEncoder(model, max_batch=max_batch, max_wait_ms=max_wait_ms)
+    texts, _, _ = _corpus(500)
+    chunks = [" ".join(t.split()[:400]) for t in texts]
+
+    async def per_request(pairs):
+        return await run_inference(model.predict, pairs, batch_size=RERANK_BATCH_SIZE, show_progress_bar=False)
+
+    await per_request([("warm up", "warm up")])
+    await batched.apredict([("warm up", "warm up")])
+
+    print(f"{candidates} candidates per search, max_batch={max_batch} pairs")
+    print(f"{'concurrency':>11} | {'per-request/s':>13} | {'batched/s':>9} | {'speedup':>7} | mean batch | wait p95 ms")
+    for n in levels:
+        before = batched.stats()
+        base = await _throughput(per_request, n, duration, chunks, candidates)
+        fast = await _throughput(batched.apredict, n, duration, chunks, candidates)
+        after = batched.stats()
+        batches = after["batches"] - before["batches"]
+        mean = (after["items"] - before["items"]) / batches if batches else 0
+        print(f"{n:>11} | {base:>13.1f} | {fast:>9.1f} | {fast / base:>6.2f}x | {mean:>10.1f} | {after['wait_ms_p95']:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per measurement")
+    parser.add_argument("--candidates", type=int, default=10)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=RERANK_MAX_WAIT_MS)
+    args = parser.parse_args()
+    asyncio.run(main(args.levels, args.duration, args.candidates, args.max_batch, args.max_wait_ms))
@@ -0,0 +1,74 @@
+"""
+Cost of re-syncing a mostly unchanged document set vs re-indexing it from scratch.
+
+Indexes a synthetic corpus into a throwaway Chroma store, edits a fraction of
+the documents (one word near the end of each, so only its last chunk changes),
+then compares:
+  full    — delete every source's chunks and re-embed everything (previous path)
+  resync  — stored_chunks + prepare_documents(stored=...) + sync_documents:
+            only changed chunks are embedded, vanished ones deleted
+
+    python benchmarks/bench_resync.py --docs 500 --changed 0.05
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["CHROMA_PATH"] = tempfile.mkdtemp(prefix="devflow_bench_resync_")
+os.environ.pop("CHROMA_HOST", None)
+
+from rag.indexer import Indexer  # noqa: E402
+from rag.retriever import Retriever  # noqa: E402
+from benchmarks.bench_ingest import _corpus  # noqa: E402
+
+
+def _index(indexer: Indexer, retriever: Retriever, texts, titles, urls, source_ids, stored=None) -> dict:
+    prepared = indexer.prepare_documents(texts, titles, urls, source_ids, "bench", stored=stored)
+    return retriever.sync_documents(*prepared, source_ids)
+
+
+def main(n_docs: int, changed: float, seed: int):
+    indexer, retriever = Indexer(), Retriever()
+    texts, titles, urls = _corpus(n_docs, seed)
+    source_ids = list(range(1, n_docs + 1))
+    indexer.generate_embeddings(["passage: warm up"] * 8)
+    _index(indexer, retriever, texts, titles, urls, source_ids)
+
+    rng = random.Random(seed + 1)
+    edited = list(texts)
+    for i in rng.sample(range(n_docs), max(1, int(n_docs * changed))):
+        words = edited[i].split()
+        words[-1] = f"edited{i}"
+        edited[i] = " ".join(words)
+
+    start = time.perf_counter()
+    for sid in source_ids:
+        retriever.delete_by_source(sid)
+    full_stats = _index(indexer, retriever, edited, titles, urls, source_ids)
+    full = time.perf_counter() - start
+
+    # put the original corpus back, then resync the same edit incrementally
+    _index(indexer, retriever, texts, titles, urls, source_ids, stored=retriever.stored_chunks(source_ids))
+    start = time.perf_counter()
+    stats = _index(indexer, retriever, edited, titles, urls, source_ids, stored=retriever.stored_chunks(source_ids))
+    resync = time.perf_counter() - start
+
+    total = full_stats["added"]
+    print(f"{n_docs} docs → {total} chunks, {changed:.0%} of docs edited")
+    print(f"{'mode':>7} | {'seconds':>8} | {'embedded':>8} | {'deleted':>7}")
+    print(f"{'full':>7} | {full:>8.2f} | {total:>8} | {total:>7}")
+    print(f"{'resync':>7} | {resync:>8.2f} | {stats['added']:>8} | {stats['deleted']:>7}")
+    print(f"resync cost: {resync / full:.1%} of a full reindex")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=500)
+    parser.add_argument("--changed", type=float, default=0.05, help="fraction of documents edited")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    main(args.docs, args.changed, args.seed)
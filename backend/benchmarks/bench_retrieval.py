@@ -0,0 +1,108 @@
+"""
+Recall@k and latency of dense-only vs hybrid (dense + keyword, RRF) retrieval.
+
+Builds a throwaway corpus where every document mentions one identifier (error
+code, config key, function name) inside generic prose, then asks two kinds of
+questions per sampled document:
+  identifier — "what does <identifier> mean": exact-match lookups that dense
+               embeddings tend to blur
+  topic      — a few of the document's own content words, no identifier
+A query counts as a hit when a chunk of its document is in the top k.
+
+    python benchmarks/bench_retrieval.py --docs 2000 --queries 200 --k 5
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_tmp = tempfile.mkdtemp(prefix="devflow_bench_retrieval_")
+os.environ["CHROMA_PATH"] = os.path.join(_tmp, "chroma")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'bench.db')}"
+os.environ["EMBED_STORE_DIR"] = os.path.join(_tmp, "embeddings")
+os.environ["QUERY_EMBED_CACHE_REDIS"] = "false"
+os.environ.pop("CHROMA_HOST", None)
+
+from rag.indexer import Indexer  # noqa: E402
+from rag.retriever import Retriever  # noqa: E402
+
+TOPICS = [
+    "connection pool", "retry budget", "cache eviction", "token refresh", "schema migration",
+    "rate limiter", "file upload", "search ranking", "session store", "background worker",
+]
+PROSE = (
+    "when the service starts it loads settings from the environment and opens a pool of "
+    "connections so requests can share them while a background task keeps the cache warm "
+    "and old entries expire after a while unless the operator changes the default limits"
+).split()
+
+
+def _identifier(rng: random.Random, i: int) -> str:
+    kind = rng.choice(["err", "cfg", "fn"])
+    if kind == "err":
+        return f"E{rng.randrange(16 ** 4):04X}_{i}"
+    if kind == "cfg":
+        return f"{rng.choice(['pool', 'cache', 'auth', 'queue'])}.{rng.choice(['max', 'min', 'ttl'])}_{i}"
+    return f"handle_{rng.choice(['retry', 'refresh', 'evict', 'upload'])}_{i}"
+
+
+def _corpus(n_docs: int, seed: int):
+    rng = random.Random(seed)
+    docs = []
+    for i in range(n_docs):
+        topic = rng.choice(TOPICS)
+        ident = _identifier(rng, i)
+        words = [rng.choice(PROSE) for _ in range(rng.randint(60, 250))]
+        words.insert(rng.randrange(len(words)), f"{topic} {ident}")
+        docs.append((ident, topic, " ".join(words)))
+    return docs
+
+
+def _measure(retriever: Retriever, queries, k: int, mode: str):
+    hits, latencies = 0, []
+    for query, source_id in queries:
+        start = time.perf_counter()
+        results = retriever.search(query, n_results=k, mode=mode)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += any(m["source_id"] == source_id for m in results["metadatas"])
+    latencies.sort()
+    return hits / len(queries), statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1]
+
+
+def main(n_docs: int, n_queries: int, k: int, seed: int):
+    indexer, retriever = Indexer(), Retriever()
+    docs = _corpus(n_docs, seed)
+    texts = [text for *_, text in docs]
+    titles = [f"doc {i}" for i in range(n_docs)]
+    source_ids = list(range(1, n_docs + 1))
+    prepared = indexer.prepare_documents(texts, titles, titles, source_ids, "bench")
+    retriever.sync_documents(*prepared, source_ids)
+
+    rng = random.Random(seed + 1)
+    sample = rng.sample(range(n_docs), min(n_queries, n_docs))
+    query_sets = {
+        "identifier": [(f"what does {docs[i][0]} mean", i + 1) for i in sample],
+        "topic": [(" ".join(rng.sample(docs[i][2].split(), 6)), i + 1) for i in sample],
+    }
+    retriever.search("warm up", n_results=k, mode="hybrid")
+
+    print(f"{n_docs} docs → {len(prepared[0])} chunks, {len(sample)} queries per set, k={k}")
+    print(f"{'queries':>10} | {'mode':>6} | {'recall@k':>8} | {'p50 ms':>7} | {'p95 ms':>7}")
+    for name, queries in query_sets.items():
+        for mode in ("dense", "hybrid"):
+            recall, p50, p95 = _measure(retriever, queries, k, mode)
+            print(f"{name:>10} | {mode:>6} | {recall:>8.2f} | {p50:>7.1f} | {p95:>7.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    main(args.docs, args.queries, args.k, args.seed)
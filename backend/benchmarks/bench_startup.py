@@ -0,0 +1,54 @@
+"""
+API cold-start cost: how long `import main` takes (the window before uvicorn can
+bind), and how long background warm-up then takes per component.
+
+Each run imports main in a fresh interpreter, so module caches don't carry over.
+Before lazy loading, every model was created at import, so the time to bind was
+roughly the import time plus the load times reported here.
+
+    python benchmarks/bench_startup.py --runs 3
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_CHILD = """
+import sys, time, json
+start = time.perf_counter()
+import main
+imported = time.perf_counter() - start
+heavy = [m for m in ("torch", "chromadb", "sentence_transformers", "langchain_core") if m in sys.modules]
+main.services.start_warmup().result()
+print(json.dumps({"import_s": imported, "heavy_at_import": heavy,
+                  "ready_s": time.perf_counter() - start, "status": main.services.status()}))
+"""
+
+
+def main(runs: int):
+    results = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", _CHILD], cwd=BACKEND, capture_output=True, text=True, check=True)
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(f"{runs} cold starts (median)")
+    print(f"  import main (time to bind): {statistics.median(r['import_s'] for r in results):.2f}s")
+    print(f"  heavy modules at import:    {results[-1]['heavy_at_import'] or 'none'}")
+    print(f"  import → all warm:          {statistics.median(r['ready_s'] for r in results):.2f}s")
+    print(f"{'component':>13} | {'load s':>6} | {'warm-up s':>9} | state")
+    for name in results[-1]["status"]["components"]:
+        load = statistics.median(r["status"]["components"][name]["load_seconds"] or 0 for r in results)
+        warm = statistics.median(r["status"]["components"][name]["warmup_seconds"] or 0 for r in results)
+        state = results[-1]["status"]["components"][name]
+        print(f"{name:>13} | {load:>6.2f} | {warm:>9.2f} | {state['state']} {(state['error'] or '')[:60]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    main(args.runs)
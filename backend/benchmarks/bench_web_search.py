@@ -0,0 +1,267 @@
+"""
+Web search-and-scrape latency against a local HTTP server that stands in for
+Brave, the Go scraper and the result pages. Every new connection pays
+--handshake ms before its first response (the TCP + TLS setup a real host
+costs) and every page takes --page-ms to serve:
+
+  previous — WebSearcher before pooling: a new AsyncClient per call, pages the
+             Go scraper missed fetched one at a time, and scrape_url fetching
+             the page a second time for its title
+  pooled   — the shared per-loop client, concurrent fallback fetches (at most
+             WEB_PER_HOST per host) and a single fetch per page
+
+  hybrid   — asearch_and_scrape with the Go scraper down, so every result page
+             goes through the Python fallback (results spread over --hosts hosts)
+  index    — scrape_url for one URL at a time with the Go scraper up, as URL
+             index jobs call it
+  repeat   — a repetitive query mix (--mix queries over --distinct topics,
+             Zipf-weighted) through asearch_and_scrape with Brave taking
+             --brave-ms: no caches, the Brave result + page caches, and the
+             caches with every page stale (each reuse is a conditional GET
+             answered 304)
+
+    python benchmarks/bench_web_search.py --queries 20 --count 3 8 --handshake 30 --page-ms 80
+"""
+import os
+import sys
+import json
+import zlib
+import time
+import asyncio
+import argparse
+import random
+import tempfile
+import statistics
+import threading
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("BRAVE_API_KEY", "bench")
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='devflow_bench_web_')}/bench.db"
+os.environ["REDIS_URL"] = ""      # the in-process Brave result cache only
+
+import httpx  # noqa: E402
+import requests  # noqa: E402
+from bs4 import BeautifulSoup  # noqa: E402
+from loguru import logger  # noqa: E402
+
+import connectors.web_search as web_search  # noqa: E402
+from connectors.web_search import WebSearcher, _clip, _parse_page  # noqa: E402
+from database.db import Database  # noqa: E402
+
+logger.disable("connectors.web_search")    # one "Go scraper unavailable" per query
+
+PAGE = ("<html><head><title>Page {n}</title></head><body><nav>menu</nav>"
+        + "<p>Retry budgets cap how many retries a client may send.</p>" * 40 + "</body></html>")
+
+
+class _Server:
+    """Minimal keep-alive HTTP/1.1 server: /search (Brave JSON), /scrape (Go),
+    /page/<n> (HTML, with an ETag it honours in If-None-Match). Counts connections,
+    requests, searches, page downloads and 304s."""
+
+    def __init__(self, handshake: float, page_latency: float, hosts: int, go_up: bool, search_latency: float = 0):
+        self.handshake, self.page_latency, self.hosts, self.go_up = handshake, page_latency, hosts, go_up
+        self.search_latency = search_latency
+        self.connections = self.requests = self.searches = self.downloads = self.not_modified = 0
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        threading.Thread(target=self._run, args=(ready,), daemon=True).start()
+        ready.wait()
+
+    def _run(self, ready):
+        asyncio.set_event_loop(self.loop)
+        server = self.loop.run_until_complete(asyncio.start_server(self._serve, "0.0.0.0", 0))
+        self.port = server.sockets[0].getsockname()[1]
+        ready.set()
+        self.loop.run_forever()
+
+    def url(self, n: int) -> str:
+        return f"http://127.0.0.{n % self.hosts + 1}:{self.port}/page/{n}"
+
+    async def _serve(self, reader, writer):
+        self.connections += 1
+        await asyncio.sleep(self.handshake)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                request_line, *headers = head.decode().split("\r\n")
+                method, target, _ = request_line.split(" ")
+                length = next((int(h.split(":")[1]) for h in headers if h.lower().startswith("content-length")), 0)
+                body = await reader.readexactly(length) if length else b""
+                self.requests += 1
+                status, payload, kind = await self._route(method, target, body, headers)
+                etag = f'ETag: "{target}"\r\n' if target.startswith("/page/") else ""
+                writer.write(f"HTTP/1.1 {status} X\r\nContent-Type: {kind}\r\nContent-Length: {len(payload)}\r\n"
+                             f"{etag}Connection: keep-alive\r\n\r\n".encode() + payload)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method, target, body, headers):
+        if target.startswith("/search"):
+            self.searches += 1
+            await asyncio.sleep(self.search_latency)
+            params = parse_qs(urlsplit(target).query)
+            count, first = int(params["count"][0]), 1000 * (zlib.crc32(params["q"][0].encode()) % 1000)   # pages per query
+            results = [{"title": f"Result {n}", "url": self.url(first + n), "description": ""} for n in range(count)]
+            return 200, json.dumps({"web": {"results": results}}).encode(), "application/json"
+        if target == "/scrape":
+            if not self.go_up:
+                return 503, b"", "text/plain"
+            await asyncio.sleep(self.page_latency)
+            urls = json.loads(body)["urls"]
+            results = [{"url": u, "title": f"Page {u.rsplit('/', 1)[1]}", "content": "Retry budgets.", "success": True}
+                       for u in urls]
+            return 200, json.dumps({"results": results}).encode(), "application/json"
+        if f'if-none-match: "{target}"' in (h.lower() for h in headers):
+            self.not_modified += 1
+            return 304, b"", "text/html"
+        await asyncio.sleep(self.page_latency)
+        self.downloads += 1
+        return 200, PAGE.format(n=target.rsplit("/", 1)[1]).encode(), "text/html"
+
+
+# ── The previous WebSearcher's request paths ─────────────────────────────────
+
+async def _previous_search_and_scrape(searcher: WebSearcher, query: str, count: int):
+    async with httpx.AsyncClient() as client:
+        resp = await client.get(searcher.brave_url, headers=searcher._brave_headers(),
+                                params={"q": query, "count": count}, timeout=10)
+        search_results = searcher._parse_brave(resp.json(), count)
+        try:
+            resp = await client.post(f"{web_search.SCRAPER_URL}/scrape", json={"urls": [r["url"] for r in search_results]})
+            resp.raise_for_status()
+            scraped = {r["url"]: r["content"] for r in resp.json().get("results", []) if r.get("success") and r.get("content")}
+        except Exception:
+            scraped = {}
+        enriched = []
+        for r in search_results:
+            content = scraped.get(r["url"])
+            if not content:
+                resp = await client.get(r["url"], headers=web_search._UA, timeout=10)
+                content = _clip(_parse_page(resp.content)[1], 5000)
+            enriched.append({**r, "content": content})
+        return enriched
+
+
+def _previous_scrape_url(url: str, max_length: int = 8000):
+    resp = requests.post(f"{web_search.SCRAPER_URL}/scrape", json={"urls": [url], "max_length": max_length}, timeout=15)
+    content = {r["url"]: r["content"] for r in resp.json()["results"] if r.get("success")}[url]
+    soup = BeautifulSoup(requests.get(url, headers=web_search._UA, timeout=8).content, "lxml")
+    return {"title": soup.find("title").get_text().strip(), "content": content}
+
+
+# ── Runs ──────────────────────────────────────────────────────────────────────
+
+def _row(name, count, server, latencies, before):
+    connections, reqs = server.connections - before[0], server.requests - before[1]
+    n = len(latencies)
+    print(f"{name:>8} | {count:>5} | {statistics.median(latencies) * 1000:>7.0f} | "
+          f"{max(latencies) * 1000:>7.0f} | {connections / n:>9.1f} | {reqs / n:>8.1f}")
+
+
+def _repeat(n_mix: int, distinct: int, count: int, handshake_ms: float, page_ms: float, brave_ms: float,
+            hosts: int, seed: int):
+    rng = random.Random(seed)
+    mix = rng.choices(range(distinct), weights=[1 / (i + 1) for i in range(distinct)], k=n_mix)
+    server = _Server(handshake_ms / 1000, page_ms / 1000, hosts, go_up=False, search_latency=brave_ms / 1000)
+    web_search.SCRAPER_URL = f"http://127.0.0.1:{server.port}"
+    db = Database()
+    print(f"repeat: {n_mix} searches over {distinct} topics ({len(set(mix))} seen), count={count}, "
+          f"Brave {brave_ms:g} ms, Go scraper down")
+    print(f"{'caches':>10} | {'p50 ms':>7} | {'mean ms':>7} | {'conns/q':>7} | {'searches/q':>10} | "
+          f"{'downloads/q':>11} | {'304s/q':>6}")
+
+    async def run(name, searcher, brave_ttl, page_ttl):
+        web_search.BRAVE_CACHE_TTL, web_search.PAGE_CACHE_TTL = brave_ttl, page_ttl
+        web_search._search_cache.clear()
+        db.prune_page_cache(datetime.now() + timedelta(days=1))      # empty it
+        searcher.brave_url = f"http://127.0.0.1:{server.port}/search"
+        await searcher.asearch_and_scrape("warm", count=count)
+        before = (server.connections, server.searches, server.downloads, server.not_modified)
+        latencies = []
+        for topic in mix:
+            start = time.perf_counter()
+            results = await searcher.asearch_and_scrape(f"topic {topic}", count=count, deadline=60)
+            latencies.append(time.perf_counter() - start)
+            assert len(results) == count
+            await asyncio.gather(*searcher._writes)
+        after = (server.connections, server.searches, server.downloads, server.not_modified)
+        connections, searches, downloads, not_modified = (a - b for a, b in zip(after, before))
+        print(f"{name:>10} | {statistics.median(latencies) * 1000:>7.1f} | {statistics.mean(latencies) * 1000:>7.1f} | "
+              f"{connections / n_mix:>7.2f} | {searches / n_mix:>10.2f} | {downloads / n_mix:>11.2f} | "
+              f"{not_modified / n_mix:>6.2f}")
+
+    async def runs():
+        await run("none", WebSearcher(), 0, 3600)
+        await run("fresh", WebSearcher(db), 900, 3600)
+        await run("stale", WebSearcher(db), 900, 0)
+        await web_search.aclose_http_clients()
+
+    asyncio.run(runs())
+
+
+def main(n_queries: int, counts, handshake_ms: float, page_ms: float, hosts: int):
+    print(f"handshake {handshake_ms:g} ms/connection, {page_ms:g} ms/page, {hosts} hosts, "
+          f"{web_search.WEB_PER_HOST} fetches per host, HTTP/2 {'on' if web_search.HTTP2 else 'off (h2 not installed)'}")
+    print(f"{'path':>8} | {'count':>5} | {'p50 ms':>7} | {'max ms':>7} | {'conns/op':>9} | {'reqs/op':>8}")
+
+    web_search.BRAVE_CACHE_TTL = 0      # every query distinct anyway; caches are measured by "repeat"
+    hybrid = _Server(handshake_ms / 1000, page_ms / 1000, hosts, go_up=False)
+    web_search.SCRAPER_URL = f"http://127.0.0.1:{hybrid.port}"
+    searcher = WebSearcher()
+    searcher.brave_url = f"http://127.0.0.1:{hybrid.port}/search"
+
+    async def run(call, count):
+        latencies, before = [], (hybrid.connections, hybrid.requests)
+        for q in range(n_queries):
+            start = time.perf_counter()
+            results = await call(searcher, f"query {q}", count)
+            latencies.append(time.perf_counter() - start)
+            assert len(results) == count
+        return latencies, before
+
+    async def hybrid_runs():
+        await searcher.asearch_and_scrape("warm", count=max(counts))     # open the pool outside the timing
+        for count in counts:
+            for name, call in [("previous", _previous_search_and_scrape),
+                               ("pooled", lambda s, q, c: s.asearch_and_scrape(q, count=c, deadline=60))]:
+                latencies, before = await run(call, count)
+                _row(f"{name}", count, hybrid, latencies, before)
+        await web_search.aclose_http_clients()
+
+    print("hybrid: asearch_and_scrape, Go scraper down")
+    asyncio.run(hybrid_runs())
+
+    index = _Server(handshake_ms / 1000, page_ms / 1000, hosts, go_up=True)
+    web_search.SCRAPER_URL = f"http://127.0.0.1:{index.port}"
+    print("index: scrape_url, Go scraper up")
+    searcher.scrape_url(index.url(0))
+    for name, call in [("previous", _previous_scrape_url), ("pooled", searcher.scrape_url)]:
+        latencies, before = [], (index.connections, index.requests)
+        for q in range(n_queries):
+            start = time.perf_counter()
+            result = call(index.url(q))
+            latencies.append(time.perf_counter() - start)
+            assert result["title"] == f"Page {q}"
+        _row(name, 1, index, latencies, before)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--count", type=int, nargs="+", default=[3, 8])
+    parser.add_argument("--handshake", type=float, default=30, help="ms per new connection")
+    parser.add_argument("--page-ms", type=float, default=80, help="ms to serve a page")
+    parser.add_argument("--hosts", type=int, default=3)
+    parser.add_argument("--mix", type=int, default=200, help="searches in the repeat mix")
+    parser.add_argument("--distinct", type=int, default=30, help="distinct queries in the repeat mix")
+    parser.add_argument("--brave-ms", type=float, default=150, help="ms Brave takes to answer")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    main(args.queries, args.count, args.handshake, args.page_ms, args.hosts)
+    _repeat(args.mix, args.distinct, max(args.count), args.handshake, args.page_ms, args.brave_ms, args.hosts, args.seed)
@@ -0,0 +1,84 @@
+"""
+Concurrency load test against a running API.
+
+Keeps N searches in flight against /api/search for a fixed duration while probing
+/health, and prints p50/p99 for both at each concurrency level. With a non-blocking
+request path /health p99 stays flat as N grows; search latency grows only with
+model/LLM capacity.
+
+    python benchmarks/load_search.py --url http://localhost:8000 --levels 1 8 32 64
+
+/api/search is rate limited per client — start the server with RATE_LIMIT_ENABLED=false.
+"""
+import time
+import asyncio
+import argparse
+from typing import List
+
+import httpx
+
+QUERIES = [
+    "How do I configure CORS?",
+    "What is the default cache TTL?",
+    "How are uploads validated?",
+    "Which embedding model is used?",
+    "How do I reindex legacy content?",
+]
+
+
+def _pct(samples: List[float], p: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000
+
+
+async def _search_worker(client: httpx.AsyncClient, worker: int, deadline: float, out: List[float]):
+    i = 0
+    while time.perf_counter() < deadline:
+        # Unique suffix so the answer cache doesn't short-circuit the pipeline
+        query = f"{QUERIES[i % len(QUERIES)]} ({worker}-{i}-{time.time_ns()})"
+        start = time.perf_counter()
+        r = await client.post("/api/search", json={"query": query})
+        if r.status_code == 200:
+            out.append(time.perf_counter() - start)
+        i += 1
+
+
+async def _health_probe(client: httpx.AsyncClient, deadline: float, out: List[float]):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await client.get("/health")
+        out.append(time.perf_counter() - start)
+        await asyncio.sleep(0.05)
+
+
+async def run_level(url: str, inflight: int, duration: float) -> None:
+    limits = httpx.Limits(max_connections=inflight + 8)
+    async with httpx.AsyncClient(base_url=url, timeout=120, limits=limits) as client:
+        search_lat: List[float] = []
+        health_lat: List[float] = []
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(
+            _health_probe(client, deadline, health_lat),
+            *[_search_worker(client, w, deadline, search_lat) for w in range(inflight)],
+        )
+    print(
+        f"{inflight:>8} | {len(search_lat):>8} | {_pct(search_lat, 0.5):>9.0f} | {_pct(search_lat, 0.99):>9.0f}"
+        f" | {_pct(health_lat, 0.5):>9.1f} | {_pct(health_lat, 0.99):>9.1f}"
+    )
+
+
+async def main(url: str, levels: List[int], duration: float) -> None:
+    print(f"{'inflight':>8} | {'searches':>8} | {'srch p50':>9} | {'srch p99':>9} | {'hlth p50':>9} | {'hlth p99':>9}  (ms)")
+    for n in levels:
+        await run_level(url, n, duration)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per level")
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.levels, args.duration))
@@ -1,64 +1,356 @@
 import os
 import json
+import time
+import base64
+import asyncio
 import hashlib
-from typing import Optional, Any
+import threading
+import weakref
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+import numpy as np
 import redis
+import redis.asyncio as aioredis
+from loguru import logger
+
+from cache.lru import LRUCache
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
 CACHE_TTL = int(os.getenv("CACHE_TTL", "3600"))
+# Connections per pool; each process has one pool for sync callers and one for the event loop
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "32"))
+# Seconds a command (or a wait for a free pooled connection) may take before it
+# counts as a failure and the caller falls back to a cache miss
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.25"))
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", "0.5"))
+# Circuit breaker: after this many consecutive failures Redis is skipped for
+# REDIS_RETRY_AFTER seconds, then a single trial call decides whether to resume
+REDIS_FAILURE_THRESHOLD = int(os.getenv("REDIS_FAILURE_THRESHOLD", "3"))
+REDIS_RETRY_AFTER = float(os.getenv("REDIS_RETRY_AFTER", "5"))
+# Seconds a worker reuses the version counters it read (see INDEX_VERSION), so an
+# answer served from the in-process tier needs no Redis round trip at all. Bumps
+# made by this worker apply at once; other workers' within this window.
+CACHE_VERSION_TTL = float(os.getenv("CACHE_VERSION_TTL", "1"))
+
+T = TypeVar("T")
+_ERRORS = (redis.RedisError, OSError, asyncio.TimeoutError)
+
+
+class CircuitBreaker:
+    """closed → open after `threshold` consecutive failures. While open, allow()
+    is False until `retry_after` seconds have passed; then one caller is let
+    through (half-open) and its outcome closes or re-opens the circuit."""
+
+    def __init__(self, threshold: int = REDIS_FAILURE_THRESHOLD, retry_after: float = REDIS_RETRY_AFTER,
+                 clock: Callable[[], float] = time.monotonic):
+        self.threshold = threshold
+        self.retry_after = retry_after
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trips = 0
+        self.short_circuited = 0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if self._trial else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self.clock() - self.opened_at >= self.retry_after:
+                # let one caller try; if it never reports back, another gets a turn after retry_after
+                self.opened_at, self._trial = self.clock(), True
+                return True
+            self.short_circuited += 1
+            return False
 
+    def success(self):
+        with self._lock:
+            self.failures, self.opened_at, self._trial = 0, None, False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial:
+                self.opened_at, self._trial = self.clock(), False  # trial failed: stay open
+            elif self.opened_at is None and self.failures >= self.threshold:
+                self.opened_at = self.clock()
+                self.trips += 1
+
+    def stats(self) -> Dict:
+        return {"state": self.state, "consecutive_failures": self.failures, "trips": self.trips,
+                "short_circuited": self.short_circuited}
+
+
+_breaker = CircuitBreaker()
 _client: Optional[redis.Redis] = None
+_client_lock = threading.Lock()
+# One asyncio client per event loop: pooled connections belong to the loop that opened them
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aioredis.Redis]" = weakref.WeakKeyDictionary()
+
+
+def _pool_kwargs() -> Dict:
+    return {"decode_responses": True, "max_connections": REDIS_MAX_CONNECTIONS, "timeout": REDIS_SOCKET_TIMEOUT,
+            "socket_timeout": REDIS_SOCKET_TIMEOUT, "socket_connect_timeout": REDIS_CONNECT_TIMEOUT,
+            "health_check_interval": 30}
 
 
 def get_redis() -> Optional[redis.Redis]:
+    """Pooled sync client, or None when Redis is disabled (empty REDIS_URL) or the
+    circuit is open. Commands on it should go through _run so failures count."""
     global _client
+    if not REDIS_URL or not _breaker.allow():
+        return None
     if _client is None:
-        try:
-            _client = redis.from_url(REDIS_URL, decode_responses=True)
-            _client.ping()
-        except Exception:
-            _client = None
+        with _client_lock:
+            if _client is None:
+                _client = redis.Redis(connection_pool=redis.BlockingConnectionPool.from_url(REDIS_URL, **_pool_kwargs()))
     return _client
 
 
-def make_cache_key(prefix: str, data: Any) -> str:
+def get_async_redis() -> Optional[aioredis.Redis]:
+    """Pooled asyncio client for the running loop; None as for get_redis()."""
+    if not REDIS_URL or not _breaker.allow():
+        return None
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        pool = aioredis.BlockingConnectionPool.from_url(REDIS_URL, **_pool_kwargs())
+        client = _async_clients[loop] = aioredis.Redis(connection_pool=pool)
+    return client
+
+
+async def aclose():
+    """Close the running loop's pooled connections (app shutdown)."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+_pool_timeouts = 0
+
+
+def _failed(e: Exception):
+    global _pool_timeouts
+    if isinstance(e, redis.ConnectionError) and str(e) == "No connection available.":
+        # every pooled connection busy for REDIS_SOCKET_TIMEOUT: overload, not an outage
+        _pool_timeouts += 1
+        return
+    was_closed = _breaker.state == "closed"
+    _breaker.failure()
+    if was_closed and _breaker.state != "closed":
+        logger.warning(f"Redis unavailable ({type(e).__name__}: {e}); skipping it for {_breaker.retry_after}s")
+
+
+def _run(op: Callable[[redis.Redis], T], default: T) -> T:
+    client = get_redis()
+    if client is None:
+        return default
+    try:
+        result = op(client)
+    except _ERRORS as e:
+        _failed(e)
+        return default
+    _breaker.success()
+    return result
+
+
+async def _arun(op: Callable[[aioredis.Redis], Awaitable[T]], default: T) -> T:
+    client = get_async_redis()
+    if client is None:
+        return default
+    try:
+        result = await op(client)
+    except _ERRORS as e:
+        _failed(e)
+        return default
+    _breaker.success()
+    return result
+
+
+def redis_stats() -> Dict:
+    return {"enabled": bool(REDIS_URL), "circuit": _breaker.stats(), "pool_timeouts": _pool_timeouts,
+            "max_connections": REDIS_MAX_CONNECTIONS, "socket_timeout": REDIS_SOCKET_TIMEOUT}
+
+
+# Generation counters. Cache keys fold in the versions of everything the value
+# was computed from, so invalidating is one INCR: entries built against the old
+# version are never looked up again and expire under their own TTL. No keyspace
+# scans. "index" covers every chunk in the vector store; "collection:<id>" a
+# collection's membership.
+INDEX_VERSION = "index"
+
+
+def collection_version(collection_id: int) -> str:
+    return f"collection:{collection_id}"
+
+
+_versions = LRUCache(maxsize=4096, ttl=CACHE_VERSION_TTL)
+
+
+def _version_key(scope: str) -> str:
+    return f"devflow:ver:{scope}"
+
+
+def make_cache_key(prefix: str, data: Any, versions: Optional[Dict[str, int]] = None) -> str:
+    if versions:
+        data = {"data": data, "versions": versions}
     payload = json.dumps(data, sort_keys=True)
     hash_val = hashlib.sha256(payload.encode()).hexdigest()[:16]
     return f"devflow:{prefix}:{hash_val}"
 
 
+def _known_versions(scopes) -> Optional[Dict[str, int]]:
+    known = {scope: _versions.get(scope) for scope in scopes}
+    return None if None in known.values() else known
+
+
+def _forget_versions(scopes) -> None:
+    # after the INCR: a read racing it may re-remember the old value, for CACHE_VERSION_TTL at most
+    for scope in scopes:
+        _versions.pop(scope)
+
+
+def _parse_versions(scopes, values) -> Dict[str, int]:
+    versions = {scope: int(v or 0) for scope, v in zip(scopes, values)}
+    for scope, version in versions.items():
+        _versions.set(scope, version)
+    return versions
+
+
+def get_versions(*scopes: str) -> Dict[str, int]:
+    """Current generation of each scope (0 if never bumped or Redis is unavailable),
+    at most CACHE_VERSION_TTL seconds old."""
+    known = _known_versions(scopes)
+    if known is not None:
+        return known
+    return _parse_versions(scopes, _run(lambda r: r.mget([_version_key(s) for s in scopes]), [None] * len(scopes)))
+
+
+def bump_version(*scopes: str) -> bool:
+    """Invalidate every cache entry keyed on these scopes (O(1) per scope)."""
+    def op(r):
+        pipe = r.pipeline(transaction=False)
+        for scope in scopes:
+            pipe.incr(_version_key(scope))
+        return pipe.execute()
+    bumped = bool(_run(op, None))
+    _forget_versions(scopes)
+    return bumped
+
+
+def _decode_json(value: Optional[str]) -> Optional[Any]:
+    return json.loads(value) if value else None
+
+
+def _decode_array(value: Optional[str]) -> Optional[np.ndarray]:
+    return np.frombuffer(base64.b64decode(value), dtype=np.float32) if value else None
+
+
+def _encode_array(value: np.ndarray) -> str:
+    # base64 float32 — a 768-dim vector is ~4 KB vs ~15 KB as JSON
+    return base64.b64encode(np.asarray(value, dtype=np.float32).tobytes()).decode()
+
+
 def get_cached(key: str) -> Optional[dict]:
-    global _client
-    client = get_redis()
-    if not client:
-        return None
-    try:
-        value = client.get(key)
-        return json.loads(value) if value else None
-    except Exception:
-        _client = None  # force reconnect on next call
-        return None
+    return _decode_json(_run(lambda r: r.get(key), None))
 
 
 def set_cached(key: str, value: dict, ttl: int = CACHE_TTL) -> bool:
-    global _client
-    client = get_redis()
-    if not client:
-        return False
-    try:
-        client.setex(key, ttl, json.dumps(value))
-        return True
-    except Exception:
-        _client = None  # force reconnect on next call
-        return False
+    return bool(_run(lambda r: r.setex(key, ttl, json.dumps(value)), False))
 
 
-def invalidate_pattern(pattern: str) -> int:
-    client = get_redis()
-    if not client:
-        return 0
-    try:
-        keys = client.keys(f"devflow:{pattern}:*")
-        return client.delete(*keys) if keys else 0
-    except Exception:
-        return 0
+def get_array(key: str) -> Optional[np.ndarray]:
+    """Fetch a float32 vector stored by set_array."""
+    return _decode_array(_run(lambda r: r.get(key), None))
+
+
+def set_array(key: str, value: np.ndarray, ttl: int = CACHE_TTL) -> bool:
+    return bool(_run(lambda r: r.setex(key, ttl, _encode_array(value)), False))
+
+
+def set_flag(key: str, ttl: int) -> bool:
+    return bool(_run(lambda r: r.setex(key, ttl, "1"), False))
+
+
+# ── asyncio API (request handlers) ───────────────────────────────────────────
+
+async def aget_cached(key: str) -> Optional[Any]:
+    return _decode_json(await _arun(lambda r: r.get(key), None))
+
+
+async def aset_cached(key: str, value: Any, ttl: int = CACHE_TTL) -> bool:
+    return bool(await _arun(lambda r: r.setex(key, ttl, json.dumps(value)), False))
+
+
+async def aget_array(key: str) -> Optional[np.ndarray]:
+    return _decode_array(await _arun(lambda r: r.get(key), None))
+
+
+async def aset_array(key: str, value: np.ndarray, ttl: int = CACHE_TTL) -> bool:
+    return bool(await _arun(lambda r: r.setex(key, ttl, _encode_array(value)), False))
+
+
+async def aset_flag(key: str, ttl: int) -> bool:
+    return bool(await _arun(lambda r: r.setex(key, ttl, "1"), False))
+
+
+async def aget_versions(*scopes: str) -> Dict[str, int]:
+    known = _known_versions(scopes)
+    if known is not None:
+        return known
+    values = await _arun(lambda r: r.mget([_version_key(s) for s in scopes]), [None] * len(scopes))
+    return _parse_versions(scopes, values)
+
+
+async def abump_version(*scopes: str) -> bool:
+    async def op(r):
+        pipe = r.pipeline(transaction=False)
+        for scope in scopes:
+            pipe.incr(_version_key(scope))
+        return await pipe.execute()
+    bumped = bool(await _arun(op, None))
+    _forget_versions(scopes)
+    return bumped
+
+
+async def aping() -> bool:
+    return bool(await _arun(lambda r: r.ping(), False))
+
+
+async def adelete(*keys: str) -> int:
+    return await _arun(lambda r: r.delete(*keys), 0)
+
+
+async def aexists(key: str) -> bool:
+    return bool(await _arun(lambda r: r.exists(key), 0))
+
+
+_DECODERS: Dict[str, Callable[[Any], Any]] = {"json": _decode_json, "array": _decode_array, "exists": bool}
+
+
+async def afetch(*lookups: Tuple[str, Optional[str]]) -> List[Any]:
+    """Several reads in one round trip. Each lookup is (kind, key) with kind
+    "json", "array" or "exists"; a None key yields None without touching Redis.
+    Every result is None (False for "exists") if Redis is unavailable.
+
+        cached, history = await afetch(("json", cache_key), ("json", history_key))
+    """
+    live = [(kind, key) for kind, key in lookups if key is not None]
+
+    async def op(r):
+        pipe = r.pipeline(transaction=False)
+        for kind, key in live:
+            if kind == "exists":
+                pipe.exists(key)
+            else:
+                pipe.get(key)
+        return await pipe.execute()
+
+    raw = iter(await _arun(op, [None] * len(live)) if live else [])
+    return [None if key is None else _DECODERS[kind](next(raw)) for kind, key in lookups]
@@ -0,0 +1,144 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+import numpy as np
+
+# Answer cache keyed by query *meaning*: a lookup hits when the cosine similarity
+# between the new query's embedding and a cached one clears the threshold and the
+# scope (endpoint + model/lang/n_results/flags) is identical. Sits behind the
+# exact-hash Redis cache, so it only costs a mat-vec on the requests that would
+# otherwise go to the LLM.
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() != "false"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "2048"))
+SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", os.getenv("CACHE_TTL", "3600")))
+
+
+def semantic_scope(prefix: str, params: Dict, versions: Optional[Dict[str, int]] = None) -> str:
+    """Everything but the query text that has to match for a cached answer to be reusable,
+    including the index versions it was generated against (see redis_cache.INDEX_VERSION)."""
+    if versions:
+        params = {**params, "versions": versions}
+    return f"{prefix}:{json.dumps(params, sort_keys=True)}"
+
+
+class SemanticCache:
+    """Thread-safe, size- and TTL-bounded store of (query embedding, answer) pairs.
+
+    Entries are evicted least-recently-used across all scopes. Each scope keeps its
+    vectors as one normalised matrix (rebuilt lazily after writes), so a lookup is a
+    single dot product regardless of how many answers are cached.
+    """
+
+    def __init__(
+        self,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        maxsize: int = SEMANTIC_CACHE_SIZE,
+        ttl: float = SEMANTIC_CACHE_TTL,
+        enabled: bool = SEMANTIC_CACHE_ENABLED,
+    ):
+        self.threshold = threshold
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self.enabled = enabled
+        self._entries: "OrderedDict[int, Tuple[Hashable, np.ndarray, Any, float]]" = OrderedDict()
+        self._scopes: Dict[Hashable, Dict[int, None]] = {}
+        self._matrices: Dict[Hashable, Tuple[List[int], np.ndarray, np.ndarray]] = {}
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, scope: Hashable, embedding) -> Optional[Tuple[Any, float]]:
+        """Return (cached value, similarity) for the closest live entry in scope, or None."""
+        if not self.enabled or embedding is None:
+            return None
+        vec = self._normalise(embedding)
+        with self._lock:
+            ids, matrix, expires = self._matrix(scope)
+            if ids:
+                sims = matrix @ vec
+                sims[expires <= time.monotonic()] = -np.inf
+                best = int(np.argmax(sims))
+                if sims[best] >= self.threshold:
+                    entry_id = ids[best]
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return dict(self._entries[entry_id][2]), float(sims[best])
+            self.misses += 1
+            return None
+
+    def set(self, scope: Hashable, embedding, value: Dict) -> None:
+        if not self.enabled or embedding is None:
+            return
+        vec = self._normalise(embedding)
+        with self._lock:
+            entry_id, self._next_id = self._next_id, self._next_id + 1
+            self._entries[entry_id] = (scope, vec, dict(value), time.monotonic() + self.ttl)
+            self._scopes.setdefault(scope, {})[entry_id] = None
+            self._matrices.pop(scope, None)
+            while len(self._entries) > self.maxsize:
+                self._evict(next(iter(self._entries)))
+            self._purge_expired()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._scopes.clear()
+            self._matrices.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups * 100, 1) if lookups else 0.0,
+        }
+
+    @staticmethod
+    def _normalise(embedding) -> np.ndarray:
+        vec = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def _matrix(self, scope: Hashable) -> Tuple[List[int], np.ndarray, np.ndarray]:
+        cached = self._matrices.get(scope)
+        if cached is None:
+            ids = list(self._scopes.get(scope, ()))
+            if ids:
+                matrix = np.stack([self._entries[i][1] for i in ids])
+                expires = np.array([self._entries[i][3] for i in ids])
+            else:
+                matrix, expires = np.empty((0, 0), dtype=np.float32), np.empty(0)
+            cached = self._matrices[scope] = (ids, matrix, expires)
+        return cached
+
+    def _evict(self, entry_id: int) -> None:
+        scope = self._entries.pop(entry_id)[0]
+        members = self._scopes.get(scope)
+        if members is not None:
+            members.pop(entry_id, None)
+            if not members:
+                del self._scopes[scope]
+        self._matrices.pop(scope, None)
+
+    def _purge_expired(self) -> None:
+        # LRU order ≈ insertion order for expiry purposes; stop at the first live entry
+        now = time.monotonic()
+        for entry_id in list(self._entries):
+            if self._entries[entry_id][3] > now:
+                break
+            self._evict(entry_id)
+
+
+semantic_cache = SemanticCache()
@@ -0,0 +1,153 @@
+import os
+import copy
+import time
+import asyncio
+import weakref
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from loguru import logger
+
+from cache.lru import LRUCache
+from cache.redis_cache import CACHE_TTL, afetch, aset_cached
+
+# Answer cache: a per-worker LRU (L1) in front of Redis (L2). An L1 hit costs no
+# network round trip and no json.loads; concurrent misses for the same key share
+# one computation instead of each running retrieve + rerank + LLM.
+ANSWER_L1_SIZE = int(os.getenv("ANSWER_L1_SIZE", "1024"))
+# Upper bound on how long a worker keeps an answer it read from Redis
+ANSWER_L1_TTL = float(os.getenv("ANSWER_L1_TTL", "300"))
+# Stale-while-revalidate: seconds past CACHE_TTL an answer may still be served
+# while a single background refresh recomputes it. 0 turns it off.
+ANSWER_STALE_TTL = int(os.getenv("ANSWER_STALE_TTL", "0"))
+
+# Where a get_or_compute result came from
+L1, L2, STALE, COALESCED, COMPUTED = "l1", "l2", "stale", "coalesced", "computed"
+
+Compute = Callable[[List[Any]], Awaitable[Tuple[Any, bool]]]
+
+
+class TieredCache:
+    """L1 (in-process LRU) → L2 (Redis) → single-flight compute.
+
+    Values live in Redis wrapped with the time they stop being fresh, so every
+    worker agrees on staleness; the Redis TTL is ttl + stale_ttl. Misses are
+    coalesced per key within the worker: the first caller starts the
+    computation as a task, later callers await the same task (a cancelled
+    request doesn't cancel it for the others).
+    """
+
+    def __init__(
+        self,
+        maxsize: int = ANSWER_L1_SIZE,
+        l1_ttl: float = ANSWER_L1_TTL,
+        ttl: int = CACHE_TTL,
+        stale_ttl: int = ANSWER_STALE_TTL,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.l1 = LRUCache(maxsize)
+        self.l1_ttl = l1_ttl
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.clock = clock
+        # in-flight computations, per event loop (tasks belong to the loop that created them)
+        self._flights: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Task]]" = \
+            weakref.WeakKeyDictionary()
+        self.l1_hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.stale_served = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    async def get_or_compute(self, key: str, compute: Compute,
+                             *lookups: Tuple[str, Optional[str]]) -> Tuple[Any, str]:
+        """Return (value, source) with source one of L1, L2, STALE, COALESCED, COMPUTED.
+
+        `lookups` are extra afetch reads made in the same round trip as the L2 get;
+        their results (None after an L1 hit) are passed to `compute`, which returns
+        (value, cacheable). Values from a cache or a shared computation are copies.
+        """
+        entry, source = self.l1.get(key), L1
+        extras: List[Any] = [None] * len(lookups)
+        if entry is None:
+            wrapped, *extras = await afetch(("json", key), *lookups)
+            entry, source = self._unwrap(wrapped), L2
+            if entry is not None:
+                self._remember(key, *entry)
+
+        if entry is not None and entry[1] + self.stale_ttl <= self.clock():
+            entry = None                        # past the stale window too
+        if entry is not None:
+            value, fresh_until = entry
+            if fresh_until <= self.clock():
+                source = STALE
+                self.stale_served += 1
+                self._start(key, compute, extras, refresh=True)  # revalidate in the background
+            elif source == L1:
+                self.l1_hits += 1
+            else:
+                self.l2_hits += 1
+            return copy.copy(value), source
+
+        self.misses += 1
+        task, leader = self._start(key, compute, extras)
+        if not leader:
+            self.coalesced += 1
+        return copy.copy(await asyncio.shield(task)), COMPUTED if leader else COALESCED
+
+    async def set(self, key: str, value: Any) -> bool:
+        fresh_until = self.clock() + self.ttl
+        self._remember(key, value, fresh_until)
+        return await aset_cached(key, {"_v": value, "_fresh_until": fresh_until}, ttl=self.ttl + self.stale_ttl)
+
+    def stats(self) -> Dict:
+        lookups = self.l1_hits + self.l2_hits + self.stale_served + self.misses
+        return {
+            "l1_size": len(self.l1), "l1_maxsize": self.l1.maxsize,
+            "l1_hits": self.l1_hits, "l2_hits": self.l2_hits, "misses": self.misses,
+            "hit_rate": round((lookups - self.misses) / lookups * 100, 1) if lookups else 0.0,
+            "coalesced": self.coalesced, "stale_served": self.stale_served,
+            "refreshes": self.refreshes, "refresh_errors": self.refresh_errors,
+            "in_flight": sum(len(f) for f in self._flights.values()),
+        }
+
+    def _remember(self, key: str, value: Any, fresh_until: float) -> None:
+        # keep it no longer than it may be served (fresh + stale window) nor than l1_ttl
+        life = min(self.l1_ttl, fresh_until + self.stale_ttl - self.clock())
+        if life > 0:
+            self.l1.set(key, (value, fresh_until), ttl=life)
+
+    def _unwrap(self, wrapped: Any) -> Optional[Tuple[Any, float]]:
+        if wrapped is None:
+            return None
+        if isinstance(wrapped, dict) and "_v" in wrapped:
+            return wrapped["_v"], wrapped["_fresh_until"]
+        return wrapped, float("inf")  # written before answers carried a freshness stamp
+
+    def _start(self, key: str, compute: Compute, extras: List[Any],
+               refresh: bool = False) -> Tuple[asyncio.Task, bool]:
+        flights = self._flights.setdefault(asyncio.get_running_loop(), {})
+        task = flights.get(key)
+        if task is not None:
+            return task, False
+        task = flights[key] = asyncio.create_task(self._compute(key, compute, extras))
+        task.add_done_callback(lambda t: flights.pop(key, None) if flights.get(key) is t else None)
+        if refresh:
+            self.refreshes += 1
+            task.add_done_callback(self._refresh_done)
+        return task, True
+
+    def _refresh_done(self, task: asyncio.Task) -> None:
+        # nobody awaits a background refresh; the stale answer stays until it expires
+        if not task.cancelled() and task.exception() is not None:
+            self.refresh_errors += 1
+            logger.warning(f"Answer cache refresh failed: {task.exception()}")
+
+    async def _compute(self, key: str, compute: Compute, extras: List[Any]) -> Any:
+        value, cacheable = await compute(extras)
+        if cacheable:
+            await self.set(key, value)
+        return value
+
+
+answer_cache = TieredCache()
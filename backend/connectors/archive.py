@@ -0,0 +1,57 @@
+import os
+import tarfile
+import zipfile
+from typing import Iterator, List, Tuple
+
+from connectors.file_upload import MAX_FILE_SIZE
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+# OS metadata that shows up in archives made on macOS/Windows
+_JUNK_PREFIXES = ("__MACOSX/", "._")
+_JUNK_NAMES = {".DS_Store", "Thumbs.db", "desktop.ini"}
+
+
+def is_archive(filename: str) -> bool:
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def _skip(name: str) -> bool:
+    base = os.path.basename(name)
+    return not base or base in _JUNK_NAMES or name.startswith(_JUNK_PREFIXES) or base.startswith("._")
+
+
+def iter_archive(path: str, filename: str) -> Iterator[Tuple[str, bytes]]:
+    """Yield (entry name, bytes) for each regular file in a ZIP or tar archive.
+
+    Entries are read one at a time from the file on disk, never the whole
+    archive; at most MAX_FILE_SIZE + 1 bytes are read per entry so oversized
+    members (or zip bombs) fail validate_upload instead of exhausting memory.
+    Tar archives are read as a stream ("r|*"), so compressed tars work too.
+    """
+    if filename.lower().endswith(".zip"):
+        with zipfile.ZipFile(path) as zf:
+            for info in zf.infolist():
+                if info.is_dir() or _skip(info.filename):
+                    continue
+                with zf.open(info) as member:
+                    yield info.filename, member.read(MAX_FILE_SIZE + 1)
+        return
+
+    with tarfile.open(path, mode="r|*") as tf:
+        for member in tf:
+            if not member.isfile() or _skip(member.name):
+                continue
+            fileobj = tf.extractfile(member)
+            if fileobj is not None:
+                yield member.name, fileobj.read(MAX_FILE_SIZE + 1)
+
+
+def iter_uploads(spooled: List[Tuple[str, str]]) -> Iterator[Tuple[str, bytes]]:
+    """Flatten spooled uploads — plain files and archives — into (filename, bytes) entries."""
+    for path, filename in spooled:
+        if is_archive(filename):
+            yield from iter_archive(path, filename)
+        else:
+            with open(path, "rb") as f:
+                yield filename, f.read(MAX_FILE_SIZE + 1)
@@ -0,0 +1,251 @@
+import io
+import os
+import time
+import uuid
+import signal
+import tempfile
+import threading
+import multiprocessing
+from multiprocessing.pool import Pool
+from typing import Dict, Iterator, List, Optional, Tuple
+from loguru import logger
+
+from pypdf import PdfReader
+import docx
+
+# PDF/DOCX text is extracted in a pool of worker processes, not in the API or
+# index-worker process: pages are read in parallel, a worker's memory is capped,
+# and a pathological file is cut off instead of wedging the caller.
+# Extraction processes; 0 extracts in the calling process (no timeouts or memory cap)
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+# PDF pages handed to a worker per task
+EXTRACT_PAGES_PER_TASK = int(os.getenv("EXTRACT_PAGES_PER_TASK", "8"))
+# Seconds one PDF page may take; a page over it is skipped
+EXTRACT_PAGE_TIMEOUT = float(os.getenv("EXTRACT_PAGE_TIMEOUT", "10"))
+# Seconds a whole file may take; past it the pool is torn down and restarted
+EXTRACT_FILE_TIMEOUT = float(os.getenv("EXTRACT_FILE_TIMEOUT", "300"))
+# How often a caller waiting on a result checks whether its pool was restarted
+_POLL_SECONDS = 0.25
+# Address-space cap per extraction process, in MB (0 = no cap)
+EXTRACT_MEMORY_MB = int(os.getenv("EXTRACT_MEMORY_MB", "1024"))
+# Tasks a worker runs before it is replaced, so a leak can't accumulate
+_TASKS_PER_WORKER = 500
+
+
+# ── Worker side ───────────────────────────────────────────────────────────────
+
+class _PageTimeout(Exception):
+    pass
+
+
+def _on_alarm(signum, frame):
+    raise _PageTimeout()
+
+
+def _init_worker(memory_mb: int):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C is the parent's to handle
+    signal.signal(signal.SIGALRM, _on_alarm)
+    if memory_mb:
+        import resource
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        resource.setrlimit(resource.RLIMIT_AS, (memory_mb * 1024 * 1024, hard))
+
+
+# The last PDF this worker opened: the tasks of one file usually land on the
+# same few workers, which then parse it once
+_reader: Optional[Tuple[str, PdfReader]] = None
+
+
+def _open_pdf(path: str, token: str) -> PdfReader:
+    global _reader
+    if _reader is None or _reader[0] != token:
+        _reader = None
+        _reader = (token, PdfReader(path))
+    return _reader[1]
+
+
+def _pdf_page_count(path: str, token: str) -> int:
+    return len(_open_pdf(path, token).pages)
+
+
+def _pdf_pages(task: Tuple[str, str, int, int, float]) -> List[Optional[str]]:
+    """Text of pages [start, end); None for a page that ran past the timeout."""
+    path, token, start, end, page_timeout = task
+    reader = _open_pdf(path, token)
+    texts: List[Optional[str]] = []
+    for i in range(start, end):
+        try:
+            signal.setitimer(signal.ITIMER_REAL, page_timeout)
+            try:
+                text = reader.pages[i].extract_text() or ""
+            finally:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+        except _PageTimeout:
+            text = None
+        texts.append(text)
+    return texts
+
+
+def _docx_paragraphs(file_bytes: bytes) -> List[str]:
+    return [paragraph.text for paragraph in docx.Document(io.BytesIO(file_bytes)).paragraphs]
+
+
+# ── Caller side ───────────────────────────────────────────────────────────────
+
+class ExtractionPool:
+    """Process pool that streams document text back to the caller.
+
+    iter_pdf_pages yields page texts in page order as page ranges finish, so the
+    caller never holds more than the pages in flight plus what it keeps. Each
+    worker runs with an address-space cap (a page that needs more fails the
+    file with ValueError) and a per-page SIGALRM timeout (the page is skipped).
+    A file that runs past file_timeout — a worker stuck where the alarm can't
+    reach it — terminates the pool and a fresh one is started. Other files that
+    had work in flight on it resubmit what they had not yet collected to the new
+    pool, so only the file that timed out fails.
+    """
+
+    def __init__(
+        self,
+        workers: int = EXTRACT_WORKERS,
+        pages_per_task: int = EXTRACT_PAGES_PER_TASK,
+        page_timeout: float = EXTRACT_PAGE_TIMEOUT,
+        file_timeout: float = EXTRACT_FILE_TIMEOUT,
+        memory_mb: int = EXTRACT_MEMORY_MB,
+    ):
+        self.workers = max(0, workers)
+        self.pages_per_task = max(1, pages_per_task)
+        self.page_timeout = page_timeout
+        self.file_timeout = file_timeout
+        self.memory_mb = memory_mb
+        self._pool: Optional[Pool] = None
+        self._lock = threading.Lock()
+        self.files = 0
+        self.pages = 0
+        self.pages_timed_out = 0
+        self.files_timed_out = 0
+        self.restarts = 0
+        self.resubmitted = 0
+
+    def _get_pool(self) -> Pool:
+        with self._lock:
+            if self._pool is None:
+                # spawn, not fork: a forked child would inherit the parent's models
+                # (and its address space, which the memory cap would then count)
+                self._pool = multiprocessing.get_context("spawn").Pool(
+                    self.workers, initializer=_init_worker, initargs=(self.memory_mb,),
+                    maxtasksperchild=_TASKS_PER_WORKER,
+                )
+            return self._pool
+
+    def _restart(self, pool: Pool):
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+                self.restarts += 1
+        pool.terminate()
+
+    def _imap(self, func, tasks: List[tuple], deadline: float, what: str) -> Iterator:
+        """func(*task) for each task, in order, run in the pool; failures become
+        ValueError. If another file's timeout restarts the pool meanwhile, the
+        tasks not yet collected are resubmitted to the new one."""
+        pool = self._get_pool()
+        results = [pool.apply_async(func, task) for task in tasks]
+        for i in range(len(tasks)):
+            while True:
+                remaining = deadline - time.monotonic()
+                try:
+                    value = results[i].get(max(0.0, min(remaining, _POLL_SECONDS)))
+                    break
+                except multiprocessing.TimeoutError:
+                    if self._pool is not pool:
+                        self.resubmitted += len(tasks) - i
+                        pool = self._get_pool()
+                        results[i:] = [pool.apply_async(func, task) for task in tasks[i:]]
+                    elif remaining <= _POLL_SECONDS:
+                        self.files_timed_out += 1
+                        self._restart(pool)
+                        raise ValueError(f"{what} extraction took longer than {self.file_timeout:g}s")
+                except MemoryError:
+                    raise ValueError(f"{what} needs more than {self.memory_mb} MB to extract")
+                except Exception as e:
+                    raise ValueError(f"Error reading {what}: {e}")
+            yield value
+
+    def iter_pdf_pages(self, file_bytes: bytes) -> Iterator[str]:
+        self.files += 1
+        if not self.workers:
+            for page in PdfReader(io.BytesIO(file_bytes)).pages:
+                self.pages += 1
+                yield page.extract_text() or ""
+            return
+
+        deadline = time.monotonic() + self.file_timeout
+        token = uuid.uuid4().hex
+        # workers read the file from disk rather than each getting a pickled copy
+        fd, path = tempfile.mkstemp(prefix="devflow_extract_", suffix=".pdf")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(file_bytes)
+            n_pages, = self._imap(_pdf_page_count, [(path, token)], deadline, "PDF")
+            tasks = [((path, token, start, min(start + self.pages_per_task, n_pages), self.page_timeout),)
+                     for start in range(0, n_pages, self.pages_per_task)]
+            skipped = 0
+            for texts in self._imap(_pdf_pages, tasks, deadline, "PDF"):
+                for text in texts:
+                    if text is None:
+                        skipped += 1
+                        continue
+                    self.pages += 1
+                    yield text
+            if skipped:
+                self.pages_timed_out += skipped
+                logger.warning(f"PDF extraction skipped {skipped} of {n_pages} pages "
+                               f"that took over {self.page_timeout:g}s each")
+        finally:
+            os.unlink(path)
+
+    def iter_docx_paragraphs(self, file_bytes: bytes) -> Iterator[str]:
+        self.files += 1
+        if not self.workers:
+            yield from _docx_paragraphs(file_bytes)
+            return
+        deadline = time.monotonic() + self.file_timeout
+        paragraphs, = self._imap(_docx_paragraphs, [(file_bytes,)], deadline, "DOCX")
+        yield from paragraphs
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.terminate()
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers, "running": self._pool is not None,
+            "files": self.files, "pages": self.pages, "pages_timed_out": self.pages_timed_out,
+            "files_timed_out": self.files_timed_out, "restarts": self.restarts,
+            "tasks_resubmitted": self.resubmitted,
+        }
+
+
+_extraction_pool: Optional[ExtractionPool] = None
+_extraction_pool_lock = threading.Lock()
+
+
+def get_extraction_pool() -> ExtractionPool:
+    global _extraction_pool
+    if _extraction_pool is None:
+        with _extraction_pool_lock:
+            if _extraction_pool is None:
+                _extraction_pool = ExtractionPool()
+    return _extraction_pool
+
+
+def close_extraction_pool():
+    if _extraction_pool is not None:
+        _extraction_pool.close()
+
+
+def extraction_stats() -> Optional[Dict]:
+    return _extraction_pool.stats() if _extraction_pool is not None else None
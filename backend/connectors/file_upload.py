@@ -1,7 +1,7 @@
-from pypdf import PdfReader
-import docx
-import io
-from typing import Tuple
+from typing import Iterator, Tuple, Union
+
+from connectors.extraction import get_extraction_pool
+from rag.chunking import PAGE_BREAK
 
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
 ALLOWED_EXTENSIONS = {"pdf", "docx", "txt"}
@@ -30,23 +30,27 @@ def validate_upload(filename: str, file_bytes: bytes) -> str:
 
 class FileProcessor:
     @staticmethod
-    def extract_text_from_pdf(file_bytes: bytes) -> str:
+    def iter_pdf_pages(file_bytes: bytes) -> Iterator[str]:
+        """Page texts in order, extracted page-parallel in the extraction pool"""
         try:
-            pdf_reader = PdfReader(io.BytesIO(file_bytes))
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text.strip()
+            yield from get_extraction_pool().iter_pdf_pages(file_bytes)
+        except ValueError:
+            raise
         except Exception as e:
             raise ValueError(f"Error reading PDF: {str(e)}")
-    
+
+    @staticmethod
+    def extract_text_from_pdf(file_bytes: bytes) -> str:
+        # pages stay separated by a form feed, so chunks can record their page
+        return PAGE_BREAK.join(FileProcessor.iter_pdf_pages(file_bytes)).strip(" \t\r\n")
+
     @staticmethod
     def extract_text_from_docx(file_bytes: bytes) -> str:
         """Extract text from DOCX file"""
         try:
-            doc = docx.Document(io.BytesIO(file_bytes))
-            text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
-            return text.strip()
+            return "\n".join(get_extraction_pool().iter_docx_paragraphs(file_bytes)).strip()
+        except ValueError:
+            raise
         except Exception as e:
             raise ValueError(f"Error reading DOCX: {str(e)}")
     
@@ -62,6 +66,18 @@ class FileProcessor:
             except Exception as e:
                 raise ValueError(f"Error reading TXT: {str(e)}")
     
+    @staticmethod
+    def read_file(filename: str, file_bytes: bytes) -> Tuple[Union[str, Iterator[str]], str]:
+        """
+        Like process_file, but a PDF's text is a lazy stream of page texts, so a
+        consumer (Chunker.iter_chunks) can work on the first pages while the
+        pool is still extracting later ones. Errors surface while iterating.
+        Returns: (text or page iterator, file_type)
+        """
+        if filename.lower().endswith('.pdf'):
+            return FileProcessor.iter_pdf_pages(file_bytes), "PDF"
+        return FileProcessor.process_file(filename, file_bytes)
+
     @staticmethod
     def process_file(filename: str, file_bytes: bytes) -> Tuple[str, str]:
         """
@@ -1,130 +1,422 @@
 import os
-import requests
+import time
+import asyncio
+import threading
+import weakref
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import httpx
 from bs4 import BeautifulSoup
-from typing import List, Dict, Any
+from loguru import logger
+from starlette.concurrency import run_in_threadpool
+
+from cache.lru import LRUCache
+from cache.redis_cache import aget_cached, aset_cached, make_cache_key
 
 SCRAPER_URL = os.getenv("GO_SCRAPER_URL", "http://localhost:8001")
+_UA = {"User-Agent": "Mozilla/5.0 (compatible; DevFlow/2.0)"}
+
+# Outbound HTTP goes through one pooled client per event loop (plus one for sync
+# callers), so Brave, the Go scraper and page fetches reuse keep-alive
+# connections instead of paying a TCP + TLS handshake per call. HTTP/2 is used
+# when the h2 package is installed.
+WEB_MAX_CONNECTIONS = int(os.getenv("WEB_MAX_CONNECTIONS", "64"))
+# Concurrent page fetches per host in the Python fallback scraper
+WEB_PER_HOST = int(os.getenv("WEB_PER_HOST", "2"))
+# Seconds one page fetch (connect + read) may take
+WEB_FETCH_TIMEOUT = float(os.getenv("WEB_FETCH_TIMEOUT", "8"))
+# Hard deadline in seconds on asearch_and_scrape: pages not scraped by then are dropped
+WEB_SEARCH_DEADLINE = float(os.getenv("WEB_SEARCH_DEADLINE", "6"))
+
+# Scraped pages are cached in the database (page_cache) by normalised URL. An
+# entry checked less than PAGE_CACHE_TTL seconds ago is served as is; an older
+# one is revalidated with a conditional GET (If-None-Match / If-Modified-Since),
+# which costs a 304 and no download or parse when the page hasn't changed.
+PAGE_CACHE_TTL = int(os.getenv("PAGE_CACHE_TTL", "3600"))
+# Entries not revalidated for this many seconds are dropped; 0 disables the page cache
+PAGE_CACHE_MAX_AGE = int(os.getenv("PAGE_CACHE_MAX_AGE", "604800"))
+# Brave result lists per (query, count) are reused for this many seconds, from
+# process memory and from Redis; 0 disables
+BRAVE_CACHE_TTL = int(os.getenv("BRAVE_CACHE_TTL", "900"))
+BRAVE_CACHE_SIZE = int(os.getenv("BRAVE_CACHE_SIZE", "1024"))
+# Pages are extracted (and cached) at the longest length any caller reads —
+# scrape_url's — so a page fetched for a search also serves an index job
+_CACHE_CHARS = 8000
+_PRUNE_INTERVAL = 3600
+# Query parameters that don't change the page
+_TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid")
+
+try:
+    import h2  # noqa: F401
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+
+def _client_kwargs() -> Dict[str, Any]:
+    return dict(
+        http2=HTTP2,
+        headers=_UA,
+        follow_redirects=True,
+        timeout=httpx.Timeout(WEB_FETCH_TIMEOUT),
+        limits=httpx.Limits(max_connections=WEB_MAX_CONNECTIONS, max_keepalive_connections=WEB_MAX_CONNECTIONS),
+    )
+
+
+_client: Optional[httpx.Client] = None
+_client_lock = threading.Lock()
+# an AsyncClient's connections belong to the loop that opened them
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def get_http_client() -> httpx.Client:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = httpx.Client(**_client_kwargs())
+    return _client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = httpx.AsyncClient(**_client_kwargs())
+    return client
+
+
+async def aclose_http_clients():
+    global _client
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+    with _client_lock:
+        sync_client, _client = _client, None
+    if sync_client is not None:
+        sync_client.close()
+
+
+_search_cache = LRUCache(BRAVE_CACHE_SIZE, ttl=BRAVE_CACHE_TTL)
+_counters = {"search_redis_hits": 0, "page_hits": 0, "page_not_modified": 0, "page_fetches": 0}
+
+
+def web_search_stats() -> Dict:
+    stats = {"search_cache": _search_cache.stats()}
+    stats.update(_counters)
+    stats.update({"page_cache_ttl": PAGE_CACHE_TTL, "search_cache_ttl": BRAVE_CACHE_TTL, "http2": HTTP2})
+    return stats
+
+
+def normalize_url(url: str) -> str:
+    """Page cache key: scheme and host lowercased, default port, fragment and
+    tracking parameters dropped, query parameters sorted."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if ":" in host:
+        host = f"[{host}]"
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port is not None and port != {"http": 80, "https": 443}.get(scheme):
+        host = f"{host}:{port}"
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(_TRACKING_PARAMS)
+    ))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+def _parse_page(html: bytes) -> Tuple[str, str]:
+    """(title, text) of an HTML page."""
+    soup = BeautifulSoup(html, "lxml")
+    title_tag = soup.find("title")
+    title = title_tag.get_text().strip() if title_tag else ""
+    for tag in soup(["script", "style", "nav", "footer", "header"]):
+        tag.decompose()
+    lines = [l.strip() for l in soup.get_text(separator="\n").splitlines() if l.strip()]
+    return title, "\n".join(lines)
+
+
+def _clip(text: str, max_length: int) -> str:
+    return text[:max_length] + "..." if len(text) > max_length else text
+
+
+def _page_row(url: str, resp: httpx.Response, max_length: int, now: datetime) -> Dict[str, Any]:
+    """page_cache row for a downloaded page."""
+    title, text = _parse_page(resp.content)
+    return {"url": normalize_url(url), "title": title, "content": _clip(text, max_length), "max_length": max_length,
+            "etag": resp.headers.get("etag"), "last_modified": resp.headers.get("last-modified"), "checked_at": now}
+
+
+def _serves(entry: Dict, max_length: int) -> bool:
+    # a truncated text serves reads of at most the length it was cut at
+    return len(entry["content"]) <= entry["max_length"] or max_length <= entry["max_length"]
+
+
+def _validators(entry: Optional[Dict]) -> Dict[str, str]:
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
 
 
 class WebSearcher:
-    def __init__(self):
+    def __init__(self, db=None):
         self.brave_api_key = os.getenv("BRAVE_API_KEY")
         self.brave_url = "https://api.search.brave.com/res/v1/web/search"
+        # Database holding page_cache; None (or PAGE_CACHE_MAX_AGE=0) scrapes every time
+        self.db = db if PAGE_CACHE_MAX_AGE > 0 else None
+        self._pruned_at: Optional[float] = None
+        self._writes: Set[asyncio.Future] = set()      # page cache write-backs in flight
+        # per-loop {host: Semaphore} bounding concurrent fallback fetches per host
+        self._host_limits: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, LRUCache]" = \
+            weakref.WeakKeyDictionary()
 
-    def search(self, query: str, count: int = 3) -> List[Dict[str, Any]]:
-        if not self.brave_api_key:
-            raise ValueError("BRAVE_API_KEY not set")
-        headers = {
+    def _brave_headers(self) -> Dict[str, str]:
+        return {
             "Accept": "application/json",
             "X-Subscription-Token": self.brave_api_key,
         }
+
+    @staticmethod
+    def _parse_brave(data: Dict, count: int) -> List[Dict[str, Any]]:
+        return [
+            {"title": r.get("title", ""), "url": r.get("url", ""), "description": r.get("description", "")}
+            for r in data.get("web", {}).get("results", [])[:count]
+        ]
+
+    @staticmethod
+    def _parse_go(data: Dict, max_length: int, now: datetime) -> Dict[str, Dict[str, Any]]:
+        """{url: page_cache row}; title and validators are empty from scrapers that don't send them."""
+        return {
+            r["url"]: {"url": normalize_url(r["url"]), "title": r.get("title") or "", "content": r["content"],
+                       "max_length": max_length, "etag": r.get("etag") or None,
+                       "last_modified": r.get("last_modified") or None, "checked_at": now}
+            for r in data.get("results", [])
+            if r.get("success") and r.get("content")
+        }
+
+    # ── Page cache ───────────────────────────────────────────────────────────
+
+    def _cached_pages(self, urls: List[str], max_length: int) -> Dict[str, Dict[str, Any]]:
+        """{url: row} for the URLs with a cache entry long enough for max_length."""
+        if self.db is None or not urls:
+            return {}
+        keys = {url: normalize_url(url) for url in urls}
         try:
-            resp = requests.get(self.brave_url, headers=headers, params={"q": query, "count": count})
-            resp.raise_for_status()
-            data = resp.json()
-            return [
-                {"title": r.get("title", ""), "url": r.get("url", ""), "description": r.get("description", "")}
-                for r in data.get("web", {}).get("results", [])[:count]
-            ]
+            rows = self.db.get_cached_pages(sorted(set(keys.values())))
         except Exception as e:
-            print(f"Brave Search error: {e}")
-            return []
+            logger.warning(f"Page cache unavailable: {e}")
+            return {}
+        oldest = datetime.now() - timedelta(seconds=PAGE_CACHE_MAX_AGE)
+        return {
+            url: rows[key] for url, key in keys.items()
+            if key in rows and rows[key]["checked_at"] >= oldest and _serves(rows[key], max_length)
+        }
 
-    def _scrape_via_go(self, urls: List[str], max_length: int = 5000) -> Dict[str, str]:
-        """Concurrent scraping via Go service. Returns {url: content} map."""
+    def _store_pages(self, rows: List[Dict[str, Any]]):
+        if self.db is None or not rows:
+            return
         try:
-            resp = requests.post(
-                f"{SCRAPER_URL}/scrape",
-                json={"urls": urls, "max_length": max_length},
-                timeout=15,
+            self.db.put_cached_pages(rows)
+            if self._pruned_at is None or time.monotonic() - self._pruned_at > _PRUNE_INTERVAL:
+                self._pruned_at = time.monotonic()
+                self.db.prune_page_cache(datetime.now() - timedelta(seconds=PAGE_CACHE_MAX_AGE))
+        except Exception as e:
+            logger.warning(f"Page cache write failed: {e}")
+
+    @staticmethod
+    def _fresh(entry: Dict[str, Any], now: datetime) -> bool:
+        return now - entry["checked_at"] < timedelta(seconds=PAGE_CACHE_TTL)
+
+    @staticmethod
+    def _fetched(url: str, entry: Optional[Dict], resp: httpx.Response, max_length: int,
+                 now: datetime) -> Dict[str, Any]:
+        """The row after a (conditional) GET: the cached entry re-dated on a 304, else the new page."""
+        if resp.status_code == 304 and entry is not None:
+            _counters["page_not_modified"] += 1
+            return {**entry, "checked_at": now}
+        resp.raise_for_status()
+        _counters["page_fetches"] += 1
+        return _page_row(url, resp, max_length, now)
+
+    # ── Single URL (index jobs) ──────────────────────────────────────────────
+
+    def _scrape_via_go(self, urls: List[str], max_length: int, now: datetime) -> Dict[str, Dict[str, Any]]:
+        try:
+            resp = get_http_client().post(
+                f"{SCRAPER_URL}/scrape", json={"urls": urls, "max_length": max_length}, timeout=15,
             )
             resp.raise_for_status()
-            data = resp.json()
-            return {
-                r["url"]: r["content"]
-                for r in data.get("results", [])
-                if r.get("success") and r.get("content")
-            }
+            scraped = self._parse_go(resp.json(), max_length, now)
+            _counters["page_fetches"] += len(scraped)
+            return scraped
         except Exception as e:
-            print(f"Go scraper unavailable ({e}), falling back to Python")
+            logger.warning(f"Go scraper unavailable ({e}), falling back to Python")
             return {}
 
-    def _scrape_python_fallback(self, url: str, max_length: int = 5000) -> str:
-        """Single-URL Python fallback scraper."""
+    def _fetch_page(self, url: str, entry: Optional[Dict], max_length: int, now: datetime) -> Optional[Dict]:
         try:
-            headers = {"User-Agent": "Mozilla/5.0 (compatible; DevFlow/2.0)"}
-            resp = requests.get(url, headers=headers, timeout=10)
-            resp.raise_for_status()
-            soup = BeautifulSoup(resp.content, "lxml")
-            for tag in soup(["script", "style", "nav", "footer", "header"]):
-                tag.decompose()
-            lines = [l.strip() for l in soup.get_text(separator="\n").splitlines() if l.strip()]
-            text = "\n".join(lines)
-            return text[:max_length] + "..." if len(text) > max_length else text
+            resp = get_http_client().get(url, headers=_validators(entry))
+            return self._fetched(url, entry, resp, max_length, now)
         except Exception as e:
-            print(f"Python scrape error for {url}: {e}")
-            return ""
+            logger.warning(f"Python scrape error for {url}: {e}")
+            return None
 
     def scrape_url(self, url: str, max_length: int = 8000) -> Dict[str, Any]:
-        """Scrape a single URL. Returns {title, content}. Tries Go scraper first."""
-        scraped = self._scrape_via_go([url], max_length)
-        if url in scraped:
-            title = self._extract_title(url)
-            return {"title": title or url, "content": scraped[url]}
-        return self._scrape_with_title_python(url, max_length)
-
-    def _extract_title(self, url: str) -> str:
-        try:
-            resp = requests.get(url, headers={"User-Agent": "Mozilla/5.0 (compatible; DevFlow/2.0)"}, timeout=8)
-            soup = BeautifulSoup(resp.content, "lxml")
-            tag = soup.find("title")
-            return tag.get_text().strip() if tag else ""
-        except Exception:
-            return ""
-
-    def _scrape_with_title_python(self, url: str, max_length: int = 8000) -> Dict[str, Any]:
+        """Scrape a single URL. Returns {title, content}. A fresh page cache entry is
+        served as is and a stale one revalidated; otherwise the Go scraper is tried
+        first. Either way the page is fetched at most once."""
+        now = datetime.now()
+        length = max(max_length, _CACHE_CHARS)
+        entry = self._cached_pages([url], max_length).get(url)
+        if entry is not None and self._fresh(entry, now):
+            _counters["page_hits"] += 1
+            row = entry
+        elif _validators(entry):
+            row = self._fetch_page(url, entry, length, now)
+        else:
+            row = self._scrape_via_go([url], length, now).get(url) or self._fetch_page(url, None, length, now)
+        if row is None:
+            row = entry         # the page is unreachable: a stale copy beats nothing
+        elif row is not entry:
+            self._store_pages([row])
+        if row is None:
+            return {"title": url, "content": ""}
+        return {"title": row["title"] or url, "content": _clip(row["content"], max_length)}
+
+    # ── Search + scrape (request handlers) ───────────────────────────────────
+
+    async def asearch(self, query: str, count: int = 3) -> List[Dict[str, Any]]:
+        if not self.brave_api_key:
+            raise ValueError("BRAVE_API_KEY not set")
+        key = make_cache_key("brave", {"q": " ".join(query.lower().split()), "count": count})
+        if BRAVE_CACHE_TTL > 0:
+            results = _search_cache.get(key)
+            if results is None:
+                results = await aget_cached(key)
+                if results is not None:
+                    _counters["search_redis_hits"] += 1
+                    _search_cache.set(key, results)
+            if results is not None:
+                return [dict(r) for r in results]
         try:
-            headers = {"User-Agent": "Mozilla/5.0 (compatible; DevFlow/2.0)"}
-            resp = requests.get(url, headers=headers, timeout=10)
+            resp = await get_async_http_client().get(
+                self.brave_url, headers=self._brave_headers(), params={"q": query, "count": count},
+            )
             resp.raise_for_status()
-            soup = BeautifulSoup(resp.content, "lxml")
-            title_tag = soup.find("title")
-            title = title_tag.get_text().strip() if title_tag else url
-            for tag in soup(["script", "style", "nav", "footer", "header"]):
-                tag.decompose()
-            lines = [l.strip() for l in soup.get_text(separator="\n").splitlines() if l.strip()]
-            text = "\n".join(lines)
-            content = text[:max_length] + "..." if len(text) > max_length else text
-            return {"title": title, "content": content}
+            results = self._parse_brave(resp.json(), count)
         except Exception as e:
-            print(f"Python scrape error for {url}: {e}")
-            return {"title": url, "content": ""}
-
-    def search_and_scrape(self, query: str, count: int = 3) -> List[Dict[str, Any]]:
-        search_results = self.search(query, count)
-        if not search_results:
+            logger.warning(f"Brave Search error: {e}")
             return []
+        if results and BRAVE_CACHE_TTL > 0:
+            _search_cache.set(key, results)
+            await aset_cached(key, results, ttl=BRAVE_CACHE_TTL)
+        return [dict(r) for r in results]
 
-        urls = [r["url"] for r in search_results]
+    async def _ascrape_via_go(self, urls: List[str], max_length: int, now: datetime) -> Dict[str, Dict[str, Any]]:
+        try:
+            resp = await get_async_http_client().post(
+                f"{SCRAPER_URL}/scrape", json={"urls": urls, "max_length": max_length}, timeout=15,
+            )
+            resp.raise_for_status()
+            scraped = self._parse_go(resp.json(), max_length, now)
+            _counters["page_fetches"] += len(scraped)
+            return scraped
+        except Exception as e:
+            logger.warning(f"Go scraper unavailable ({e}), falling back to Python")
+            return {}
 
-        # Try Go concurrent scraper first
-        scraped = self._scrape_via_go(urls)
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        limits = self._host_limits.get(asyncio.get_running_loop())
+        if limits is None:
+            limits = self._host_limits[asyncio.get_running_loop()] = LRUCache(1024)
+        host = urlsplit(url).netloc
+        semaphore = limits.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(WEB_PER_HOST)
+            limits.set(host, semaphore)
+        return semaphore
 
-        enriched = []
-        for result in search_results:
-            url = result["url"]
-            content = scraped.get(url)
+    async def _afetch_page(self, url: str, entry: Optional[Dict], max_length: int,
+                           now: datetime) -> Optional[Dict]:
+        try:
+            async with self._host_limit(url):
+                resp = await get_async_http_client().get(url, headers=_validators(entry))
+            # HTML parsing is CPU-bound; keep it off the event loop
+            return await run_in_threadpool(self._fetched, url, entry, resp, max_length, now)
+        except Exception as e:
+            logger.warning(f"Python scrape error for {url}: {e}")
+            return None
 
-            # Fall back to Python if Go service missed this URL
-            if not content:
-                content = self._scrape_python_fallback(url)
+    async def asearch_and_scrape(self, query: str, count: int = 3, max_length: int = 5000,
+                                 deadline: float = WEB_SEARCH_DEADLINE) -> List[Dict[str, Any]]:
+        """Brave results enriched with page content, in Brave's order. Fresh page
+        cache entries are used as is and stale ones revalidated; the Go scraper
+        takes the rest as a batch and pages it missed are fetched concurrently.
+        Whatever isn't scraped within `deadline` seconds of the call is left out
+        (a stale cached copy stands in for a page still being revalidated)."""
+        loop = asyncio.get_running_loop()
+        end = loop.time() + deadline
+        now = datetime.now()
+        length = max(max_length, _CACHE_CHARS)
+        search_results: List[Dict[str, Any]] = []
+        pages: Dict[str, Dict] = {}     # url → row served
+        stale: Dict[str, Dict] = {}     # url → cached row to revalidate
+        misses: List[str] = []
+        fetched: List[Dict] = []        # rows to write back
+        try:
+            async with asyncio.timeout(deadline):
+                search_results = await self.asearch(query, count)
+                if not search_results:
+                    return []
+                urls = [r["url"] for r in search_results]
+                for url, entry in (await run_in_threadpool(self._cached_pages, urls, max_length)).items():
+                    if self._fresh(entry, now):
+                        pages[url] = entry
+                    elif _validators(entry):
+                        stale[url] = entry
+                _counters["page_hits"] += len(pages)
+                misses = [url for url in urls if url not in pages and url not in stale]
+                if misses:
+                    scraped = await self._ascrape_via_go(misses, length, now)
+                    pages.update(scraped)
+                    fetched.extend(scraped.values())
+        except TimeoutError:
+            logger.warning(f"Web search for {query!r} hit the {deadline:g}s deadline")
+            pages = {**stale, **pages}
+            stale, misses = {}, []
 
-            if content:
-                enriched.append({
-                    "title": result["title"],
-                    "url": url,
-                    "description": result["description"],
-                    "content": content,
-                })
+        tasks = {asyncio.ensure_future(self._afetch_page(url, entry, length, now)): url for url, entry in stale.items()}
+        tasks.update({asyncio.ensure_future(self._afetch_page(url, None, length, now)): url
+                      for url in misses if url not in pages})
+        if tasks:
+            done, pending = await asyncio.wait(tasks, timeout=max(0.0, end - loop.time()))
+            for task in pending:
+                task.cancel()
+            if pending:
+                logger.warning(f"Web search for {query!r}: dropped {len(pending)} pages at the {deadline:g}s deadline")
+            for task in done:
+                row = task.result()
+                if row is not None:
+                    pages[tasks[task]] = row
+                    fetched.append(row)
+        for url, entry in stale.items():
+            pages.setdefault(url, entry)
+        if fetched and self.db is not None:
+            # written back off the response path: a commit can cost tens of ms (fsync on SQLite)
+            write = asyncio.ensure_future(run_in_threadpool(self._store_pages, fetched))
+            self._writes.add(write)
+            write.add_done_callback(self._writes.discard)
 
-        return enriched
+        return [
+            {"title": r["title"], "url": r["url"], "description": r["description"],
+             "content": _clip(pages[r["url"]]["content"], max_length)}
+            for r in search_results if pages.get(r["url"], {}).get("content")
+        ]
@@ -1,21 +1,43 @@
-from contextlib import contextmanager
+import threading
+from contextlib import contextmanager, nullcontext
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
-from sqlalchemy import text
+from sqlalchemy import bindparam, text
 from sqlalchemy.exc import IntegrityError
 
-from database.engine import engine
-from database.models import metadata
+from database.engine import engine, _is_sqlite, _sqlite_shared_connection
+from database.models import LEXICAL_DDL, metadata
+
+# SQLite takes one writer at a time — serialise write transactions in-process so
+# worker threads queue here instead of failing with "database is locked". Reads
+# run on their own pooled connections under WAL and never take the lock, except
+# on an in-memory database, where every call shares one StaticPool connection.
+_sqlite_lock = threading.Lock()
+
+# search_history.cached values
+CACHE_MISS, CACHE_HIT_EXACT, CACHE_HIT_SEMANTIC = 0, 1, 2
 
 
 class Database:
     def __init__(self):
         metadata.create_all(engine)
+        with self._conn() as conn:
+            for statement in LEXICAL_DDL.get(engine.dialect.name, []):
+                conn.execute(text(statement))
 
     @contextmanager
     def _conn(self):
-        with engine.begin() as conn:
-            yield conn
+        """Connection for a write transaction."""
+        with _sqlite_lock if _is_sqlite else nullcontext():
+            with engine.begin() as conn:
+                yield conn
+
+    @contextmanager
+    def _read(self):
+        """Connection for reads only: not serialised behind writers."""
+        with _sqlite_lock if _sqlite_shared_connection else nullcontext():
+            with engine.begin() as conn:
+                yield conn
 
     @staticmethod
     def _rows(result) -> List[Dict]:
@@ -36,6 +58,19 @@ class Database:
             )
             return result.scalar()
 
+    def find_source(self, source_type: str, path: str) -> Optional[int]:
+        """Id of the most recent source with this type and path (file name, URL), if any."""
+        with self._read() as conn:
+            result = conn.execute(
+                text("SELECT id FROM sources WHERE type=:type AND path=:path ORDER BY id DESC LIMIT 1"),
+                {"type": source_type, "path": path},
+            )
+            return result.scalar()
+
+    def get_source(self, source_id: int) -> Optional[Dict]:
+        with self._read() as conn:
+            return self._row(conn.execute(text("SELECT * FROM sources WHERE id=:id"), {"id": source_id}))
+
     def update_source_status(self, source_id: int, status: str):
         with self._conn() as conn:
             conn.execute(
@@ -56,8 +91,12 @@ class Database:
                 {"id": doc_id, "source_id": source_id, "title": title, "url": url, "preview": content_preview},
             )
 
-    def get_sources(self, collection_id: Optional[int] = None, limit: int = 50, offset: int = 0) -> List[Dict]:
+    def clear_documents(self, source_id: int):
         with self._conn() as conn:
+            conn.execute(text("DELETE FROM documents WHERE source_id=:id"), {"id": source_id})
+
+    def get_sources(self, collection_id: Optional[int] = None, limit: int = 50, offset: int = 0) -> List[Dict]:
+        with self._read() as conn:
             if collection_id:
                 result = conn.execute(text("""
                     SELECT s.*, COUNT(d.id) as doc_count FROM sources s
@@ -82,7 +121,7 @@ class Database:
 
     # ── Search history ────────────────────────────────────────────────────────
 
-    def add_search(self, query: str, results_count: int, cached: bool = False, model: str = "gemini-flash"):
+    def add_search(self, query: str, results_count: int, cached: int = CACHE_MISS, model: str = "gemini-flash"):
         with self._conn() as conn:
             conn.execute(
                 text("INSERT INTO search_history (query, results_count, cached, model) VALUES (:q, :rc, :cached, :model)"),
@@ -95,7 +134,7 @@ class Database:
             """))
 
     def get_search_history(self, limit: int = 50) -> List[Dict]:
-        with self._conn() as conn:
+        with self._read() as conn:
             result = conn.execute(
                 text("SELECT * FROM search_history ORDER BY created_at DESC LIMIT :limit"),
                 {"limit": limit},
@@ -105,7 +144,7 @@ class Database:
     # ── Analytics ─────────────────────────────────────────────────────────────
 
     def get_stats(self) -> Dict:
-        with self._conn() as conn:
+        with self._read() as conn:
             sources = conn.execute(text("SELECT COUNT(*) FROM sources WHERE status='indexed'")).scalar()
             docs = conn.execute(text("SELECT COUNT(*) FROM documents")).scalar()
             searches = conn.execute(text("SELECT COUNT(*) FROM search_history")).scalar()
@@ -113,7 +152,7 @@ class Database:
 
     def get_analytics(self) -> Dict:
         cutoff = (datetime.now() - timedelta(days=7)).isoformat()
-        with self._conn() as conn:
+        with self._read() as conn:
             top_queries = self._rows(conn.execute(text("""
                 SELECT query, COUNT(*) as count FROM search_history
                 GROUP BY query ORDER BY count DESC LIMIT 10
@@ -121,7 +160,8 @@ class Database:
 
             searches_by_day = self._rows(conn.execute(text("""
                 SELECT DATE(created_at) as date, COUNT(*) as count,
-                       SUM(CASE WHEN cached = 1 THEN 1 ELSE 0 END) as cache_hits
+                       SUM(CASE WHEN cached > 0 THEN 1 ELSE 0 END) as cache_hits,
+                       SUM(CASE WHEN cached = 2 THEN 1 ELSE 0 END) as semantic_cache_hits
                 FROM search_history
                 WHERE created_at >= :cutoff
                 GROUP BY DATE(created_at) ORDER BY date
@@ -131,12 +171,17 @@ class Database:
                 "SELECT type, COUNT(*) as count FROM sources GROUP BY type"
             )))
 
-            cache_row = conn.execute(
-                text("SELECT COUNT(*) as total, SUM(CASE WHEN cached = 1 THEN 1 ELSE 0 END) as hits FROM search_history")
-            ).fetchone()
+            cache_row = conn.execute(text("""
+                SELECT COUNT(*) as total,
+                       SUM(CASE WHEN cached > 0 THEN 1 ELSE 0 END) as hits,
+                       SUM(CASE WHEN cached = 2 THEN 1 ELSE 0 END) as semantic_hits
+                FROM search_history
+            """)).fetchone()
             total = cache_row[0] or 0
             hits = cache_row[1] or 0
+            semantic_hits = cache_row[2] or 0
             cache_rate = round((hits / total * 100) if total > 0 else 0, 1)
+            semantic_rate = round((semantic_hits / total * 100) if total > 0 else 0, 1)
 
             model_usage = self._rows(conn.execute(text(
                 "SELECT model, COUNT(*) as count FROM search_history GROUP BY model"
@@ -147,6 +192,7 @@ class Database:
                 "searches_by_day": searches_by_day,
                 "source_types": source_types,
                 "cache_hit_rate": cache_rate,
+                "semantic_cache_hit_rate": semantic_rate,
                 "model_usage": model_usage,
             }
 
@@ -161,7 +207,7 @@ class Database:
             return result.scalar()
 
     def get_collections(self) -> List[Dict]:
-        with self._conn() as conn:
+        with self._read() as conn:
             result = conn.execute(text("""
                 SELECT c.*, COUNT(sc.source_id) as source_count
                 FROM collections c
@@ -189,24 +235,302 @@ class Database:
                 {"sid": source_id, "cid": collection_id},
             )
 
+    def get_collection_source_ids(self, collection_id: int) -> List[int]:
+        """Every member of the collection (get_sources pages them)."""
+        with self._read() as conn:
+            result = conn.execute(
+                text("SELECT source_id FROM source_collections WHERE collection_id=:cid ORDER BY source_id"),
+                {"cid": collection_id},
+            )
+            return result.scalars().all()
+
+    def get_source_collections(self, source_ids: List[int]) -> Dict[int, List[int]]:
+        """{source_id: [collection ids]} for the given sources that belong to any."""
+        if not source_ids:
+            return {}
+        with self._read() as conn:
+            result = conn.execute(
+                text("SELECT source_id, collection_id FROM source_collections WHERE source_id IN :sids")
+                .bindparams(bindparam("sids", expanding=True)),
+                {"sids": list(source_ids)},
+            )
+            memberships: Dict[int, List[int]] = {}
+            for source_id, collection_id in result:
+                memberships.setdefault(source_id, []).append(collection_id)
+            return memberships
+
+    def get_memberships(self) -> Dict[int, List[int]]:
+        """{collection_id: [source ids]} for every collection."""
+        with self._read() as conn:
+            result = conn.execute(text("SELECT collection_id, source_id FROM source_collections ORDER BY collection_id"))
+            memberships: Dict[int, List[int]] = {}
+            for collection_id, source_id in result:
+                memberships.setdefault(collection_id, []).append(source_id)
+            return memberships
+
     # ── Index jobs ────────────────────────────────────────────────────────────
 
-    def create_job(self, job_id: str, filename: str):
+    def create_job(self, job_id: str, filename: str, parent_id: str = None):
         with self._conn() as conn:
             conn.execute(
-                text("INSERT INTO index_jobs (id, filename, status) VALUES (:id, :fn, 'pending')"),
-                {"id": job_id, "fn": filename},
+                text("INSERT INTO index_jobs (id, filename, status, chunks, parent_id) VALUES (:id, :fn, 'pending', 0, :pid)"),
+                {"id": job_id, "fn": filename, "pid": parent_id},
             )
 
     def update_job(self, job_id: str, status: str, chunks: int = 0, error: str = None):
         with self._conn() as conn:
-            completed_at = datetime.now().isoformat() if status != "pending" else None
+            completed_at = datetime.now().isoformat() if status in ("completed", "failed") else None
             conn.execute(
                 text("UPDATE index_jobs SET status=:status, chunks=:chunks, error=:error, completed_at=:completed_at WHERE id=:id"),
                 {"status": status, "chunks": chunks, "error": error, "completed_at": completed_at, "id": job_id},
             )
 
     def get_job(self, job_id: str) -> Optional[Dict]:
-        with self._conn() as conn:
+        with self._read() as conn:
             result = conn.execute(text("SELECT * FROM index_jobs WHERE id=:id"), {"id": job_id})
             return self._row(result)
+
+    def get_child_jobs(self, parent_id: str) -> List[Dict]:
+        with self._read() as conn:
+            return self._rows(conn.execute(
+                text("SELECT id, filename, status, chunks, error FROM index_jobs WHERE parent_id=:pid ORDER BY created_at, id"),
+                {"pid": parent_id},
+            ))
+
+    def delete_child_jobs(self, parent_id: str):
+        with self._conn() as conn:
+            conn.execute(text("DELETE FROM index_jobs WHERE parent_id=:pid"), {"pid": parent_id})
+
+    # ── Job queue ─────────────────────────────────────────────────────────────
+    # Queue jobs are index_jobs rows with a kind. A worker claims one by moving it
+    # to 'indexing' under a lease it keeps extending while it runs; if the worker
+    # dies the lease expires and the job becomes claimable again. Claims are a
+    # compare-and-set UPDATE, so concurrent workers never run the same job twice.
+
+    _CLAIMABLE = (
+        "kind IS NOT NULL AND attempts < :max_attempts AND ("
+        "(status='pending' AND run_after <= :now) OR (status='indexing' AND leased_until < :now))"
+    )
+
+    def enqueue_job(self, job_id: str, kind: str, filename: str, payload: str):
+        with self._conn() as conn:
+            conn.execute(
+                text("""
+                    INSERT INTO index_jobs (id, filename, status, chunks, kind, payload, attempts, run_after)
+                    VALUES (:id, :fn, 'pending', 0, :kind, :payload, 0, :now)
+                """),
+                {"id": job_id, "fn": filename, "kind": kind, "payload": payload, "now": datetime.now().isoformat()},
+            )
+
+    def claim_job(self, owner: str, lease_seconds: float, max_attempts: int) -> Optional[Dict]:
+        now = datetime.now()
+        params = {
+            "now": now.isoformat(), "max_attempts": max_attempts, "owner": owner,
+            "until": (now + timedelta(seconds=lease_seconds)).isoformat(),
+        }
+        with self._conn() as conn:
+            candidates = conn.execute(
+                text(f"SELECT id FROM index_jobs WHERE {self._CLAIMABLE} ORDER BY run_after LIMIT 5"), params,
+            ).scalars().all()
+            for job_id in candidates:
+                claimed = conn.execute(
+                    text(f"""
+                        UPDATE index_jobs SET status='indexing', lease_owner=:owner, leased_until=:until,
+                               attempts=attempts + 1
+                        WHERE id=:id AND {self._CLAIMABLE}
+                    """),
+                    {**params, "id": job_id},
+                )
+                if claimed.rowcount == 1:
+                    return self._row(conn.execute(text("SELECT * FROM index_jobs WHERE id=:id"), {"id": job_id}))
+        return None
+
+    def heartbeat_job(self, job_id: str, owner: str, lease_seconds: float) -> bool:
+        until = (datetime.now() + timedelta(seconds=lease_seconds)).isoformat()
+        with self._conn() as conn:
+            result = conn.execute(
+                text("UPDATE index_jobs SET leased_until=:until WHERE id=:id AND lease_owner=:owner AND status='indexing'"),
+                {"until": until, "id": job_id, "owner": owner},
+            )
+            return result.rowcount == 1
+
+    def checkpoint_job(self, job_id: str, owner: str, chunks: int,
+                       total: Optional[int] = None, rate: Optional[float] = None) -> bool:
+        """Record a running job's progress; chunks is also where a rerun resumes."""
+        with self._conn() as conn:
+            result = conn.execute(
+                text("UPDATE index_jobs SET chunks=:chunks, total=:total, rate=:rate WHERE id=:id AND lease_owner=:owner"),
+                {"chunks": chunks, "total": total, "rate": rate, "id": job_id, "owner": owner},
+            )
+            return result.rowcount == 1
+
+    def complete_job(self, job_id: str, owner: str, chunks: Optional[int] = None) -> bool:
+        """Release the lease; chunks=None leaves status as the handler set it."""
+        with self._conn() as conn:
+            if chunks is None:
+                result = conn.execute(
+                    text("UPDATE index_jobs SET leased_until=NULL, lease_owner=NULL WHERE id=:id AND lease_owner=:owner"),
+                    {"id": job_id, "owner": owner},
+                )
+            else:
+                result = conn.execute(
+                    text("""
+                        UPDATE index_jobs SET status='completed', chunks=:chunks, error=NULL, completed_at=:now,
+                               leased_until=NULL, lease_owner=NULL
+                        WHERE id=:id AND lease_owner=:owner
+                    """),
+                    {"chunks": chunks, "now": datetime.now().isoformat(), "id": job_id, "owner": owner},
+                )
+            return result.rowcount == 1
+
+    def fail_job(self, job_id: str, owner: str, error: str, retry_at: Optional[datetime] = None) -> bool:
+        """Record a failed attempt: back to 'pending' until retry_at, or 'failed' for good."""
+        with self._conn() as conn:
+            result = conn.execute(
+                text("""
+                    UPDATE index_jobs SET status=:status, error=:error, run_after=:run_after, completed_at=:completed_at,
+                           leased_until=NULL, lease_owner=NULL
+                    WHERE id=:id AND lease_owner=:owner
+                """),
+                {
+                    "status": "pending" if retry_at else "failed",
+                    "error": error,
+                    "run_after": retry_at.isoformat() if retry_at else None,
+                    "completed_at": None if retry_at else datetime.now().isoformat(),
+                    "id": job_id, "owner": owner,
+                },
+            )
+            return result.rowcount == 1
+
+    def recover_jobs(self, max_attempts: int) -> List[Dict]:
+        """Fail jobs whose lease expired on their last allowed attempt (worker kept dying)."""
+        params = {"now": datetime.now().isoformat(), "max_attempts": max_attempts}
+        with self._conn() as conn:
+            dead = self._rows(conn.execute(text("""
+                SELECT * FROM index_jobs
+                WHERE kind IS NOT NULL AND status='indexing' AND leased_until < :now AND attempts >= :max_attempts
+            """), params))
+            for job in dead:
+                conn.execute(
+                    text("""
+                        UPDATE index_jobs SET status='failed', completed_at=:now, leased_until=NULL, lease_owner=NULL,
+                               error=:error
+                        WHERE id=:id AND status='indexing' AND leased_until < :now
+                    """),
+                    {**params, "id": job["id"], "error": f"Worker lost after {job['attempts']} attempts"},
+                )
+            return dead
+
+    def get_queue_stats(self) -> Dict:
+        with self._read() as conn:
+            rows = conn.execute(
+                text("SELECT status, COUNT(*) FROM index_jobs WHERE kind IS NOT NULL GROUP BY status")
+            ).fetchall()
+            return {status: count for status, count in rows}
+
+    # ── Page cache ────────────────────────────────────────────────────────────
+
+    def get_cached_pages(self, urls: List[str]) -> Dict[str, Dict]:
+        """{url: row} for the cached pages among these normalised URLs."""
+        if not urls:
+            return {}
+        with self._read() as conn:
+            rows = self._rows(conn.execute(
+                text("SELECT * FROM page_cache WHERE url IN :urls").bindparams(bindparam("urls", expanding=True)),
+                {"urls": list(urls)},
+            ))
+        for row in rows:
+            if isinstance(row["checked_at"], str):     # SQLite returns the stored ISO string
+                row["checked_at"] = datetime.fromisoformat(row["checked_at"])
+        return {row["url"]: row for row in rows}
+
+    def put_cached_pages(self, rows: List[Dict]):
+        """Upsert {url, title, content, max_length, etag, last_modified, checked_at} rows."""
+        if not rows:
+            return
+        with self._conn() as conn:
+            conn.execute(
+                text("""
+                    INSERT INTO page_cache (url, title, content, max_length, etag, last_modified, checked_at)
+                    VALUES (:url, :title, :content, :max_length, :etag, :last_modified, :checked_at)
+                    ON CONFLICT (url) DO UPDATE SET title=EXCLUDED.title, content=EXCLUDED.content,
+                        max_length=EXCLUDED.max_length, etag=EXCLUDED.etag,
+                        last_modified=EXCLUDED.last_modified, checked_at=EXCLUDED.checked_at
+                """),
+                [{**row, "checked_at": row["checked_at"].isoformat()} for row in rows],
+            )
+
+    def prune_page_cache(self, checked_before: datetime) -> int:
+        with self._conn() as conn:
+            return conn.execute(
+                text("DELETE FROM page_cache WHERE checked_at < :before"), {"before": checked_before.isoformat()},
+            ).rowcount
+
+    # ── Lexical index ─────────────────────────────────────────────────────────
+    # chunk_text mirrors the chunks stored in Chroma (see LEXICAL_DDL); rows are
+    # written before the vectors and removed after them, and searches skip ids
+    # Chroma doesn't know, so a half-finished write never surfaces wrong text.
+
+    def add_chunk_text(self, rows: List[Dict]):
+        """Upsert {chunk_id, source_id, content} rows."""
+        if not rows:
+            return
+        with self._conn() as conn:
+            conn.execute(
+                text("""
+                    INSERT INTO chunk_text (chunk_id, source_id, content) VALUES (:chunk_id, :source_id, :content)
+                    ON CONFLICT (chunk_id) DO UPDATE SET source_id=EXCLUDED.source_id, content=EXCLUDED.content
+                """),
+                rows,
+            )
+
+    def delete_chunk_text(self, chunk_ids: List[str]):
+        if not chunk_ids:
+            return
+        with self._conn() as conn:
+            conn.execute(
+                text("DELETE FROM chunk_text WHERE chunk_id IN :ids").bindparams(bindparam("ids", expanding=True)),
+                {"ids": list(chunk_ids)},
+            )
+
+    def delete_source_chunk_text(self, source_id: int):
+        with self._conn() as conn:
+            conn.execute(text("DELETE FROM chunk_text WHERE source_id=:id"), {"id": source_id})
+
+    def count_chunk_text(self) -> int:
+        with self._read() as conn:
+            return conn.execute(text("SELECT COUNT(*) FROM chunk_text")).scalar()
+
+    def search_chunk_text(self, terms: List[str], limit: int, source_ids: Optional[List[int]] = None,
+                          collection_id: Optional[int] = None) -> List[str]:
+        """Chunk ids matching any of the terms, best first (BM25 on SQLite, ts_rank_cd on PostgreSQL),
+        optionally limited to some sources and/or one collection's members."""
+        if not terms:
+            return []
+        params: Dict = {"limit": limit}
+        source_filter = ""
+        if source_ids is not None:
+            source_filter = "AND t.source_id IN :sids"
+            params["sids"] = list(source_ids)
+        if collection_id is not None:
+            source_filter += " AND t.source_id IN (SELECT source_id FROM source_collections WHERE collection_id = :cid)"
+            params["cid"] = collection_id
+        if _is_sqlite:
+            params["q"] = " OR ".join(f'"{t}"' for t in terms)
+            sql = f"""
+                SELECT t.chunk_id FROM chunk_fts JOIN chunk_text t ON t.id = chunk_fts.rowid
+                WHERE chunk_fts MATCH :q {source_filter}
+                ORDER BY bm25(chunk_fts) LIMIT :limit
+            """
+        else:
+            params["q"] = " | ".join(terms)
+            sql = f"""
+                SELECT t.chunk_id FROM chunk_text t, to_tsquery('simple', :q) q
+                WHERE t.tsv @@ q {source_filter}
+                ORDER BY ts_rank_cd(t.tsv, q) DESC LIMIT :limit
+            """
+        stmt = text(sql)
+        if source_ids is not None:
+            stmt = stmt.bindparams(bindparam("sids", expanding=True))
+        with self._read() as conn:
+            return conn.execute(stmt, params).scalars().all()
@@ -1,10 +1,14 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.pool import QueuePool, StaticPool
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./devflow.db")
 
 _is_sqlite = DATABASE_URL.startswith("sqlite")
+# An in-memory database exists only on its one connection, so it stays on a
+# shared StaticPool; a file database gets a pool and WAL, so reads don't wait
+# for writers
+_sqlite_shared_connection = _is_sqlite and DATABASE_URL in ("sqlite://", "sqlite:///:memory:")
 
 engine = create_engine(
     DATABASE_URL,
@@ -12,6 +16,11 @@ engine = create_engine(
     **({
         "connect_args": {"check_same_thread": False},
         "poolclass": StaticPool,
+    } if _sqlite_shared_connection else {
+        "connect_args": {"check_same_thread": False, "timeout": 30},
+        "pool_size": 10,
+        "max_overflow": 20,
+        "poolclass": QueuePool,
     } if _is_sqlite else {
         "pool_size": 10,
         "max_overflow": 20,
@@ -19,3 +28,11 @@ engine = create_engine(
         "poolclass": QueuePool,
     })
 )
+
+
+if _is_sqlite and not _sqlite_shared_connection:
+    @event.listens_for(engine, "connect")
+    def _sqlite_wal(dbapi_conn, _):
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
@@ -1,5 +1,5 @@
 from sqlalchemy import (
-    Table, Column, Integer, String, Boolean, Text,
+    Table, Column, Integer, Float, String, Boolean, Text,
     DateTime, MetaData, ForeignKey, Index, func,
 )
 
@@ -16,6 +16,7 @@ sources = Table(
     Column("created_at", DateTime, server_default=func.now()),
     Index("idx_sources_status", "status"),
     Index("idx_sources_created", "created_at"),
+    Index("idx_sources_type_path", "type", "path"),
 )
 
 documents = Table(
@@ -53,6 +54,8 @@ source_collections = Table(
     "source_collections", metadata,
     Column("source_id", Integer, ForeignKey("sources.id", ondelete="CASCADE"), primary_key=True),
     Column("collection_id", Integer, ForeignKey("collections.id", ondelete="CASCADE"), primary_key=True),
+    # members of a collection (the primary key leads with source_id)
+    Index("idx_source_collections_collection", "collection_id", "source_id"),
 )
 
 index_jobs = Table(
@@ -64,6 +67,19 @@ index_jobs = Table(
     Column("error", Text),
     Column("created_at", DateTime, server_default=func.now()),
     Column("completed_at", DateTime),
+    Column("parent_id", String, ForeignKey("index_jobs.id", ondelete="CASCADE")),
+    # Job queue (jobs/): rows with a kind are claimed and run by worker processes
+    Column("kind", String(20)),
+    Column("payload", Text),
+    Column("attempts", Integer, default=0),
+    Column("run_after", DateTime),
+    Column("leased_until", DateTime),
+    Column("lease_owner", String(64)),
+    # Progress of long jobs (reindex-all): chunks done so far is also the resume point
+    Column("total", Integer),
+    Column("rate", Float),
+    Index("idx_jobs_parent", "parent_id"),
+    Index("idx_jobs_queue", "status", "run_after"),
 )
 
 users = Table(
@@ -74,3 +90,69 @@ users = Table(
     Column("hashed_password", Text, nullable=False),
     Column("created_at", DateTime, server_default=func.now()),
 )
+
+# Scraped web pages keyed by normalised URL (connectors/web_search.py): the
+# extracted text and title plus the validators a stale entry is revalidated
+# with. max_length is the text limit the page was extracted at.
+page_cache = Table(
+    "page_cache", metadata,
+    Column("url", Text, primary_key=True),
+    Column("title", Text),
+    Column("content", Text, nullable=False),
+    Column("max_length", Integer, nullable=False),
+    Column("etag", Text),
+    Column("last_modified", Text),
+    Column("checked_at", DateTime, nullable=False),
+    Index("idx_page_cache_checked", "checked_at"),
+)
+
+# ── Lexical index ─────────────────────────────────────────────────────────────
+# Chunk text for keyword (BM25-style) retrieval next to the Chroma vectors. The
+# full-text machinery is dialect specific, so it is created with raw DDL rather
+# than through `metadata`: an FTS5 index over an external-content table on
+# SQLite, a generated tsvector + GIN index on PostgreSQL. "simple"/unicode61
+# tokenisation keeps identifiers (error codes, config keys) intact and works for
+# every indexed language.
+LEXICAL_DDL = {
+    "sqlite": [
+        """CREATE TABLE IF NOT EXISTS chunk_text (
+            id INTEGER PRIMARY KEY,
+            chunk_id TEXT NOT NULL UNIQUE,
+            source_id INTEGER,
+            content TEXT NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_chunk_text_source ON chunk_text (source_id)",
+        """CREATE VIRTUAL TABLE IF NOT EXISTS chunk_fts USING fts5(
+            content, content='chunk_text', content_rowid='id',
+            tokenize="unicode61 remove_diacritics 2 tokenchars '_'"
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS chunk_text_ai AFTER INSERT ON chunk_text BEGIN
+            INSERT INTO chunk_fts (rowid, content) VALUES (new.id, new.content);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS chunk_text_ad AFTER DELETE ON chunk_text BEGIN
+            INSERT INTO chunk_fts (chunk_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS chunk_text_au AFTER UPDATE ON chunk_text BEGIN
+            INSERT INTO chunk_fts (chunk_fts, rowid, content) VALUES ('delete', old.id, old.content);
+            INSERT INTO chunk_fts (rowid, content) VALUES (new.id, new.content);
+        END""",
+    ],
+    "postgresql": [
+        """CREATE TABLE IF NOT EXISTS chunk_text (
+            chunk_id TEXT PRIMARY KEY,
+            source_id INTEGER,
+            content TEXT NOT NULL,
+            tsv tsvector GENERATED ALWAYS AS (to_tsvector('simple', content)) STORED
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_chunk_text_source ON chunk_text (source_id)",
+        "CREATE INDEX IF NOT EXISTS idx_chunk_text_tsv ON chunk_text USING GIN (tsv)",
+    ],
+}
+
+LEXICAL_DROP = [
+    "DROP TRIGGER IF EXISTS chunk_text_ai",
+    "DROP TRIGGER IF EXISTS chunk_text_ad",
+    "DROP TRIGGER IF EXISTS chunk_text_au",
+    "DROP TABLE IF EXISTS chunk_fts",
+    "DROP TABLE IF EXISTS chunk_text",
+]
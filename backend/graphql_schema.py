@@ -1,45 +1,25 @@
 import strawberry
 from strawberry.fastapi import GraphQLRouter
 from typing import List, Optional
+from starlette.concurrency import run_in_threadpool
+from services import get_services
 
-# ── Lazy singletons — load ML models once, not per request ───────────────────
-
-_db = None
-_retriever = None
-_reranker = None
-_rag = None
-
+# ── Shared services — the same models and clients as the REST routes ────────
 
 def _get_db():
-    global _db
-    if _db is None:
-        from database.db import Database
-        _db = Database()
-    return _db
+    return get_services().db
 
 
 def _get_retriever():
-    global _retriever
-    if _retriever is None:
-        from rag.retriever import Retriever
-        _retriever = Retriever()
-    return _retriever
+    return get_services().get("retriever")
 
 
 def _get_reranker():
-    global _reranker
-    if _reranker is None:
-        from rag.reranker import Reranker
-        _reranker = Reranker()
-    return _reranker
+    return get_services().get("reranker")
 
 
 def _get_rag():
-    global _rag
-    if _rag is None:
-        from rag.generator import GeminiRAG
-        _rag = GeminiRAG()
-    return _rag
+    return get_services().get("rag")
 
 
 # ── Types ─────────────────────────────────────────────────────────────────────
@@ -93,6 +73,7 @@ class SearchResultType:
 @strawberry.type
 class AnalyticsType:
     cache_hit_rate: float
+    semantic_cache_hit_rate: float
     chromadb_count: int
 
 
@@ -159,6 +140,7 @@ class Query:
         d = _get_db().get_analytics()
         return AnalyticsType(
             cache_hit_rate=d.get("cache_hit_rate", 0.0),
+            semantic_cache_hit_rate=d.get("semantic_cache_hit_rate", 0.0),
             chromadb_count=_get_retriever().count(),
         )
 
@@ -178,10 +160,10 @@ class Query:
 @strawberry.type
 class Mutation:
     @strawberry.mutation
-    def delete_source(self, source_id: int) -> MutationResult:
+    async def delete_source(self, source_id: int) -> MutationResult:
         try:
-            _get_retriever().delete_by_source(source_id)
-            _get_db().delete_source(source_id)
+            await run_in_threadpool(_get_retriever().delete_by_source, source_id)
+            await run_in_threadpool(_get_db().delete_source, source_id)
             return MutationResult(success=True, message="Source deleted")
         except Exception as e:
             return MutationResult(success=False, message=str(e))
@@ -198,54 +180,76 @@ class Mutation:
         )
 
     @strawberry.mutation
-    def delete_collection(self, collection_id: int) -> MutationResult:
+    async def delete_collection(self, collection_id: int) -> MutationResult:
         try:
-            _get_db().delete_collection(collection_id)
+            await run_in_threadpool(_get_retriever().delete_collection, collection_id)
             return MutationResult(success=True, message="Collection deleted")
         except Exception as e:
             return MutationResult(success=False, message=str(e))
 
     @strawberry.mutation
-    def add_source_to_collection(self, source_id: int, collection_id: int) -> MutationResult:
+    async def add_source_to_collection(self, source_id: int, collection_id: int) -> MutationResult:
         try:
-            _get_db().add_source_to_collection(source_id, collection_id)
+            # also copies the source's chunks into the collection's sub-index
+            await run_in_threadpool(_get_retriever().add_to_collection, source_id, collection_id)
             return MutationResult(success=True, message="Source added to collection")
         except Exception as e:
             return MutationResult(success=False, message=str(e))
 
     @strawberry.mutation
-    def search(
+    async def search(
         self, query: str, n_results: int = 5,
-        model: str = "gemini-flash", use_hyde: bool = False,
+        model: str = "gemini-flash", use_hyde: bool = False, retrieval: str = "dense",
     ) -> SearchResultType:
-        from cache.redis_cache import make_cache_key, get_cached, set_cached
+        from cache.redis_cache import INDEX_VERSION, aget_versions, make_cache_key
+        from cache.semantic_cache import semantic_cache, semantic_scope
+        from cache.tiered_cache import COMPUTED, answer_cache
+        from database.db import CACHE_MISS, CACHE_HIT_EXACT, CACHE_HIT_SEMANTIC
 
         from rag.lang import detect_language
-        cache_key = make_cache_key("gql_search", {"q": query, "n": n_results, "m": model, "lang": detect_language(query), "hyde": use_hyde})
-        cached = get_cached(cache_key)
-        if cached:
-            return SearchResultType(
-                answer=cached["answer"], model=model,
-                cached=True, source_count=len(cached.get("sources", [])),
-            )
-
-        results = _get_retriever().search(query, n_results, use_hyde=use_hyde)
-        documents = results["documents"] or []
-        metadatas = results["metadatas"] or []
-
-        if documents:
-            documents, metadatas = _get_reranker().rerank(query, documents, metadatas)
-
-        if not documents:
-            return SearchResultType(answer="No relevant documents found.", model=model, cached=False, source_count=0)
-
-        response = _get_rag().generate_answer(query=query, context=documents, sources=metadatas, model=model)
-        _get_db().add_search(query, len(documents), cached=False, model=model)
-        set_cached(cache_key, response)
-
+        params = {"n": n_results, "m": model, "lang": detect_language(query), "hyde": use_hyde, "ret": retrieval}
+        versions = await aget_versions(INDEX_VERSION)
+        cache_key = make_cache_key("gql_search", {"q": query, **params}, versions)
+        scope = semantic_scope("gql_search", params, versions)
+        computed = []
+
+        async def answer(extras):
+            _get_retriever().seed_query_embedding(query, extras[0])
+            query_embedding = await _get_retriever().aembed_query(query) if semantic_cache.enabled else None
+            hit = semantic_cache.get(scope, query_embedding)
+            if hit:
+                computed.append((len(hit[0].get("sources", [])), CACHE_HIT_SEMANTIC))
+                return {**hit[0], "cached": True}, False
+
+            results = await _get_retriever().asearch(query, n_results, use_hyde=use_hyde, mode=retrieval)
+            documents = results["documents"] or []
+            metadatas = results["metadatas"] or []
+
+            if documents:
+                documents, metadatas = await _get_reranker().arerank(
+                    query, documents, metadatas, ids=results.get("ids"), distances=results.get("distances"),
+                )
+
+            if not documents:
+                return {"answer": "No relevant documents found.", "sources": [], "cached": False}, False
+
+            response = await _get_rag().agenerate_answer(query=query, context=documents, sources=metadatas, model=model)
+            response["cached"] = False
+            computed.append((len(documents), CACHE_MISS))
+            semantic_cache.set(scope, query_embedding, response)
+            return response, True
+
+        response, source = await answer_cache.get_or_compute(
+            cache_key, answer, ("array", _get_retriever().query_cache_key(query)),
+        )
+        if source != COMPUTED:
+            computed = [(len(response.get("sources", [])), CACHE_HIT_EXACT)]
+        for results_count, kind in computed:
+            await run_in_threadpool(_get_db().add_search, query, results_count, cached=kind, model=model)
         return SearchResultType(
             answer=response["answer"], model=model,
-            cached=False, source_count=len(documents),
+            cached=source != COMPUTED or response.get("cached", False),
+            source_count=computed[0][0] if computed else 0,
         )
 
 
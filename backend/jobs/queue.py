@@ -0,0 +1,69 @@
+import os
+import json
+import uuid
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "10"))
+JOB_RETRY_MAX_SECONDS = float(os.getenv("JOB_RETRY_MAX_SECONDS", "900"))
+
+
+class PermanentJobError(Exception):
+    """A failure retrying won't fix (unreadable file, duplicate content) — fail the job now."""
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with ±20% jitter: 10s, 20s, 40s, ... capped at JOB_RETRY_MAX_SECONDS."""
+    delay = min(JOB_RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1), JOB_RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+class JobQueue:
+    """Durable indexing queue on the index_jobs table. The API only enqueues;
+    worker processes (worker.py) claim, run and settle jobs."""
+
+    def __init__(self, db, max_attempts: int = JOB_MAX_ATTEMPTS, lease_seconds: float = JOB_LEASE_SECONDS):
+        self.db = db
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+
+    def enqueue(self, kind: str, label: str, **payload) -> str:
+        job_id = str(uuid.uuid4())
+        self.db.enqueue_job(job_id, kind, label, json.dumps(payload))
+        return job_id
+
+    def claim(self, owner: str) -> Optional[Dict]:
+        job = self.db.claim_job(owner, self.lease_seconds, self.max_attempts)
+        if job:
+            job["payload"] = json.loads(job["payload"] or "{}")
+        return job
+
+    def heartbeat(self, job_id: str, owner: str) -> bool:
+        return self.db.heartbeat_job(job_id, owner, self.lease_seconds)
+
+    def checkpoint(self, job_id: str, owner: str, chunks: int,
+                   total: Optional[int] = None, rate: Optional[float] = None) -> bool:
+        return self.db.checkpoint_job(job_id, owner, chunks, total, rate)
+
+    def complete(self, job_id: str, owner: str, chunks: Optional[int] = None) -> bool:
+        return self.db.complete_job(job_id, owner, chunks)
+
+    def fail(self, job: Dict, owner: str, error: str, permanent: bool = False) -> bool:
+        """Schedule a retry with backoff, or fail for good once attempts run out.
+        Returns True when the job is now terminally failed."""
+        if permanent or job["attempts"] >= self.max_attempts:
+            self.db.fail_job(job["id"], owner, error)
+            return True
+        retry_at = datetime.now() + timedelta(seconds=retry_delay(job["attempts"]))
+        self.db.fail_job(job["id"], owner, error, retry_at=retry_at)
+        return False
+
+    def recover(self) -> List[Dict]:
+        """Fail jobs whose worker died on their last attempt; returns them for cleanup."""
+        jobs = self.db.recover_jobs(self.max_attempts)
+        for job in jobs:
+            job["payload"] = json.loads(job["payload"] or "{}")
+        return jobs
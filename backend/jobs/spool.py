@@ -0,0 +1,48 @@
+import os
+import tempfile
+from typing import List, Tuple
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+
+# Uploads are written here by the API and read by whichever worker claims the
+# job, so with out-of-process workers this must be a shared volume. Files are
+# deleted once their job completes or fails for good.
+SPOOL_DIR = os.getenv("INGEST_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "devflow-ingest"))
+_SPOOL_CHUNK = 1024 * 1024
+
+
+def _new_path() -> Tuple[int, str]:
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    return tempfile.mkstemp(dir=SPOOL_DIR, prefix="upload-")
+
+
+def spool_bytes(data: bytes) -> str:
+    fd, path = _new_path()
+    with os.fdopen(fd, "wb") as out:
+        out.write(data)
+    return path
+
+
+async def spool_upload(upload: UploadFile, budget: int) -> Tuple[str, int]:
+    """Copy an upload to the spool dir in 1 MB pieces; 413 once it passes `budget` bytes."""
+    fd, path = await run_in_threadpool(_new_path)
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await upload.read(_SPOOL_CHUNK):
+                size += len(chunk)
+                if size > budget:
+                    raise HTTPException(status_code=413, detail=f"Upload exceeds {budget // (1024 * 1024)} MB limit")
+                await run_in_threadpool(out.write, chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path, size
+
+
+def cleanup(paths: List[str]):
+    for path in paths:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
@@ -0,0 +1,200 @@
+import time
+import asyncio
+from typing import Callable, Dict, List, Optional
+from loguru import logger
+
+from jobs.queue import PermanentJobError
+
+
+class Services:
+    """Per-process models and clients for job handlers, created on first use so a
+    worker only loads what the jobs it actually runs need. Inline workers pass the
+    API's container as `shared` and use its instances instead of loading their own."""
+
+    def __init__(self, shared=None):
+        self._shared = shared
+        self._db = self._indexer = self._retriever = self._web_searcher = None
+
+    @property
+    def db(self):
+        if self._db is None:
+            if self._shared is not None:
+                self._db = self._shared.db
+            else:
+                from database.db import Database
+                self._db = Database()
+        return self._db
+
+    @property
+    def indexer(self):
+        if self._indexer is None:
+            if self._shared is not None:
+                self._indexer = self._shared.get("indexer")
+            else:
+                from rag.indexer import Indexer
+                self._indexer = Indexer()
+        return self._indexer
+
+    @property
+    def retriever(self):
+        if self._retriever is None:
+            if self._shared is not None:
+                self._retriever = self._shared.get("retriever")
+            else:
+                from rag.retriever import Retriever
+                self._retriever = Retriever(self.db)
+        return self._retriever
+
+    @property
+    def web_searcher(self):
+        if self._web_searcher is None:
+            if self._shared is not None:
+                self._web_searcher = self._shared.get("web_searcher")
+            else:
+                from connectors.web_search import WebSearcher
+                self._web_searcher = WebSearcher()
+        return self._web_searcher
+
+
+def _index_text(svc: Services, source_type: str, path: str, title: str, content: str,
+                collection_id: Optional[int] = None, source_id: Optional[int] = None,
+                chunks: Optional[List] = None) -> int:
+    # With a source_id this re-syncs that source: only chunks whose content changed
+    # are embedded, and chunks that disappeared are deleted. Without one the text
+    # is a new document, even if another source has the same name.
+    stored = {}
+    created = source_id is None
+    if created:
+        source_id = svc.db.add_source(source_type, path, title)
+    else:
+        stored = svc.retriever.stored_chunks([source_id])
+    try:
+        chunks, embeddings, metadatas, ids = svc.indexer.prepare_documents(
+            [content], [title], [path], source_id, source_type, stored=stored,
+            chunks=None if chunks is None else [chunks],
+        )
+        sync = svc.retriever.sync_documents(chunks, embeddings, metadatas, ids, [source_id])
+    except Exception:
+        if created:
+            # drop the half-written source so a retry starts from a clean slate
+            svc.retriever.delete_by_source(source_id)
+            svc.db.delete_source(source_id)
+        else:
+            svc.db.update_source_status(source_id, "failed")  # the retry re-syncs the same source
+        raise
+    svc.db.update_source_status(source_id, "indexed")
+    svc.db.clear_documents(source_id)
+    svc.db.add_document(svc.indexer.generate_id(content), source_id, title, path)
+    if collection_id:
+        svc.retriever.add_to_collection(source_id, collection_id)
+    if stored:
+        logger.info(f"Source {source_id} re-synced: {sync['added']} chunks embedded, "
+                    f"{sync['kept']} unchanged, {sync['deleted']} removed")
+    return len(chunks)
+
+
+def index_file(svc: Services, job: Dict) -> int:
+    from connectors.file_upload import FileProcessor
+    payload = job["payload"]
+    filename, path = payload["filename"], payload["path"]
+    with open(path, "rb") as f:
+        file_bytes = f.read()
+    try:
+        # a PDF streams in page by page and is chunked as it arrives
+        text, _ = FileProcessor.read_file(filename, file_bytes)
+        text_content, file_chunks = svc.indexer.chunk_document(text)
+    except ValueError as e:
+        raise PermanentJobError(str(e))
+    if not text_content or len(text_content.strip()) < 10:
+        raise PermanentJobError("Could not extract text")
+    chunks = _index_text(svc, "file", filename, filename, text_content,
+                         source_id=payload.get("source_id"), chunks=file_chunks)
+    logger.info(f"Job {job['id']}: indexed {filename} → {chunks} chunks")
+    return chunks
+
+
+def index_url(svc: Services, job: Dict) -> int:
+    payload = job["payload"]
+    url = payload["url"]
+    result = svc.web_searcher.scrape_url(url)
+    content = result.get("content", "")
+    page_title = payload.get("title") or result.get("title", url)
+
+    if not content or len(content.strip()) < 50:
+        raise PermanentJobError("Could not extract content from URL")
+
+    sample = " ".join(content.split()[:200])
+    # a URL names one page, so a page indexed before is re-synced under its source
+    # rather than rejected as a duplicate of itself
+    source_id = payload.get("source_id") or svc.db.find_source("web", url)
+    if source_id is None and svc.retriever.is_duplicate(sample):
+        raise PermanentJobError("Similar content already exists in your knowledge base")
+
+    chunks = _index_text(svc, "web", url, page_title, content, payload.get("collection_id"), source_id)
+    logger.info(f"Job {job['id']}: indexed URL {url} → {chunks} chunks")
+    return chunks
+
+
+def reindex_all(svc: Services, job: Dict) -> int:
+    # chunks holds the last checkpoint, so a retried or reclaimed job resumes there
+    start = job.get("chunks") or 0
+    started = time.monotonic()
+
+    def checkpoint(done: int, total: int):
+        rate = (done - start) / max(time.monotonic() - started, 1e-6)
+        if not svc.db.checkpoint_job(job["id"], job["lease_owner"], done, total, round(rate, 1)):
+            raise RuntimeError("Lease lost to another worker")
+
+    if start:
+        logger.info(f"Reindex-all job {job['id']}: resuming at chunk {start}")
+    migrated = svc.retriever.migrate_from_v1(start=start, progress=checkpoint)
+    logger.info(f"Reindex-all job {job['id']}: migrated {migrated} chunks")
+    return migrated
+
+
+def rebuild_lexical(svc: Services, job: Dict) -> int:
+    def checkpoint(done: int, total: int):
+        svc.db.checkpoint_job(job["id"], job["lease_owner"], done, total)
+
+    indexed = svc.retriever.rebuild_lexical_index(progress=checkpoint)
+    logger.info(f"Lexical index job {job['id']}: indexed {indexed} chunks")
+    return indexed
+
+
+def rebuild_collection_indexes(svc: Services, job: Dict) -> int:
+    def checkpoint(done: int, total: int):
+        svc.db.checkpoint_job(job["id"], job["lease_owner"], done, total)
+
+    copied = svc.retriever.rebuild_collection_indexes(progress=checkpoint)
+    logger.info(f"Collection index job {job['id']}: copied {copied} chunks")
+    return copied
+
+
+def bulk_ingest(svc: Services, job: Dict) -> None:
+    from connectors.archive import iter_uploads
+    from rag.pipeline import IngestPipeline
+    payload = job["payload"]
+    if job["attempts"] > 1:
+        # Rerun after a lost lease: start progress from a clean slate
+        svc.db.delete_child_jobs(job["id"])
+    pipeline = IngestPipeline(svc.db, svc.indexer, svc.retriever, collection_id=payload.get("collection_id"))
+    asyncio.run(pipeline.run(job["id"], iter_uploads([tuple(u) for u in payload["uploads"]])))
+    return None  # the pipeline settles the parent row's status itself
+
+
+HANDLERS: Dict[str, Callable[[Services, Dict], Optional[int]]] = {
+    "file": index_file,
+    "url": index_url,
+    "reindex": reindex_all,
+    "lexical": rebuild_lexical,
+    "collections": rebuild_collection_indexes,
+    "bulk": bulk_ingest,
+}
+
+
+def spool_paths(job: Dict) -> list:
+    """Spooled upload files a job owns; deleted once it settles for good."""
+    payload = job.get("payload") or {}
+    if "path" in payload:
+        return [payload["path"]]
+    return [path for path, _ in payload.get("uploads", [])]
@@ -0,0 +1,166 @@
+import os
+import time
+import signal
+import socket
+import threading
+import multiprocessing as mp
+from typing import Dict, Optional
+from loguru import logger
+
+from jobs.queue import JOB_LEASE_SECONDS, JobQueue, PermanentJobError
+from jobs.spool import cleanup
+from jobs.tasks import HANDLERS, Services, spool_paths
+
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+
+
+class _Heartbeat(threading.Thread):
+    """Extends a job's lease every lease/3 seconds while its handler runs."""
+
+    def __init__(self, queue: JobQueue, job_id: str, owner: str):
+        super().__init__(name=f"heartbeat-{job_id[:8]}", daemon=True)
+        self.queue = queue
+        self.job_id = job_id
+        self.owner = owner
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.queue.lease_seconds / 3):
+            try:
+                if not self.queue.heartbeat(self.job_id, self.owner):
+                    logger.warning(f"Job {self.job_id}: lease lost to another worker")
+                    return
+            except Exception as e:
+                logger.warning(f"Job {self.job_id}: heartbeat failed: {e}")
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+class Worker:
+    """Claims jobs from the queue and runs them one at a time.
+
+    A failed attempt is retried with exponential backoff up to JOB_MAX_ATTEMPTS;
+    PermanentJobError fails the job straight away. Jobs whose worker died are
+    picked up again once their lease expires.
+    """
+
+    def __init__(self, name: Optional[str] = None, services: Optional[Services] = None,
+                 poll_interval: float = JOB_POLL_INTERVAL):
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.services = services or Services()
+        self.queue = JobQueue(self.services.db)
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def run_once(self) -> bool:
+        """Claim and run one job. Returns False when nothing was claimable."""
+        job = self.queue.claim(self.name)
+        if job is None:
+            return False
+
+        heartbeat = _Heartbeat(self.queue, job["id"], self.name)
+        heartbeat.start()
+        try:
+            handler = HANDLERS.get(job["kind"])
+            if handler is None:
+                raise PermanentJobError(f"Unknown job kind '{job['kind']}'")
+            chunks = handler(self.services, job)
+        except Exception as e:
+            heartbeat.stop()
+            self._settle_failure(job, e)
+        else:
+            heartbeat.stop()
+            self.queue.complete(job["id"], self.name, chunks)
+            cleanup(spool_paths(job))
+        return True
+
+    def _settle_failure(self, job: Dict, error: Exception):
+        final = self.queue.fail(job, self.name, str(error), permanent=isinstance(error, PermanentJobError))
+        if final:
+            cleanup(spool_paths(job))
+            logger.error(f"Job {job['id']} ({job['kind']}) failed after {job['attempts']} attempt(s): {error}")
+        else:
+            logger.warning(f"Job {job['id']} ({job['kind']}) attempt {job['attempts']} failed, will retry: {error}")
+
+    def run_until_empty(self) -> int:
+        """Run jobs until none are claimable; returns how many ran."""
+        ran = 0
+        while self.run_once():
+            ran += 1
+        return ran
+
+    def run_forever(self):
+        logger.info(f"Worker {self.name} started")
+        while not self._stop.is_set():
+            try:
+                if self.run_once():
+                    continue
+                for job in self.queue.recover():
+                    cleanup(spool_paths(job))
+                    logger.error(f"Job {job['id']} ({job['kind']}) abandoned: worker lost on final attempt")
+            except Exception as e:
+                # DB unavailable, SQLite busy, ... — back off and try again
+                logger.error(f"Worker {self.name}: {e}")
+            self._stop.wait(self.poll_interval)
+        logger.info(f"Worker {self.name} stopped")
+
+
+# ── Entry points ──────────────────────────────────────────────────────────────
+
+def start_inline_workers(n: int, services: Optional[Services] = None) -> list:
+    """Run n worker threads inside the current (API) process — for single-service deploys.
+    Pass the API's services so the workers reuse its models and Chroma client."""
+    services = services or Services()
+    workers = [Worker(name=f"{socket.gethostname()}:{os.getpid()}:inline-{i}", services=services) for i in range(n)]
+    for worker in workers:
+        threading.Thread(target=worker.run_forever, name=worker.name, daemon=True).start()
+    return workers
+
+
+def _process_main(index: int):
+    worker = Worker()
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())  # finish the current job, then exit
+    signal.signal(signal.SIGINT, signal.SIG_IGN)             # the supervisor handles Ctrl-C
+    worker.run_forever()
+
+
+def run_workers(n: int):
+    """Supervise n worker processes, restarting any that die, until SIGTERM/SIGINT."""
+    if not os.getenv("CHROMA_HOST"):
+        logger.warning("CHROMA_HOST is not set: chunks indexed by workers won't be searchable from a running "
+                       "API process until it restarts. Point API and workers at a Chroma server.")
+    ctx = mp.get_context("spawn")  # no forked torch/SQLAlchemy state
+    procs: Dict[int, mp.Process] = {}
+    stopping = threading.Event()
+
+    def start(i: int):
+        procs[i] = ctx.Process(target=_process_main, args=(i,), name=f"devflow-worker-{i}")
+        procs[i].start()
+
+    def shutdown(*_):
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    for i in range(n):
+        start(i)
+    logger.info(f"Started {n} worker process(es)")
+
+    while not stopping.wait(1.0):
+        for i, proc in list(procs.items()):
+            if not proc.is_alive():
+                logger.warning(f"Worker process {proc.name} exited with {proc.exitcode}; restarting")
+                start(i)
+
+    for proc in procs.values():
+        proc.terminate()
+    deadline = time.monotonic() + JOB_LEASE_SECONDS
+    for proc in procs.values():
+        proc.join(max(0.0, deadline - time.monotonic()))
+        if proc.is_alive():
+            proc.kill()  # its job's lease expires and another worker picks it up
@@ -1,6 +1,7 @@
 import os
 import sys
 import uuid
+from typing import List, Optional
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -23,36 +24,38 @@ if _SENTRY_DSN:
         release=os.getenv("RENDER_GIT_COMMIT", "dev"),
     )
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Request, BackgroundTasks, Depends
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request, BackgroundTasks, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 from loguru import logger
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from jose import JWTError, jwt
 
-from database.db import Database
-from rag.indexer import Indexer
-from rag.retriever import Retriever
-from rag.reranker import Reranker
-from rag.generator import GeminiRAG
-from connectors.web_search import WebSearcher
-from connectors.file_upload import FileProcessor, validate_upload
+from database.db import CACHE_MISS, CACHE_HIT_EXACT, CACHE_HIT_SEMANTIC
+from connectors.file_upload import validate_upload
+from jobs.queue import JobQueue
+from jobs.spool import spool_bytes
 from models.schemas import (
     SearchRequest, HybridSearchRequest, ManualDocumentRequest,
     SaveWebResultRequest, IndexResponse, UploadResponse,
     StatsResponse, UserRegisterRequest, UserLoginRequest, TokenResponse,
     JobStatusResponse, UrlIndexRequest, BulkDeleteRequest,
 )
-from auth.auth import init_users_table, register_user, authenticate_user, create_access_token, revoke_token, SECRET_KEY, ALGORITHM
+from auth.auth import init_users_table, register_user, authenticate_user, create_access_token, arevoke_token, SECRET_KEY, ALGORITHM
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from cache.redis_cache import make_cache_key, get_cached, set_cached
+from cache.redis_cache import INDEX_VERSION, aget_versions, aping, make_cache_key
+from cache.semantic_cache import semantic_cache, semantic_scope
+from cache.tiered_cache import COMPUTED, answer_cache
 from rag.lang import detect_language
 from graphql_schema import graphql_router
-from routers import chat, history, analytics, collections
+from routers import chat, history, analytics, collections, ingest
 from middleware.request_id import RequestIDMiddleware
+from middleware.readiness import ReadinessGateMiddleware
+from services import STARTUP_WARMUP, get_services
 
 _bearer = HTTPBearer(auto_error=False)
 
@@ -89,7 +92,11 @@ def _rate_key(request: Request) -> str:
             pass
     return get_remote_address(request)
 
-limiter = Limiter(key_func=_rate_key, default_limits=["200/minute"])
+limiter = Limiter(
+    key_func=_rate_key,
+    default_limits=["200/minute"],
+    enabled=os.getenv("RATE_LIMIT_ENABLED", "true").lower() != "false",
+)
 
 # ── App ───────────────────────────────────────────────────────────────────────
 
@@ -113,23 +120,71 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ── Services ──────────────────────────────────────────────────────────────────
+
+# One container per process, shared with the routers, GraphQL and inline workers.
+# Models and clients load on first use or from the warm-up thread started below,
+# so importing this module (and binding the port) doesn't wait for them.
+services = get_services()
+db = services.db
+indexer = services.lazy("indexer")
+retriever = services.lazy("retriever")
+reranker = services.lazy("reranker")
+rag = services.lazy("rag")
+web_searcher = services.lazy("web_searcher")
+
+job_queue = JobQueue(db)
+
+init_users_table()
+logger.info("DevFlow API v2.2.0 started")
+
+app.add_middleware(ReadinessGateMiddleware, services=services)
+
 app.include_router(graphql_router, prefix="/graphql")
 app.include_router(chat.router)
 app.include_router(history.router)
 app.include_router(analytics.router)
 app.include_router(collections.router)
+app.include_router(ingest.router)
 
-# ── Services ──────────────────────────────────────────────────────────────────
+# Indexing runs in worker processes (python worker.py). INLINE_WORKERS > 0 also
+# runs worker threads in this process, for single-service deploys.
+INLINE_WORKERS = int(os.getenv("INLINE_WORKERS", "0"))
 
-db = Database()
-indexer = Indexer()
-retriever = Retriever()
-reranker = Reranker()
-rag = GeminiRAG()
-web_searcher = WebSearcher()
 
-init_users_table()
-logger.info("DevFlow API v2.2.0 started")
+@app.on_event("startup")
+async def _warm_services():
+    if STARTUP_WARMUP == "background":
+        services.start_warmup()
+    elif STARTUP_WARMUP == "eager":
+        await services.wait_ready(timeout=None)
+
+
+@app.on_event("startup")
+async def _start_inline_workers():
+    if INLINE_WORKERS > 0:
+        from jobs.tasks import Services
+        from jobs.worker import start_inline_workers
+        start_inline_workers(INLINE_WORKERS, Services(shared=services))
+        logger.info(f"Started {INLINE_WORKERS} inline index worker(s)")
+
+
+@app.on_event("shutdown")
+async def _close_redis():
+    from cache.redis_cache import aclose
+    await aclose()
+
+
+@app.on_event("shutdown")
+async def _close_extraction_pool():
+    from connectors.extraction import close_extraction_pool
+    close_extraction_pool()
+
+
+@app.on_event("shutdown")
+async def _close_http_clients():
+    from connectors.web_search import aclose_http_clients
+    await aclose_http_clients()
 
 # ── S3 helper (optional) ──────────────────────────────────────────────────────
 
@@ -146,65 +201,12 @@ async def _maybe_store_s3(filename: str, file_bytes: bytes) -> None:
     except Exception as e:
         logger.warning(f"S3 upload skipped (non-critical): {e}")
 
-# ── Background jobs ───────────────────────────────────────────────────────────
-
-def _index_file_task(job_id: str, filename: str, file_bytes: bytes):
-    try:
-        text_content, _ = FileProcessor.process_file(filename, file_bytes)
-        if not text_content or len(text_content.strip()) < 10:
-            db.update_job(job_id, "failed", error="Could not extract text")
-            return
-        source_id = db.add_source("file", filename, filename)
-        chunks, embeddings, metadatas, ids = indexer.prepare_documents(
-            [text_content], [filename], [filename], source_id, "file",
-        )
-        retriever.add_documents(chunks, embeddings, metadatas, ids)
-        db.update_source_status(source_id, "indexed")
-        db.add_document(indexer.generate_id(text_content), source_id, filename, filename)
-        db.update_job(job_id, "completed", chunks=len(chunks))
-        logger.info(f"Job {job_id}: indexed {filename} → {len(chunks)} chunks")
-    except Exception as e:
-        db.update_job(job_id, "failed", error=str(e))
-        logger.error(f"Job {job_id} failed: {e}")
-
-
-def _index_url_task(job_id: str, url: str, title: str, collection_id: int = None):
-    try:
-        result = web_searcher.scrape_url(url)
-        content = result.get("content", "")
-        page_title = title or result.get("title", url)
-
-        if not content or len(content.strip()) < 50:
-            db.update_job(job_id, "failed", error="Could not extract content from URL")
-            return
-
-        sample = " ".join(content.split()[:200])
-        if retriever.is_duplicate(sample):
-            db.update_job(job_id, "failed", error="Similar content already exists in your knowledge base")
-            return
-
-        source_id = db.add_source("web", url, page_title)
-        chunks, embeddings, metadatas, ids = indexer.prepare_documents(
-            [content], [page_title], [url], source_id, "web",
-        )
-        retriever.add_documents(chunks, embeddings, metadatas, ids)
-        db.update_source_status(source_id, "indexed")
-        db.add_document(indexer.generate_id(content), source_id, page_title, url)
-        if collection_id:
-            db.add_source_to_collection(source_id, collection_id)
-        db.update_job(job_id, "completed", chunks=len(chunks))
-        logger.info(f"Job {job_id}: indexed URL {url} → {len(chunks)} chunks")
-    except Exception as e:
-        db.update_job(job_id, "failed", error=str(e))
-        logger.error(f"Job {job_id} URL index failed: {e}")
-
-
 # ── Auth ──────────────────────────────────────────────────────────────────────
 
 @app.post("/api/auth/register", response_model=TokenResponse)
 @limiter.limit("5/minute")
 async def register(request: Request, data: UserRegisterRequest):
-    user = register_user(data.email, data.username, data.password)
+    user = await run_in_threadpool(register_user, data.email, data.username, data.password)
     token = create_access_token({"sub": str(user["id"]), "username": user["username"]})
     return TokenResponse(access_token=token, user_id=user["id"], username=user["username"])
 
@@ -212,7 +214,7 @@ async def register(request: Request, data: UserRegisterRequest):
 @app.post("/api/auth/login", response_model=TokenResponse)
 @limiter.limit("5/minute")
 async def login(request: Request, data: UserLoginRequest):
-    user = authenticate_user(data.email, data.password)
+    user = await run_in_threadpool(authenticate_user, data.email, data.password)  # password hashing is CPU-bound
     token = create_access_token({"sub": str(user["id"]), "username": user["username"]})
     return TokenResponse(access_token=token, user_id=user["id"], username=user["username"])
 
@@ -220,7 +222,7 @@ async def login(request: Request, data: UserLoginRequest):
 @app.post("/api/auth/logout")
 async def logout(credentials: HTTPAuthorizationCredentials = Depends(_bearer)):
     if credentials:
-        revoke_token(credentials.credentials)
+        await arevoke_token(credentials.credentials)
     return {"success": True}
 
 
@@ -231,23 +233,21 @@ async def health():
     checks: dict = {}
 
     try:
-        db.get_stats()
+        await run_in_threadpool(db.get_stats)
         checks["database"] = "ok"
     except Exception as e:
         checks["database"] = f"error: {type(e).__name__}"
 
-    from cache.redis_cache import get_redis
-    try:
-        r = get_redis()
-        checks["redis"] = "ok" if r else "unavailable"
-    except Exception:
-        checks["redis"] = "unavailable"
+    checks["redis"] = "ok" if await aping() else "unavailable"
 
-    try:
-        retriever.count()
-        checks["chromadb"] = "ok"
-    except Exception as e:
-        checks["chromadb"] = f"error: {type(e).__name__}"
+    if not services.components["retriever"].loaded:
+        checks["chromadb"] = "loading"  # liveness must not wait for warm-up; see /ready
+    else:
+        try:
+            await run_in_threadpool(retriever.count)
+            checks["chromadb"] = "ok"
+        except Exception as e:
+            checks["chromadb"] = f"error: {type(e).__name__}"
 
     is_healthy = checks["database"] == "ok"
     return JSONResponse(
@@ -256,75 +256,134 @@ async def health():
     )
 
 
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once the models are loaded and warmed, 503 while they're
+    still loading (liveness stays on /health). Includes per-component load times."""
+    status = services.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+
 @app.get("/")
 async def root():
-    return {"status": "running", "version": "2.2.0", "stats": db.get_stats()}
+    return {"status": "running", "version": "2.2.0", "stats": await run_in_threadpool(db.get_stats)}
 
 
 # ── Search ────────────────────────────────────────────────────────────────────
 
+async def _record_search(query: str, model: str, response: dict, source: str, computed: list):
+    """One search_history row per request, whichever tier answered it. `computed`
+    holds (results_count, cache kind) if this request ran the pipeline itself."""
+    if source != COMPUTED:
+        response["cached"] = True
+        computed = [(len(response.get("sources", [])), CACHE_HIT_EXACT)]
+    for results_count, kind in computed:
+        await run_in_threadpool(db.add_search, query, results_count, cached=kind, model=model)
+
+
 @app.post("/api/search")
 @limiter.limit("30/minute")
 async def search(request: Request, data: SearchRequest):
-    cache_key = make_cache_key("search", {"q": data.query, "n": data.n_results, "m": data.model, "lang": detect_language(data.query), "hyde": data.use_hyde, "rerank": data.rerank})
-    cached = get_cached(cache_key)
-    if cached:
-        cached["cached"] = True
-        return cached
-
-    results = retriever.search(data.query, data.n_results, use_hyde=data.use_hyde)
-    documents, metadatas = results["documents"] or [], results["metadatas"] or []
-
-    if documents and data.rerank:
-        documents, metadatas = reranker.rerank(data.query, documents, metadatas)
-
-    if not documents:
-        return {"answer": "No relevant documents found.", "sources": [], "query": data.query, "cached": False}
-
-    response = rag.generate_answer(query=data.query, context=documents, sources=metadatas, model=data.model)
-    response.update({"query": data.query, "cached": False})
-    db.add_search(data.query, len(documents), cached=False, model=data.model)
-    set_cached(cache_key, response)
-    logger.info(f"Search: '{data.query[:60]}' → {len(documents)} docs, model={data.model}")
+    params = {"n": data.n_results, "m": data.model, "lang": detect_language(data.query), "hyde": data.use_hyde,
+              "rerank": data.rerank, "ret": data.retrieval}
+    versions = await aget_versions(INDEX_VERSION)
+    cache_key = make_cache_key("search", {"q": data.query, **params}, versions)
+    scope = semantic_scope("search", params, versions)
+    computed = []
+
+    async def answer(extras):
+        retriever.seed_query_embedding(data.query, extras[0])
+        query_embedding = await retriever.aembed_query(data.query) if semantic_cache.enabled else None
+        hit = semantic_cache.get(scope, query_embedding)
+        if hit:
+            response, similarity = hit
+            response.update({"query": data.query, "cached": True})
+            computed.append((len(response.get("sources", [])), CACHE_HIT_SEMANTIC))
+            logger.info(f"Semantic cache hit: '{data.query[:60]}' (similarity={similarity:.3f})")
+            return response, False
+
+        results = await retriever.asearch(data.query, data.n_results, use_hyde=data.use_hyde, mode=data.retrieval)
+        documents, metadatas = results["documents"] or [], results["metadatas"] or []
+
+        if documents and data.rerank:
+            documents, metadatas = await reranker.arerank(
+                data.query, documents, metadatas, ids=results.get("ids"), distances=results.get("distances"),
+            )
+
+        if not documents:
+            return {"answer": "No relevant documents found.", "sources": [], "query": data.query, "cached": False}, False
+
+        response = await rag.agenerate_answer(query=data.query, context=documents, sources=metadatas, model=data.model)
+        response.update({"query": data.query, "cached": False})
+        computed.append((len(documents), CACHE_MISS))
+        semantic_cache.set(scope, query_embedding, response)
+        logger.info(f"Search: '{data.query[:60]}' → {len(documents)} docs, model={data.model}")
+        return response, True
+
+    # answer (in-process, then Redis together with the query embedding), else one shared computation
+    response, source = await answer_cache.get_or_compute(
+        cache_key, answer, ("array", retriever.query_cache_key(data.query)),
+    )
+    await _record_search(data.query, data.model, response, source, computed)
     return response
 
 
 @app.post("/api/search/hybrid")
 @limiter.limit("30/minute")
 async def hybrid_search(request: Request, data: HybridSearchRequest):
-    cache_key = make_cache_key("hybrid", {"q": data.query, "web": data.use_web, "m": data.model, "lang": detect_language(data.query), "hyde": data.use_hyde, "rerank": data.rerank})
-    cached = get_cached(cache_key)
-    if cached:
-        cached["cached"] = True
-        return cached
-
-    doc_results = retriever.search(data.query, data.n_results, use_hyde=data.use_hyde)
-    documents = doc_results["documents"] or []
-    metadatas = doc_results["metadatas"] or []
-
-    if documents and data.rerank:
-        documents, metadatas = reranker.rerank(data.query, documents, metadatas)
-
-    web_sources, web_results = [], []
-    if data.use_web and len(documents) < 2:
-        web_results = web_searcher.search_and_scrape(data.query, count=3)
-        web_sources = [r["content"] for r in web_results]
-
-    all_sources = documents + web_sources
-    if not all_sources:
-        return {"answer": "No relevant information found.", "doc_sources": [], "web_sources": [],
-                "query": data.query, "cached": False}
-
-    web_meta = [{"title": r["title"], "url": r["url"], "source": "web"} for r in web_results]
-    response = rag.generate_answer(
-        query=data.query, context=all_sources, sources=metadatas + web_meta, model=data.model,
+    params = {"web": data.use_web, "m": data.model, "lang": detect_language(data.query), "hyde": data.use_hyde,
+              "rerank": data.rerank, "ret": data.retrieval}
+    versions = await aget_versions(INDEX_VERSION)
+    cache_key = make_cache_key("hybrid", {"q": data.query, **params}, versions)
+    scope = semantic_scope("hybrid", {"n": data.n_results, **params}, versions)
+    computed = []
+
+    async def answer(extras):
+        retriever.seed_query_embedding(data.query, extras[0])
+        query_embedding = await retriever.aembed_query(data.query) if semantic_cache.enabled else None
+        hit = semantic_cache.get(scope, query_embedding)
+        if hit:
+            response, similarity = hit
+            response.update({"query": data.query, "cached": True})
+            computed.append((len(response.get("sources", [])), CACHE_HIT_SEMANTIC))
+            logger.info(f"Semantic cache hit (hybrid): '{data.query[:60]}' (similarity={similarity:.3f})")
+            return response, False
+
+        doc_results = await retriever.asearch(data.query, data.n_results, use_hyde=data.use_hyde, mode=data.retrieval)
+        documents = doc_results["documents"] or []
+        metadatas = doc_results["metadatas"] or []
+
+        if documents and data.rerank:
+            documents, metadatas = await reranker.arerank(
+                data.query, documents, metadatas, ids=doc_results.get("ids"), distances=doc_results.get("distances"),
+            )
+
+        web_sources, web_results = [], []
+        if data.use_web and len(documents) < 2:
+            web_results = await web_searcher.asearch_and_scrape(data.query, count=3)
+            web_sources = [r["content"] for r in web_results]
+
+        all_sources = documents + web_sources
+        if not all_sources:
+            return {"answer": "No relevant information found.", "doc_sources": [], "web_sources": [],
+                    "query": data.query, "cached": False}, False
+
+        web_meta = [{"title": r["title"], "url": r["url"], "source": "web"} for r in web_results]
+        response = await rag.agenerate_answer(
+            query=data.query, context=all_sources, sources=metadatas + web_meta, model=data.model,
+        )
+        response.update({
+            "doc_sources": metadatas, "web_sources": web_meta,
+            "web_results_full": web_results, "query": data.query, "cached": False,
+        })
+        computed.append((len(all_sources), CACHE_MISS))
+        semantic_cache.set(scope, query_embedding, response)
+        return response, True
+
+    response, source = await answer_cache.get_or_compute(
+        cache_key, answer, ("array", retriever.query_cache_key(data.query)),
     )
-    response.update({
-        "doc_sources": metadatas, "web_sources": web_meta,
-        "web_results_full": web_results, "query": data.query, "cached": False,
-    })
-    db.add_search(data.query, len(all_sources), cached=False, model=data.model)
-    set_cached(cache_key, response)
+    await _record_search(data.query, data.model, response, source, computed)
     return response
 
 
@@ -332,6 +391,11 @@ async def hybrid_search(request: Request, data: HybridSearchRequest):
 
 @app.post("/api/index/manual", response_model=IndexResponse)
 async def add_manual_document(data: ManualDocumentRequest):
+    source_id = await run_in_threadpool(_add_manual_document, data)
+    return IndexResponse(success=True, message="Document added", source_id=source_id)
+
+
+def _add_manual_document(data: ManualDocumentRequest) -> int:
     source_id = db.add_source("manual", None, data.title)
     chunks, embeddings, metadatas, ids = indexer.prepare_documents(
         [data.content], [data.title], [data.url or f"manual_{source_id}"], source_id, "manual",
@@ -340,41 +404,63 @@ async def add_manual_document(data: ManualDocumentRequest):
     db.update_source_status(source_id, "indexed")
     db.add_document(indexer.generate_id(data.content), source_id, data.title, data.url)
     if data.collection_id:
-        db.add_source_to_collection(source_id, data.collection_id)
-    return IndexResponse(success=True, message="Document added", source_id=source_id)
+        retriever.add_to_collection(source_id, data.collection_id)
+    return source_id
 
 
 @app.get("/api/sources")
 async def get_sources(collection_id: int = None, limit: int = 50, offset: int = 0):
-    return {"sources": db.get_sources(collection_id=collection_id, limit=limit, offset=offset)}
+    sources = await run_in_threadpool(db.get_sources, collection_id=collection_id, limit=limit, offset=offset)
+    return {"sources": sources}
+
+
+def _delete_sources(source_ids: List[int]):
+    for sid in source_ids:
+        retriever.delete_by_source(sid)
+        db.delete_source(sid)
 
 
 @app.delete("/api/sources/{source_id}")
 async def delete_source(source_id: int):
-    retriever.delete_by_source(source_id)
-    db.delete_source(source_id)
+    await run_in_threadpool(_delete_sources, [source_id])
     return {"success": True}
 
 
-@app.get("/api/stats", response_model=StatsResponse)
-async def get_stats():
+def _stats() -> dict:
     stats = db.get_stats()
-    stats["chromadb_count"] = retriever.count()
+    warm = services.get_if_warm("retriever")  # not gated: never waits on warm-up
+    stats["chromadb_count"] = warm.count() if warm else None
     return stats
 
 
+@app.get("/api/stats", response_model=StatsResponse)
+async def get_stats():
+    return await run_in_threadpool(_stats)
+
+
 @app.post("/api/upload", response_model=UploadResponse)
 @limiter.limit("10/minute")
-async def upload_file(request: Request, background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+async def upload_file(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    source_id: Optional[int] = Form(None),
+):
+    """Index an uploaded file as a new source, or re-sync the file source `source_id`."""
     file_bytes = await file.read()
     try:
         validate_upload(file.filename or "", file_bytes)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-
-    job_id = str(uuid.uuid4())
-    db.create_job(job_id, file.filename)
-    background_tasks.add_task(_index_file_task, job_id, file.filename, file_bytes)
+    if source_id is not None:
+        source = await run_in_threadpool(db.get_source, source_id)
+        if not source or source["type"] != "file":
+            raise HTTPException(status_code=404, detail="File source not found")
+
+    path = await run_in_threadpool(spool_bytes, file_bytes)
+    job_id = await run_in_threadpool(
+        job_queue.enqueue, "file", file.filename, filename=file.filename, path=path, source_id=source_id,
+    )
     background_tasks.add_task(_maybe_store_s3, file.filename, file_bytes)
     logger.info(f"Upload queued: {file.filename} → job {job_id}")
     return UploadResponse(success=True, message=f"Upload queued: {file.filename}", job_id=job_id)
@@ -382,68 +468,82 @@ async def upload_file(request: Request, background_tasks: BackgroundTasks, file:
 
 @app.get("/api/upload/status/{job_id}", response_model=JobStatusResponse)
 async def upload_status(job_id: str):
-    job = db.get_job(job_id)
+    job = await run_in_threadpool(db.get_job, job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
+    rate, total = job.get("rate"), job.get("total")
+    eta = None
+    if job["status"] == "indexing" and rate and total is not None:
+        eta = round(max(total - (job["chunks"] or 0), 0) / rate, 1)
     return JobStatusResponse(
         job_id=job_id, status=job["status"], filename=job["filename"],
-        chunks=job["chunks"], error=job.get("error"),
+        chunks=job["chunks"], error=job.get("error"), attempts=job.get("attempts") or 0,
+        total=total, chunks_per_sec=rate, eta_seconds=eta,
     )
 
 
 @app.post("/api/index/url", response_model=UploadResponse)
 @limiter.limit("10/minute")
-async def index_url(request: Request, data: UrlIndexRequest, background_tasks: BackgroundTasks):
-    job_id = str(uuid.uuid4())
-    db.create_job(job_id, data.url)
-    background_tasks.add_task(_index_url_task, job_id, data.url, data.title or "", data.collection_id)
+async def index_url(request: Request, data: UrlIndexRequest):
+    job_id = await run_in_threadpool(
+        job_queue.enqueue, "url", data.url, url=data.url, title=data.title or "", collection_id=data.collection_id,
+    )
     logger.info(f"URL index queued: {data.url} → job {job_id}")
     return UploadResponse(success=True, message=f"URL queued: {data.url}", job_id=job_id)
 
 
-def _reindex_all_task(job_id: str):
-    try:
-        migrated = retriever.migrate_from_v1()
-        db.update_job(job_id, "completed", chunks=migrated)
-        logger.info(f"Reindex-all job {job_id}: migrated {migrated} chunks")
-    except Exception as e:
-        db.update_job(job_id, "failed", error=str(e))
-        logger.error(f"Reindex-all job {job_id} failed: {e}")
-
-
 @app.post("/api/admin/reindex-all", response_model=UploadResponse)
-async def reindex_all(background_tasks: BackgroundTasks):
-    job_id = str(uuid.uuid4())
-    db.create_job(job_id, "reindex-all")
-    background_tasks.add_task(_reindex_all_task, job_id)
+async def reindex_all():
+    job_id = await run_in_threadpool(job_queue.enqueue, "reindex", "reindex-all")
     logger.info(f"Reindex-all queued → job {job_id}")
     return UploadResponse(success=True, message="Reindexing started", job_id=job_id)
 
 
+@app.post("/api/admin/rebuild-lexical", response_model=UploadResponse)
+async def rebuild_lexical():
+    job_id = await run_in_threadpool(job_queue.enqueue, "lexical", "rebuild-lexical")
+    logger.info(f"Lexical index rebuild queued → job {job_id}")
+    return UploadResponse(success=True, message="Lexical index rebuild started", job_id=job_id)
+
+
+@app.post("/api/admin/rebuild-collection-indexes", response_model=UploadResponse)
+async def rebuild_collection_indexes():
+    job_id = await run_in_threadpool(job_queue.enqueue, "collections", "rebuild-collection-indexes")
+    logger.info(f"Collection index rebuild queued → job {job_id}")
+    return UploadResponse(success=True, message="Collection index rebuild started", job_id=job_id)
+
+
 @app.post("/api/sources/bulk-delete")
 async def bulk_delete_sources(data: BulkDeleteRequest):
-    for sid in data.ids:
-        retriever.delete_by_source(sid)
-        db.delete_source(sid)
+    await run_in_threadpool(_delete_sources, data.ids)
     return {"success": True, "deleted": len(data.ids)}
 
 
 @app.get("/api/sources/{source_id}/chunks")
 async def get_source_chunks(source_id: int):
-    chunks = retriever.get_chunks_by_source(source_id)
+    chunks = await run_in_threadpool(retriever.get_chunks_by_source, source_id)
     return {"source_id": source_id, "chunks": chunks, "total": len(chunks)}
 
 
 @app.post("/api/save-web-result", response_model=IndexResponse)
 async def save_web_result(data: SaveWebResultRequest):
-    source_id = db.add_source("web", data.url, data.title)
+    source_id = await run_in_threadpool(_save_web_result, data)
+    return IndexResponse(success=True, message=f"Saved '{data.title}'", source_id=source_id)
+
+
+def _save_web_result(data: SaveWebResultRequest) -> int:
+    # Saving a page again re-syncs its source instead of adding a second copy
+    source_id = db.find_source("web", data.url)
+    stored = retriever.stored_chunks([source_id]) if source_id else {}
+    source_id = source_id or db.add_source("web", data.url, data.title)
     chunks, embeddings, metadatas, ids = indexer.prepare_documents(
-        [data.content], [data.title], [data.url], source_id, "web",
+        [data.content], [data.title], [data.url], source_id, "web", stored=stored,
     )
-    retriever.add_documents(chunks, embeddings, metadatas, ids)
+    retriever.sync_documents(chunks, embeddings, metadatas, ids, [source_id])
     db.update_source_status(source_id, "indexed")
+    db.clear_documents(source_id)
     db.add_document(indexer.generate_id(data.content), source_id, data.title, data.url)
-    return IndexResponse(success=True, message=f"Saved '{data.title}'", source_id=source_id)
+    return source_id
 
 
 if __name__ == "__main__":
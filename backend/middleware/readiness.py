@@ -0,0 +1,43 @@
+import json
+from loguru import logger
+
+# Routes served while models are still warming: probes, docs, and routes that
+# only touch the database. /api/stats and /api/analytics leave out the vector
+# count until the retriever is loaded. Under /api/collections only reads and
+# creating a collection are DB-only; deletes and membership changes update the
+# sub-indexes and wait like everything else.
+_EXEMPT_PATHS = {"/", "/health", "/ready", "/docs", "/redoc", "/openapi.json",
+                 "/api/sources", "/api/stats", "/api/analytics"}
+_EXEMPT_PREFIXES = ("/api/auth/", "/api/history", "/api/upload/status/")
+_EXEMPT_READ_PREFIXES = ("/api/collections",)
+_EXEMPT_ROUTES = {("POST", "/api/collections")}
+
+
+class ReadinessGateMiddleware:
+    """Holds requests that need the models until background warm-up finishes,
+    then lets them through; after READY_WAIT_TIMEOUT they get a 503 with
+    Retry-After instead. Pure ASGI so streaming responses pass through untouched."""
+
+    def __init__(self, app, services):
+        self.app = app
+        self.services = services
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.services.ready or self._exempt(scope["method"], scope["path"]):
+            return await self.app(scope, receive, send)
+        if not await self.services.wait_ready():
+            logger.warning(f"{scope['path']} rejected: models still loading")
+            body = json.dumps({"detail": "Service is starting, models are still loading"}).encode()
+            await send({"type": "http.response.start", "status": 503, "headers": [
+                (b"content-type", b"application/json"), (b"retry-after", b"5"),
+                (b"content-length", str(len(body)).encode()),
+            ]})
+            await send({"type": "http.response.body", "body": body})
+            return
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    def _exempt(method: str, path: str) -> bool:
+        return (path in _EXEMPT_PATHS or path.startswith(_EXEMPT_PREFIXES)
+                or (method in ("GET", "HEAD") and path.startswith(_EXEMPT_READ_PREFIXES))
+                or (method, path.rstrip("/")) in _EXEMPT_ROUTES)
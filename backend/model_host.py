@@ -0,0 +1,21 @@
+"""
+DevFlow model host — loads the e5 embedder and the cross-encoder once and serves
+them over a unix socket to every API worker and indexing worker on the machine
+started with the same MODEL_HOST_SOCKET, so the weights exist in one process
+however many workers run.
+
+    python model_host.py --socket /tmp/devflow-models.sock
+    MODEL_HOST_SOCKET=/tmp/devflow-models.sock uvicorn main:app --workers 4
+"""
+import argparse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from rag.model_host import MODEL_HOST_SOCKET, serve  # noqa: E402
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default=MODEL_HOST_SOCKET or "/tmp/devflow-models.sock")
+    args = parser.parse_args()
+    serve(args.socket)
@@ -2,6 +2,8 @@ from pydantic import BaseModel, Field
 from typing import Optional, Literal, List
 
 SUPPORTED_MODELS = Literal["gemini-flash", "gemini-pro", "claude-haiku", "gpt-4o-mini"]
+# dense: embeddings only; hybrid: embeddings + keyword index, fused by rank
+RETRIEVAL_MODES = Literal["dense", "hybrid"]
 
 
 class SearchRequest(BaseModel):
@@ -10,6 +12,7 @@ class SearchRequest(BaseModel):
     model: SUPPORTED_MODELS = "gemini-flash"
     rerank: bool = True
     use_hyde: bool = False
+    retrieval: RETRIEVAL_MODES = "dense"
 
 
 class HybridSearchRequest(BaseModel):
@@ -19,6 +22,7 @@ class HybridSearchRequest(BaseModel):
     model: SUPPORTED_MODELS = "gemini-flash"
     rerank: bool = True
     use_hyde: bool = False
+    retrieval: RETRIEVAL_MODES = "dense"
 
 
 class ChatStreamRequest(BaseModel):
@@ -27,6 +31,7 @@ class ChatStreamRequest(BaseModel):
     model: SUPPORTED_MODELS = "gemini-flash"
     use_web: bool = False
     use_hyde: bool = False
+    retrieval: RETRIEVAL_MODES = "dense"
     collection_id: Optional[int] = None
 
 
@@ -71,13 +76,17 @@ class JobStatusResponse(BaseModel):
     filename: str
     chunks: int
     error: Optional[str] = None
+    attempts: int = 0
+    total: Optional[int] = None
+    chunks_per_sec: Optional[float] = None
+    eta_seconds: Optional[float] = None
 
 
 class StatsResponse(BaseModel):
     sources: int
     documents: int
     searches: int
-    chromadb_count: int
+    chromadb_count: Optional[int] = None  # None while the models are still warming
 
 
 class UserRegisterRequest(BaseModel):
@@ -0,0 +1,130 @@
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+
+# Recent per-request queue waits kept for the wait-time percentiles in stats()
+_WAIT_SAMPLES = 1024
+
+
+def _percentile_ms(ordered: List[float], p: float) -> float:
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000, 2) if ordered else 0.0
+
+
+class _Request:
+    __slots__ = ("items", "future", "submitted")
+
+    def __init__(self, items: List[Any]):
+        self.items = items
+        self.future: Future = Future()
+        self.submitted = time.perf_counter()
+
+
+class MicroBatcher:
+    """Coalesces concurrent submit() calls into batched calls of `fn` on one worker thread.
+
+    The worker takes the first waiting request plus anything already queued. If
+    other requests are arriving it keeps collecting for up to `max_wait_ms` or
+    until `max_batch` items are queued; a lone request runs immediately, so
+    there's no added latency at low load. `fn` runs once over all items and the
+    results are fanned back out to each request's future.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[List[Any]], Sequence[Any]],
+        max_batch: int = 64,
+        max_wait_ms: float = 5.0,
+        name: str = "batcher",
+    ):
+        self.fn = fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        self._carry: Optional[_Request] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._sizes: Dict[int, int] = {}  # power-of-two upper bound → batches
+        self._waits: "deque[float]" = deque(maxlen=_WAIT_SAMPLES)
+
+    def submit(self, items: List[Any]) -> Future:
+        """Queue items for the next batch. The future resolves to a list of results, one per item."""
+        req = _Request(list(items))
+        if not req.items:
+            req.future.set_result([])
+            return req.future
+        self._ensure_worker()
+        self._queue.put(req)
+        return req.future
+
+    def stats(self) -> Dict:
+        waits = sorted(self._waits)
+        return {
+            "batches": self._batches,
+            "items": self._items,
+            "mean_batch_size": round(self._items / self._batches, 2) if self._batches else 0.0,
+            "batch_size_histogram": {f"<={k}": v for k, v in sorted(self._sizes.items())},
+            "queue_depth": self._queue.qsize() + (self._carry is not None),
+            "wait_ms_p50": _percentile_ms(waits, 0.5),
+            "wait_ms_p95": _percentile_ms(waits, 0.95),
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+    def _ensure_worker(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _next_batch(self) -> List[_Request]:
+        first, self._carry = self._carry or self._queue.get(), None
+        batch, size = [first], len(first.items)
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch:
+            try:
+                req = self._queue.get_nowait()
+            except queue.Empty:
+                timeout = deadline - time.perf_counter()
+                if len(batch) == 1 or timeout <= 0:
+                    break
+                try:
+                    req = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+            if size + len(req.items) > self.max_batch:
+                self._carry = req  # keep it whole for the next batch
+                break
+            batch.append(req)
+            size += len(req.items)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            started = time.perf_counter()
+            self._waits.extend(started - req.submitted for req in batch)
+            items = [item for req in batch for item in req.items]
+            try:
+                results = self.fn(items)
+            except Exception as e:
+                for req in batch:
+                    req.future.set_exception(e)
+                continue
+
+            self._batches += 1
+            self._items += len(items)
+            bucket = 1 << (len(items) - 1).bit_length()
+            self._sizes[bucket] = self._sizes.get(bucket, 0) + 1
+            offset = 0
+            for req in batch:
+                req.future.set_result(results[offset:offset + len(req.items)])
+                offset += len(req.items)
@@ -0,0 +1,218 @@
+import os
+import re
+import threading
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+import numpy as np
+
+# Chunks are bounded by embedder tokens, not words: e5 reads at most 512 tokens
+# (prefix and special tokens included) and silently drops the rest.
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "400"))
+# Tokens shared by consecutive windows of a block too long for one chunk
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "48"))
+# Text is tokenized this many characters (whole blocks) at a time, which bounds
+# the memory one huge page or plain-text file takes
+CHUNK_SEGMENT_CHARS = 100_000
+
+# Extracted text marks page boundaries with a form feed (see FileProcessor)
+PAGE_BREAK = "\f"
+PASSAGE_PREFIX = "passage: "
+
+_HEADING = re.compile(r"[ ]{0,3}(#{1,6})[ \t]+(.*?)[ \t#]*$")
+_FENCE = re.compile(r"[ ]{0,3}(```|~~~)")
+_LINE = re.compile(r"[^\n]*\n?")
+
+
+class Chunk(NamedTuple):
+    text: str
+    page: int       # 1-based page the chunk is on; 0 when the text has no pages
+    section: str    # nearest markdown heading above the chunk, "" if none
+    start: int      # character offsets of the chunk in the whole text
+    end: int
+    tokens: int
+
+
+class _Block(NamedTuple):
+    kind: str       # "heading", "code" or "text"
+    start: int      # offsets in the page
+    end: int
+
+
+_tokenizers: Dict[str, object] = {}
+_tokenizers_lock = threading.Lock()
+
+
+def get_tokenizer(model_name: str):
+    """The model's fast (Rust) tokenizer, loaded once per process. Needs only the
+    tokenizer files, so it works with the ONNX backend and the model host too."""
+    if model_name not in _tokenizers:
+        with _tokenizers_lock:
+            if model_name not in _tokenizers:
+                from transformers import AutoTokenizer
+                _tokenizers[model_name] = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+    return _tokenizers[model_name]
+
+
+class Chunker:
+    """Structure-aware chunker bounded by the embedder's token count.
+
+    Text is split into blocks — markdown headings, fenced code blocks and
+    blank-line-separated paragraphs — and consecutive blocks are packed into a
+    chunk while they fit in max_tokens. A heading always starts a new chunk
+    (and names the section of the chunks after it), a page break always ends
+    one, and a code block is never split unless it alone is over the limit.
+    A block over the limit is cut into token windows that overlap by
+    overlap tokens, at line breaks in code and word boundaries elsewhere.
+
+    iter_chunks is a generator: pages (or CHUNK_SEGMENT_CHARS of an unpaged
+    text) are tokenized one at a time, in one tokenizer call each, and chunk
+    texts are slices of the input rather than re-joined words.
+    """
+
+    def __init__(self, tokenizer, max_tokens: int = CHUNK_MAX_TOKENS, overlap: int = CHUNK_OVERLAP_TOKENS):
+        self.tokenizer = tokenizer
+        # the passage prefix and [CLS]/[SEP] come out of the model's budget
+        budget = tokenizer.model_max_length - len(self._offsets(PASSAGE_PREFIX)) - 2
+        self.max_tokens = max(16, min(max_tokens, budget))
+        self.overlap = max(0, min(overlap, self.max_tokens // 2))
+
+    def _offsets(self, text: str) -> List[Tuple[int, int]]:
+        return self.tokenizer.backend_tokenizer.encode(text, add_special_tokens=False).offsets
+
+    def iter_chunks(self, text: Union[str, Iterable[str]]) -> Iterator[Chunk]:
+        """Chunks of a text (pages separated by PAGE_BREAK) or of a stream of page texts."""
+        if isinstance(text, str):
+            paged = PAGE_BREAK in text
+            pages = self._split_pages(text)
+        else:
+            paged, pages = True, iter(text)
+        base, section = 0, ""
+        for number, page in enumerate(pages, 1):
+            for chunk in self._page_chunks(page, number if paged else 0, base, section):
+                section = chunk.section
+                yield chunk
+            base += len(page) + len(PAGE_BREAK)
+
+    @staticmethod
+    def _split_pages(text: str) -> Iterator[str]:
+        start = 0
+        while (end := text.find(PAGE_BREAK, start)) != -1:
+            yield text[start:end]
+            start = end + len(PAGE_BREAK)
+        yield text[start:]
+
+    # ── Blocks ───────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _blocks(page: str) -> Iterator[_Block]:
+        para: Optional[int] = None      # start of the open paragraph
+        para_end = 0
+        fence: Optional[Tuple[str, int]] = None  # (marker, start) of the open code block
+        for match in _LINE.finditer(page):
+            line_start, line_end = match.span()
+            if line_start == line_end:
+                break
+            line = match.group().rstrip("\n")
+            if fence is not None:
+                if line.lstrip().startswith(fence[0]):
+                    yield _Block("code", fence[1], line_end)
+                    fence = None
+                continue
+            opener = _FENCE.match(line)
+            heading = None if opener else _HEADING.match(line)
+            if opener or heading or not line.strip():
+                if para is not None:
+                    yield _Block("text", para, para_end)
+                    para = None
+                if opener:
+                    fence = (opener.group(1), line_start)
+                elif heading:
+                    yield _Block("heading", line_start, line_end)
+                continue
+            if para is None:
+                para = line_start
+            para_end = line_end
+        if fence is not None:
+            yield _Block("code", fence[1], len(page))   # unclosed fence runs to the end
+        elif para is not None:
+            yield _Block("text", para, para_end)
+
+    def _segments(self, page: str) -> Iterator[Tuple[List[_Block], np.ndarray, np.ndarray]]:
+        """Runs of whole blocks with the token start/end offsets (in the page) of their text."""
+        blocks: List[_Block] = []
+        for block in self._blocks(page):
+            if blocks and block.end - blocks[0].start > CHUNK_SEGMENT_CHARS:
+                yield self._tokenize(page, blocks)
+                blocks = []
+            blocks.append(block)
+        if blocks:
+            yield self._tokenize(page, blocks)
+
+    def _tokenize(self, page: str, blocks: List[_Block]):
+        start = blocks[0].start
+        offsets = self._offsets(page[start:blocks[-1].end])
+        offsets = np.fromiter(chain.from_iterable(offsets), dtype=np.int64, count=2 * len(offsets)).reshape(-1, 2) + start
+        return blocks, offsets[:, 0], offsets[:, 1]
+
+    # ── Packing ──────────────────────────────────────────────────────────────
+
+    def _page_chunks(self, page: str, number: int, base: int, section: str) -> Iterator[Chunk]:
+        first = last = None             # page offsets of the chunk being built
+        tokens = 0
+        has_body = False
+
+        def emit():
+            text = page[first:last]
+            lead = len(text) - len(text.lstrip())
+            text = text.strip()
+            return Chunk(text, number, section, base + first + lead, base + first + lead + len(text), tokens)
+
+        for blocks, starts, ends in self._segments(page):
+            for block in blocks:
+                lo, hi = np.searchsorted(starts, block.start), np.searchsorted(starts, block.end)
+                n = int(hi - lo)
+                if n == 0:
+                    continue
+                if block.kind == "heading" and has_body:
+                    yield emit()
+                    first = None
+                if block.kind == "heading":
+                    section = _HEADING.match(page[block.start:block.end].rstrip("\n")).group(2).strip()
+                elif first is not None and tokens + n > self.max_tokens:
+                    yield emit()
+                    first = None
+                if n > self.max_tokens:
+                    if first is not None:     # headings waiting for a body
+                        yield emit()
+                    for lo_w, hi_w in self._windows(page, block, starts, ends, int(lo), int(hi)):
+                        first, last, tokens = int(starts[lo_w]), int(ends[hi_w - 1]), hi_w - lo_w
+                        yield emit()
+                    first, has_body = None, False
+                    continue
+                if first is None:
+                    first, tokens, has_body = block.start, 0, False
+                last = block.end
+                tokens += n
+                has_body = has_body or block.kind != "heading"
+        if first is not None:
+            yield emit()
+
+    def _windows(self, page: str, block: _Block, starts: np.ndarray, ends: np.ndarray,
+                 lo: int, hi: int) -> Iterator[Tuple[int, int]]:
+        """Token ranges [a, b) of at most max_tokens covering tokens lo..hi, cut at
+        the last line break (code) or word boundary in the window when there is one."""
+        a = lo
+        while a < hi:
+            b = min(a + self.max_tokens, hi)
+            if b < hi:
+                floor = a + self.max_tokens // 2
+                for cut in range(b, floor, -1):
+                    gap = page[int(ends[cut - 1]):int(starts[cut])]
+                    boundary = "\n" in gap if block.kind == "code" else bool(gap)
+                    if boundary:
+                        b = cut
+                        break
+            yield a, b
+            if b >= hi:
+                break
+            a = max(b - self.overlap, a + 1)
@@ -0,0 +1,181 @@
+import os
+import re
+import json
+import fcntl
+import hashlib
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from loguru import logger
+
+# Content-addressed passage embeddings on local disk: key = sha256(model name +
+# exact encoder input, i.e. including the "passage: " prefix). Re-ingesting a
+# file, the same text under another source, or rebuilding a collection with the
+# same model reads vectors back instead of running the model.
+#
+# Layout per model directory:
+#   vectors.bin — rows of `dim` float32/float16 values, read through np.memmap
+#   index.bin   — append-only (16-byte key, uint32 row) records
+# Writers append vectors first and index records second under an flock, so a
+# crash leaves at worst unreferenced rows; readers in other processes pick up
+# new records when index.bin grows.
+EMBED_STORE_ENABLED = os.getenv("EMBED_STORE_ENABLED", "true").lower() != "false"
+EMBED_STORE_DIR = os.getenv("EMBED_STORE_DIR", "./embedding_store")
+EMBED_STORE_DTYPE = os.getenv("EMBED_STORE_DTYPE", "float32")
+EMBED_STORE_MAX_ROWS = int(os.getenv("EMBED_STORE_MAX_ROWS", "1000000"))
+
+_RECORD = np.dtype([("key", "S16"), ("row", "<u4")])
+
+
+class EmbeddingStore:
+    """Persistent (text → embedding) map for one model, shared by every process on the host."""
+
+    def __init__(
+        self,
+        path: str,
+        model_name: str,
+        dim: int,
+        dtype: str = EMBED_STORE_DTYPE,
+        max_rows: int = EMBED_STORE_MAX_ROWS,
+    ):
+        self.model_name = model_name
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.max_rows = max_rows
+        self.dir = os.path.join(path, re.sub(r"[^A-Za-z0-9_.-]+", "__", model_name))
+        self._vectors_path = os.path.join(self.dir, "vectors.bin")
+        self._index_path = os.path.join(self.dir, "index.bin")
+        self._row_bytes = dim * self.dtype.itemsize
+        self._index: Dict[bytes, int] = {}
+        self._index_bytes = 0
+        self._mmap: Optional[np.memmap] = None
+        self._lock = threading.Lock()
+        self._full_logged = False
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(self.dir, exist_ok=True)
+        meta_path = os.path.join(self.dir, "meta.json")
+        meta = {"model": model_name, "dim": dim, "dtype": self.dtype.name}
+        with open(os.path.join(self.dir, ".lock"), "a+") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                with open(meta_path) as f:
+                    stale = json.load(f) != meta
+            except (OSError, ValueError):
+                stale = True
+            if stale:
+                # new store, or one written with another dim/dtype: start over
+                for p in (self._vectors_path, self._index_path):
+                    open(p, "wb").close()
+                with open(meta_path, "w") as f:
+                    json.dump(meta, f)
+        self._refresh()
+
+    def key(self, text: str) -> bytes:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode()).digest()[:16]
+
+    def _refresh(self):
+        """Load index records appended since the last look (by this or another process)."""
+        size = os.path.getsize(self._index_path)
+        size -= size % _RECORD.itemsize  # ignore a torn record from a crashed writer
+        if size <= self._index_bytes:
+            return
+        with open(self._index_path, "rb") as f:
+            f.seek(self._index_bytes)
+            records = np.frombuffer(f.read(size - self._index_bytes), dtype=_RECORD)
+        self._index.update(zip(records["key"].tolist(), records["row"].tolist()))
+        self._index_bytes = size
+
+    def _vectors(self, rows: np.ndarray) -> np.ndarray:
+        needed = int(rows.max()) + 1
+        if self._mmap is None or len(self._mmap) < needed:
+            total = os.path.getsize(self._vectors_path) // self._row_bytes
+            self._mmap = np.memmap(self._vectors_path, dtype=self.dtype, mode="r", shape=(total, self.dim))
+        return np.asarray(self._mmap[rows], dtype=np.float32)
+
+    def get_many(self, texts: List[str]) -> Tuple[np.ndarray, List[int]]:
+        """(len(texts), dim) float32 array with the stored rows filled in, plus the
+        indices of texts that were not found (their rows are left as zeros)."""
+        keys = [self.key(t) for t in texts]
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        with self._lock:
+            self._refresh()
+            rows = [self._index.get(k) for k in keys]
+            found = [i for i, r in enumerate(rows) if r is not None]
+            if found:
+                out[found] = self._vectors(np.array([rows[i] for i in found]))
+        missing = [i for i, r in enumerate(rows) if r is None]
+        self.hits += len(found)
+        self.misses += len(missing)
+        return out, missing
+
+    def put_many(self, texts: List[str], embeddings: np.ndarray):
+        embeddings = np.asarray(embeddings, dtype=self.dtype).reshape(len(texts), self.dim)
+        with self._lock, open(os.path.join(self.dir, ".lock"), "a+") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self._refresh()
+            new = {}
+            for text, vector in zip(texts, embeddings):
+                k = self.key(text)
+                if k not in self._index and k not in new:
+                    new[k] = vector
+            if not new:
+                return
+            with open(self._vectors_path, "r+b") as vf, open(self._index_path, "r+b") as xf:
+                start = os.fstat(vf.fileno()).st_size // self._row_bytes
+                room = self.max_rows - start
+                if room < len(new):
+                    if not self._full_logged:
+                        logger.warning(f"Embedding store {self.dir} is full ({self.max_rows} rows); not caching new passages")
+                        self._full_logged = True
+                    new = dict(list(new.items())[:max(0, room)])
+                    if not new:
+                        return
+                vf.seek(start * self._row_bytes)
+                vf.write(np.stack(list(new.values())).tobytes())
+                vf.flush()
+                os.fsync(vf.fileno())
+                records = np.empty(len(new), dtype=_RECORD)
+                records["key"] = list(new.keys())
+                records["row"] = np.arange(start, start + len(new))
+                xf.truncate(self._index_bytes)  # drop a torn tail before appending
+                xf.seek(self._index_bytes)
+                xf.write(records.tobytes())
+                xf.flush()
+            self._refresh()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "rows": len(self._index),
+            "max_rows": self.max_rows,
+            "dtype": self.dtype.name,
+            "bytes": len(self._index) * self._row_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups * 100, 1) if lookups else 0.0,
+        }
+
+
+_store: Optional[EmbeddingStore] = None
+_store_failed = False
+_store_lock = threading.Lock()
+
+
+def get_embedding_store(model_name: str, dim: int) -> Optional[EmbeddingStore]:
+    """Process-wide store for the embedding model, or None when disabled/unavailable."""
+    global _store, _store_failed
+    if not EMBED_STORE_ENABLED or _store_failed:
+        return None
+    with _store_lock:
+        if _store is None:
+            try:
+                _store = EmbeddingStore(EMBED_STORE_DIR, model_name, dim)
+            except OSError as e:
+                logger.warning(f"Embedding store disabled: {e}")
+                _store_failed = True
+        return _store
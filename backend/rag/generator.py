@@ -83,20 +83,44 @@ class GeminiRAG:
         if not context:
             return {"answer": "No relevant documents found.", "sources": [], "model": model}
 
-        llm = _get_llm(model) if model != "gemini-flash" else self.default_llm
-        chain = RAG_PROMPT | llm | StrOutputParser()
+        try:
+            answer = self._chain(model).invoke(self._inputs(query, context, sources, history))
+        except Exception as e:
+            answer = f"Generation error: {str(e)}"
+
+        return {"answer": answer, "sources": sources[:5], "model": model}
+
+    async def agenerate_answer(
+        self,
+        query: str,
+        context: List[str],
+        sources: List[Dict],
+        history: List[Dict] = None,
+        model: str = "gemini-flash",
+    ) -> Dict:
+        if not context:
+            return {"answer": "No relevant documents found.", "sources": [], "model": model}
 
         try:
-            answer = chain.invoke({
-                "context": _format_context(context, sources),
-                "question": query,
-                "history": _format_history(history or []),
-            })
+            answer = await self._chain(model).ainvoke(self._inputs(query, context, sources, history))
         except Exception as e:
             answer = f"Generation error: {str(e)}"
 
         return {"answer": answer, "sources": sources[:5], "model": model}
 
+    def _chain(self, model: str):
+        if model == "gemini-flash":
+            return self.chain
+        return RAG_PROMPT | _get_llm(model) | StrOutputParser()
+
+    @staticmethod
+    def _inputs(query: str, context: List[str], sources: List[Dict], history: List[Dict] = None) -> Dict:
+        return {
+            "context": _format_context(context, sources),
+            "question": query,
+            "history": _format_history(history or []),
+        }
+
     async def astream_answer(
         self,
         query: str,
@@ -1,80 +1,237 @@
-from typing import List, Dict, Tuple
+import os
+import asyncio
+from typing import Iterable, List, Dict, Optional, Tuple, Union
 import hashlib
-from sentence_transformers import SentenceTransformer
+import numpy as np
+from concurrent.futures import Future, ThreadPoolExecutor
+from rag.batching import MicroBatcher
+from rag.chunking import PAGE_BREAK, Chunk, Chunker, get_tokenizer
+from rag.embedding_store import get_embedding_store
 from rag.lang import detect_language
+from rag.model_host import MODEL_HOST_SOCKET, RemoteEmbedder, get_client
+from rag.onnx_backend import INFERENCE_BACKEND, OnnxEncoder, model_variant
 
-_model: SentenceTransformer = None
+# Dynamic micro-batching: concurrent encode() calls (queries from searches, small
+# passage lists from ingestion) are collected for up to EMBED_MAX_WAIT_MS and run
+# as one padded forward pass. EMBED_MAX_BATCH=1 disables coalescing.
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "64"))
+EMBED_MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", "5"))
 
+# Passages per forward pass when indexing (length-sorted, see generate_embeddings)
+INDEX_ENCODE_BATCH = int(os.getenv("INDEX_ENCODE_BATCH", "64"))
 
-def get_embedding_model() -> SentenceTransformer:
+# multilingual-e5-base: 94 languages, 768-dim
+# Requires "query: " prefix for queries, "passage: " prefix for documents
+EMBEDDING_MODEL_NAME = "intfloat/multilingual-e5-base"
+
+
+class BatchedEmbedder:
+    """SentenceTransformer facade that routes small encode() calls through a MicroBatcher.
+    Calls with at least max_batch texts (bulk indexing) go straight to the model."""
+
+    def __init__(self, model: Union["SentenceTransformer", OnnxEncoder], max_batch: int = EMBED_MAX_BATCH, max_wait_ms: float = EMBED_MAX_WAIT_MS):
+        self.model = model
+        self.batcher = MicroBatcher(self._encode_batch, max_batch, max_wait_ms, name="embedder")
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        # One forward pass over the whole coalesced batch
+        return self.model.encode(texts, batch_size=len(texts), show_progress_bar=False, convert_to_numpy=True)
+
+    def submit(self, texts: List[str]) -> Future:
+        return self.batcher.submit(texts)
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if kwargs or len(texts) >= self.batcher.max_batch:
+            return self.model.encode(sentences, batch_size=batch_size, show_progress_bar=show_progress_bar, **kwargs)
+        embeddings = np.stack(self.submit(texts).result())
+        return embeddings[0] if single else embeddings
+
+    async def aencode(self, texts: List[str]) -> np.ndarray:
+        """Await a batched encode from the event loop without holding a thread."""
+        return np.stack(await asyncio.wrap_future(self.submit(texts)))
+
+    def stats(self) -> Dict:
+        return self.batcher.stats()
+
+    def __getattr__(self, name):
+        # tokenizer, max_seq_length, get_sentence_embedding_dimension, ...
+        return getattr(self.model, name)
+
+
+_model: Union[BatchedEmbedder, RemoteEmbedder] = None
+
+
+def load_embedding_model() -> BatchedEmbedder:
+    """Load the embedder into this process (torch is imported only here)."""
+    if INFERENCE_BACKEND == "onnx":
+        return BatchedEmbedder(OnnxEncoder(EMBEDDING_MODEL_NAME))
+    from sentence_transformers import SentenceTransformer
+    return BatchedEmbedder(SentenceTransformer(EMBEDDING_MODEL_NAME))
+
+
+def get_embedding_model() -> Union[BatchedEmbedder, RemoteEmbedder]:
+    """The process's embedder: a client for the model host when MODEL_HOST_SOCKET
+    is set, otherwise a local copy."""
     global _model
     if _model is None:
-        # multilingual-e5-base: 94 languages, 768-dim
-        # Requires "query: " prefix for queries, "passage: " prefix for documents
-        _model = SentenceTransformer("intfloat/multilingual-e5-base")
+        _model = RemoteEmbedder(get_client()) if MODEL_HOST_SOCKET else load_embedding_model()
     return _model
 
 
 class Indexer:
     def __init__(self):
         self.model = get_embedding_model()
+        self.encode_batch = INDEX_ENCODE_BATCH
+        self.store = get_embedding_store(model_variant(EMBEDDING_MODEL_NAME), self.model.get_sentence_embedding_dimension())
+        self.chunker = Chunker(get_tokenizer(EMBEDDING_MODEL_NAME))
 
-    def chunk_text(self, text: str, chunk_size: int = 400, overlap: int = 50) -> List[str]:
-        words = text.split()
-        chunks = []
-        i = 0
-        while i < len(words):
-            chunk = " ".join(words[i:i + chunk_size])
-            if chunk:
-                chunks.append(chunk)
-            i += chunk_size - overlap
-        return chunks
-
-    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
-        embeddings = self.model.encode(texts, batch_size=32, show_progress_bar=False)
-        return embeddings.tolist()
+    def chunk_text(self, text: str) -> List[str]:
+        return [chunk.text for chunk in self.chunker.iter_chunks(text)]
+
+    def chunk_document(self, text: Union[str, Iterable[str]]) -> Tuple[str, List[Chunk]]:
+        """The chunks of a text or of a stream of page texts (FileProcessor.read_file)
+        and the whole text. A stream is chunked page by page as it arrives, so a
+        PDF is chunked while the extraction pool is still reading later pages."""
+        if isinstance(text, str):
+            return text, list(self.chunker.iter_chunks(text))
+        pages: List[str] = []
+
+        def collected():
+            for page in text:
+                pages.append(page)
+                yield page
+
+        chunks = list(self.chunker.iter_chunks(collected()))
+        return PAGE_BREAK.join(pages), chunks
+
+    def generate_embeddings(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """Encode passages as a (len(texts), dim) float32 array.
+
+        Texts already in the embedding store are read back; only the rest go
+        through the model, and their vectors are added to the store.
+        """
+        if self.store is None or not texts:
+            return self._encode(texts, batch_size)
+        embeddings, missing = self.store.get_many(texts)
+        if missing:
+            encoded = self._encode([texts[i] for i in missing], batch_size)
+            embeddings[missing] = encoded
+            self.store.put_many([texts[i] for i in missing], encoded)
+        return embeddings
+
+    def _encode(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        # Texts are sorted by length and encoded in fixed-size batches so each
+        # forward pass pads to similar lengths, then scattered back to input order.
+        batch_size = batch_size or self.encode_batch
+        if not texts:
+            return np.empty((0, self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+        if len(texts) < batch_size:
+            return np.asarray(self.model.encode(texts), dtype=np.float32).reshape(len(texts), -1)
+
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        embeddings = np.empty((len(texts), self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            idx = order[start:start + batch_size]
+            embeddings[idx] = self.model.encode(
+                [texts[i] for i in idx], batch_size=len(idx), show_progress_bar=False, convert_to_numpy=True,
+            )
+        return embeddings
 
     def generate_id(self, text: str, prefix: str = "doc") -> str:
         return f"{prefix}_{hashlib.md5(text.encode()).hexdigest()[:16]}"
 
+    @staticmethod
+    def chunk_hash(chunk: str) -> str:
+        return hashlib.sha256(chunk.encode()).hexdigest()[:32]
+
     def prepare_documents(
         self,
         texts: List[str],
         titles: List[str],
         urls: List[str],
-        source_id: int,
+        source_id: Union[int, List[int]],
         source_type: str,
-    ) -> Tuple[List[str], List[List[float]], List[Dict], List[str]]:
-        all_chunks: List[str] = []
-        all_embeddings: List[List[float]] = []
-        all_metadatas: List[Dict] = []
-        all_ids: List[str] = []
-
-        for text, title, url in zip(texts, titles, urls):
-            chunks = self.chunk_text(text)
-            if not chunks:
-                continue
+        stored: Optional[Dict[int, Dict[str, List[str]]]] = None,
+        chunks: Optional[List[List[Chunk]]] = None,
+    ) -> Tuple[List[str], np.ndarray, List[Dict], List[str]]:
+        # Chunk every document first, then encode all passages as one stream so a
+        # bulk import of many short documents costs a few full batches, not one
+        # small model call per document. source_id may be one id for all texts or
+        # one per text.
+        #
+        # Chunk ids are derived from source id + content hash, so an unchanged
+        # chunk keeps its id across re-ingests. stored ({source_id: {content_hash:
+        # [chunk ids]}}, see Retriever.stored_chunks) lists what is already in the
+        # vector store: those chunks reuse their id and are not re-encoded — their
+        # embedding rows are NaN and Retriever.sync_documents never writes them.
+        #
+        # chunks, if given, holds each text's chunks as already cut by
+        # chunk_document, so streamed files are not chunked a second time.
+        source_ids = [source_id] * len(texts) if isinstance(source_id, int) else source_id
+        stored = {sid: {h: list(ids) for h, ids in hashes.items()} for sid, hashes in (stored or {}).items()}
+        docs = []
+        for i, (text, title, url, sid) in enumerate(zip(texts, titles, urls, source_ids)):
+            doc_chunks: List[Chunk] = chunks[i] if chunks is not None else list(self.chunker.iter_chunks(text))
+            if doc_chunks:
+                docs.append((text, title, url, sid, doc_chunks))
 
-            lang = detect_language(text)
+        all_chunks = [chunk.text for *_, chunks in docs for chunk in chunks]
+        all_hashes = [self.chunk_hash(chunk) for chunk in all_chunks]
+        all_ids: List[str] = []
+        to_encode: List[int] = []
+        taken = {id_ for hashes in stored.values() for ids in hashes.values() for id_ in ids}
+        pos = 0
+        for *_, sid, chunks in docs:
+            known = stored.get(sid, {})
+            for _ in chunks:
+                h = all_hashes[pos]
+                if known.get(h):
+                    all_ids.append(known[h].pop(0))
+                else:
+                    # a counter keeps repeated chunks within one source distinct
+                    n = 0
+                    while (id_ := self.generate_id(f"{sid}_{h}_{n}", prefix="chunk")) in taken:
+                        n += 1
+                    taken.add(id_)
+                    all_ids.append(id_)
+                    to_encode.append(pos)
+                pos += 1
 
+        # Language detection is pure Python; run it alongside the encode, which
+        # releases the GIL inside torch.
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            langs = pool.submit(lambda: [detect_language(text) for text, *_ in docs])
             # multilingual-e5: passages must use "passage: " prefix for best quality.
             # Raw chunk text is stored; prefixed version is only used for embedding generation.
-            prefixed = [f"passage: {chunk}" for chunk in chunks]
-            embeddings = self.generate_embeddings(prefixed)
-
-            for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-                chunk_id = self.generate_id(f"{url}_{i}")
-                all_chunks.append(chunk)
-                all_embeddings.append(embedding)
-                all_ids.append(chunk_id)
+            encoded = self.generate_embeddings([f"passage: {all_chunks[i]}" for i in to_encode])
+            langs = langs.result()
+        if len(to_encode) == len(all_chunks):
+            all_embeddings = encoded
+        else:
+            all_embeddings = np.full((len(all_chunks), encoded.shape[1]), np.nan, dtype=np.float32)
+            all_embeddings[to_encode] = encoded
+
+        all_metadatas: List[Dict] = []
+        pos = 0
+        for (_, title, url, sid, chunks), lang in zip(docs, langs):
+            for i, chunk in enumerate(chunks):
                 all_metadatas.append({
                     "title": title,
                     "url": url or "",
-                    "source_id": source_id,
+                    "source_id": sid,
                     "source_type": source_type,
                     "chunk_index": i,
                     "total_chunks": len(chunks),
                     "lang": lang,
+                    "content_hash": all_hashes[pos],
+                    # provenance: page 0 means the text had no pages
+                    "page": chunk.page,
+                    "section": chunk.section,
+                    "char_start": chunk.start,
+                    "char_end": chunk.end,
                 })
+                pos += 1
 
         return all_chunks, all_embeddings, all_metadatas, all_ids
@@ -0,0 +1,19 @@
+import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+# Bounded pool for CPU-bound model calls that aren't micro-batched (query
+# embeddings and reranking go through their own batcher threads). Kept
+# separate from the default thread pool so a burst of searches can't starve
+# DB/Chroma calls, and sized small because torch already parallelises each call.
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+
+_executor = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="inference")
+
+
+async def run_inference(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking model call on the inference pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
@@ -1,4 +1,8 @@
-from langdetect import detect, LangDetectException
+from langdetect import DetectorFactory, detect, LangDetectException
+
+# langdetect samples randomly; without a fixed seed the same query can come back
+# as different languages, which splits its cache key
+DetectorFactory.seed = 0
 
 _LANG_NAMES = {
     "en": "English", "es": "Spanish", "fr": "French", "de": "German",
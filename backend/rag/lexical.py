@@ -0,0 +1,31 @@
+import os
+import re
+import unicodedata
+from typing import Dict, List, Sequence, Tuple
+
+# Hybrid retrieval: dense (Chroma) and lexical (chunk_text full-text index)
+# candidate lists are fused with reciprocal-rank fusion, so an exact identifier
+# match can surface even when its embedding is far from the query's.
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "30"))
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+
+_TERM = re.compile(r"\w+")
+_MAX_TERMS = 32
+
+
+def query_terms(query: str) -> List[str]:
+    """Distinct lower-cased word tokens of a query, in order. Tokens are \\w+, the
+    same split the index uses, so they are safe to quote into FTS5/tsquery syntax."""
+    seen: Dict[str, None] = {}
+    for term in _TERM.findall(unicodedata.normalize("NFKC", query).casefold()):
+        seen.setdefault(term, None)
+    return list(seen)[:_MAX_TERMS]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = HYBRID_RRF_K) -> List[Tuple[str, float]]:
+    """Fuse ranked id lists: score(id) = Σ 1 / (k + rank). Returns (id, score), best first."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, id_ in enumerate(ranking, start=1):
+            scores[id_] = scores.get(id_, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
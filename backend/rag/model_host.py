@@ -0,0 +1,359 @@
+"""
+Model host: one process owns the e5 embedder and the cross-encoder, and any
+number of API workers (uvicorn --workers N) or indexing workers use them over a
+unix socket instead of each loading its own copy of the weights.
+
+Requests are small JSON frames (texts or query/passage pairs). Results — the
+embedding matrix or the score vector — are written by the host straight into a
+shared-memory block owned by the calling connection, so only the array shape
+crosses the socket. Concurrent requests from every worker land in the host's
+MicroBatchers and are coalesced into shared forward passes.
+
+Importing this module is cheap (no torch); the models are loaded by serve().
+"""
+import os
+import time
+import json
+import socket
+import asyncio
+import struct
+import threading
+import socketserver
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, List, Optional, Tuple, Union
+import numpy as np
+from loguru import logger
+
+# Unix socket of the model host. When set, get_embedding_model() and
+# get_reranker() return clients for the host instead of loading the models.
+MODEL_HOST_SOCKET = os.getenv("MODEL_HOST_SOCKET", "")
+# Seconds a single encode/rerank call may take before the client gives up
+MODEL_HOST_TIMEOUT = float(os.getenv("MODEL_HOST_TIMEOUT", "30"))
+# Seconds a client keeps retrying the first connection while the host loads
+MODEL_HOST_CONNECT_TIMEOUT = float(os.getenv("MODEL_HOST_CONNECT_TIMEOUT", "60"))
+# Connections (and threads) per worker process for awaited calls
+MODEL_HOST_CONNECTIONS = int(os.getenv("MODEL_HOST_CONNECTIONS", "8"))
+
+_HEADER = struct.Struct("!I")
+# Initial size of a connection's result buffer; grown on demand
+_MIN_BUFFER = 1 << 20
+
+
+class ModelHostError(RuntimeError):
+    """The host rejected a request, or could not be reached."""
+
+
+def _send(sock: socket.socket, message: Dict):
+    body = json.dumps(message).encode()
+    sock.sendall(_HEADER.pack(len(body)) + body)
+
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("model host connection closed")
+        buf += chunk
+    return bytes(buf)
+
+
+def _recv(sock: socket.socket) -> Dict:
+    (length,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    return json.loads(_recv_exact(sock, length))
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    # Only the creating (client) process may unlink the block. Before 3.13 an
+    # attach also registers it with this process's resource tracker, which
+    # would unlink it when the host exits.
+    shm = shared_memory.SharedMemory(name=name)
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+# --- host side --------------------------------------------------------------
+
+class _Handler(socketserver.BaseRequestHandler):
+    """Serves one client connection until it closes."""
+
+    def handle(self):
+        host: "ModelHost" = self.server.host
+        shm: Optional[shared_memory.SharedMemory] = None
+        try:
+            while True:
+                try:
+                    request = _recv(self.request)
+                except (ConnectionError, OSError):
+                    return
+                try:
+                    if request.get("shm") and (shm is None or shm.name != request["shm"].lstrip("/")):
+                        if shm is not None:
+                            shm.close()
+                        shm = _attach(request["shm"])
+                    _send(self.request, host.dispatch(request, shm))
+                except Exception as e:
+                    logger.warning(f"Model host: {request.get('op')} failed: {e}")
+                    _send(self.request, {"error": f"{type(e).__name__}: {e}"})
+        finally:
+            if shm is not None:
+                shm.close()
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class ModelHost:
+    """Serves encode / predict / info / stats requests for an embedder (a
+    BatchedEmbedder) and a cross-encoder (a BatchedCrossEncoder)."""
+
+    def __init__(self, embedder, cross_encoder, path: str = MODEL_HOST_SOCKET):
+        self.embedder = embedder
+        self.cross_encoder = cross_encoder
+        self.path = path
+        self.requests = 0
+        self.started = time.time()
+        self._server: Optional[_Server] = None
+
+    def _write(self, array: np.ndarray, shm: Optional[shared_memory.SharedMemory]) -> Dict:
+        array = np.ascontiguousarray(array, dtype=np.float32)
+        if shm is None or array.nbytes > shm.size:
+            raise ValueError(f"result of {array.nbytes} bytes does not fit the client buffer")
+        np.ndarray(array.shape, dtype=np.float32, buffer=shm.buf)[...] = array
+        return {"shape": list(array.shape)}
+
+    def dispatch(self, request: Dict, shm: Optional[shared_memory.SharedMemory]) -> Dict:
+        op = request.get("op")
+        self.requests += 1
+        if op == "encode":
+            texts = request["texts"]
+            if request.get("batch_size"):
+                # bulk indexing: fixed-size batches straight to the model
+                embeddings = self.embedder.encode(texts, batch_size=request["batch_size"],
+                                                  show_progress_bar=False, convert_to_numpy=True)
+            else:
+                embeddings = self.embedder.encode(texts)
+            return self._write(np.asarray(embeddings).reshape(len(texts), -1), shm)
+        if op == "predict":
+            pairs = [tuple(p) for p in request["pairs"]]
+            if request.get("batch_size"):
+                scores = self.cross_encoder.predict(pairs, batch_size=request["batch_size"], show_progress_bar=False)
+            else:
+                scores = self.cross_encoder.predict(pairs)
+            return self._write(scores, shm)
+        if op == "info":
+            return {"dimension": self.embedder.get_sentence_embedding_dimension(),
+                    "max_length": self.cross_encoder.max_length}
+        if op == "stats":
+            return {"embedder": self.embedder.stats(), "reranker": self.cross_encoder.stats(),
+                    "requests": self.requests, "uptime_s": round(time.time() - self.started, 1), "pid": os.getpid()}
+        raise ValueError(f"unknown op {op!r}")
+
+    def serve_forever(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # stale socket from a previous run
+        self._server = _Server(self.path, _Handler)
+        self._server.host = self
+        os.chmod(self.path, 0o660)
+        logger.info(f"Model host listening on {self.path} (pid {os.getpid()})")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+
+
+def serve(path: str = MODEL_HOST_SOCKET):
+    """Load and warm both models in this process, then serve them on path."""
+    if not path:
+        raise ValueError("MODEL_HOST_SOCKET is not set")
+    from rag.indexer import load_embedding_model
+    from rag.reranker import load_reranker
+    start = time.perf_counter()
+    embedder, cross_encoder = load_embedding_model(), load_reranker()
+    embedder.encode(["query: warm up", "passage: warm up"])
+    cross_encoder.predict([("warm up", "warm up")])
+    logger.info(f"Model host: models loaded and warm in {time.perf_counter() - start:.1f}s")
+    ModelHost(embedder, cross_encoder, path).serve_forever()
+
+
+# --- client side ------------------------------------------------------------
+
+class _Channel:
+    """One connection to the host plus the shared-memory block its results land in."""
+
+    def __init__(self, path: str, timeout: float, connect_timeout: float):
+        deadline = time.monotonic() + connect_timeout
+        while True:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                self.sock.connect(path)
+                break
+            except (FileNotFoundError, ConnectionRefusedError) as e:
+                self.sock.close()
+                if time.monotonic() >= deadline:
+                    raise ModelHostError(f"model host at {path} is not reachable: {e}") from e
+                time.sleep(0.2)  # host still loading its models
+        self.sock.settimeout(timeout)
+        self.shm: Optional[shared_memory.SharedMemory] = None
+
+    def _buffer(self, nbytes: int) -> shared_memory.SharedMemory:
+        if self.shm is None or self.shm.size < nbytes:
+            self._release()
+            self.shm = shared_memory.SharedMemory(create=True, size=max(_MIN_BUFFER, 1 << (nbytes - 1).bit_length()))
+        return self.shm
+
+    def call(self, request: Dict, nbytes: int = 0) -> Tuple[Dict, Optional[shared_memory.SharedMemory]]:
+        shm = self._buffer(nbytes) if nbytes else None
+        if shm is not None:
+            request["shm"] = shm.name
+        _send(self.sock, request)
+        response = _recv(self.sock)
+        if "error" in response:
+            raise ModelHostError(response["error"])
+        return response, shm
+
+    def _release(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def close(self):
+        try:
+            self.sock.close()
+        finally:
+            self._release()
+
+
+class ModelHostClient:
+    """Pool of channels to one model host. Safe to share between threads; a
+    channel that fails mid-call is dropped rather than returned to the pool."""
+
+    def __init__(self, path: str = MODEL_HOST_SOCKET, timeout: float = MODEL_HOST_TIMEOUT,
+                 connect_timeout: float = MODEL_HOST_CONNECT_TIMEOUT, connections: int = MODEL_HOST_CONNECTIONS):
+        self.path = path
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self._idle: List[_Channel] = []
+        self._lock = threading.Lock()
+        self._info: Optional[Dict] = None
+        self.calls = 0
+        self.errors = 0
+        # awaited calls block on the socket here, not on the event loop
+        self.executor = ThreadPoolExecutor(max_workers=connections, thread_name_prefix="model-host")
+
+    def _acquire(self) -> _Channel:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return _Channel(self.path, self.timeout, self.connect_timeout)
+
+    def _call(self, request: Dict, nbytes: int = 0):
+        channel = self._acquire()
+        self.calls += 1
+        try:
+            response, shm = channel.call(request, nbytes)
+            result = response
+            if shm is not None:
+                result = np.ndarray(tuple(response["shape"]), dtype=np.float32, buffer=shm.buf).copy()
+        except ModelHostError:
+            self.errors += 1
+            with self._lock:
+                self._idle.append(channel)  # the host answered; the channel is fine
+            raise
+        except (OSError, ValueError) as e:
+            self.errors += 1
+            channel.close()
+            raise ModelHostError(f"model host call failed: {e}") from e
+        with self._lock:
+            self._idle.append(channel)
+        return result
+
+    def info(self) -> Dict:
+        if self._info is None:
+            self._info = self._call({"op": "info"})
+        return self._info
+
+    def encode(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        nbytes = len(texts) * self.info()["dimension"] * 4
+        return self._call({"op": "encode", "texts": texts, "batch_size": batch_size}, nbytes)
+
+    def predict(self, pairs: List[Tuple[str, str]], batch_size: Optional[int] = None) -> np.ndarray:
+        return self._call({"op": "predict", "pairs": [list(p) for p in pairs], "batch_size": batch_size}, len(pairs) * 4)
+
+    def stats(self) -> Dict:
+        stats = self._call({"op": "stats"})
+        stats.update({"socket": self.path, "client_calls": self.calls, "client_errors": self.errors,
+                      "idle_connections": len(self._idle)})
+        return stats
+
+    def close(self):
+        with self._lock:
+            channels, self._idle = self._idle, []
+        for channel in channels:
+            channel.close()
+        self.executor.shutdown(wait=False)
+
+
+_client: Optional[ModelHostClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> ModelHostClient:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ModelHostClient()
+    return _client
+
+
+class RemoteEmbedder:
+    """BatchedEmbedder stand-in for processes that use the model host."""
+
+    def __init__(self, client: ModelHostClient):
+        self.client = client
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        # kwargs mark a bulk call (see BatchedEmbedder.encode): skip the host's batcher
+        embeddings = self.client.encode(texts, batch_size=batch_size if kwargs else None)
+        return embeddings[0] if single else embeddings
+
+    async def aencode(self, texts: List[str]) -> np.ndarray:
+        return await asyncio.get_running_loop().run_in_executor(self.client.executor, self.client.encode, list(texts))
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.client.info()["dimension"]
+
+    def stats(self) -> Dict:
+        return {"model_host": self.client.stats()}
+
+
+class RemoteCrossEncoder:
+    """BatchedCrossEncoder stand-in for processes that use the model host."""
+
+    def __init__(self, client: ModelHostClient):
+        self.client = client
+
+    @property
+    def max_length(self) -> int:
+        return self.client.info()["max_length"]
+
+    def predict(self, pairs: List[Tuple[str, str]], **kwargs) -> np.ndarray:
+        return self.client.predict(pairs, batch_size=kwargs.get("batch_size"))
+
+    async def apredict(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        return await asyncio.get_running_loop().run_in_executor(self.client.executor, self.client.predict, list(pairs))
+
+    def stats(self) -> Dict:
+        return {"model_host": self.client.stats()}
@@ -0,0 +1,208 @@
+import os
+import re
+import json
+from typing import Dict, List, Optional, Tuple, Union
+import numpy as np
+from loguru import logger
+
+# Inference backend for the e5 embedder and the mMiniLM reranker:
+#   torch — SentenceTransformer / CrossEncoder in full precision (default)
+#   onnx  — ONNX Runtime, with dynamic int8 quantization of the weights unless
+#           ONNX_QUANTIZE=false
+# The first start exports each model to ONNX_CACHE_DIR (needs torch + onnx);
+# later starts load the cached graph and the tokenizer only, so the PyTorch
+# weights never enter memory.
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch").lower()
+ONNX_CACHE_DIR = os.getenv("ONNX_CACHE_DIR", "./onnx_models")
+ONNX_QUANTIZE = os.getenv("ONNX_QUANTIZE", "true").lower() != "false"
+# Intra-op threads per session; 0 lets ONNX Runtime use every core
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))
+
+if INFERENCE_BACKEND not in ("torch", "onnx"):
+    raise ValueError(f"INFERENCE_BACKEND must be 'torch' or 'onnx', got {INFERENCE_BACKEND!r}")
+
+
+def model_variant(model_name: str) -> str:
+    """model_name qualified by the backend that runs it. Vectors and scores from
+    torch, ONNX fp32 and ONNX int8 differ slightly, so caches of model outputs key
+    on this rather than the bare name. torch keeps the bare name, which keeps the
+    stores written before backends were selectable valid."""
+    if INFERENCE_BACKEND == "torch":
+        return model_name
+    return f"{model_name}@onnx-{'int8' if ONNX_QUANTIZE else 'fp32'}"
+
+
+def _model_dir(model_name: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.-]+", "__", model_name))
+
+
+def _export(model, tokenizer, input_names: List[str], output_name: str, path: str):
+    """Trace a Hugging Face model to ONNX with dynamic batch and sequence axes.
+    output_name is "token_embeddings" (last hidden state) or "logits"."""
+    import torch
+
+    class Graph(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            out = self.model(**dict(zip(input_names, inputs)), return_dict=True)
+            return out.last_hidden_state if output_name == "token_embeddings" else out.logits
+
+    sample = tokenizer(["query: export sample"], ["passage: export sample"], return_tensors="pt")
+    inputs = tuple(sample[name] for name in input_names)
+    axes = {name: {0: "batch", 1: "seq"} for name in input_names}
+    axes[output_name] = {0: "batch"}
+    model.eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            Graph(), inputs, path, input_names=input_names, output_names=[output_name],
+            dynamic_axes=axes, opset_version=17, dynamo=False,
+        )
+
+
+def _quantize(fp32_path: str, int8_path: str):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+
+
+def _session(path: str, threads: int = ONNX_THREADS):
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if threads:
+        options.intra_op_num_threads = threads
+    return ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+
+def _prepare(model_name: str, cache_dir: str, quantize: bool, export_fn) -> Tuple[str, Dict]:
+    """Path of the (quantized) ONNX graph and its saved config, exporting on first use."""
+    model_dir = _model_dir(model_name, cache_dir)
+    fp32_path = os.path.join(model_dir, "model.onnx")
+    int8_path = os.path.join(model_dir, "model.int8.onnx")
+    config_path = os.path.join(model_dir, "config.json")
+    path = int8_path if quantize else fp32_path
+    # Files are written under per-process temp names and renamed into place, so
+    # API and worker processes starting together never load a partial graph.
+    tmp = f".{os.getpid()}.tmp"
+    if not (os.path.exists(path) and os.path.exists(config_path)):
+        os.makedirs(model_dir, exist_ok=True)
+        if not os.path.exists(fp32_path) or not os.path.exists(config_path):
+            logger.info(f"Exporting {model_name} to ONNX → {model_dir}")
+            config = export_fn(fp32_path + tmp)
+            os.replace(fp32_path + tmp, fp32_path)
+            with open(config_path + tmp, "w") as f:
+                json.dump(config, f)
+            os.replace(config_path + tmp, config_path)
+        if quantize:
+            logger.info(f"Quantizing {model_name} to int8")
+            _quantize(fp32_path, int8_path + tmp)
+            os.replace(int8_path + tmp, int8_path)
+    with open(config_path) as f:
+        return path, json.load(f)
+
+
+class OnnxEncoder:
+    """SentenceTransformer stand-in (encode / dimension / tokenizer) over an ONNX graph
+    that outputs token embeddings; pooling and normalization are done in numpy."""
+
+    def __init__(self, model_name: str, cache_dir: str = ONNX_CACHE_DIR, quantize: bool = ONNX_QUANTIZE):
+        from transformers import AutoTokenizer
+
+        def export(path: str) -> Dict:
+            from sentence_transformers import SentenceTransformer
+            from sentence_transformers.models import Normalize
+            st = SentenceTransformer(model_name, device="cpu")
+            transformer = st[0].auto_model
+            names = [n for n in st.tokenizer.model_input_names if n in ("input_ids", "attention_mask", "token_type_ids")]
+            _export(transformer, st.tokenizer, names, "token_embeddings", path)
+            return {
+                "input_names": names,
+                "pooling": st[1].get_pooling_mode_str(),
+                "normalize": any(isinstance(m, Normalize) for m in st),
+                "dim": st.get_sentence_embedding_dimension(),
+                "max_seq_length": st.max_seq_length,
+            }
+
+        path, self.config = _prepare(model_name, cache_dir, quantize, export)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.session = _session(path)
+        self.max_seq_length = self.config["max_seq_length"]
+        if self.config["pooling"] not in ("mean", "cls"):
+            raise ValueError(f"Unsupported pooling for ONNX backend: {self.config['pooling']}")
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.config["dim"]
+
+    def _forward(self, texts: List[str]) -> np.ndarray:
+        features = self.tokenizer(texts, padding=True, truncation=True, max_length=self.max_seq_length, return_tensors="np")
+        tokens = self.session.run(None, {n: features[n].astype(np.int64) for n in self.config["input_names"]})[0]
+        if self.config["pooling"] == "cls":
+            pooled = tokens[:, 0]
+        else:
+            mask = features["attention_mask"][..., None].astype(np.float32)
+            pooled = (tokens * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.config["normalize"]:
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        show_progress_bar: bool = False,
+        convert_to_numpy: bool = True,
+        **kwargs,
+    ) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, self.config["dim"]), dtype=np.float32)
+        out = np.concatenate([self._forward(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)])
+        return out[0] if single else out
+
+
+class OnnxCrossEncoder:
+    """CrossEncoder stand-in (predict / max_length) over an ONNX sequence-classification graph."""
+
+    def __init__(
+        self,
+        model_name: str,
+        max_length: Optional[int] = None,
+        cache_dir: str = ONNX_CACHE_DIR,
+        quantize: bool = ONNX_QUANTIZE,
+    ):
+        from transformers import AutoTokenizer
+
+        def export(path: str) -> Dict:
+            import torch
+            from sentence_transformers import CrossEncoder
+            ce = CrossEncoder(model_name, device="cpu")
+            names = [n for n in ce.tokenizer.model_input_names if n in ("input_ids", "attention_mask", "token_type_ids")]
+            _export(ce.model, ce.tokenizer, names, "logits", path)
+            return {
+                "input_names": names,
+                "sigmoid": isinstance(ce.default_activation_function, torch.nn.Sigmoid),
+            }
+
+        path, self.config = _prepare(model_name, cache_dir, quantize, export)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.session = _session(path)
+        self.max_length = max_length
+
+    def predict(self, sentences: List[Tuple[str, str]], batch_size: int = 32, show_progress_bar: bool = None, **kwargs) -> np.ndarray:
+        scores = []
+        for i in range(0, len(sentences), batch_size):
+            batch = sentences[i:i + batch_size]
+            features = self.tokenizer(
+                [a for a, _ in batch], [b for _, b in batch],
+                padding=True, truncation="longest_first", max_length=self.max_length, return_tensors="np",
+            )
+            logits = self.session.run(None, {n: features[n].astype(np.int64) for n in self.config["input_names"]})[0]
+            scores.append(logits[:, 0])
+        scores = np.concatenate(scores) if scores else np.zeros(0, dtype=np.float32)
+        if self.config["sigmoid"]:
+            scores = 1 / (1 + np.exp(-scores))
+        return scores.astype(np.float32)
+
@@ -0,0 +1,222 @@
+import os
+import asyncio
+import uuid
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Tuple
+from starlette.concurrency import run_in_threadpool
+from loguru import logger
+
+from connectors.file_upload import FileProcessor, validate_upload
+
+# Bulk ingestion runs as four asyncio stages joined by bounded queues:
+#   read (archive entries) → extract+chunk (N workers) → embed (batched) → write
+# A full queue blocks the stage feeding it, so memory stays bounded however
+# large the archive is and the slowest stage (usually embedding) sets the pace.
+INGEST_EXTRACT_WORKERS = int(os.getenv("INGEST_EXTRACT_WORKERS", "4"))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "16"))
+INGEST_EMBED_DOCS = int(os.getenv("INGEST_EMBED_DOCS", "32"))
+
+_DONE = object()
+
+
+class IngestPipeline:
+    """Index a stream of (filename, bytes) entries under one parent index job.
+
+    Each entry gets its own index_jobs row (parent_id = the bulk job) that moves
+    pending → indexing → completed/failed, which is what the progress endpoints
+    read. One bad file fails its own row and never the batch.
+    """
+
+    def __init__(
+        self,
+        db,
+        indexer,
+        retriever,
+        collection_id: Optional[int] = None,
+        extract_workers: int = INGEST_EXTRACT_WORKERS,
+        queue_size: int = INGEST_QUEUE_SIZE,
+        embed_docs: int = INGEST_EMBED_DOCS,
+    ):
+        self.db = db
+        self.indexer = indexer
+        self.retriever = retriever
+        self.collection_id = collection_id
+        self.extract_workers = max(1, extract_workers)
+        self.queue_size = max(1, queue_size)
+        self.embed_docs = max(1, embed_docs)
+        self.files = 0
+        self.failed = 0
+        self.chunks = 0
+        self.read_error: Optional[str] = None
+
+    async def run(self, parent_id: str, entries: Iterator[Tuple[str, bytes]]) -> Dict:
+        await run_in_threadpool(self.db.update_job, parent_id, "indexing")
+        to_extract: asyncio.Queue = asyncio.Queue(self.queue_size)
+        to_embed: asyncio.Queue = asyncio.Queue(self.queue_size)
+        to_write: asyncio.Queue = asyncio.Queue(2)
+
+        async def extract_all():
+            await asyncio.gather(*[self._extract(to_extract, to_embed) for _ in range(self.extract_workers)])
+            await to_embed.put(_DONE)
+
+        try:
+            # TaskGroup cancels the other stages if one raises, so nothing is left
+            # blocked on a queue nobody drains
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(self._read(parent_id, entries, to_extract))
+                tg.create_task(extract_all())
+                tg.create_task(self._embed(to_embed, to_write))
+                tg.create_task(self._write(to_write))
+        except* Exception as eg:
+            error = "; ".join(str(e) for e in eg.exceptions)
+            logger.error(f"Bulk ingest {parent_id} aborted: {error}")
+            await run_in_threadpool(self.db.update_job, parent_id, "failed", chunks=self.chunks, error=error)
+            raise
+
+        if not self.files:
+            status, error = "failed", self.read_error or "No files found in upload"
+        else:
+            status = "failed" if self.failed == self.files else "completed"
+            problems = [f"{self.failed} of {self.files} files failed"] if self.failed else []
+            if self.read_error:
+                problems.append(f"archive read stopped early: {self.read_error}")
+            error = "; ".join(problems) or None
+        await run_in_threadpool(self.db.update_job, parent_id, status, chunks=self.chunks, error=error)
+        logger.info(f"Bulk ingest {parent_id}: {self.files} files, {self.failed} failed → {self.chunks} chunks")
+        return {"files": self.files, "failed": self.failed, "chunks": self.chunks}
+
+    async def _fail(self, job_id: str, error: str):
+        self.failed += 1
+        await run_in_threadpool(self.db.update_job, job_id, "failed", error=error)
+
+    # ── Stages ────────────────────────────────────────────────────────────────
+
+    async def _read(self, parent_id: str, entries: Iterator[Tuple[str, bytes]], out: asyncio.Queue):
+        while True:
+            try:
+                entry = await run_in_threadpool(next, entries, None)
+            except Exception as e:
+                # Corrupt/truncated archive: keep what was already read
+                self.read_error = str(e) or type(e).__name__
+                break
+            if entry is None:
+                break
+            filename, data = entry
+            job_id = str(uuid.uuid4())
+            await run_in_threadpool(self.db.create_job, job_id, filename, parent_id)
+            self.files += 1
+            await out.put((job_id, filename, data))
+        for _ in range(self.extract_workers):
+            await out.put(_DONE)
+
+    async def _extract(self, inbox: asyncio.Queue, out: asyncio.Queue):
+        while (item := await inbox.get()) is not _DONE:
+            job_id, filename, data = item
+            try:
+                validate_upload(os.path.basename(filename), data)
+                text_content, chunks = await run_in_threadpool(self._chunk_file, filename, data)
+            except Exception as e:
+                await self._fail(job_id, str(e))
+                continue
+            if not text_content or len(text_content.strip()) < 10:
+                await self._fail(job_id, "Could not extract text")
+                continue
+            await run_in_threadpool(self.db.update_job, job_id, "indexing")
+            await out.put((job_id, filename, text_content, chunks))
+
+    def _chunk_file(self, filename: str, data: bytes):
+        # a PDF streams in page by page and is chunked as it arrives
+        text, _ = FileProcessor.read_file(filename, data)
+        return self.indexer.chunk_document(text)
+
+    async def _embed(self, inbox: asyncio.Queue, out: asyncio.Queue):
+        done = False
+        while not done:
+            # Block for one document, then take whatever else is already extracted
+            batch: List[Tuple[str, str, str, list]] = []
+            item = await inbox.get()
+            while item is not _DONE:
+                batch.append(item)
+                if len(batch) >= self.embed_docs or inbox.empty():
+                    break
+                item = inbox.get_nowait()
+            done = item is _DONE
+            if batch:
+                await out.put(await self._prepare(batch))
+        await out.put(_DONE)
+
+    async def _prepare(self, batch: List[Tuple[str, str, str, list]]):
+        # Every entry is a new source: a name says nothing about which document a
+        # file replaces, and re-syncing one is /api/upload with its source_id
+        source_ids = [await run_in_threadpool(self.db.add_source, "file", filename, filename)
+                      for _, filename, *_ in batch]
+        texts = [text for _, _, text, _ in batch]
+        names = [filename for _, filename, *_ in batch]
+        try:
+            prepared = await run_in_threadpool(
+                self.indexer.prepare_documents, texts, names, names, source_ids, "file",
+                chunks=[chunks for *_, chunks in batch],
+            )
+        except Exception as e:
+            prepared = e
+        return batch, source_ids, prepared
+
+    async def _write(self, inbox: asyncio.Queue):
+        while (item := await inbox.get()) is not _DONE:
+            batch, source_ids, prepared = item
+            try:
+                if isinstance(prepared, Exception):
+                    raise prepared
+                chunks, embeddings, metadatas, ids = prepared
+                await run_in_threadpool(self.retriever.sync_documents, chunks, embeddings, metadatas, ids, source_ids)
+            except Exception as e:
+                if len(batch) == 1:
+                    await self._fail_file(batch[0], source_ids[0], e)
+                    continue
+                # one bad document must not sink the rest: redo the batch file by file
+                logger.warning(f"Bulk ingest batch of {len(batch)} files failed, retrying one by one: {e}")
+                for entry, source_id in zip(batch, source_ids):
+                    try:
+                        chunks = await run_in_threadpool(self._index_one, entry, source_id)
+                    except Exception as file_error:
+                        await self._fail_file(entry, source_id, file_error)
+                        continue
+                    await self._complete(entry, source_id, chunks)
+                continue
+
+            per_source = Counter(m["source_id"] for m in metadatas)
+            for entry, source_id in zip(batch, source_ids):
+                await self._complete(entry, source_id, per_source[source_id])
+
+    def _index_one(self, entry: Tuple[str, str, str, list], source_id: int) -> int:
+        _, filename, text_content, chunks = entry
+        prepared = self.indexer.prepare_documents(
+            [text_content], [filename], [filename], source_id, "file", chunks=[chunks],
+        )
+        self.retriever.sync_documents(*prepared, [source_id])
+        return len(prepared[0])
+
+    async def _complete(self, entry: Tuple[str, str, str, list], source_id: int, chunks: int):
+        job_id, filename, text_content, _ = entry
+        await run_in_threadpool(self._finish, job_id, filename, text_content, source_id, chunks)
+        self.chunks += chunks
+
+    async def _fail_file(self, entry: Tuple[str, str, str, list], source_id: int, error: Exception):
+        logger.error(f"Bulk ingest of {entry[1]} failed: {error}")
+        await run_in_threadpool(self._discard, source_id)
+        await self._fail(entry[0], str(error))
+
+    def _discard(self, source_id: int):
+        try:
+            self.retriever.delete_by_source(source_id)  # whatever a failed write left behind
+        except Exception as e:
+            logger.warning(f"Could not clean up chunks of failed source {source_id}: {e}")
+        self.db.update_source_status(source_id, "failed")
+
+    def _finish(self, job_id: str, filename: str, text_content: str, source_id: int, chunks: int):
+        self.db.update_source_status(source_id, "indexed")
+        self.db.clear_documents(source_id)
+        self.db.add_document(self.indexer.generate_id(text_content), source_id, filename, filename)
+        if self.collection_id:
+            self.retriever.add_to_collection(source_id, self.collection_id)
+        self.db.update_job(job_id, "completed", chunks=chunks)
@@ -1,20 +1,143 @@
-from typing import List, Dict, Tuple
-from sentence_transformers import CrossEncoder
+import os
+import asyncio
+import hashlib
+from concurrent.futures import Future
+from typing import List, Dict, Optional, Tuple, Union
+import numpy as np
+from cache.lru import LRUCache
+from rag.batching import MicroBatcher
+from rag.model_host import MODEL_HOST_SOCKET, RemoteCrossEncoder, get_client
+from rag.onnx_backend import INFERENCE_BACKEND, OnnxCrossEncoder, model_variant
 
-_model: CrossEncoder = None
+# Multilingual cross-encoder: 100 languages, MMARCO-trained
+RERANK_MODEL_NAME = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+# Tokens per (query, passage) pair; longer pairs are truncated. Attention cost
+# grows with the square of this, so lowering it is the main CPU knob.
+RERANK_MAX_LENGTH = int(os.getenv("RERANK_MAX_LENGTH", "512"))
+# Pairs per forward pass. Pairs are sorted by length first, so each batch pads
+# to a similar length instead of to the longest passage in the request.
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+# Cross-request batching: pairs from concurrent searches are collected for up to
+# RERANK_MAX_WAIT_MS (or RERANK_MAX_BATCH pairs) and scored together on one
+# worker thread, instead of each request running its own small forward passes.
+RERANK_MAX_BATCH = int(os.getenv("RERANK_MAX_BATCH", "64"))
+RERANK_MAX_WAIT_MS = float(os.getenv("RERANK_MAX_WAIT_MS", "5"))
+# (query, chunk) → score memo. Chunk ids are content-addressed, so an id always
+# names the same text and a cached score never goes stale.
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "20000"))
+# Skip the cross-encoder when the best dense hit beats the runner-up by at least
+# this much cosine distance. 0 disables early exit.
+RERANK_EARLY_EXIT_MARGIN = float(os.getenv("RERANK_EARLY_EXIT_MARGIN", "0"))
 
 
-def get_reranker() -> CrossEncoder:
+class BatchedCrossEncoder:
+    """CrossEncoder facade that routes predict() calls through a MicroBatcher."""
+
+    def __init__(self, model: Union["CrossEncoder", OnnxCrossEncoder], max_batch: int = RERANK_MAX_BATCH, max_wait_ms: float = RERANK_MAX_WAIT_MS):
+        self.model = model
+        self.batcher = MicroBatcher(self._predict_batch, max_batch, max_wait_ms, name="reranker")
+
+    def _predict_batch(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        # length-bucketed: neighbouring pairs in a forward pass need similar padding
+        order = sorted(range(len(pairs)), key=lambda i: len(pairs[i][1]))
+        scores = self.model.predict([pairs[i] for i in order], batch_size=RERANK_BATCH_SIZE, show_progress_bar=False)
+        out = np.empty(len(pairs), dtype=np.float32)
+        out[order] = scores
+        return out
+
+    def submit(self, pairs: List[Tuple[str, str]]) -> Future:
+        return self.batcher.submit(pairs)
+
+    def predict(self, pairs: List[Tuple[str, str]], **kwargs) -> np.ndarray:
+        if kwargs:
+            return self.model.predict(pairs, **kwargs)
+        return np.asarray(self.submit(pairs).result(), dtype=np.float32)
+
+    async def apredict(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        """Await a batched predict from the event loop without holding a thread."""
+        return np.asarray(await asyncio.wrap_future(self.submit(pairs)), dtype=np.float32)
+
+    def stats(self) -> Dict:
+        return self.batcher.stats()
+
+    def __getattr__(self, name):
+        # max_length, tokenizer, config, ...
+        return getattr(self.model, name)
+
+
+_model: Union[BatchedCrossEncoder, RemoteCrossEncoder] = None
+# Shared by every Reranker in the process (search, chat and GraphQL each hold one)
+_score_cache = LRUCache(RERANK_CACHE_SIZE)
+_counters = {"pairs_scored": 0, "early_exits": 0}
+
+
+def load_reranker() -> BatchedCrossEncoder:
+    """Load the cross-encoder into this process (torch is imported only here)."""
+    if INFERENCE_BACKEND == "onnx":
+        return BatchedCrossEncoder(OnnxCrossEncoder(RERANK_MODEL_NAME, max_length=RERANK_MAX_LENGTH))
+    from sentence_transformers import CrossEncoder
+    return BatchedCrossEncoder(CrossEncoder(RERANK_MODEL_NAME, max_length=RERANK_MAX_LENGTH))
+
+
+def get_reranker() -> Union[BatchedCrossEncoder, RemoteCrossEncoder]:
+    """The process's cross-encoder: a client for the model host when
+    MODEL_HOST_SOCKET is set, otherwise a local copy."""
     global _model
     if _model is None:
-        # Multilingual cross-encoder: 100 languages, MMARCO-trained
-        _model = CrossEncoder("cross-encoder/mmarco-mMiniLMv2-L12-H384-v1")
+        _model = RemoteCrossEncoder(get_client()) if MODEL_HOST_SOCKET else load_reranker()
     return _model
 
 
 class Reranker:
-    def __init__(self):
+    def __init__(self, early_exit_margin: float = RERANK_EARLY_EXIT_MARGIN):
         self.model = get_reranker()
+        self.early_exit_margin = early_exit_margin
+
+    @staticmethod
+    def _chunk_key(doc: str, id_: Optional[str]) -> str:
+        return id_ or hashlib.sha256(doc.encode()).hexdigest()[:32]
+
+    def _decisive(self, distances: Optional[List[Optional[float]]]) -> bool:
+        """True when the dense ranking already has a clear winner."""
+        if self.early_exit_margin <= 0 or not distances or len(distances) < 2:
+            return False
+        if distances[0] is None or distances[1] is None:  # keyword-only hits (hybrid mode)
+            return False
+        return distances[1] - distances[0] >= self.early_exit_margin
+
+    def _cached_scores(self, query: str, documents: List[str], ids: Optional[List[str]]):
+        q = hashlib.sha256(f"{model_variant(RERANK_MODEL_NAME)}|{query}".encode()).hexdigest()[:32]
+        keys = [(q, self._chunk_key(doc, ids[i] if ids else None)) for i, doc in enumerate(documents)]
+        scores = [_score_cache.get(key) for key in keys]
+        return keys, scores, [i for i, s in enumerate(scores) if s is None]
+
+    @staticmethod
+    def _fill(keys, scores: List[Optional[float]], missing: List[int], predicted) -> List[float]:
+        for i, s in zip(missing, predicted):
+            scores[i] = float(s)
+            _score_cache.set(keys[i], scores[i])
+        _counters["pairs_scored"] += len(missing)
+        return scores
+
+    def score(self, query: str, documents: List[str], ids: Optional[List[str]] = None) -> List[float]:
+        """Cross-encoder scores for each document, reusing memoized (query, chunk) scores."""
+        keys, scores, missing = self._cached_scores(query, documents, ids)
+        if not missing:
+            return scores
+        predicted = self.model.predict([(query, documents[i]) for i in missing])
+        return self._fill(keys, scores, missing, predicted)
+
+    async def ascore(self, query: str, documents: List[str], ids: Optional[List[str]] = None) -> List[float]:
+        keys, scores, missing = self._cached_scores(query, documents, ids)
+        if not missing:
+            return scores
+        predicted = await self.model.apredict([(query, documents[i]) for i in missing])
+        return self._fill(keys, scores, missing, predicted)
+
+    @staticmethod
+    def _top(documents: List[str], metadatas: List[Dict], scores: List[float], top_k: int):
+        order = sorted(range(len(documents)), key=lambda i: scores[i], reverse=True)[:top_k]
+        return [documents[i] for i in order], [metadatas[i] for i in order]
 
     def rerank(
         self,
@@ -22,12 +145,38 @@ class Reranker:
         documents: List[str],
         metadatas: List[Dict],
         top_k: int = 5,
+        ids: Optional[List[str]] = None,
+        distances: Optional[List[Optional[float]]] = None,
+    ) -> Tuple[List[str], List[Dict]]:
+        if not documents:
+            return documents, metadatas
+        if self._decisive(distances):
+            _counters["early_exits"] += 1
+            return documents[:top_k], metadatas[:top_k]
+
+        return self._top(documents, metadatas, self.score(query, documents, ids), top_k)
+
+    async def arerank(
+        self,
+        query: str,
+        documents: List[str],
+        metadatas: List[Dict],
+        top_k: int = 5,
+        ids: Optional[List[str]] = None,
+        distances: Optional[List[Optional[float]]] = None,
     ) -> Tuple[List[str], List[Dict]]:
         if not documents:
             return documents, metadatas
+        if self._decisive(distances):
+            _counters["early_exits"] += 1
+            return documents[:top_k], metadatas[:top_k]
+        return self._top(documents, metadatas, await self.ascore(query, documents, ids), top_k)
 
-        pairs = [(query, doc) for doc in documents]
-        scores = self.model.predict(pairs)
 
-        ranked = sorted(zip(scores, documents, metadatas), reverse=True)[:top_k]
-        return [d for _, d, _ in ranked], [m for _, _, m in ranked]
+def reranker_stats() -> Dict:
+    stats = _score_cache.stats()
+    stats.update(_counters)
+    stats.update({"max_length": RERANK_MAX_LENGTH, "batch_size": RERANK_BATCH_SIZE,
+                  "early_exit_margin": RERANK_EARLY_EXIT_MARGIN})
+    stats["batcher"] = _model.stats() if _model is not None else None
+    return stats
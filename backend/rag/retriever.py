@@ -1,33 +1,129 @@
 import os
-from typing import List, Dict, Optional
+import re
+import hashlib
+import unicodedata
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Dict, Optional, Tuple, Union
+import numpy as np
 import chromadb
 from chromadb.config import Settings
-from rag.indexer import get_embedding_model
+from starlette.concurrency import run_in_threadpool
+import asyncio
+from rag.indexer import Indexer, get_embedding_model, EMBEDDING_MODEL_NAME
+from rag.lexical import HYBRID_CANDIDATES, query_terms, reciprocal_rank_fusion
+from rag.onnx_backend import model_variant
+from cache.lru import LRUCache
+from cache.redis_cache import (
+    INDEX_VERSION, aget_array, aset_array, bump_version, collection_version, get_array, set_array,
+)
 
 CHROMA_PATH = os.getenv("CHROMA_PATH", "./chroma_db")
+# Set CHROMA_HOST to use a Chroma server instead of the embedded store. Required
+# once indexing runs in separate worker processes: an embedded client only sees
+# vectors written by its own process until it is restarted.
+CHROMA_HOST = os.getenv("CHROMA_HOST", "")
+CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8000"))
 
 # v2 collection uses multilingual-e5-base (768-dim)
 # v1 "devflow_docs" used all-MiniLM-L6-v2 (384-dim) — kept for migration
 COLLECTION_NAME = "devflow_docs_v2"
 LEGACY_COLLECTION_NAME = "devflow_docs"
+# Legacy chunks read, encoded and written per migrate_from_v1 step
+MIGRATE_PAGE_SIZE = int(os.getenv("MIGRATE_PAGE_SIZE", "256"))
+
+# Collection-scoped searches query a per-collection sub-index: a Chroma
+# collection holding copies of the members' chunks (same ids, vectors and
+# metadata). Unlike a filter on the main index, its cost doesn't grow with the
+# collection. Kept in step by add_to_collection / remove_from_collection /
+# delete_collection and by every chunk write; rebuild_collection_indexes backfills.
+# Chunks copied per Chroma call when a source joins a collection
+SUBINDEX_PAGE_SIZE = int(os.getenv("SUBINDEX_PAGE_SIZE", "2000"))
+
+
+def subindex_name(collection_id: int) -> str:
+    return f"{COLLECTION_NAME}_c{collection_id}"
+
+
+# Query-embedding cache: in-process LRU, optionally backed by Redis so workers
+# share hits. Keyed by model + normalized query text, so it survives changes to
+# n_results/model/rerank that produce a different answer-cache key.
+QUERY_EMBED_CACHE_SIZE = int(os.getenv("QUERY_EMBED_CACHE_SIZE", "4096"))
+QUERY_EMBED_CACHE_TTL = int(os.getenv("QUERY_EMBED_CACHE_TTL", str(7 * 24 * 3600)))
+QUERY_EMBED_CACHE_REDIS = os.getenv("QUERY_EMBED_CACHE_REDIS", "true").lower() != "false"
+
+_query_cache = LRUCache(QUERY_EMBED_CACHE_SIZE)
+_query_cache_l2_hits = 0
+_TRAILING_PUNCT = re.compile(r"[\s?!.,;:]+$")
+
+
+def normalize_query(query: str) -> str:
+    """Case-, whitespace- and trailing-punctuation-insensitive form of a query."""
+    text = unicodedata.normalize("NFKC", query).casefold()
+    text = " ".join(text.split())
+    return _TRAILING_PUNCT.sub("", text)
+
+
+def _query_cache_key(query: str) -> str:
+    # keyed by backend too: the L2 entries are shared with workers that may run another one
+    digest = hashlib.sha256(f"{model_variant(EMBEDDING_MODEL_NAME)}|{normalize_query(query)}".encode()).hexdigest()[:32]
+    return f"devflow:qemb:{digest}"
+
+
+def query_embedding_cache_stats() -> Dict:
+    stats = _query_cache.stats()
+    stats["redis_hits"] = _query_cache_l2_hits
+    stats["redis_enabled"] = QUERY_EMBED_CACHE_REDIS
+    return stats
+
+
+def _hyde_llm():
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(
+        model="gemini-1.5-flash",
+        google_api_key=os.getenv("GEMINI_API_KEY", ""),
+        temperature=0.1,
+        max_tokens=150,
+    )
+
+
+def _hyde_prompt(query: str) -> str:
+    from rag.lang import detect_language, lang_name
+    lang_display = lang_name(detect_language(query))
+    return f"Write a concise technical answer (2-3 sentences) in {lang_display} to: {query}"
 
 
 class Retriever:
-    def __init__(self):
-        self.client = chromadb.PersistentClient(
-            path=CHROMA_PATH,
-            settings=Settings(anonymized_telemetry=False),
-        )
+    def __init__(self, db=None):
+        if CHROMA_HOST:
+            self.client = chromadb.HttpClient(
+                host=CHROMA_HOST, port=CHROMA_PORT,
+                settings=Settings(anonymized_telemetry=False),
+            )
+        else:
+            self.client = chromadb.PersistentClient(
+                path=CHROMA_PATH,
+                settings=Settings(anonymized_telemetry=False),
+            )
         self.collection = self.client.get_or_create_collection(
             name=COLLECTION_NAME,
             metadata={"hnsw:space": "cosine"},
         )
+        self._subindexes: Dict[int, chromadb.Collection] = {}
         self.model = get_embedding_model()
+        if db is None:
+            from database.db import Database
+            db = Database()
+        self.db = db  # lexical index (chunk_text) for hybrid retrieval
+
+    @staticmethod
+    def _text_rows(documents: List[str], metadatas: List[Dict], ids: List[str]) -> List[Dict]:
+        return [{"chunk_id": id_, "source_id": meta.get("source_id"), "content": doc}
+                for doc, meta, id_ in zip(documents, metadatas, ids)]
 
     def add_documents(
         self,
         documents: List[str],
-        embeddings: List[List[float]],
+        embeddings: Union[np.ndarray, List[List[float]]],
         metadatas: List[Dict],
         ids: List[str],
     ):
@@ -37,12 +133,102 @@ class Retriever:
         new_idx = [i for i, id_ in enumerate(ids) if id_ not in existing]
         if not new_idx:
             return
-        self.collection.add(
+        self.db.add_chunk_text(self._text_rows(
+            [documents[i] for i in new_idx], [metadatas[i] for i in new_idx], [ids[i] for i in new_idx],
+        ))
+        new = dict(
             documents=[documents[i] for i in new_idx],
-            embeddings=[embeddings[i] for i in new_idx],
+            embeddings=np.asarray(embeddings, dtype=np.float32)[new_idx],
             metadatas=[metadatas[i] for i in new_idx],
             ids=[ids[i] for i in new_idx],
         )
+        self.collection.add(**new)
+        self._mirror_upsert(**new)
+        bump_version(INDEX_VERSION)  # cached answers no longer see the whole index
+
+    def _source_filter(self, source_ids: List[int]) -> Dict:
+        return {"source_id": source_ids[0]} if len(source_ids) == 1 else {"source_id": {"$in": source_ids}}
+
+    def stored_chunks(self, source_ids: List[int]) -> Dict[int, Dict[str, List[str]]]:
+        """{source_id: {content_hash: [chunk ids]}} for what is indexed under these sources.
+        Chunks indexed before content hashes were recorded are hashed from their text."""
+        if not source_ids:
+            return {}
+        results = self.collection.get(where=self._source_filter(source_ids), include=["metadatas"])
+        unhashed = [id_ for id_, meta in zip(results["ids"], results["metadatas"]) if "content_hash" not in meta]
+        legacy = {}
+        if unhashed:
+            docs = self.collection.get(ids=unhashed, include=["documents"])
+            legacy = {id_: Indexer.chunk_hash(doc) for id_, doc in zip(docs["ids"], docs["documents"])}
+
+        stored: Dict[int, Dict[str, List[str]]] = {}
+        for id_, meta in zip(results["ids"], results["metadatas"]):
+            h = meta.get("content_hash") or legacy.get(id_)
+            if h:
+                stored.setdefault(meta["source_id"], {}).setdefault(h, []).append(id_)
+        return stored
+
+    def sync_documents(
+        self,
+        documents: List[str],
+        embeddings: Union[np.ndarray, List[List[float]]],
+        metadatas: List[Dict],
+        ids: List[str],
+        source_ids: Optional[List[int]] = None,
+    ) -> Dict:
+        """Make the chunks stored for source_ids exactly these chunks.
+
+        New ids are added; ids already stored keep their vectors and only get
+        their metadata (chunk_index, title, ...) rewritten when it changed; stored
+        chunks missing from the new set are deleted. Pairs with
+        Indexer.prepare_documents(stored=...), which leaves reused rows NaN.
+        """
+        source_ids = sorted(set(source_ids or []) | {m["source_id"] for m in metadatas})
+        if not source_ids:
+            return {"added": 0, "kept": 0, "updated": 0, "deleted": 0}
+        current = self.collection.get(where=self._source_filter(source_ids), include=["metadatas"])
+        current_meta = dict(zip(current["ids"], current["metadatas"]))
+
+        new_idx = [i for i, id_ in enumerate(ids) if id_ not in current_meta]
+        if new_idx:
+            vectors = np.asarray(embeddings, dtype=np.float32)[new_idx]
+            if np.isnan(vectors).any():
+                # a chunk planned as reused was deleted in the meantime; re-plan
+                raise RuntimeError("Stored chunks changed during sync, retry")
+            self.db.add_chunk_text(self._text_rows(
+                [documents[i] for i in new_idx], [metadatas[i] for i in new_idx], [ids[i] for i in new_idx],
+            ))
+            new = dict(
+                documents=[documents[i] for i in new_idx],
+                embeddings=vectors,
+                metadatas=[metadatas[i] for i in new_idx],
+                ids=[ids[i] for i in new_idx],
+            )
+            self.collection.add(**new)
+            self._mirror_upsert(**new)
+
+        changed = [i for i, id_ in enumerate(ids) if id_ in current_meta and current_meta[id_] != metadatas[i]]
+        if changed:
+            update = dict(ids=[ids[i] for i in changed], metadatas=[metadatas[i] for i in changed])
+            self.collection.update(**update)
+            for subindex, keep in self._member_subindexes(update["metadatas"]):
+                subindex.update(ids=[update["ids"][i] for i in keep], metadatas=[update["metadatas"][i] for i in keep])
+
+        # delete last, so a concurrent search never sees the source half-empty
+        vanished = list(current_meta.keys() - set(ids))
+        if vanished:
+            self.collection.delete(ids=vanished)
+            for subindex, keep in self._member_subindexes([current_meta[id_] for id_ in vanished]):
+                subindex.delete(ids=[vanished[i] for i in keep])
+            self.db.delete_chunk_text(vanished)
+        if new_idx or changed or vanished:
+            bump_version(INDEX_VERSION)
+        return {
+            "added": len(new_idx),
+            "kept": len(ids) - len(new_idx),
+            "updated": len(changed),
+            "deleted": len(vanished),
+        }
 
     def search(
         self,
@@ -50,8 +236,11 @@ class Retriever:
         n_results: int = 5,
         collection_source_ids: Optional[List[int]] = None,
         use_hyde: bool = False,
+        mode: str = "dense",
+        collection_id: Optional[int] = None,
     ) -> Dict:
-        count = self.collection.count()
+        collection, collection_source_ids = self._scope(collection_id, collection_source_ids)
+        count = collection.count()
         if count == 0:
             return {"documents": [], "metadatas": [], "distances": []}
         if collection_source_ids is not None and not collection_source_ids:
@@ -60,10 +249,136 @@ class Retriever:
         if use_hyde:
             query_embedding = self._hyde_embedding(query)
         else:
+            query_embedding = self._encode_query(query)
+
+        if mode != "hybrid":
+            return self._query_collection(query_embedding, min(n_results, count), collection_source_ids, collection)
+        k = min(max(n_results, HYBRID_CANDIDATES), count)
+        dense = self._query_collection(query_embedding, k, collection_source_ids, collection)
+        lexical = self.db.search_chunk_text(query_terms(query), k, collection_source_ids, collection_id)
+        return self._fuse(dense, lexical, n_results)
+
+    async def asearch(
+        self,
+        query: str,
+        n_results: int = 5,
+        collection_source_ids: Optional[List[int]] = None,
+        use_hyde: bool = False,
+        mode: str = "dense",
+        collection_id: Optional[int] = None,
+    ) -> Dict:
+        """Async variant of search: the query embedding is awaited from the batched
+        embedder, Chroma calls run on the default thread pool, HyDE uses ainvoke.
+        mode="hybrid" runs the keyword search alongside and fuses both rankings;
+        collection_id searches that collection's sub-index instead of the whole index."""
+        collection, collection_source_ids = await run_in_threadpool(self._scope, collection_id, collection_source_ids)
+        count = await run_in_threadpool(collection.count)
+        if count == 0:
+            return {"documents": [], "metadatas": [], "distances": []}
+        if collection_source_ids is not None and not collection_source_ids:
+            return {"documents": [], "metadatas": [], "distances": []}
+
+        async def dense(n: int) -> Dict:
+            if use_hyde:
+                query_embedding = await self._ahyde_embedding(query)
+            else:
+                query_embedding = await self._aencode_query(query)
+            return await run_in_threadpool(self._query_collection, query_embedding, n, collection_source_ids, collection)
+
+        if mode != "hybrid":
+            return await dense(min(n_results, count))
+        k = min(max(n_results, HYBRID_CANDIDATES), count)
+        dense_results, lexical = await asyncio.gather(
+            dense(k),
+            run_in_threadpool(self.db.search_chunk_text, query_terms(query), k, collection_source_ids, collection_id),
+        )
+        return await run_in_threadpool(self._fuse, dense_results, lexical, n_results)
+
+    def _fuse(self, dense: Dict, lexical_ids: List[str], n: int) -> Dict:
+        """Reciprocal-rank fusion of dense hits and keyword hits, top n."""
+        fused = reciprocal_rank_fusion([dense["ids"], lexical_ids])
+        hits = {
+            id_: (doc, meta, dist)
+            for id_, doc, meta, dist in zip(dense["ids"], dense["documents"], dense["metadatas"], dense["distances"])
+        }
+        keyword_only = [id_ for id_, _ in fused if id_ not in hits]
+        if keyword_only:
+            extra = self.collection.get(ids=keyword_only, include=["documents", "metadatas"])
+            hits.update({id_: (doc, meta, None) for id_, doc, meta in zip(extra["ids"], extra["documents"], extra["metadatas"])})
+
+        # ids Chroma doesn't know (a write still in flight) are skipped
+        top = [(id_, score) for id_, score in fused if id_ in hits][:n]
+        return {
+            "ids": [id_ for id_, _ in top],
+            "documents": [hits[id_][0] for id_, _ in top],
+            "metadatas": [hits[id_][1] for id_, _ in top],
+            "distances": [hits[id_][2] for id_, _ in top],
+            "scores": [score for _, score in top],
+        }
+
+    def _encode_query(self, query: str) -> List[List[float]]:
+        key = _query_cache_key(query)
+        embedding = _query_cache.get(key)
+        if embedding is None:
+            embedding = self._query_cache_l2(key)
+        if embedding is None:
             # multilingual-e5: queries must use "query: " prefix
-            query_embedding = self.model.encode([f"query: {query}"]).tolist()
+            embedding = self.model.encode([f"query: {query}"])[0]
+            _query_cache.set(key, embedding)
+            if QUERY_EMBED_CACHE_REDIS:
+                set_array(key, embedding, QUERY_EMBED_CACHE_TTL)
+        return [embedding.tolist()]
+
+    async def _aencode_query(self, query: str) -> List[List[float]]:
+        return [(await self.aembed_query(query)).tolist()]
+
+    async def aembed_query(self, query: str) -> np.ndarray:
+        """Cached e5 query embedding as a 1-D array (shared with the semantic answer cache)."""
+        key = _query_cache_key(query)
+        embedding = _query_cache.get(key)
+        if embedding is None and QUERY_EMBED_CACHE_REDIS:
+            embedding = self.seed_query_embedding(query, await aget_array(key))
+        if embedding is None:
+            embedding = (await self.model.aencode([f"query: {query}"]))[0]
+            _query_cache.set(key, embedding)
+            if QUERY_EMBED_CACHE_REDIS:
+                await aset_array(key, embedding, QUERY_EMBED_CACHE_TTL)
+        return embedding
 
-        n = min(n_results, count)
+    @staticmethod
+    def query_cache_key(query: str) -> Optional[str]:
+        """Redis key of the query's embedding, for handlers that fold the lookup
+        into their own round trip (redis_cache.afetch) and hand the result to
+        seed_query_embedding. None when the embedding is already in process."""
+        key = _query_cache_key(query)
+        return key if QUERY_EMBED_CACHE_REDIS and key not in _query_cache else None
+
+    @staticmethod
+    def seed_query_embedding(query: str, embedding: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        global _query_cache_l2_hits
+        if embedding is not None:
+            _query_cache_l2_hits += 1
+            _query_cache.set(_query_cache_key(query), embedding)
+        return embedding
+
+    @staticmethod
+    def _query_cache_l2(key: str) -> Optional[np.ndarray]:
+        global _query_cache_l2_hits
+        if not QUERY_EMBED_CACHE_REDIS:
+            return None
+        embedding = get_array(key)
+        if embedding is not None:
+            _query_cache_l2_hits += 1
+            _query_cache.set(key, embedding)
+        return embedding
+
+    def _query_collection(
+        self,
+        query_embedding: List[List[float]],
+        n: int,
+        collection_source_ids: Optional[List[int]] = None,
+        collection: Optional[chromadb.Collection] = None,
+    ) -> Dict:
         kwargs: Dict = dict(
             query_embeddings=query_embedding,
             n_results=n,
@@ -72,8 +387,26 @@ class Retriever:
         if collection_source_ids is not None:
             kwargs["where"] = {"source_id": {"$in": collection_source_ids}}
 
-        results = self.collection.query(**kwargs)
+        collection = collection or self.collection
+        matched = None
+        while True:
+            try:
+                results = collection.query(**kwargs)
+                break
+            except RuntimeError:
+                # a filtered HNSW query can't fill n results when fewer chunks (or
+                # too few reachable ones, after deletes) match: ask for fewer
+                if "where" not in kwargs or kwargs["n_results"] <= 1:
+                    raise
+                if matched is None:
+                    matched = len(collection.get(where=kwargs["where"], include=[])["ids"])
+                    if matched == 0:
+                        return {"ids": [], "documents": [], "metadatas": [], "distances": []}
+                    kwargs["n_results"] = min(kwargs["n_results"] - 1, matched)
+                else:
+                    kwargs["n_results"] //= 2
         return {
+            "ids": results["ids"][0] if results["ids"] else [],
             "documents": results["documents"][0] if results["documents"] else [],
             "metadatas": results["metadatas"][0] if results["metadatas"] else [],
             "distances": results["distances"][0] if results["distances"] else [],
@@ -92,6 +425,8 @@ class Retriever:
                 "chunk_index": meta.get("chunk_index", i),
                 "total_chunks": meta.get("total_chunks", len(results["documents"])),
                 "lang": meta.get("lang", "en"),
+                "page": meta.get("page", 0),
+                "section": meta.get("section", ""),
             })
         chunks.sort(key=lambda x: x["chunk_index"])
         return chunks
@@ -116,27 +451,23 @@ class Retriever:
     def _hyde_embedding(self, query: str) -> List[List[float]]:
         """HyDE: average embeddings of query and LLM-generated hypothetical answer.
         Hypothetical answer is generated in the detected query language."""
-        from rag.lang import detect_language, lang_name
-        lang = detect_language(query)
-        lang_display = lang_name(lang)
         try:
-            from langchain_google_genai import ChatGoogleGenerativeAI
-            llm = ChatGoogleGenerativeAI(
-                model="gemini-1.5-flash",
-                google_api_key=os.getenv("GEMINI_API_KEY", ""),
-                temperature=0.1,
-                max_tokens=150,
-            )
-            prompt = (
-                f"Write a concise technical answer (2-3 sentences) in {lang_display} to: {query}"
-            )
-            hyp = llm.invoke(prompt).content.strip()
-            orig_emb = self.model.encode([f"query: {query}"])[0]
-            hyp_emb = self.model.encode([f"passage: {hyp}"])[0]
-            combined = ((orig_emb + hyp_emb) / 2).tolist()
-            return [combined]
+            hyp = _hyde_llm().invoke(_hyde_prompt(query)).content.strip()
+            return self._combine_hyde(query, hyp)
+        except Exception:
+            return self._encode_query(query)
+
+    async def _ahyde_embedding(self, query: str) -> List[List[float]]:
+        try:
+            hyp = (await _hyde_llm().ainvoke(_hyde_prompt(query))).content.strip()
+            orig_emb, hyp_emb = await self.model.aencode([f"query: {query}", f"passage: {hyp}"])
+            return [((orig_emb + hyp_emb) / 2).tolist()]
         except Exception:
-            return self.model.encode([f"query: {query}"]).tolist()
+            return await self._aencode_query(query)
+
+    def _combine_hyde(self, query: str, hyp: str) -> List[List[float]]:
+        orig_emb, hyp_emb = self.model.encode([f"query: {query}", f"passage: {hyp}"])
+        return [((orig_emb + hyp_emb) / 2).tolist()]
 
     def delete_by_source(self, source_id: int):
         results = self.collection.get(
@@ -145,60 +476,198 @@ class Retriever:
         )
         if results["ids"]:
             self.collection.delete(ids=results["ids"])
+            for collection_id in self.db.get_source_collections([source_id]).get(source_id, []):
+                subindex = self._subindex(collection_id)
+                if subindex is not None:
+                    subindex.delete(where={"source_id": source_id})
+        self.db.delete_source_chunk_text(source_id)
+        if results["ids"]:
+            bump_version(INDEX_VERSION)
 
     def count(self) -> int:
         return self.collection.count()
 
-    def migrate_from_v1(self) -> int:
-        """Re-embed all content from the legacy all-MiniLM collection into this one.
-        Returns number of chunks migrated. Safe to call multiple times."""
+    # ── Collection sub-indexes ────────────────────────────────────────────────
+
+    def _scope(self, collection_id: Optional[int],
+               source_ids: Optional[List[int]]) -> Tuple[chromadb.Collection, Optional[List[int]]]:
+        """(Chroma collection, source filter) a search runs against. A collection
+        without a sub-index yet (members added before sub-indexes existed, and
+        rebuild_collection_indexes hasn't run) is searched on the main index,
+        filtered to its members."""
+        if collection_id is None:
+            return self.collection, source_ids
+        subindex = self._subindex(collection_id)
+        if subindex is not None:
+            return subindex, source_ids
+        members = self.db.get_collection_source_ids(collection_id)
+        if source_ids is not None:
+            allowed = set(source_ids)
+            members = [sid for sid in members if sid in allowed]
+        return self.collection, members
+
+    def _subindex(self, collection_id: int, create: bool = False) -> Optional[chromadb.Collection]:
+        """The collection's sub-index; None if it has none yet (unless create)."""
+        subindex = self._subindexes.get(collection_id)
+        if subindex is not None:
+            return subindex
+        if create:
+            subindex = self.client.get_or_create_collection(
+                name=subindex_name(collection_id), metadata={"hnsw:space": "cosine"},
+            )
+        else:
+            try:
+                subindex = self.client.get_collection(subindex_name(collection_id))
+            except Exception:
+                return None
+        self._subindexes[collection_id] = subindex
+        return subindex
+
+    def _member_subindexes(self, metadatas: List[Dict]) -> List[Tuple[chromadb.Collection, List[int]]]:
+        """[(sub-index, positions of the chunks whose source is a member)] for
+        every collection the chunks' sources belong to."""
+        memberships = self.db.get_source_collections(list({m.get("source_id") for m in metadatas}))
+        positions: Dict[int, List[int]] = {}
+        for i, meta in enumerate(metadatas):
+            for collection_id in memberships.get(meta.get("source_id"), []):
+                positions.setdefault(collection_id, []).append(i)
+        return [(self._subindex(cid, create=True), keep) for cid, keep in positions.items()]
+
+    def _mirror_upsert(self, ids: List[str], documents: List[str], embeddings: np.ndarray,
+                       metadatas: List[Dict]) -> None:
+        """Copy newly written chunks into the sub-indexes of their sources' collections."""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        for subindex, keep in self._member_subindexes(metadatas):
+            subindex.upsert(
+                ids=[ids[i] for i in keep], documents=[documents[i] for i in keep],
+                embeddings=embeddings[keep], metadatas=[metadatas[i] for i in keep],
+            )
+
+    def _copy_sources(self, source_ids: List[int], collection_id: int,
+                      page_size: int = SUBINDEX_PAGE_SIZE) -> int:
+        """Upsert the sources' chunks, vectors included, into the collection's sub-index."""
+        subindex = self._subindex(collection_id, create=True)
+        copied = 0
+        for start in range(0, len(source_ids), page_size):
+            chunks = self.collection.get(
+                where=self._source_filter(source_ids[start:start + page_size]),
+                include=["documents", "embeddings", "metadatas"],
+            )
+            for offset in range(0, len(chunks["ids"]), page_size):
+                page = slice(offset, offset + page_size)
+                subindex.upsert(
+                    ids=chunks["ids"][page], documents=chunks["documents"][page],
+                    embeddings=chunks["embeddings"][page], metadatas=chunks["metadatas"][page],
+                )
+            copied += len(chunks["ids"])
+        return copied
+
+    def add_to_collection(self, source_id: int, collection_id: int) -> None:
+        self.db.add_source_to_collection(source_id, collection_id)
+        self._copy_sources([source_id], collection_id)
+        bump_version(collection_version(collection_id))
+
+    def remove_from_collection(self, source_id: int, collection_id: int) -> None:
+        self.db.remove_source_from_collection(source_id, collection_id)
+        subindex = self._subindex(collection_id)
+        if subindex is not None:
+            subindex.delete(where={"source_id": source_id})
+        bump_version(collection_version(collection_id))
+
+    def delete_collection(self, collection_id: int) -> None:
+        self.db.delete_collection(collection_id)
+        self._subindexes.pop(collection_id, None)
+        try:
+            self.client.delete_collection(subindex_name(collection_id))
+        except Exception:
+            pass  # never had a member
+        bump_version(collection_version(collection_id))
+
+    def rebuild_collection_indexes(self, progress: Optional[Callable[[int, int], None]] = None) -> int:
+        """Backfill every collection's sub-index from source_collections (collections
+        created before sub-indexes existed, or a write that raced a membership
+        change). Upserts, so it is safe to rerun. Returns the chunks copied."""
+        memberships = self.db.get_memberships()
+        copied = 0
+        for done, (collection_id, source_ids) in enumerate(memberships.items(), 1):
+            copied += self._copy_sources(source_ids, collection_id)
+            bump_version(collection_version(collection_id))
+            if progress:
+                progress(done, len(memberships))
+        return copied
+
+    def rebuild_lexical_index(self, progress: Optional[Callable[[int, int], None]] = None,
+                              page_size: int = MIGRATE_PAGE_SIZE) -> int:
+        """Backfill chunk_text from the Chroma collection (chunks indexed before the
+        keyword index existed). Upserts, so it is safe to rerun."""
+        total = self.collection.count()
+        done = 0
+        for offset in range(0, total, page_size):
+            page = self.collection.get(limit=page_size, offset=offset, include=["documents", "metadatas"])
+            if not page["ids"]:
+                break
+            self.db.add_chunk_text(self._text_rows(page["documents"], page["metadatas"], page["ids"]))
+            done += len(page["ids"])
+            if progress:
+                progress(done, total)
+        return done
+
+    def migrate_from_v1(
+        self,
+        start: int = 0,
+        progress: Optional[Callable[[int, int], None]] = None,
+        page_size: int = MIGRATE_PAGE_SIZE,
+    ) -> int:
+        """Re-embed the legacy all-MiniLM collection into this one, a page at a time.
+
+        Legacy ids are upserted, so a rerun never duplicates chunks and content
+        indexed into v2 meanwhile is left alone. Page N+1 is read and encoded while
+        page N is written; at most two pages are in memory. progress(done, total)
+        runs after each page is written — done is the offset to resume from via
+        start. Returns the number of legacy chunks migrated so far.
+        """
         try:
             legacy = self.client.get_collection(LEGACY_COLLECTION_NAME)
         except Exception:
             return 0  # no legacy collection — nothing to migrate
 
         total = legacy.count()
-        if total == 0:
-            return 0
-
-        # Fetch all docs from legacy collection
-        results = legacy.get(include=["documents", "metadatas"])
-        docs = results["documents"]
-        metas = results["metadatas"]
-        ids = results["ids"]
-
-        if not docs:
-            return 0
-
-        # Clear v2 collection to avoid duplicates from partial previous migrations
-        existing_ids = self.collection.get()["ids"]
-        if existing_ids:
-            self.collection.delete(ids=existing_ids)
-
-        # Re-embed in batches with multilingual-e5 passage prefix
-        batch_size = 64
-        migrated = 0
-        for i in range(0, len(docs), batch_size):
-            batch_docs = docs[i:i + batch_size]
-            batch_metas = metas[i:i + batch_size]
-            batch_ids = ids[i:i + batch_size]
-
-            prefixed = [f"passage: {doc}" for doc in batch_docs]
-            new_embeddings = self.model.encode(
-                prefixed, batch_size=32, show_progress_bar=False,
-            ).tolist()
-
-            # Add detected language to metadata if missing
-            for meta in batch_metas:
-                if "lang" not in meta:
-                    meta["lang"] = "en"
-
-            self.collection.add(
-                documents=batch_docs,
-                embeddings=new_embeddings,
-                metadatas=batch_metas,
-                ids=batch_ids,
-            )
-            migrated += len(batch_docs)
+        done = min(start, total)
+        if done >= total:
+            return done
+
+        indexer = Indexer()
+        writing: Optional[Future] = None
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="migrate-write") as writer:
+            for offset in range(done, total, page_size):
+                page = legacy.get(limit=page_size, offset=offset, include=["documents", "metadatas"])
+                if not page["ids"]:
+                    break
+                docs = page["documents"]
+                metas = [dict(meta or {}) for meta in page["metadatas"]]
+                for doc, meta in zip(docs, metas):
+                    meta.setdefault("lang", "en")
+                    meta["content_hash"] = Indexer.chunk_hash(doc)
+                # multilingual-e5 passage prefix; goes through the embedding store,
+                # so pages already encoded by an interrupted run cost no inference
+                embeddings = indexer.generate_embeddings([f"passage: {doc}" for doc in docs])
+
+                if writing is not None:
+                    done = writing.result()
+                    if progress:
+                        progress(done, total)
+                writing = writer.submit(self._upsert_page, page["ids"], docs, embeddings, metas, offset + len(docs))
+
+            if writing is not None:
+                done = writing.result()
+                if progress:
+                    progress(done, total)
+        return done
 
-        return migrated
+    def _upsert_page(self, ids: List[str], docs: List[str], embeddings: np.ndarray,
+                     metas: List[Dict], done_after: int) -> int:
+        self.db.add_chunk_text(self._text_rows(docs, metas, ids))
+        self.collection.upsert(ids=ids, documents=docs, embeddings=embeddings, metadatas=metas)
+        self._mirror_upsert(ids, docs, embeddings, metas)
+        bump_version(INDEX_VERSION)
+        return done_after
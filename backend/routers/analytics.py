@@ -1,22 +1,51 @@
 from fastapi import APIRouter
-from database.db import Database
+from starlette.concurrency import run_in_threadpool
+from services import get_services
 
 router = APIRouter(prefix="/api/analytics", tags=["analytics"])
-db = Database()
-
-_retriever = None
+db = get_services().db
 
 
 def _get_retriever():
-    global _retriever
-    if _retriever is None:
-        from rag.retriever import Retriever
-        _retriever = Retriever()
-    return _retriever
+    return get_services().get("retriever")
 
 
 @router.get("")
 async def get_analytics():
+    return await run_in_threadpool(_analytics)
+
+
+def _analytics() -> dict:
     data = db.get_analytics()
-    data["chromadb_count"] = _get_retriever().count()
+    retriever = get_services().get_if_warm("retriever")  # not gated: never waits on warm-up
+    data["chromadb_count"] = retriever.count() if retriever else None
     return data
+
+
+@router.get("/runtime")
+async def get_runtime_stats():
+    """In-process cache and inference counters for this worker."""
+    from rag.indexer import get_embedding_model, EMBEDDING_MODEL_NAME
+    from rag.embedding_store import get_embedding_store
+    from rag.retriever import query_embedding_cache_stats
+    from rag.reranker import reranker_stats
+    from rag.onnx_backend import INFERENCE_BACKEND, model_variant
+    from cache.semantic_cache import semantic_cache
+    from cache.redis_cache import redis_stats
+    from cache.tiered_cache import answer_cache
+    from connectors.extraction import extraction_stats
+    from connectors.web_search import web_search_stats
+    model = get_embedding_model()
+    store = get_embedding_store(model_variant(EMBEDDING_MODEL_NAME), model.get_sentence_embedding_dimension())
+    return {
+        "query_embedding_cache": query_embedding_cache_stats(),
+        "answer_cache": answer_cache.stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "embedder": model.stats(),
+        "embedding_store": store.stats() if store else None,
+        "reranker": reranker_stats(),
+        "inference_backend": INFERENCE_BACKEND,
+        "redis": redis_stats(),
+        "extraction": extraction_stats(),
+        "web_search": web_search_stats(),
+    }
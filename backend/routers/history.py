@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Query
-from database.db import Database
+from starlette.concurrency import run_in_threadpool
+from services import get_services
 
 router = APIRouter(prefix="/api/history", tags=["history"])
-db = Database()
+db = get_services().db
 
 
 @router.get("")
 async def get_history(limit: int = Query(default=50, ge=1, le=200)):
-    return {"history": db.get_search_history(limit)}
+    return {"history": await run_in_threadpool(db.get_search_history, limit)}
@@ -0,0 +1,101 @@
+import os
+import json
+import asyncio
+from typing import List, Optional, Tuple
+from fastapi import APIRouter, File, Form, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from loguru import logger
+
+from connectors.archive import is_archive
+from jobs.queue import JobQueue
+from jobs.spool import cleanup, spool_upload
+from models.schemas import UploadResponse
+from services import get_services
+
+router = APIRouter(prefix="/api/ingest", tags=["ingest"])
+
+INGEST_MAX_BYTES = int(os.getenv("INGEST_MAX_BYTES", str(1024 * 1024 * 1024)))  # 1 GB per request
+PROGRESS_INTERVAL = float(os.getenv("INGEST_PROGRESS_INTERVAL", "1.0"))
+
+def _get_db():
+    return get_services().db
+
+
+def _progress(job: dict, files: List[dict]) -> dict:
+    counts = {"pending": 0, "indexing": 0, "completed": 0, "failed": 0}
+    for f in files:
+        counts[f["status"]] = counts.get(f["status"], 0) + 1
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "total": len(files),
+        **counts,
+        "chunks": sum(f["chunks"] or 0 for f in files),
+        "error": job.get("error"),
+    }
+
+
+@router.post("/bulk", response_model=UploadResponse)
+async def bulk_ingest(
+    files: List[UploadFile] = File(...),
+    collection_id: Optional[int] = Form(None),
+):
+    """Queue a batch of files and/or ZIP/tar archives; track it via /api/ingest/{job_id}[/events]."""
+    spooled: List[Tuple[str, str]] = []
+    budget = INGEST_MAX_BYTES
+    try:
+        for upload in files:
+            path, size = await spool_upload(upload, budget)
+            spooled.append((path, upload.filename or "upload"))
+            budget -= size
+    except BaseException:
+        await run_in_threadpool(cleanup, [path for path, _ in spooled])
+        raise
+
+    names = [name for _, name in spooled]
+    label = names[0] if len(names) == 1 else f"{len(names)} uploads"
+    job_id = await run_in_threadpool(
+        JobQueue(_get_db()).enqueue, "bulk", label, uploads=spooled, collection_id=collection_id,
+    )
+    archives = sum(1 for name in names if is_archive(name))
+    logger.info(f"Bulk ingest queued: {len(names)} uploads ({archives} archives) → job {job_id}")
+    return UploadResponse(success=True, message=f"Bulk ingest queued: {label}", job_id=job_id)
+
+
+@router.get("/{job_id}")
+async def bulk_status(job_id: str):
+    job = await run_in_threadpool(_get_db().get_job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    files = await run_in_threadpool(_get_db().get_child_jobs, job_id)
+    return {**_progress(job, files), "files": files}
+
+
+@router.get("/{job_id}/events")
+async def bulk_events(job_id: str):
+    """SSE: a progress summary plus the files whose status changed, until the job finishes."""
+    if not await run_in_threadpool(_get_db().get_job, job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        seen, first = {}, True
+        while True:
+            job = await run_in_threadpool(_get_db().get_job, job_id)
+            files = await run_in_threadpool(_get_db().get_child_jobs, job_id)
+            changed = [f for f in files if seen.get(f["id"]) != (f["status"], f["chunks"])]
+            seen.update({f["id"]: (f["status"], f["chunks"]) for f in changed})
+            finished = job["status"] in ("completed", "failed")
+            if changed or finished or first:
+                first = False
+                yield f"data: {json.dumps({**_progress(job, files), 'files': changed}, default=str)}\n\n"
+            if finished:
+                break
+            await asyncio.sleep(PROGRESS_INTERVAL)
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
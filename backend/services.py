@@ -0,0 +1,220 @@
+import os
+import time
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+from loguru import logger
+
+# How the API process loads its models:
+#   background — bind immediately, load + warm every component on a thread (default)
+#   eager      — load + warm during startup, before the first connection is accepted
+#   lazy       — load each component on first use, no warm-up pass
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "background").lower()
+# Seconds a request that needs the models waits for warm-up before getting a 503
+READY_WAIT_TIMEOUT = float(os.getenv("READY_WAIT_TIMEOUT", "60"))
+
+
+class Component:
+    """One lazily created service plus its load/warm-up timings. get() is thread-safe:
+    callers racing the warm-up thread wait for it instead of loading a second copy."""
+
+    def __init__(self, name: str, factory: Callable[[], Any], warmup: Optional[Callable[[Any], None]] = None):
+        self.name = name
+        self.factory = factory
+        self.warmup = warmup
+        self.state = "pending"
+        self.load_seconds: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self._instance = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not None
+
+    def get(self) -> Any:
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self.state = "loading"
+                    start = time.perf_counter()
+                    try:
+                        instance = self.factory()
+                    except Exception as e:
+                        self.state, self.error = "failed", f"{type(e).__name__}: {e}"
+                        raise
+                    self.load_seconds = round(time.perf_counter() - start, 3)
+                    self._instance = instance
+                    self.state = "loaded"
+        return self._instance
+
+    def warm(self):
+        instance = self.get()
+        if self.warmup is not None and self.warmup_seconds is None:
+            start = time.perf_counter()
+            self.warmup(instance)
+            self.warmup_seconds = round(time.perf_counter() - start, 3)
+        self.state = "ready"
+
+    def status(self) -> Dict:
+        return {"state": self.state, "load_seconds": self.load_seconds,
+                "warmup_seconds": self.warmup_seconds, "error": self.error}
+
+
+class LazyService:
+    """Stand-in for a module-level service (main.retriever, main.reranker, ...):
+    attribute reads and writes go to the component, loading it on first touch."""
+
+    def __init__(self, component: Component):
+        object.__setattr__(self, "_component", component)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._component.get(), name)
+
+    def __setattr__(self, name: str, value: Any):
+        setattr(self._component.get(), name, value)
+
+
+class AppServices:
+    """Models and clients for the API process, created on first use or by a
+    background warm-up that runs a real inference pass through each model."""
+
+    def __init__(self, db, mode: str = STARTUP_WARMUP):
+        self.db = db
+        self.mode = mode
+        self.components: Dict[str, Component] = {}
+        self._warm_future: Optional[Future] = None
+        self._warm_lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.ready_seconds: Optional[float] = None
+
+    def register(self, name: str, factory: Callable[[], Any], warmup: Optional[Callable[[Any], None]] = None):
+        self.components[name] = Component(name, factory, warmup)
+
+    def lazy(self, name: str) -> LazyService:
+        return LazyService(self.components[name])
+
+    def get(self, name: str) -> Any:
+        return self.components[name].get()
+
+    def get_if_warm(self, name: str) -> Optional[Any]:
+        """The component if using it won't wait on warm-up, else None: lets a
+        DB-only route skip its model-backed extras while the models load."""
+        component = self.components[name]
+        return component.get() if self.ready or component.loaded else None
+
+    def _warm_all(self):
+        for component in self.components.values():
+            try:
+                component.warm()
+            except Exception as e:
+                # get() retries on the next request; /ready reports the failure
+                component.state, component.error = "failed", f"{type(e).__name__}: {e}"
+                logger.error(f"Warm-up of {component.name} failed: {e}")
+        self.ready_seconds = round(time.perf_counter() - self.started, 3)
+        timings = ", ".join(f"{c.name}={c.load_seconds}s" for c in self.components.values())
+        logger.info(f"Services warm in {self.ready_seconds}s ({timings})")
+
+    def start_warmup(self) -> Future:
+        """Warm every component on a daemon thread (idempotent)."""
+        with self._warm_lock:
+            if self._warm_future is None:
+                self._warm_future = Future()
+
+                def run():
+                    try:
+                        self._warm_all()
+                    finally:
+                        self._warm_future.set_result(None)
+
+                threading.Thread(target=run, name="warmup", daemon=True).start()
+            return self._warm_future
+
+    @property
+    def ready(self) -> bool:
+        # lazy mode never warms up front: it serves at once and loads on first use
+        return self.mode == "lazy" or (self._warm_future is not None and self._warm_future.done())
+
+    async def wait_ready(self, timeout: float = READY_WAIT_TIMEOUT) -> bool:
+        """Wait (without blocking the loop) for warm-up to finish; False on timeout."""
+        if self.ready:
+            return True
+        future = asyncio.wrap_future(self.start_warmup())
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def status(self) -> Dict:
+        return {
+            "ready": self.ready and all(c.state != "failed" for c in self.components.values()),
+            "mode": self.mode,
+            "seconds_since_start": round(time.perf_counter() - self.started, 3),
+            "ready_seconds": self.ready_seconds,
+            "components": {name: c.status() for name, c in self.components.items()},
+        }
+
+
+def _warm_embedder(instance):
+    instance.model.encode(["query: warm up", "passage: warm up"])
+
+
+def _warm_retriever(retriever):
+    retriever.count()
+    _warm_embedder(retriever)
+
+
+def _warm_reranker(reranker):
+    reranker.model.predict([("warm up", "warm up")])
+
+
+def create_app_services(db) -> AppServices:
+    """The API's service registry. Heavy modules (torch, chromadb, LangChain) are
+    imported inside the factories so importing main.py stays cheap."""
+    services = AppServices(db)
+
+    def indexer():
+        from rag.indexer import Indexer
+        return Indexer()
+
+    def retriever():
+        from rag.retriever import Retriever
+        return Retriever(db)
+
+    def reranker():
+        from rag.reranker import Reranker
+        return Reranker()
+
+    def rag():
+        from rag.generator import GeminiRAG
+        return GeminiRAG()
+
+    def web_searcher():
+        from connectors.web_search import WebSearcher
+        return WebSearcher(services.db)
+
+    services.register("indexer", indexer, _warm_embedder)
+    services.register("retriever", retriever, _warm_retriever)
+    services.register("reranker", reranker, _warm_reranker)
+    services.register("rag", rag)
+    services.register("web_searcher", web_searcher)
+    return services
+
+
+_services: Optional[AppServices] = None
+_services_lock = threading.Lock()
+
+
+def get_services() -> AppServices:
+    """The process-wide container shared by REST routes, the chat SSE router,
+    GraphQL and inline workers — one Database, Chroma client and model set."""
+    global _services
+    if _services is None:
+        with _services_lock:
+            if _services is None:
+                from database.db import Database
+                _services = create_app_services(Database())
+    return _services
@@ -1,6 +1,6 @@
 """
 Test environment setup:
-  1. Isolated SQLite DB per test run (via DATABASE_URL env var).
+  1. Isolated SQLite DB, Chroma store and embedding store per test run (via env vars).
   2. Stub graphql_schema — avoids strawberry/pydantic version conflicts on local.
   3. Swap bcrypt → sha256_crypt in passlib to avoid bcrypt 4.x 72-byte limit issue.
 """
@@ -16,10 +16,13 @@ from passlib.context import CryptContext
 
 _tmp_db = os.path.join(tempfile.gettempdir(), f"devflow_test_{uuid.uuid4().hex[:8]}.db")
 os.environ["DATABASE_URL"] = f"sqlite:///{_tmp_db}"
+os.environ["EMBED_STORE_DIR"] = tempfile.mkdtemp(prefix="devflow_test_embeddings_")
+os.environ["CHROMA_PATH"] = tempfile.mkdtemp(prefix="devflow_test_chroma_")
 os.environ.setdefault("GEMINI_API_KEY", "dummy")
 os.environ.setdefault("JWT_SECRET_KEY", "test-secret-key-for-testing-only")
 os.environ.setdefault("REDIS_URL", "")  # disables Redis; cache falls back gracefully
 os.environ.setdefault("SENTRY_DSN", "")  # disable Sentry in tests
+os.environ.setdefault("STARTUP_WARMUP", "lazy")  # no warm-up thread racing the tests for the models
 
 # ── 2. Stub graphql ───────────────────────────────────────────────────────────
 
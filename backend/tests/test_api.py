@@ -231,7 +231,7 @@ def test_get_analytics_shape():
     r = client.get("/api/analytics")
     assert r.status_code == 200
     body = r.json()
-    for key in ("cache_hit_rate", "top_queries", "searches_by_day", "source_types", "model_usage"):
+    for key in ("cache_hit_rate", "semantic_cache_hit_rate", "top_queries", "searches_by_day", "source_types", "model_usage"):
         assert key in body, f"missing analytics key: {key}"
 
 
@@ -242,6 +242,16 @@ def test_analytics_cache_hit_rate_type():
     assert 0.0 <= rate <= 100.0
 
 
+def test_analytics_counts_semantic_hits():
+    from main import db
+    from database.db import CACHE_HIT_EXACT, CACHE_HIT_SEMANTIC
+    db.add_search(f"semantic {_run}", 3, cached=CACHE_HIT_SEMANTIC)
+    db.add_search(f"exact {_run}", 3, cached=CACHE_HIT_EXACT)
+    body = client.get("/api/analytics").json()
+    assert body["semantic_cache_hit_rate"] > 0
+    assert body["cache_hit_rate"] >= body["semantic_cache_hit_rate"]
+
+
 # ── Manual document index ─────────────────────────────────────────────────────
 
 def test_manual_index_queues():
@@ -254,3 +264,14 @@ def test_manual_index_queues():
     body = r.json()
     assert body["success"] is True
     assert "source_id" in body
+
+
+def test_analytics_runtime_shape():
+    r = client.get("/api/analytics/runtime")
+    assert r.status_code == 200
+    body = r.json()
+    for key in ("hits", "misses", "redis_hits", "hit_rate"):
+        assert key in body["query_embedding_cache"], f"missing query cache key: {key}"
+    assert "batches" in body["embedder"]
+    assert "rows" in body["embedding_store"] and "hit_rate" in body["embedding_store"]
+    assert "pairs_scored" in body["reranker"] and "early_exits" in body["reranker"]
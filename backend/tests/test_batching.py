@@ -0,0 +1,77 @@
+"""
+MicroBatcher tests — concurrent submits coalesce into one call, results fan back
+out in order, and a failing batch fails every request in it.
+"""
+import threading
+import pytest
+
+from rag.batching import MicroBatcher
+
+
+def _gated(fn, gate: threading.Event, entered: threading.Event):
+    def run(items):
+        entered.set()
+        gate.wait(5)
+        return fn(items)
+    return run
+
+
+def test_concurrent_submits_coalesce():
+    calls = []
+    gate, entered = threading.Event(), threading.Event()
+    batcher = MicroBatcher(_gated(lambda items: calls.append(list(items)) or [i * 2 for i in items], gate, entered),
+                           max_batch=16, max_wait_ms=50)
+
+    first = batcher.submit([0])        # occupies the worker until the gate opens
+    entered.wait(5)
+    futures = [batcher.submit([i, i + 100]) for i in range(1, 5)]
+    gate.set()
+
+    assert first.result(5) == [0]
+    assert [f.result(5) for f in futures] == [[i * 2, (i + 100) * 2] for i in range(1, 5)]
+    assert len(calls) == 2 and len(calls[1]) == 8
+    assert batcher.stats()["batches"] == 2
+
+
+def test_oversized_request_waits_for_next_batch():
+    gate, entered = threading.Event(), threading.Event()
+    batcher = MicroBatcher(_gated(lambda items: list(items), gate, entered), max_batch=4, max_wait_ms=50)
+
+    blocker = batcher.submit(["x"])
+    entered.wait(5)
+    small = batcher.submit([1, 2])
+    large = batcher.submit([3, 4, 5])
+    gate.set()
+
+    assert blocker.result(5) == ["x"]
+    assert small.result(5) == [1, 2]
+    assert large.result(5) == [3, 4, 5]
+    assert batcher.stats()["batches"] == 3
+
+
+def test_batch_error_propagates():
+    def boom(items):
+        raise RuntimeError("model failed")
+
+    batcher = MicroBatcher(boom, max_batch=8, max_wait_ms=1)
+    with pytest.raises(RuntimeError):
+        batcher.submit(["a"]).result(5)
+    assert batcher.submit([]).result(5) == []
+
+
+def test_stats_report_queue_depth_histogram_and_waits():
+    gate, entered = threading.Event(), threading.Event()
+    batcher = MicroBatcher(_gated(lambda items: list(items), gate, entered), max_batch=8, max_wait_ms=50)
+
+    blocker = batcher.submit(["x"])
+    entered.wait(5)
+    queued = [batcher.submit([i, i]) for i in range(3)]
+    assert batcher.stats()["queue_depth"] == 3
+    gate.set()
+    for f in [blocker] + queued:
+        f.result(5)
+
+    stats = batcher.stats()
+    assert stats["queue_depth"] == 0
+    assert stats["batch_size_histogram"] == {"<=1": 1, "<=8": 1}
+    assert stats["wait_ms_p95"] >= stats["wait_ms_p50"] > 0
@@ -0,0 +1,203 @@
+"""
+Cache tests — in-process LRU semantics, the query-embedding cache (keyed by
+inference backend as well as model), the semantic answer cache, and the two-tier answer cache (single-flight misses,
+stale-while-revalidate).
+"""
+import time
+import asyncio
+import numpy as np
+import pytest
+
+from cache.lru import LRUCache
+import rag.onnx_backend as onnx_backend
+from rag.retriever import Retriever, _query_cache_key, normalize_query, query_embedding_cache_stats
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1          # "a" is now most recent
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["hits"] == 3 and cache.stats()["misses"] == 1
+
+
+def test_lru_ttl_expiry():
+    cache = LRUCache(maxsize=4, ttl=0.05)
+    cache.set("k", "v")
+    assert cache.get("k") == "v"
+    time.sleep(0.06)
+    assert cache.get("k") is None
+    assert len(cache) == 0
+
+
+def test_normalize_query():
+    assert normalize_query("  How do I configure   CORS?? ") == "how do i configure cors"
+    assert normalize_query("How do I configure CORS") == normalize_query("how do i configure cors.")
+    assert normalize_query("What is C#") != normalize_query("What is C")
+
+
+def test_model_output_caches_key_on_the_backend(monkeypatch):
+    keys = set()
+    for backend, quantize in (("torch", True), ("onnx", True), ("onnx", False)):
+        monkeypatch.setattr(onnx_backend, "INFERENCE_BACKEND", backend)
+        monkeypatch.setattr(onnx_backend, "ONNX_QUANTIZE", quantize)
+        keys.add(_query_cache_key("how do I configure CORS"))
+    assert len(keys) == 3
+    assert onnx_backend.model_variant("m") == "m@onnx-fp32"
+
+
+def test_query_embedding_cache_skips_encoder():
+    retriever = Retriever()
+    calls = []
+    real_encode = retriever.model.encode
+
+    def counting_encode(texts, **kwargs):
+        calls.append(texts)
+        return real_encode(texts, **kwargs)
+
+    retriever.model = type("Spy", (), {"encode": staticmethod(counting_encode)})()
+    before = query_embedding_cache_stats()["hits"]
+
+    first = retriever._encode_query("How do I rotate the JWT secret?")
+    second = retriever._encode_query("how do i rotate the jwt secret")
+
+    assert first == second
+    assert len(calls) == 1
+    assert query_embedding_cache_stats()["hits"] == before + 1
+
+
+def test_semantic_cache_hits_near_duplicates_within_scope():
+    from cache.semantic_cache import SemanticCache
+    cache = SemanticCache(threshold=0.95, maxsize=8, ttl=60, enabled=True)
+    base = np.array([1.0, 0.0, 0.0])
+    cache.set("search:a", base, {"answer": "use CORSMiddleware"})
+
+    value, similarity = cache.get("search:a", base + [0.0, 0.05, 0.0])
+    assert value["answer"] == "use CORSMiddleware" and similarity > 0.95
+    assert cache.get("search:a", np.array([0.0, 1.0, 0.0])) is None   # unrelated query
+    assert cache.get("search:b", base) is None                       # different model/params
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_semantic_cache_ttl_and_eviction():
+    from cache.semantic_cache import SemanticCache
+    cache = SemanticCache(threshold=0.9, maxsize=2, ttl=60, enabled=True)
+    cache.set("s", [1.0, 0.0], {"answer": "x"})
+    cache.set("s", [0.0, 1.0], {"answer": "y"})
+    cache.set("s", [-1.0, 0.0], {"answer": "z"})   # evicts "x"
+    assert len(cache) == 2
+    assert cache.get("s", [1.0, 0.0]) is None
+    assert cache.get("s", [0.0, 1.0])[0]["answer"] == "y"
+
+    expiring = SemanticCache(threshold=0.9, maxsize=2, ttl=0.05, enabled=True)
+    expiring.set("s", [1.0, 0.0], {"answer": "x"})
+    time.sleep(0.06)
+    assert expiring.get("s", [1.0, 0.0]) is None
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _tiered(monkeypatch, **kwargs):
+    import cache.tiered_cache as tiered_cache
+    round_trips = []
+
+    async def afetch(*lookups):
+        round_trips.append(lookups)
+        return [None] * len(lookups)
+
+    async def aset_cached(key, value, ttl):
+        return False
+
+    monkeypatch.setattr(tiered_cache, "afetch", afetch)
+    monkeypatch.setattr(tiered_cache, "aset_cached", aset_cached)
+    return tiered_cache.TieredCache(maxsize=16, l1_ttl=300, **kwargs), round_trips
+
+
+def test_tiered_cache_coalesces_concurrent_misses(monkeypatch):
+    from cache.tiered_cache import COALESCED, COMPUTED, L1
+    cache, round_trips = _tiered(monkeypatch, ttl=60)
+    calls = []
+
+    async def compute(extras):
+        calls.append(extras)
+        await asyncio.sleep(0.05)
+        return {"answer": "one pipeline run"}, True
+
+    async def burst():
+        return await asyncio.gather(*[cache.get_or_compute("k", compute, ("array", "qemb")) for _ in range(20)])
+
+    results = asyncio.run(burst())
+    assert len(calls) == 1 and calls[0] == [None]
+    assert sorted(source for _, source in results) == [COALESCED] * 19 + [COMPUTED]
+    assert all(value == {"answer": "one pipeline run"} for value, _ in results)
+
+    value, source = asyncio.run(cache.get_or_compute("k", compute))
+    assert source == L1 and len(round_trips) == 20   # no Redis round trip for an in-process hit
+    value["cached"] = True                           # callers get copies
+    assert asyncio.run(cache.get_or_compute("k", compute))[0] == {"answer": "one pipeline run"}
+    assert cache.stats()["coalesced"] == 19 and cache.stats()["l1_hits"] == 2
+
+
+def test_tiered_cache_shares_errors_and_skips_uncacheable(monkeypatch):
+    cache, _ = _tiered(monkeypatch, ttl=60)
+
+    async def failing(extras):
+        await asyncio.sleep(0.01)
+        raise RuntimeError("LLM down")
+
+    async def burst():
+        return await asyncio.gather(*[cache.get_or_compute("k", failing) for _ in range(3)], return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in asyncio.run(burst()))
+
+    async def empty(extras):
+        return {"answer": "No relevant documents found."}, False
+
+    asyncio.run(cache.get_or_compute("k", empty))
+    assert "k" not in cache.l1 and cache.stats()["in_flight"] == 0
+
+
+def test_tiered_cache_stale_while_revalidate(monkeypatch):
+    from cache.tiered_cache import COMPUTED, L1, STALE
+    clock = _Clock()
+    cache, _ = _tiered(monkeypatch, ttl=10, stale_ttl=30, clock=clock)
+    answers = iter(["v1", "v2"])
+
+    async def compute(extras):
+        return {"answer": next(answers)}, True
+
+    async def scenario():
+        assert (await cache.get_or_compute("k", compute))[1] == COMPUTED
+        clock.now += 15                                  # past ttl, inside the stale window
+        value, source = await cache.get_or_compute("k", compute)
+        assert (value["answer"], source) == ("v1", STALE)
+        await asyncio.sleep(0)                           # let the background refresh run
+        await asyncio.sleep(0)
+        value, source = await cache.get_or_compute("k", compute)
+        assert (value["answer"], source) == ("v2", L1)
+
+    asyncio.run(scenario())
+    assert cache.stats()["refreshes"] == 1 and cache.stats()["stale_served"] == 1
+
+
+def test_tiered_cache_without_stale_window_recomputes(monkeypatch):
+    from cache.tiered_cache import COMPUTED
+    clock = _Clock()
+    cache, _ = _tiered(monkeypatch, ttl=10, clock=clock)
+    answers = iter(["v1", "v2"])
+
+    async def compute(extras):
+        return {"answer": next(answers)}, True
+
+    asyncio.run(cache.get_or_compute("k", compute))
+    clock.now += 11
+    assert asyncio.run(cache.get_or_compute("k", compute)) == ({"answer": "v2"}, COMPUTED)
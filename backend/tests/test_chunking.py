@@ -0,0 +1,63 @@
+"""
+Chunker tests — chunks stay within the embedder's token budget, break at
+headings, code fences and pages, record where they came from, and a stream of
+pages chunks the same as the joined text.
+"""
+from rag.chunking import PAGE_BREAK, Chunker, get_tokenizer
+from rag.indexer import EMBEDDING_MODEL_NAME
+
+tokenizer = get_tokenizer(EMBEDDING_MODEL_NAME)
+chunker = Chunker(tokenizer, max_tokens=64, overlap=8)
+
+DOC = """# Install
+
+Run pip install devflow, then copy the example env file.
+
+## Configure CORS
+
+Add the frontend origin to ALLOWED_ORIGINS and restart the API.
+
+```python
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=origins,
+)
+```
+"""
+
+
+def _tokens(text):
+    return len(tokenizer(text, add_special_tokens=False)["input_ids"])
+
+
+def test_headings_and_code_blocks_bound_chunks():
+    chunks = list(chunker.iter_chunks(DOC))
+    assert [c.section for c in chunks] == ["Install", "Configure CORS", "Configure CORS"]
+    assert chunks[0].text.startswith("# Install") and chunks[1].text.startswith("## Configure CORS")
+    assert chunks[2].text.startswith("```python") and chunks[2].text.endswith("```")  # the code block whole
+    for c in chunks:
+        assert DOC[c.start:c.end] == c.text and c.page == 0
+        assert c.tokens == _tokens(c.text) <= chunker.max_tokens
+
+
+def test_long_paragraph_is_windowed_within_the_budget():
+    text = " ".join(f"token{i}" for i in range(400))
+    chunks = list(chunker.iter_chunks(text))
+    assert len(chunks) > 2
+    assert all(_tokens(c.text) <= chunker.max_tokens for c in chunks)
+    assert chunks[0].text.startswith("token0 ") and chunks[-1].text.endswith("token399")
+    assert all(c.text.split()[0] in prev.text for prev, c in zip(chunks, chunks[1:]))   # windows overlap
+    assert all(text[c.start:c.end] == c.text for c in chunks)
+
+
+def test_pages_are_recorded_and_streamed_pages_match():
+    pages = ["First page about caching.", "", "Third page about workers.\n\nAnd a second paragraph."]
+    joined = PAGE_BREAK.join(pages)
+    chunks = list(chunker.iter_chunks(joined))
+    assert [c.page for c in chunks] == [1, 3]
+    assert all(joined[c.start:c.end] == c.text for c in chunks)
+    assert list(chunker.iter_chunks(iter(pages))) == chunks
+
+
+def test_budget_leaves_room_for_prefix_and_special_tokens():
+    assert Chunker(tokenizer, max_tokens=10_000).max_tokens <= tokenizer.model_max_length - 2
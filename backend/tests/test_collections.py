@@ -0,0 +1,77 @@
+"""
+Collection-scoped retrieval tests — a scoped search queries the collection's
+own sub-index, so it reaches every member however large the collection is, the
+sub-index follows membership changes, re-syncs and the backfill, and a
+collection without one is searched on the main index filtered to its members.
+"""
+import random
+import pytest
+
+from database.db import Database
+from rag.indexer import Indexer
+from rag.retriever import Retriever, subindex_name
+
+db = Database()
+indexer = Indexer()
+retriever = Retriever(db)
+
+
+def _index(sids, texts):
+    titles = [f"t{sid}" for sid in sids]
+    prepared = indexer.prepare_documents(texts, titles, titles, sids, "manual", stored=retriever.stored_chunks(sids))
+    retriever.sync_documents(*prepared, sids)
+
+
+@pytest.fixture
+def collection():
+    cid = db.create_collection(f"scoped-{random.randrange(10**6)}")
+    base = 900_000 + random.randrange(50_000)
+    sources = list(range(base, base + 52))
+    yield cid, sources
+    retriever.delete_collection(cid)
+    retriever.sync_documents([], [], [], [], sources)  # drops every chunk of these sources
+
+
+def _scoped_sources(cid, query="scoped retrieval member", n=10, mode="dense"):
+    results = retriever.search(query, n_results=n, collection_id=cid, mode=mode)
+    return {m["source_id"] for m in results["metadatas"]}
+
+
+def test_scoped_search_reaches_every_member_past_fifty(collection):
+    cid, sources = collection
+    members, outsider = sources[:51], sources[51]
+    _index(sources, [f"scoped retrieval member number {sid} token_member_{sid}" for sid in sources])
+    for sid in members:
+        retriever.add_to_collection(sid, cid)
+
+    assert len(db.get_collection_source_ids(cid)) == 51
+    assert _scoped_sources(cid, n=len(members)) == set(members)
+    last = members[-1]
+    assert _scoped_sources(cid, f"token_member_{last}", n=3, mode="hybrid") >= {last}
+    assert not db.search_chunk_text([f"token_member_{last}"], 5, collection_id=cid + 1)
+
+
+def test_subindex_follows_membership_and_resync(collection):
+    cid, sources = collection
+    a, b = sources[:2]
+    _index([a, b], ["scoped retrieval member a, first draft", "scoped retrieval member b"])
+    retriever.add_to_collection(a, cid)
+    retriever.add_to_collection(b, cid)
+
+    _index([a], ["scoped retrieval member a, second draft with new text"])  # re-sync reaches the sub-index
+    assert _scoped_sources(cid) == {a, b}
+
+    retriever.remove_from_collection(b, cid)
+    assert _scoped_sources(cid) == {a}
+
+    assert retriever._subindex(cid).count() == len(retriever.get_chunks_by_source(a))
+
+    retriever.client.delete_collection(subindex_name(cid))   # as if created before sub-indexes existed
+    retriever._subindexes.clear()
+    assert _scoped_sources(cid) == {a}                         # main index, filtered to members
+    assert _scoped_sources(cid, "scoped retrieval member a", mode="hybrid") == {a}
+    assert retriever.rebuild_collection_indexes() >= 1
+    assert _scoped_sources(cid) == {a}
+
+    retriever.delete_collection(cid)
+    assert _scoped_sources(cid) == set()
@@ -0,0 +1,152 @@
+"""
+Concurrency load test — /health latency must stay flat while searches are in flight,
+source routes run their DB and Chroma calls off the event loop, and SQLite reads
+don't queue behind writes.
+Every blocking stage of the search path (batched query encode, Chroma query,
+batched rerank) is replaced by a sync function that sleeps, and the LLM by a non-blocking sleep, so
+any stage that still ran on the event loop would stall the /health probes.
+"""
+import time
+import asyncio
+from types import SimpleNamespace
+import pytest
+import httpx
+import numpy as np
+
+import main
+from main import app
+
+STAGE_DELAY = 0.05
+LLM_DELAY = 0.5
+
+
+class _SlowChain:
+    async def ainvoke(self, inputs):
+        await asyncio.sleep(LLM_DELAY)
+        return "answer"
+
+
+class _SlowEmbedder:
+    def encode(self, texts, **kwargs):
+        time.sleep(STAGE_DELAY)
+        return np.zeros((len(texts), 8), dtype=np.float32)
+
+
+def _slow_query(query_embedding, n, collection_source_ids=None, collection=None):
+    time.sleep(STAGE_DELAY)
+    docs = [f"Document {i} about configuring CORS in FastAPI." for i in range(n)]
+    return {"documents": docs, "metadatas": [{"title": f"doc{i}"} for i in range(n)], "distances": [0.2] * n}
+
+
+class _SlowCrossEncoder:
+    def predict(self, pairs, **kwargs):
+        time.sleep(STAGE_DELAY)
+        return np.zeros(len(pairs), dtype=np.float32)
+
+
+def _p99(samples):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+
+async def _health_p99_with_inflight(client: httpx.AsyncClient, inflight: int) -> float:
+    searches = [
+        asyncio.create_task(client.post("/api/search", json={"query": f"cors question {inflight}-{i}"}))
+        for i in range(inflight)
+    ]
+
+    # Probe for as long as any search is still in flight. Latency includes any
+    # overshoot of the pacing sleep, so loop stalls between probes count too.
+    latencies = []
+    while not all(t.done() for t in searches):
+        start = time.perf_counter()
+        await asyncio.sleep(0.02)
+        r = await client.get("/health")
+        latencies.append(time.perf_counter() - start - 0.02)
+        assert r.status_code == 200
+
+    responses = await asyncio.gather(*searches)
+    assert all(r.status_code == 200 for r in responses)
+    return _p99(latencies)
+
+
+@pytest.mark.asyncio
+async def test_health_p99_flat_under_inflight_searches(monkeypatch):
+    monkeypatch.setattr(main.limiter, "enabled", False)
+    monkeypatch.setattr(main.semantic_cache, "enabled", False)  # every search must take the full path
+    monkeypatch.setattr(main.retriever, "collection", SimpleNamespace(count=lambda: 100))
+    monkeypatch.setattr(main.retriever.model, "model", _SlowEmbedder())
+    monkeypatch.setattr(main.retriever, "_query_collection", _slow_query)
+    monkeypatch.setattr(main.reranker.model, "model", _SlowCrossEncoder())
+    monkeypatch.setattr(main.rag, "_chain", lambda model: _SlowChain())
+    # history writes stay real: the /health DB check is a read and doesn't queue behind them
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as client:
+        p99 = {n: await _health_p99_with_inflight(client, n) for n in (1, 8, 32)}
+
+    # A blocked event loop would queue /health behind the model and LLM stages
+    for n, latency in p99.items():
+        assert latency < STAGE_DELAY * 2, f"/health p99 {latency:.3f}s with {n} searches in flight"
+
+
+@pytest.mark.asyncio
+async def test_source_routes_run_off_the_event_loop(monkeypatch):
+    def slow(result):
+        def call(*args, **kwargs):
+            time.sleep(STAGE_DELAY * 4)
+            return result
+        return call
+
+    monkeypatch.setattr(main.db, "get_stats", slow({"sources": 0, "documents": 0, "searches": 0}))
+    monkeypatch.setattr(main.db, "get_sources", slow([]))
+    monkeypatch.setattr(main.retriever, "get_chunks_by_source", slow([]))
+    monkeypatch.setattr(main.retriever, "delete_by_source", slow(None))
+    monkeypatch.setattr(main.db, "delete_source", slow(None))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as client:
+        calls = [client.get("/api/stats"), client.get("/api/sources"), client.get("/"),
+                 client.get("/api/sources/1/chunks"), client.delete("/api/sources/1"),
+                 client.post("/api/sources/bulk-delete", json={"ids": [2]})]
+        start = time.perf_counter()
+        responses = await asyncio.gather(*calls)
+    assert all(r.status_code == 200 for r in responses)
+    # one after another on the loop they'd take at least 8 sleeps
+    assert time.perf_counter() - start < STAGE_DELAY * 4 * 4
+
+
+def test_sqlite_reads_do_not_wait_for_writers():
+    from concurrent.futures import ThreadPoolExecutor
+    from database.db import _sqlite_lock
+    with _sqlite_lock, ThreadPoolExecutor(1) as pool:    # as if a write transaction were running
+        assert pool.submit(main.db.get_sources).result(timeout=5) is not None
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_searches_run_the_pipeline_once(monkeypatch):
+    calls, recorded = [], []
+
+    class _CountingChain(_SlowChain):
+        async def ainvoke(self, inputs):
+            calls.append(inputs)
+            return await super().ainvoke(inputs)
+
+    monkeypatch.setattr(main.limiter, "enabled", False)
+    monkeypatch.setattr(main.semantic_cache, "enabled", False)
+    monkeypatch.setattr(main.retriever, "collection", SimpleNamespace(count=lambda: 100))
+    monkeypatch.setattr(main.retriever.model, "model", _SlowEmbedder())
+    monkeypatch.setattr(main.retriever, "_query_collection", _slow_query)
+    monkeypatch.setattr(main.reranker.model, "model", _SlowCrossEncoder())
+    monkeypatch.setattr(main.rag, "_chain", lambda model: _CountingChain())
+    monkeypatch.setattr(main.db, "add_search", lambda *a, **kw: recorded.append(kw.get("cached", 0)))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as client:
+        query = {"query": f"stampede question {time.time()}"}
+        responses = await asyncio.gather(*[client.post("/api/search", json=query) for _ in range(16)])
+
+    assert all(r.status_code == 200 for r in responses)
+    assert len(calls) == 1
+    assert sorted(r.json()["cached"] for r in responses) == [False] + [True] * 15
+    assert sorted(recorded) == [0] + [1] * 15   # every request still lands in search history
@@ -0,0 +1,108 @@
+"""
+Extraction pool tests — PDF pages come back in page order from the worker
+processes, a page over the per-page timeout is skipped, a file over the file
+deadline fails and restarts the pool without failing the other files in flight
+on it, and unreadable files raise ValueError.
+"""
+import io
+import time
+import threading
+import docx
+import pytest
+
+from connectors.extraction import ExtractionPool
+from connectors.file_upload import FileProcessor
+
+
+def _pdf(pages) -> bytes:
+    """Minimal PDF with one Helvetica text line per entry of each page."""
+    objs = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        body = "BT /F1 11 Tf 14 TL 50 780 Td " + " ".join(f"({line}) '" for line in lines) + " ET"
+        objs.append(f"<< /Length {len(body)} >>\nstream\n{body}\nendstream")
+        objs.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {len(objs)} 0 R "
+                    "/Resources << /Font << /F1 3 0 R >> >> >>")
+        kids.append(f"{len(objs)} 0 R")
+    objs[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+    out, offsets = bytearray(b"%PDF-1.4\n"), []
+    for i, obj in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{obj}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+PAGES = [[f"page {p} line {i} on configuring ALLOWED_ORIGINS" for i in range(5)] for p in range(10)]
+
+
+@pytest.fixture
+def pool():
+    pool = ExtractionPool(workers=2, pages_per_task=3)
+    yield pool
+    pool.close()
+
+
+def test_pdf_pages_stream_back_in_order(pool):
+    pages = list(pool.iter_pdf_pages(_pdf(PAGES)))
+    assert pages == list(ExtractionPool(workers=0).iter_pdf_pages(_pdf(PAGES)))
+    assert [page.splitlines()[0] for page in pages] == [f"page {p} line 0 on configuring ALLOWED_ORIGINS"
+                                                        for p in range(10)]
+    assert pool.stats()["pages"] == 10 and pool.stats()["running"]
+
+
+def test_page_over_the_timeout_is_skipped(pool):
+    pool.page_timeout = 1e-6
+    assert list(pool.iter_pdf_pages(_pdf(PAGES))) == []
+    assert pool.stats()["pages_timed_out"] == 10
+
+
+def test_file_over_the_deadline_restarts_the_pool(pool):
+    pool.file_timeout = 0
+    with pytest.raises(ValueError, match="longer than"):
+        list(pool.iter_pdf_pages(_pdf(PAGES)))
+    assert pool.stats()["restarts"] == 1 and not pool.stats()["running"]
+
+    pool.file_timeout = 60
+    assert len(list(pool.iter_pdf_pages(_pdf(PAGES)))) == 10
+
+
+def test_a_timeout_fails_only_its_own_file(pool):
+    list(pool.iter_pdf_pages(_pdf(PAGES)))          # start the workers
+    extracted = []
+
+    def other_file():
+        time.sleep(0.1)                             # queued behind the stuck tasks below
+        extracted.append(list(pool.iter_pdf_pages(_pdf(PAGES))))
+
+    thread = threading.Thread(target=other_file)
+    thread.start()
+    stuck = pool._imap(time.sleep, [(5,), (5,)], time.monotonic() + 0.5, "Stuck")
+    with pytest.raises(ValueError, match="longer than"):
+        next(stuck)
+    thread.join(60)
+
+    assert pool.stats()["restarts"] == 1 and pool.stats()["tasks_resubmitted"] > 0
+    assert len(extracted[0]) == 10
+
+
+def test_read_file_streams_pdf_pages():
+    text, file_type = FileProcessor.read_file("manual.pdf", _pdf(PAGES))
+    assert file_type == "PDF" and not isinstance(text, str)
+    assert len(list(text)) == 10
+    assert FileProcessor.read_file("notes.txt", b"plain text") == ("plain text", "TXT")
+
+
+def test_docx_and_unreadable_files():
+    document = docx.Document()
+    for i in range(3):
+        document.add_paragraph(f"paragraph {i}")
+    buf = io.BytesIO()
+    document.save(buf)
+    assert FileProcessor.process_file("notes.docx", buf.getvalue()) == ("paragraph 0\nparagraph 1\nparagraph 2", "DOCX")
+
+    with pytest.raises(ValueError, match="Error reading PDF"):
+        FileProcessor.process_file("broken.pdf", b"%PDF-1.4 not really a pdf")
@@ -0,0 +1,94 @@
+"""
+Hybrid retrieval tests — the keyword index follows every Chroma write and
+delete, and rank fusion surfaces exact identifier matches.
+"""
+import asyncio
+import random
+import pytest
+
+from database.db import Database
+from rag.indexer import Indexer
+from rag.lexical import query_terms, reciprocal_rank_fusion
+from rag.retriever import Retriever
+
+db = Database()
+indexer = Indexer()
+retriever = Retriever(db)
+
+FILLER = "the service reads its settings at startup and retries failed requests with a delay".split()
+
+
+@pytest.fixture
+def source_id():
+    sid = 800_000 + random.randrange(100_000)
+    yield sid
+    retriever.delete_by_source(sid)
+
+
+def _sync(sid, texts):
+    titles = [f"t{i}" for i in range(len(texts))]
+    prepared = indexer.prepare_documents(texts, titles, titles, sid, "manual", stored=retriever.stored_chunks([sid]))
+    return retriever.sync_documents(*prepared, [sid])
+
+
+def test_query_terms_keep_identifiers():
+    assert query_terms("Why does ERR_CONN_RESET happen? err_conn_reset!") == ["why", "does", "err_conn_reset", "happen"]
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d"]], k=60)
+    assert fused[0][0] == "c" and {id_ for id_, _ in fused} == {"a", "b", "c", "d"}
+
+
+def test_hybrid_search_finds_exact_identifier(source_id):
+    rng = random.Random(source_id)
+    texts = [" ".join(rng.choice(FILLER) for _ in range(30)) for _ in range(25)]
+    texts[17] += " set max_pool_overflow_x17 to raise the limit"
+    _sync(source_id, texts)
+
+    results = retriever.search("what is max_pool_overflow_x17", n_results=3,
+                               collection_source_ids=[source_id], mode="hybrid")
+    assert "max_pool_overflow_x17" in results["documents"][0]
+    assert len(results["documents"]) == len(results["scores"]) == 3
+
+    async_results = asyncio.run(retriever.asearch("max_pool_overflow_x17", 3, [source_id], mode="hybrid"))
+    assert async_results["ids"][0] == results["ids"][0]
+
+
+def test_keyword_index_follows_sync_and_delete(source_id):
+    _sync(source_id, ["first draft mentions token_alpha_991 only"])
+    assert db.search_chunk_text(["token_alpha_991"], 5, [source_id])
+    _sync(source_id, ["second draft mentions token_beta_992 instead"])
+    assert not db.search_chunk_text(["token_alpha_991"], 5, [source_id])
+    assert db.search_chunk_text(["token_beta_992"], 5, [source_id])
+    retriever.delete_by_source(source_id)
+    assert not db.search_chunk_text(["token_beta_992"], 5, [source_id])
+
+
+def test_rebuild_backfills_chunks_indexed_without_keyword_rows(source_id):
+    _sync(source_id, ["legacy chunk about token_gamma_993"])
+    db.delete_source_chunk_text(source_id)
+    assert not db.search_chunk_text(["token_gamma_993"], 5)
+    assert retriever.rebuild_lexical_index(page_size=64) == retriever.count()
+    assert db.search_chunk_text(["token_gamma_993"], 5)
+
+
+def test_filtered_query_asks_for_fewer_when_hnsw_cannot_fill_k():
+    class _Collection:
+        """Raises like Chroma's HNSW when a filtered query asks for more than match."""
+        def __init__(self):
+            self.asked = []
+
+        def query(self, n_results, **kwargs):
+            self.asked.append(n_results)
+            if n_results > 2:
+                raise RuntimeError("Cannot return the results in a contigious 2D array. Probably ef or M is too small")
+            ids = ["a", "b"][:n_results]
+            return {"ids": [ids], "documents": [ids], "metadatas": [[{}] * len(ids)], "distances": [[0.1] * len(ids)]}
+
+        def get(self, where, include):
+            return {"ids": ["a", "b"]}
+
+    fake = _Collection()
+    results = retriever._query_collection([[0.0]], 30, [1], fake)
+    assert results["ids"] == ["a", "b"] and fake.asked == [30, 2]
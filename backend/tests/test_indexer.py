@@ -0,0 +1,166 @@
+"""
+Indexer tests — batched, length-sorted passage encoding maps embeddings back to
+the right chunks and documents, and a stream of pages is chunked as it arrives.
+"""
+import numpy as np
+
+from rag.chunking import PAGE_BREAK
+from rag.indexer import Indexer
+
+indexer = Indexer()
+
+
+def _sections(n, edit=None, words=30):
+    """n markdown sections; the chunker starts a chunk at each heading."""
+    edit = edit or {}
+    return "\n\n".join(
+        f"# Part {s}\n\n" + " ".join(edit.get((s, i), f"w{s}_{i}") for i in range(words)) for s in range(n)
+    )
+
+
+def test_sorted_batches_preserve_input_order():
+    texts = [f"passage: {'word ' * n}end {n}" for n in (3, 90, 12, 1, 45, 7, 60, 2, 30)]
+    batched = indexer.generate_embeddings(texts, batch_size=4)
+    one_by_one = np.stack([indexer.model.model.encode(t, convert_to_numpy=True) for t in texts])
+    assert batched.dtype == np.float32 and batched.shape == one_by_one.shape
+    np.testing.assert_allclose(batched, one_by_one, atol=1e-4)
+
+
+def test_prepare_documents_maps_chunks_to_documents():
+    long_text = _sections(3)                             # 3 chunks
+    chunks, embeddings, metadatas, ids = indexer.prepare_documents(
+        ["short note about caching", "", long_text], ["a", "empty", "b"], ["u1", "u2", "u3"],
+        source_id=7, source_type="manual",
+    )
+    assert len(chunks) == len(ids) == len(metadatas) == embeddings.shape[0] == 4
+    assert [m["title"] for m in metadatas] == ["a", "b", "b", "b"]
+    assert [m["chunk_index"] for m in metadatas] == [0, 0, 1, 2]
+    assert metadatas[1]["total_chunks"] == 3 and metadatas[0]["source_id"] == 7
+    np.testing.assert_allclose(embeddings[2], indexer.generate_embeddings([f"passage: {chunks[2]}"])[0], atol=1e-4)
+
+
+# ── Incremental re-indexing ──────────────────────────────────────────────────
+
+
+def test_chunk_document_chunks_pages_as_they_arrive():
+    pages = [_sections(1), _sections(2)]
+    text, chunks = indexer.chunk_document(iter(pages))
+    assert text == PAGE_BREAK.join(pages)
+    assert [c.page for c in chunks] == [1, 2, 2]
+    assert indexer.chunk_document(text) == (text, chunks)
+    _, _, metadatas, _ = indexer.prepare_documents([text], ["t"], ["u"], 1, "file", chunks=[chunks])
+    assert [m["page"] for m in metadatas] == [1, 2, 2]
+
+
+def test_prepare_documents_reuses_stored_chunks(monkeypatch):
+    text = _sections(3)
+    chunks, _, metadatas, ids = indexer.prepare_documents([text], ["t"], ["u"], 5, "file")
+    stored = {5: {}}
+    for m, id_ in zip(metadatas, ids):
+        stored[5].setdefault(m["content_hash"], []).append(id_)
+
+    encoded = []
+    real = indexer.generate_embeddings
+    monkeypatch.setattr(indexer, "generate_embeddings", lambda texts, **kw: encoded.extend(texts) or real(texts, **kw))
+    edited = _sections(3, {(2, 25): "changed"})             # only the last chunk covers section 2
+    _, embeddings, _, new_ids = indexer.prepare_documents([edited], ["t"], ["u"], 5, "file", stored=stored)
+    assert new_ids[:2] == ids[:2] and new_ids[2] != ids[2]
+    assert len(encoded) == 1 and "changed" in encoded[0]
+    assert np.isnan(embeddings[:2]).all() and not np.isnan(embeddings[2]).any()
+
+
+def test_repeated_chunks_get_distinct_ids():
+    text = "\n\n".join(["# Same\n\nsame words"] * 2 + ["# Other\n\nother words"])  # chunks 0 and 1 are identical
+    _, _, metadatas, ids = indexer.prepare_documents([text], ["t"], ["u"], 6, "file")
+    assert metadatas[0]["content_hash"] == metadatas[1]["content_hash"]
+    assert len(ids) == len(set(ids)) == 3
+
+
+def test_sync_documents_embeds_only_changes():
+    from rag.retriever import Retriever
+    retriever = Retriever()
+    sid = 900_000 + np.random.randint(100_000)
+
+    def sync(text):
+        stored = retriever.stored_chunks([sid])
+        prepared = indexer.prepare_documents([text], ["t"], ["u"], sid, "file", stored=stored)
+        return retriever.sync_documents(*prepared, [sid])
+
+    try:
+        assert sync(_sections(3))["added"] == 3
+        first = {c["chunk_index"]: c["id"] for c in retriever.get_chunks_by_source(sid)}
+
+        stats = sync(_sections(3, {(2, 25): "changed"}))
+        assert (stats["added"], stats["kept"], stats["deleted"]) == (1, 2, 1)
+        chunks = retriever.get_chunks_by_source(sid)
+        assert [c["id"] for c in chunks[:2]] == [first[0], first[1]] and "changed" in chunks[2]["text"]
+
+        stats = sync(_sections(1, words=10))                # one chunk left; its words match no old chunk
+        assert stats["deleted"] == 3 and len(retriever.get_chunks_by_source(sid)) == 1
+        assert sync(_sections(1, words=10)) == {"added": 0, "kept": 1, "updated": 0, "deleted": 0}
+    finally:
+        retriever.delete_by_source(sid)
+
+
+def test_sync_adopts_chunks_indexed_before_content_hashes():
+    from rag.retriever import Retriever
+    retriever = Retriever()
+    sid = 900_000 + np.random.randint(100_000)
+    text = "legacy chunk " + " ".join(f"w{i}" for i in range(20))
+    legacy_id = indexer.generate_id(f"legacy-{sid}_0")
+    retriever.add_documents(
+        [text], indexer.generate_embeddings([f"passage: {text}"]),
+        [{"title": "t", "url": "u", "source_id": sid, "source_type": "file",
+          "chunk_index": 0, "total_chunks": 1, "lang": "en"}],
+        [legacy_id],
+    )
+    try:
+        stored = retriever.stored_chunks([sid])
+        prepared = indexer.prepare_documents([text], ["t"], ["u"], sid, "file", stored=stored)
+        assert prepared[3] == [legacy_id]
+        stats = retriever.sync_documents(*prepared, [sid])
+        assert (stats["added"], stats["updated"]) == (0, 1)  # content_hash recorded, vector untouched
+        assert retriever.stored_chunks([sid]) == {sid: {indexer.chunk_hash(text): [legacy_id]}}
+    finally:
+        retriever.delete_by_source(sid)
+
+
+# ── Embedding store ──────────────────────────────────────────────────────────
+
+def test_embedding_store_persists_across_instances(tmp_path):
+    from rag.embedding_store import EmbeddingStore
+    vectors = np.random.rand(3, 8).astype(np.float32)
+    writer = EmbeddingStore(str(tmp_path), "test/model", 8)
+    reader = EmbeddingStore(str(tmp_path), "test/model", 8)    # e.g. another worker process
+    writer.put_many(["a", "b", "c"], vectors)
+
+    found, missing = reader.get_many(["c", "x", "a"])
+    assert missing == [1]
+    np.testing.assert_array_equal(found[[0, 2]], vectors[[2, 0]])
+    assert len(EmbeddingStore(str(tmp_path), "test/model", 8)) == 3   # reopened from disk
+    assert len(EmbeddingStore(str(tmp_path), "other/model", 8)) == 0  # keys are per model
+
+
+def test_embedding_store_ignores_torn_index_tail(tmp_path):
+    from rag.embedding_store import EmbeddingStore
+    store = EmbeddingStore(str(tmp_path), "test/model", 4, dtype="float16")
+    store.put_many(["a"], np.ones((1, 4)))
+    with open(store._index_path, "ab") as f:
+        f.write(b"\x01\x02\x03")                             # writer crashed mid-record
+    reopened = EmbeddingStore(str(tmp_path), "test/model", 4, dtype="float16")
+    reopened.put_many(["b"], np.full((1, 4), 2.0))
+    found, missing = EmbeddingStore(str(tmp_path), "test/model", 4, dtype="float16").get_many(["a", "b"])
+    assert missing == [] and found[:, 0].tolist() == [1.0, 2.0]
+
+
+def test_generate_embeddings_skips_stored_passages(monkeypatch):
+    assert indexer.store is not None
+    texts = [f"passage: stored text {i} {np.random.rand()}" for i in range(5)]
+    first = indexer.generate_embeddings(texts[:3])
+
+    encoded = []
+    real = indexer._encode
+    monkeypatch.setattr(indexer, "_encode", lambda batch, size=None: encoded.extend(batch) or real(batch, size))
+    again = indexer.generate_embeddings(texts)
+    assert encoded == texts[3:]
+    np.testing.assert_allclose(again[:3], first, atol=1e-6)
@@ -0,0 +1,129 @@
+"""
+Bulk ingest tests — ZIP/tar/multipart uploads are queued as one job; a worker
+indexes each entry as a child job, bad entries fail on their own (also when
+they fail the write of a whole embed batch), and the SSE stream ends with the
+final summary.
+"""
+import io
+import json
+import uuid
+import asyncio
+import tarfile
+import zipfile
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from jobs.worker import Worker
+from rag.pipeline import _DONE, IngestPipeline
+
+client = TestClient(app)
+worker = Worker(name="test-ingest-worker")
+
+_DOC = "Configuring CORS: add the frontend origin to ALLOWED_ORIGINS and restart the API. " * 5
+
+
+def _zip(entries: dict) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for name, data in entries.items():
+            zf.writestr(name, data)
+    return buf.getvalue()
+
+
+def _tar_gz(entries: dict) -> bytes:
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz") as tf:
+        for name, data in entries.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+def _status(job_id: str) -> dict:
+    worker.run_until_empty()
+    r = client.get(f"/api/ingest/{job_id}")
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_bulk_zip_indexes_each_entry_as_child_job():
+    archive = _zip({
+        "docs/cors.txt": _DOC,
+        "docs/deploy.txt": _DOC.replace("CORS", "deploys"),
+        "docs/image.png": b"\x89PNG....",
+        "__MACOSX/docs/._cors.txt": b"junk",
+        "docs/empty.txt": "",
+    })
+    r = client.post("/api/ingest/bulk", files=[("files", ("team-docs.zip", archive, "application/zip"))])
+    assert r.status_code == 200, r.text
+
+    body = _status(r.json()["job_id"])
+    assert body["status"] == "completed"
+    assert body["total"] == 4 and body["completed"] == 2 and body["failed"] == 2
+    assert body["chunks"] > 0
+    failed = {f["filename"]: f["error"] for f in body["files"] if f["status"] == "failed"}
+    assert "Unsupported type" in failed["docs/image.png"]
+    assert body["error"] == "2 of 4 files failed"
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_retried_file_by_file(monkeypatch):
+    svc = worker.services
+    sync = svc.retriever.sync_documents
+
+    def picky_sync(chunks, *args):
+        if any("POISON" in chunk for chunk in chunks):
+            raise RuntimeError("write rejected")
+        return sync(chunks, *args)
+
+    monkeypatch.setattr(svc.retriever, "sync_documents", picky_sync)
+    pipeline = IngestPipeline(svc.db, svc.indexer, svc.retriever)
+    texts = [_DOC, _DOC.replace("CORS", "POISON"), _DOC.replace("CORS", "deploys")]
+    batch = []
+    for i, text in enumerate(texts):
+        job_id = str(uuid.uuid4())
+        svc.db.create_job(job_id, f"f{i}.txt")
+        batch.append((job_id, f"f{i}.txt", *svc.indexer.chunk_document(text)))
+    inbox = asyncio.Queue()
+    await inbox.put(await pipeline._prepare(batch))
+    await inbox.put(_DONE)
+    await pipeline._write(inbox)
+
+    statuses = [svc.db.get_job(job_id)["status"] for job_id, *_ in batch]
+    assert statuses == ["completed", "failed", "completed"]
+    assert pipeline.failed == 1 and pipeline.chunks > 0
+
+
+def test_bulk_multipart_and_tar():
+    r = client.post("/api/ingest/bulk", files=[
+        ("files", ("a.txt", _DOC.encode(), "text/plain")),
+        ("files", ("more.tar.gz", _tar_gz({"b.txt": _DOC.encode(), "c.txt": _DOC.encode()}), "application/gzip")),
+    ])
+    body = _status(r.json()["job_id"])
+    assert body["status"] == "completed"
+    assert sorted(f["filename"] for f in body["files"]) == ["a.txt", "b.txt", "c.txt"]
+    assert all(f["status"] == "completed" and f["chunks"] > 0 for f in body["files"])
+
+
+def test_bulk_events_stream_final_summary():
+    r = client.post("/api/ingest/bulk", files=[("files", ("one.txt", _DOC.encode(), "text/plain"))])
+    job_id = r.json()["job_id"]
+    worker.run_until_empty()
+    with client.stream("GET", f"/api/ingest/{job_id}/events") as stream:
+        events = [line[len("data: "):] for line in stream.iter_lines() if line.startswith("data: ")]
+    assert events[-1] == "[DONE]"
+    final = json.loads(events[-2])
+    assert final["status"] == "completed" and final["completed"] == 1
+
+
+def test_bulk_corrupt_archive_fails_parent():
+    r = client.post("/api/ingest/bulk", files=[("files", ("broken.zip", b"PK\x03\x04 not really a zip", "application/zip"))])
+    body = _status(r.json()["job_id"])
+    assert body["status"] == "failed" and body["total"] == 0
+    assert body["error"]
+
+
+def test_bulk_status_unknown_job():
+    assert client.get("/api/ingest/does-not-exist").status_code == 404
@@ -0,0 +1,196 @@
+"""
+Job queue tests — claims are exclusive, failures retry with backoff or fail for
+good, expired leases are recovered, and uploads run end to end through a worker.
+"""
+import time
+import pytest
+from fastapi.testclient import TestClient
+
+import jobs.tasks as tasks
+from database.db import Database
+from jobs.queue import JobQueue, PermanentJobError
+from jobs.worker import Worker
+from main import app, limiter
+
+client = TestClient(app)
+db = Database()
+
+
+@pytest.fixture(autouse=True)
+def no_rate_limit(monkeypatch):
+    """These tests upload more than the 10/minute the endpoint allows."""
+    monkeypatch.setattr(limiter, "enabled", False)
+
+
+@pytest.fixture
+def kind(monkeypatch):
+    """A private job kind so jobs queued by other tests are never claimed here."""
+    calls = []
+    name = f"test-{time.monotonic_ns()}"
+
+    def handler(svc, job):
+        calls.append(job)
+        behaviour = job["payload"].get("behaviour")
+        if behaviour == "flaky" and job["attempts"] == 1:
+            raise RuntimeError("transient")
+        if behaviour == "bad":
+            raise PermanentJobError("unreadable")
+        return 3
+
+    monkeypatch.setitem(tasks.HANDLERS, name, handler)
+    return name, calls
+
+
+def _claim_own(queue: JobQueue, owner: str, kind: str):
+    # Skip over other tests' jobs without running them
+    job = queue.claim(owner)
+    while job and job["kind"] != kind:
+        queue.db.fail_job(job["id"], owner, "skipped by test")
+        job = queue.claim(owner)
+    return job
+
+
+def test_claim_is_exclusive_and_completes(kind):
+    name, _ = kind
+    queue = JobQueue(db)
+    job_id = queue.enqueue(name, "x")
+    job = _claim_own(queue, "w1", name)
+    assert job["id"] == job_id and job["attempts"] == 1 and job["status"] == "indexing"
+    assert _claim_own(queue, "w2", name) is None            # leased, not claimable
+    assert not queue.complete(job_id, "w2", 1)              # only the owner can settle it
+    assert queue.complete(job_id, "w1", 5)
+    assert db.get_job(job_id)["status"] == "completed" and db.get_job(job_id)["chunks"] == 5
+
+
+def test_failed_attempt_retries_with_backoff(kind, monkeypatch):
+    name, calls = kind
+    monkeypatch.setattr("jobs.queue.retry_delay", lambda attempts: 1.0)
+    job_id = JobQueue(db).enqueue(name, "flaky", behaviour="flaky")
+    worker = Worker(name="retry-worker")
+
+    worker.run_until_empty()
+    job = db.get_job(job_id)
+    assert job["status"] == "pending" and job["error"] == "transient"   # backing off
+
+    time.sleep(1.1)
+    worker.run_until_empty()
+    job = db.get_job(job_id)
+    assert job["status"] == "completed" and job["attempts"] == 2 and job["error"] is None
+    assert len([c for c in calls if c["id"] == job_id]) == 2
+
+
+def test_permanent_error_fails_immediately(kind):
+    name, calls = kind
+    job_id = JobQueue(db).enqueue(name, "bad", behaviour="bad")
+    Worker(name="perm-worker").run_until_empty()
+    job = db.get_job(job_id)
+    assert job["status"] == "failed" and job["attempts"] == 1 and job["error"] == "unreadable"
+
+
+def test_expired_lease_is_reclaimed_then_abandoned(kind):
+    name, _ = kind
+    queue = JobQueue(db, max_attempts=2, lease_seconds=0.05)
+    job_id = queue.enqueue(name, "crashy")
+
+    assert _claim_own(queue, "dead-1", name)["id"] == job_id   # worker "crashes" holding the lease
+    time.sleep(0.1)
+    job = _claim_own(queue, "alive", name)
+    assert job["id"] == job_id and job["attempts"] == 2 and job["lease_owner"] == "alive"
+    assert not queue.heartbeat(job_id, "dead-1")
+
+    time.sleep(0.1)                                            # the second worker dies too
+    assert job_id in [j["id"] for j in queue.recover()]
+    assert db.get_job(job_id)["status"] == "failed"
+
+
+def test_upload_runs_through_worker():
+    content = b"Worker-indexed document about configuring retries and backoff for jobs."
+    job_id = client.post("/api/upload", files={"file": ("worker.txt", content, "text/plain")}).json()["job_id"]
+    assert client.get(f"/api/upload/status/{job_id}").json()["status"] == "pending"
+    Worker(name="upload-worker").run_until_empty()
+    body = client.get(f"/api/upload/status/{job_id}").json()
+    assert body["status"] == "completed" and body["chunks"] > 0 and body["attempts"] == 1
+
+
+def _upload(worker, name, content, **form):
+    job_id = client.post("/api/upload", files={"file": (name, content, "text/plain")}, data=form).json()["job_id"]
+    worker.run_until_empty()
+    assert client.get(f"/api/upload/status/{job_id}").json()["status"] == "completed"
+
+
+def test_reupload_with_source_id_resyncs_that_source():
+    name = f"resync-{time.monotonic_ns()}.txt"
+    worker = Worker(name="resync-worker")
+    _upload(worker, name, b"First version of a note about lease renewal in workers.")
+    source_id = db.find_source("file", name)
+    _upload(worker, name, b"Second version of a note about lease renewal and heartbeats.", source_id=source_id)
+
+    assert [s["id"] for s in db.get_sources(limit=1000) if s["path"] == name] == [source_id]
+    chunks = worker.services.retriever.get_chunks_by_source(source_id)
+    assert len(chunks) == 1 and chunks[0]["text"].startswith("Second version")
+
+
+def test_same_name_without_source_id_is_a_new_document():
+    name = f"same-name-{time.monotonic_ns()}.txt"
+    worker = Worker(name="same-name-worker")
+    _upload(worker, name, b"Meeting notes from the storage team about compaction.")
+    first = db.find_source("file", name)
+    _upload(worker, name, b"Meeting notes from the API team about pagination limits.")
+
+    second = db.find_source("file", name)
+    assert second != first
+    retriever = worker.services.retriever
+    assert retriever.get_chunks_by_source(first)[0]["text"].startswith("Meeting notes from the storage team")
+    assert retriever.get_chunks_by_source(second)[0]["text"].startswith("Meeting notes from the API team")
+
+
+def test_upload_rejects_an_unknown_source_id():
+    resp = client.post("/api/upload", files={"file": ("x.txt", b"Some text to index here.", "text/plain")},
+                       data={"source_id": 987654321})
+    assert resp.status_code == 404
+
+
+@pytest.fixture
+def legacy_collection():
+    from rag.retriever import LEGACY_COLLECTION_NAME
+    retriever = Worker(name="legacy-setup").services.retriever
+    legacy = retriever.client.get_or_create_collection(LEGACY_COLLECTION_NAME)
+    ids = [f"legacy-{i}" for i in range(23)]
+    legacy.add(
+        ids=ids,
+        documents=[f"legacy chunk number {i} about connection pooling" for i in range(23)],
+        embeddings=[[float(i), 1.0, 0.0] for i in range(23)],
+        metadatas=[{"source_id": 424242, "chunk_index": i} for i in range(23)],
+    )
+    yield retriever, ids
+    retriever.client.delete_collection(LEGACY_COLLECTION_NAME)
+    retriever.delete_by_source(424242)
+
+
+def test_migration_resumes_from_checkpoint(legacy_collection):
+    retriever, ids = legacy_collection
+    checkpoints = []
+
+    def interrupt(done, total):
+        checkpoints.append((done, total))
+        if len(checkpoints) == 2:
+            raise RuntimeError("worker killed")
+
+    with pytest.raises(RuntimeError):
+        retriever.migrate_from_v1(progress=interrupt, page_size=5)
+    assert checkpoints == [(5, 23), (10, 23)]
+
+    resumed = []
+    assert retriever.migrate_from_v1(start=10, progress=lambda d, t: resumed.append(d), page_size=5) == 23
+    assert resumed == [15, 20, 23]
+    migrated = retriever.collection.get(ids=ids, include=["metadatas"])
+    assert sorted(migrated["ids"]) == sorted(ids)
+    assert all("content_hash" in m and m["lang"] == "en" for m in migrated["metadatas"])
+
+
+def test_reindex_job_reports_progress(legacy_collection):
+    job_id = client.post("/api/admin/reindex-all").json()["job_id"]
+    Worker(name="reindex-worker").run_until_empty()
+    body = client.get(f"/api/upload/status/{job_id}").json()
+    assert body["status"] == "completed" and body["chunks"] == body["total"] == 23
+    assert body["chunks_per_sec"] > 0 and body["eta_seconds"] is None
@@ -0,0 +1,98 @@
+"""
+Model host tests — clients get the same embeddings and scores as the local
+models through the socket + shared-memory path, concurrent callers are served
+(and coalesced by the host's batchers), result buffers grow on demand and are
+unlinked on close, and host errors surface as ModelHostError.
+"""
+import os
+import asyncio
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pytest
+
+from rag.indexer import get_embedding_model
+from rag.model_host import ModelHost, ModelHostClient, ModelHostError, RemoteCrossEncoder, RemoteEmbedder
+from rag.reranker import get_reranker
+
+TEXTS = ["query: how do I set the cache TTL?", "passage: Redis caches search answers for an hour.",
+         "passage: " + "The reranker rescores retrieved chunks. " * 20]
+PAIRS = [("how does reranking work", t) for t in TEXTS]
+
+
+@pytest.fixture(scope="module")
+def host():
+    path = os.path.join(tempfile.mkdtemp(prefix="devflow_host_"), "models.sock")
+    model_host = ModelHost(get_embedding_model(), get_reranker(), path)
+    thread = threading.Thread(target=model_host.serve_forever, daemon=True)
+    thread.start()
+    client = ModelHostClient(path, timeout=30, connect_timeout=10)
+    yield model_host, client
+    client.close()
+    model_host.shutdown()
+    thread.join(5)
+
+
+def test_remote_embedder_matches_local(host):
+    _, client = host
+    remote = RemoteEmbedder(client)
+    local = get_embedding_model().encode(TEXTS)
+    assert remote.get_sentence_embedding_dimension() == local.shape[1]
+    np.testing.assert_allclose(remote.encode(TEXTS), local, atol=1e-5)
+    np.testing.assert_allclose(remote.encode(TEXTS[0]), local[0], atol=1e-5)
+    # bulk calls (kwargs) bypass the host's batcher but return the same vectors
+    np.testing.assert_allclose(remote.encode(TEXTS, batch_size=2, convert_to_numpy=True), local, atol=1e-5)
+    np.testing.assert_allclose(asyncio.run(remote.aencode(TEXTS)), local, atol=1e-5)
+
+
+def test_remote_cross_encoder_matches_local(host):
+    _, client = host
+    remote = RemoteCrossEncoder(client)
+    local = get_reranker().predict(PAIRS)
+    assert remote.max_length == get_reranker().max_length
+    np.testing.assert_allclose(remote.predict(PAIRS), local, atol=1e-5)
+    np.testing.assert_allclose(asyncio.run(remote.apredict(PAIRS)), local, atol=1e-5)
+
+
+def test_concurrent_callers_share_the_host(host):
+    _, client = host
+    remote = RemoteEmbedder(client)
+    before = client.stats()["embedder"]["items"]
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda i: remote.encode([f"query: question {i}"]), range(32)))
+    assert all(r.shape == (1, remote.get_sentence_embedding_dimension()) for r in results)
+    stats = client.stats()
+    assert stats["embedder"]["items"] - before == 32 and stats["client_errors"] == 0
+
+
+def test_result_buffer_grows_and_is_unlinked():
+    path = os.path.join(tempfile.mkdtemp(prefix="devflow_host_"), "models.sock")
+    model_host = ModelHost(get_embedding_model(), get_reranker(), path)
+    thread = threading.Thread(target=model_host.serve_forever, daemon=True)
+    thread.start()
+    client = ModelHostClient(path, timeout=30, connect_timeout=10)
+    dim = client.info()["dimension"]
+    n = (1 << 20) // (dim * 4) + 1  # one row more than the initial buffer holds
+    assert client.encode([f"passage: text {i}" for i in range(n)], batch_size=64).shape == (n, dim)
+    name = client._idle[0].shm.name
+    client.close()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
+    model_host.shutdown()
+    thread.join(5)
+
+
+def test_host_errors_raise_model_host_error(host):
+    _, client = host
+    with pytest.raises(ModelHostError, match="unknown op"):
+        client._call({"op": "nope"})
+    # the channel survives a rejected request
+    assert client.encode(TEXTS[:1]).shape[0] == 1
+
+
+def test_unreachable_host_raises_model_host_error():
+    client = ModelHostClient("/tmp/devflow-no-such-host.sock", timeout=1, connect_timeout=0.3)
+    with pytest.raises(ModelHostError, match="not reachable"):
+        client.info()
@@ -0,0 +1,73 @@
+"""
+ONNX backend parity tests — the exported fp32 graphs reproduce the PyTorch
+models, and int8 quantization keeps embedding cosine drift and rerank score
+drift within bounds, reordering only candidates the reference scores as near-ties.
+"""
+import itertools
+import numpy as np
+import pytest
+
+pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+
+from rag.indexer import EMBEDDING_MODEL_NAME, get_embedding_model  # noqa: E402
+from rag.onnx_backend import OnnxCrossEncoder, OnnxEncoder  # noqa: E402
+from rag.reranker import RERANK_MAX_LENGTH, RERANK_MODEL_NAME, get_reranker  # noqa: E402
+
+MIN_INT8_COSINE = 0.98      # per-text cosine(int8, torch) embedding similarity
+MAX_INT8_SCORE_DRIFT = 0.05  # |int8 - torch| rerank score, after the sigmoid
+
+TEXTS = [
+    "query: How do I configure CORS for the frontend origin?",
+    "query: Wie setze ich den Cache-TTL?",
+    "passage: The reranker rescores retrieved chunks with a cross-encoder before generation.",
+    "passage: " + "Chunks are indexed with their content hash so unchanged text is never re-embedded. " * 12,
+    "passage: ¿Cómo indexo una URL en la base de conocimiento?",
+]
+QUERY = "how does reranking work"
+CANDIDATES = [t.split(": ", 1)[1] for t in TEXTS[2:]] + [
+    "Redis caches search answers for an hour.",
+    "The cross-encoder reads the query and the chunk together and outputs a relevance score.",
+]
+
+
+@pytest.fixture(scope="module")
+def onnx_dir(tmp_path_factory):
+    return str(tmp_path_factory.mktemp("onnx_models"))
+
+
+def _cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+
+@pytest.mark.parametrize("quantize", [False, True])
+def test_embedding_parity(onnx_dir, quantize):
+    reference = get_embedding_model().model.encode(TEXTS, convert_to_numpy=True)
+    encoder = OnnxEncoder(EMBEDDING_MODEL_NAME, cache_dir=onnx_dir, quantize=quantize)
+    embeddings = encoder.encode(TEXTS, batch_size=2)
+
+    assert embeddings.shape == reference.shape and embeddings.dtype == np.float32
+    assert encoder.get_sentence_embedding_dimension() == reference.shape[1]
+    cosine = _cosine(embeddings, reference)
+    assert cosine.min() >= (MIN_INT8_COSINE if quantize else 0.9999), cosine
+    # int8 activations are quantized per batch, so batch composition moves values slightly
+    np.testing.assert_allclose(encoder.encode(TEXTS[0]), embeddings[0], atol=1e-3)
+
+
+@pytest.mark.parametrize("quantize", [False, True])
+def test_rerank_parity(onnx_dir, quantize):
+    pairs = [(QUERY, doc) for doc in CANDIDATES]
+    reference = get_reranker().model.predict(pairs, show_progress_bar=False)
+    cross_encoder = OnnxCrossEncoder(RERANK_MODEL_NAME, max_length=RERANK_MAX_LENGTH, cache_dir=onnx_dir, quantize=quantize)
+    scores = cross_encoder.predict(pairs, batch_size=3)
+
+    drift = np.abs(scores - reference)
+    if not quantize:
+        assert drift.max() < 1e-4
+        assert list(np.argsort(-scores)) == list(np.argsort(-reference))
+        return
+    assert drift.max() <= MAX_INT8_SCORE_DRIFT, drift
+    # an ordering flip is only allowed between candidates closer than the observed drift can explain
+    for i, j in itertools.combinations(range(len(pairs)), 2):
+        if (scores[i] - scores[j]) * (reference[i] - reference[j]) < 0:
+            assert abs(reference[i] - reference[j]) <= 2 * drift.max()
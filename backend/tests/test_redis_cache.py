@@ -0,0 +1,193 @@
+"""
+Redis layer tests — circuit-breaker transitions, fast fallback to a cache miss
+while Redis is down (no reconnect per call), pipelined afetch decoding several
+keys from a single round trip, and generation-based invalidation: index writes
+and collection membership changes bump a version that moves every cache key.
+"""
+import json
+import time
+import random
+import asyncio
+import base64
+import numpy as np
+from fastapi.testclient import TestClient
+
+import cache.redis_cache as redis_cache
+from cache.redis_cache import INDEX_VERSION, CircuitBreaker, collection_version, make_cache_key
+from cache.semantic_cache import semantic_scope
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_circuit_breaker_opens_then_half_opens_for_one_trial():
+    clock = _Clock()
+    breaker = CircuitBreaker(threshold=2, retry_after=5, clock=clock)
+    breaker.failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    clock.now = 5
+    assert breaker.allow() and breaker.state == "half-open"
+    assert not breaker.allow()              # only one trial at a time
+    breaker.failure()                       # trial failed: open for another retry_after
+    assert breaker.state == "open" and not breaker.allow()
+
+    clock.now = 10
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.state == "closed" and breaker.allow()
+    assert breaker.stats()["trips"] == 1 and breaker.stats()["short_circuited"] == 3
+
+
+def test_unreachable_redis_falls_back_and_short_circuits(monkeypatch):
+    monkeypatch.setattr(redis_cache, "REDIS_URL", "redis://127.0.0.1:1")
+    monkeypatch.setattr(redis_cache, "_client", None)
+    monkeypatch.setattr(redis_cache, "_breaker", CircuitBreaker(threshold=2, retry_after=60))
+
+    assert redis_cache.get_cached("devflow:k") is None
+    assert redis_cache.set_array("devflow:v", np.ones(4)) is False
+    assert redis_cache._breaker.state == "open"
+
+    start = time.perf_counter()
+    for _ in range(100):
+        assert redis_cache.get_cached("devflow:k") is None
+        assert asyncio.run(redis_cache.aget_cached("devflow:k")) is None
+    assert time.perf_counter() - start < 0.5  # no connection attempts while open
+    assert redis_cache._breaker.short_circuited == 200
+
+
+class _FakePipeline:
+    def __init__(self, store, calls):
+        self.store, self.calls, self.ops = store, calls, []
+
+    def get(self, key):
+        self.ops.append(self.store.get(key))
+
+    def exists(self, key):
+        self.ops.append(int(key in self.store))
+
+    async def execute(self):
+        self.calls.append(len(self.ops))
+        return self.ops
+
+
+class _FakeAsyncRedis:
+    def __init__(self, store):
+        self.store, self.calls = store, []
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self.store, self.calls)
+
+
+def test_afetch_decodes_several_keys_in_one_round_trip(monkeypatch):
+    vector = np.arange(4, dtype=np.float32)
+    fake = _FakeAsyncRedis({
+        "devflow:search:a": json.dumps({"answer": "cached"}),
+        "devflow:qemb:b": base64.b64encode(vector.tobytes()).decode(),
+        "devflow:blocked:c": "1",
+    })
+    monkeypatch.setattr(redis_cache, "get_async_redis", lambda: fake)
+    cached, embedding, missing, blocked, skipped = asyncio.run(redis_cache.afetch(
+        ("json", "devflow:search:a"), ("array", "devflow:qemb:b"), ("json", "devflow:search:zz"),
+        ("exists", "devflow:blocked:c"), ("array", None),
+    ))
+    assert cached == {"answer": "cached"}
+    np.testing.assert_array_equal(embedding, vector)
+    assert missing is None and blocked is True and skipped is None
+    assert fake.calls == [4]  # one pipeline execute; the None key never reaches Redis
+
+
+def test_afetch_without_redis_returns_misses(monkeypatch):
+    monkeypatch.setattr(redis_cache, "REDIS_URL", "")
+    assert asyncio.run(redis_cache.afetch(("json", "a"), ("exists", "b"))) == [None, False]
+
+
+class _FakeSyncPipeline:
+    def __init__(self, redis):
+        self.redis, self.ops = redis, []
+
+    def incr(self, key):
+        self.ops.append(lambda: self.redis.incr(key))
+
+    def execute(self):
+        self.redis.round_trips += 1
+        return [op() for op in self.ops]
+
+
+class _FakeSyncRedis:
+    def __init__(self):
+        self.store, self.round_trips = {}, 0
+
+    def incr(self, key):
+        self.store[key] = str(int(self.store.get(key, 0)) + 1)
+        return int(self.store[key])
+
+    def mget(self, keys):
+        self.round_trips += 1
+        return [self.store.get(k) for k in keys]
+
+    def keys(self, pattern):
+        raise AssertionError("invalidation must not scan the keyspace")
+
+    def pipeline(self, transaction=True):
+        return _FakeSyncPipeline(self)
+
+
+def test_bumping_a_version_moves_cache_keys(monkeypatch):
+    fake = _FakeSyncRedis()
+    monkeypatch.setattr(redis_cache, "get_redis", lambda: fake)
+    data = {"q": "how do I set the TTL", "n": 5}
+    # unversioned keys are unchanged, so existing entries stay readable
+    assert make_cache_key("search", data) == make_cache_key("search", data, {})
+
+    before = redis_cache.get_versions(INDEX_VERSION, collection_version(3))
+    assert before == {INDEX_VERSION: 0, "collection:3": 0}
+    assert redis_cache.bump_version(INDEX_VERSION)
+    after = redis_cache.get_versions(INDEX_VERSION, collection_version(3))
+    assert after == {INDEX_VERSION: 1, "collection:3": 0}
+    assert make_cache_key("search", data, before) != make_cache_key("search", data, after)
+    assert semantic_scope("search", {"n": 5}, before) != semantic_scope("search", {"n": 5}, after)
+
+    redis_cache.bump_version(collection_version(3), collection_version(4))
+    assert redis_cache.get_versions(collection_version(3), collection_version(4)) == {"collection:3": 1, "collection:4": 1}
+
+
+def test_index_writes_bump_the_index_version(monkeypatch):
+    import rag.retriever
+    from rag.indexer import Indexer
+    from rag.retriever import Retriever
+    bumps = []
+    monkeypatch.setattr(rag.retriever, "bump_version", lambda *scopes: bumps.append(scopes))
+    retriever, indexer = Retriever(), Indexer()
+    sid = 700_000 + random.randrange(100_000)
+    prepared = indexer.prepare_documents(["versioned chunk about cache generations"], ["v"], ["v"], sid, "manual")
+    retriever.add_documents(*prepared)
+    assert bumps == [(INDEX_VERSION,)]
+    retriever.add_documents(*prepared)      # nothing new: no bump
+    stored = retriever.stored_chunks([sid])
+    retriever.sync_documents(*indexer.prepare_documents(["versioned chunk about cache generations"], ["v"], ["v"],
+                                                        sid, "manual", stored=stored), [sid])
+    assert len(bumps) == 1                   # unchanged sync: no bump
+    retriever.delete_by_source(sid)
+    assert bumps == [(INDEX_VERSION,), (INDEX_VERSION,)]
+
+
+def test_collection_membership_changes_bump_the_collection_version(monkeypatch):
+    import main
+    import rag.retriever
+    bumps = []
+    monkeypatch.setattr(rag.retriever, "bump_version", lambda *scopes: bumps.append(scopes))
+    client = TestClient(main.app)
+    cid = client.post("/api/collections", json={"name": f"versions-{random.randrange(10**6)}"}).json()["collection_id"]
+    sid = main.db.add_source("manual", None, "versioned source")
+    client.post(f"/api/collections/{cid}/sources/{sid}")
+    client.delete(f"/api/collections/{cid}/sources/{sid}")
+    client.delete(f"/api/collections/{cid}")
+    assert bumps == [(collection_version(cid),)] * 3
@@ -0,0 +1,83 @@
+"""
+Reranker tests — length-bucketed scoring matches one-pair-at-a-time scoring,
+concurrent requests share a forward pass, memoized scores skip the model, and a
+decisive dense margin skips reranking.
+"""
+import asyncio
+import threading
+import numpy as np
+import pytest
+
+from rag import reranker as reranker_module
+from rag.reranker import Reranker
+
+DOCS = [f"{'filler ' * n}chunk {n} explains retry budgets" for n in (40, 2, 25, 0, 60, 9)]
+IDS = [f"chunk_{i}" for i in range(len(DOCS))]
+
+
+def test_bucketed_scores_match_unbatched():
+    reranker = Reranker()
+    query = "how are retry budgets enforced? (bucketing)"
+    scores = reranker.score(query, DOCS, IDS)
+    one_by_one = [float(reranker.model.model.predict([(query, d)], show_progress_bar=False)[0]) for d in DOCS]
+    np.testing.assert_allclose(scores, one_by_one, atol=1e-4)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_reranks_share_forward_passes(monkeypatch):
+    reranker = Reranker()
+    calls, gate = [], threading.Event()
+    predict = reranker.model.model.predict
+
+    def gated(pairs, **kwargs):
+        calls.append(len(pairs))
+        gate.wait(5)
+        return predict(pairs, **kwargs)
+
+    monkeypatch.setattr(reranker.model.model, "predict", gated)
+    blocker = asyncio.ensure_future(reranker.ascore("blocker (coalesce)", DOCS[:1]))
+    while not calls:
+        await asyncio.sleep(0.005)
+    requests = [reranker.ascore(f"question {q} (coalesce)", DOCS, IDS) for q in range(4)]
+    pending = asyncio.gather(*requests)
+    await asyncio.sleep(0.05)
+    gate.set()
+    results = await pending
+    await blocker
+
+    assert calls == [1, 4 * len(DOCS)]  # four requests, one forward pass
+    for q, scores in enumerate(results):
+        expected = predict([(f"question {q} (coalesce)", d) for d in DOCS], show_progress_bar=False)
+        np.testing.assert_allclose(scores, expected, atol=1e-4)
+    assert reranker.model.stats()["batch_size_histogram"]["<=32"] >= 1
+
+
+def test_repeat_query_uses_memoized_scores(monkeypatch):
+    reranker = Reranker()
+    query = "how are retry budgets enforced? (memo)"
+    first = reranker.rerank(query, DOCS, [{"i": i} for i in range(len(DOCS))], top_k=3, ids=IDS)
+
+    calls = []
+    predict = reranker.model.predict
+    monkeypatch.setattr(reranker.model, "predict", lambda pairs, **kw: calls.append(len(pairs)) or predict(pairs, **kw))
+    again = reranker.rerank(query, DOCS, [{"i": i} for i in range(len(DOCS))], top_k=3, ids=IDS)
+    assert again == first and calls == []
+
+    extra = "a brand new chunk about token refresh"
+    reranker.rerank(query, DOCS + [extra], [{"i": i} for i in range(len(DOCS) + 1)], ids=IDS + ["chunk_new"])
+    assert calls == [1]
+
+
+def test_decisive_margin_skips_reranking(monkeypatch):
+    reranker = Reranker(early_exit_margin=0.1)
+    monkeypatch.setattr(reranker, "score", lambda *a, **kw: (_ for _ in ()).throw(AssertionError("scored")))
+    before = reranker_module.reranker_stats()["early_exits"]
+
+    docs, metas = reranker.rerank("q", DOCS, [{"i": i} for i in range(len(DOCS))], top_k=2,
+                                  distances=[0.1, 0.35, 0.4, 0.5, 0.6, 0.7])
+    assert docs == DOCS[:2] and [m["i"] for m in metas] == [0, 1]
+    assert reranker_module.reranker_stats()["early_exits"] == before + 1
+
+    # close margin, or a keyword-only hit without a distance: rerank as usual
+    assert not reranker._decisive([0.1, 0.15])
+    assert not reranker._decisive([None, 0.5])
@@ -0,0 +1,143 @@
+"""
+Startup tests — importing main loads no models, components load once even when
+requests race the warm-up thread, gated requests wait for warm-up (or get a 503
+after the timeout), /ready reports per-component timings, and REST routes,
+routers and inline workers share one set of services.
+"""
+import sys
+import json
+import asyncio
+import threading
+import subprocess
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from middleware.readiness import ReadinessGateMiddleware
+from services import AppServices
+
+
+def test_import_main_loads_no_models():
+    code = ("import sys, json, main; print(json.dumps([m for m in ('torch', 'chromadb', "
+            "'sentence_transformers', 'langchain_core') if m in sys.modules]))")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert json.loads(out.stdout.strip().splitlines()[-1]) == []
+
+
+def _services(gate: threading.Event, calls: list) -> AppServices:
+    services = AppServices(db=None, mode="background")
+
+    def slow():
+        calls.append("model")
+        gate.wait(5)
+        return type("Model", (), {"value": 42})()
+
+    services.register("model", slow, warmup=lambda m: calls.append("warm"))
+    services.register("client", lambda: "client")
+    return services
+
+
+def test_warmup_loads_each_component_once():
+    gate, calls = threading.Event(), []
+    services = _services(gate, calls)
+    lazy = services.lazy("model")
+    future = services.start_warmup()
+
+    reader = threading.Thread(target=lambda: calls.append(lazy.value))
+    reader.start()          # races the warm-up thread for the same component
+    gate.set()
+    future.result(5)
+    reader.join(5)
+
+    assert calls.count("model") == 1 and 42 in calls and "warm" in calls
+    status = services.status()
+    assert status["ready"] and status["components"]["model"]["state"] == "ready"
+    assert status["components"]["model"]["load_seconds"] is not None
+
+
+@pytest.mark.asyncio
+async def test_gate_holds_requests_until_ready():
+    gate, calls = threading.Event(), []
+    services = _services(gate, calls)
+    app = FastAPI()
+    app.add_middleware(ReadinessGateMiddleware, services=services)
+    app.get("/health")(lambda: {"ok": True})
+    app.get("/api/search")(lambda: {"value": services.get("model").value})
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        search = asyncio.create_task(client.get("/api/search"))
+        await asyncio.sleep(0.05)
+        assert (await client.get("/health")).status_code == 200   # probes are never held
+        assert not search.done()
+        gate.set()
+        assert (await search).json() == {"value": 42}
+
+
+@pytest.mark.asyncio
+async def test_gate_times_out_with_503(monkeypatch):
+    gate, calls = threading.Event(), []
+    services = _services(gate, calls)
+    original = services.wait_ready
+    monkeypatch.setattr(services, "wait_ready", lambda: original(timeout=0.05))
+    app = FastAPI()
+    app.add_middleware(ReadinessGateMiddleware, services=services)
+    app.get("/api/search")(lambda: {"ok": True})
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.get("/api/search")
+    gate.set()
+    assert r.status_code == 503 and r.headers["retry-after"] == "5"
+
+
+@pytest.mark.asyncio
+async def test_db_only_routes_skip_the_gate(monkeypatch):
+    gate, calls = threading.Event(), []
+    services = _services(gate, calls)
+    original = services.wait_ready
+    monkeypatch.setattr(services, "wait_ready", lambda: original(timeout=0.05))
+    services.start_warmup()
+    app = FastAPI()
+    app.add_middleware(ReadinessGateMiddleware, services=services)
+    app.get("/api/stats")(lambda: {"model": services.get_if_warm("model")})
+    app.get("/api/sources")(lambda: {"ok": True})
+    app.get("/api/collections")(lambda: {"ok": True})
+    app.post("/api/collections")(lambda: {"ok": True})
+    app.delete("/api/collections/{cid}")(lambda cid: {"ok": True})
+    app.post("/api/collections/{cid}/sources/{sid}")(lambda cid, sid: {"ok": True})
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        assert (await client.get("/api/stats")).json() == {"model": None}
+        assert (await client.get("/api/sources")).status_code == 200
+        assert (await client.get("/api/collections")).status_code == 200
+        assert (await client.post("/api/collections")).status_code == 200
+        assert (await client.delete("/api/collections/1")).status_code == 503
+        assert (await client.post("/api/collections/1/sources/2")).status_code == 503
+    gate.set()
+
+
+def test_ready_reports_component_timings():
+    from main import app, services
+    services.start_warmup().result(120)
+    r = TestClient(app).get("/ready")
+    body = r.json()
+    assert set(body["components"]) >= {"indexer", "retriever", "reranker", "rag"}
+    assert r.status_code == (200 if body["ready"] else 503)
+    assert body["components"]["retriever"]["state"] == "ready"
+    assert body["components"]["retriever"]["load_seconds"] is not None
+
+
+def test_routers_and_inline_workers_share_one_container():
+    import main
+    from routers import analytics, chat, collections, history, ingest
+    from jobs.tasks import Services
+
+    assert chat._get_db() is ingest._get_db() is history.db is collections.db is analytics.db is main.db
+    assert chat._get_retriever() is analytics._get_retriever() is main.services.get("retriever")
+    assert chat._get_reranker() is main.services.get("reranker")
+    inline = Services(shared=main.services)
+    assert inline.db is main.db and inline.retriever is main.services.get("retriever")
+    assert inline.indexer is main.services.get("indexer")
@@ -0,0 +1,171 @@
+"""
+WebSearcher tests — scrape_url fetches a page once and takes its title from
+that fetch (or from the Go scraper), fallback pages are fetched concurrently
+within the per-host limit over one shared client, the overall deadline returns
+whatever was scraped in time, and the page cache serves fresh pages, revalidates
+stale ones with a conditional GET and, with the Brave result cache, makes a
+repeated search free of outbound requests.
+"""
+import asyncio
+import weakref
+from collections import Counter
+import httpx
+import pytest
+
+import connectors.web_search as web_search
+from cache.lru import LRUCache
+from connectors.web_search import WebSearcher, normalize_url
+from database.db import Database
+
+db = Database()
+
+PAGE = b"<html><head><title>Retry budgets</title></head><body><nav>menu</nav><p>Budgets cap retries.</p></body></html>"
+TEXT = "Retry budgets\nBudgets cap retries."
+
+
+def _results(urls):
+    return {"web": {"results": [{"title": f"T {u}", "url": u, "description": "d"} for u in urls]}}
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    """Route the pooled clients through state["handler"] (sync for scrape_url,
+    async for asearch_and_scrape) and record every URL requested."""
+    state = {"handler": None, "calls": []}
+
+    def dispatch(request):
+        state["calls"].append(str(request.url))
+        return state["handler"](request)
+
+    kwargs = web_search._client_kwargs
+    monkeypatch.setattr(web_search, "_client_kwargs",
+                        lambda: {**kwargs(), "http2": False, "transport": httpx.MockTransport(dispatch)})
+    monkeypatch.setattr(web_search, "_client", None)
+    monkeypatch.setattr(web_search, "_async_clients", weakref.WeakKeyDictionary())
+    monkeypatch.setattr(web_search, "_search_cache", LRUCache(16, ttl=60))
+    monkeypatch.setenv("BRAVE_API_KEY", "test")
+    return state
+
+
+def test_scrape_url_fetches_once_and_titles_from_that_fetch(transport):
+    def handler(request):
+        if request.url.host == "localhost":
+            return httpx.Response(503)
+        return httpx.Response(200, content=PAGE)
+    transport["handler"] = handler
+
+    result = WebSearcher().scrape_url("https://docs.example.com/retries")
+    assert result == {"title": "Retry budgets", "content": TEXT}
+    assert transport["calls"].count("https://docs.example.com/retries") == 1
+
+
+def test_scrape_url_uses_the_go_title_without_fetching(transport):
+    def handler(request):
+        assert request.url.host == "localhost", "page fetched although Go scraped it"
+        return httpx.Response(200, json={"results": [
+            {"url": "https://docs.example.com/a", "title": "From Go", "content": "body", "success": True}]})
+    transport["handler"] = handler
+
+    assert WebSearcher().scrape_url("https://docs.example.com/a") == {"title": "From Go", "content": "body"}
+
+
+@pytest.mark.asyncio
+async def test_fallback_fetches_run_concurrently_within_the_host_limit(transport, monkeypatch):
+    monkeypatch.setattr(web_search, "WEB_PER_HOST", 2)
+    urls = [f"https://{host}.example.com/{i}" for host in ("a", "b") for i in range(4)]
+    active, peak = {}, {}
+
+    async def handler(request):
+        host = request.url.host
+        if host == "api.search.brave.com":
+            return httpx.Response(200, json=_results(urls))
+        if host == "localhost":
+            return httpx.Response(503)
+        active[host] = active.get(host, 0) + 1
+        peak[host] = max(peak.get(host, 0), active[host])
+        await asyncio.sleep(0.05)
+        active[host] -= 1
+        return httpx.Response(200, content=PAGE)
+    transport["handler"] = handler
+
+    start = asyncio.get_running_loop().time()
+    results = await WebSearcher().asearch_and_scrape("retries", count=len(urls))
+    elapsed = asyncio.get_running_loop().time() - start
+
+    assert [r["url"] for r in results] == urls                    # Brave's order
+    assert all(r["title"] == f"T {r['url']}" and r["content"] == TEXT for r in results)
+    assert peak == {"a.example.com": 2, "b.example.com": 2}
+    assert elapsed < 0.05 * len(urls) / 2                          # not one page at a time
+
+
+@pytest.mark.asyncio
+async def test_deadline_returns_what_was_scraped_in_time(transport):
+    urls = ["https://fast.example.com/", "https://slow.example.com/"]
+
+    async def handler(request):
+        host = request.url.host
+        if host == "api.search.brave.com":
+            return httpx.Response(200, json=_results(urls))
+        if host == "localhost":
+            return httpx.Response(503)
+        await asyncio.sleep(5 if host == "slow.example.com" else 0)
+        return httpx.Response(200, content=PAGE)
+    transport["handler"] = handler
+
+    start = asyncio.get_running_loop().time()
+    results = await WebSearcher().asearch_and_scrape("retries", count=2, deadline=0.3)
+    assert asyncio.get_running_loop().time() - start < 1
+    assert [r["url"] for r in results] == ["https://fast.example.com/"]
+
+
+def test_normalize_url():
+    assert normalize_url("HTTPS://Docs.Example.com:443/a?b=2&utm_source=x&a=1#top") == "https://docs.example.com/a?a=1&b=2"
+    assert normalize_url("http://example.com") == "http://example.com/"
+    assert normalize_url("http://example.com:8080/x") == "http://example.com:8080/x"
+
+
+def test_page_cache_serves_fresh_pages_and_revalidates_stale_ones(transport, monkeypatch):
+    url = "https://docs.example.com/cached?utm_source=feed"
+    validators = []
+
+    def handler(request):
+        if request.url.host == "localhost":
+            return httpx.Response(503)
+        validators.append(request.headers.get("if-none-match"))
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, content=PAGE, headers={"ETag": '"v1"'})
+    transport["handler"] = handler
+
+    searcher = WebSearcher(db)
+    first = searcher.scrape_url(url)
+    assert searcher.scrape_url("https://DOCS.example.com/cached") == first      # fresh: no request
+    assert validators == [None]
+    checked = db.get_cached_pages([normalize_url(url)])[normalize_url(url)]["checked_at"]
+
+    monkeypatch.setattr(web_search, "PAGE_CACHE_TTL", 0)
+    assert searcher.scrape_url(url) == first == {"title": "Retry budgets", "content": TEXT}
+    assert validators == [None, '"v1"']                                          # 304, nothing re-parsed
+    assert db.get_cached_pages([normalize_url(url)])[normalize_url(url)]["checked_at"] > checked
+
+
+@pytest.mark.asyncio
+async def test_repeated_search_reuses_results_and_pages(transport):
+    urls = ["https://a.example.com/repeat", "https://b.example.com/repeat"]
+    hosts = Counter()
+
+    async def handler(request):
+        hosts[request.url.host] += 1
+        if request.url.host == "api.search.brave.com":
+            return httpx.Response(200, json=_results(urls))
+        if request.url.host == "localhost":
+            return httpx.Response(503)
+        return httpx.Response(200, content=PAGE)
+    transport["handler"] = handler
+
+    searcher = WebSearcher(db)
+    first = await searcher.asearch_and_scrape("Repeat  search", count=2)
+    assert [r["url"] for r in first] == urls
+    await asyncio.gather(*searcher._writes)      # pages are written back in the background
+    assert await searcher.asearch_and_scrape("repeat search", count=2) == first
+    assert hosts == {"api.search.brave.com": 1, "localhost": 1, "a.example.com": 1, "b.example.com": 1}
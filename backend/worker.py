@@ -0,0 +1,26 @@
+"""
+DevFlow indexing worker — claims queued index jobs (file uploads, URLs, bulk
+ingests, reindex) from the index_jobs table and runs them outside the API
+process. Scale throughput by raising --workers or running more worker hosts
+against the same DATABASE_URL, CHROMA_HOST and spool volume.
+
+    python worker.py --workers 4
+    python worker.py --drain        # run everything queued, then exit
+"""
+import os
+import argparse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from jobs.worker import Worker, run_workers  # noqa: E402
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("JOB_WORKERS", "2")))
+    parser.add_argument("--drain", action="store_true", help="run queued jobs in this process until none are left")
+    args = parser.parse_args()
+    if args.drain:
+        Worker().run_until_empty()
+    else:
+        run_workers(args.workers)
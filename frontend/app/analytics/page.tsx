@@ -37,6 +37,7 @@ export default function AnalyticsPage() {
         <div className="stats" style={{ marginBottom: 40 }}>
           {[
             { label: 'Cache Hit Rate', value: `${d?.cache_hit_rate ?? 0}%` },
+            { label: 'Semantic Hits', value: `${d?.semantic_cache_hit_rate ?? 0}%` },
             { label: 'Vector Chunks', value: d?.chromadb_count ?? 0 },
           ].map((k, i) => (
             <motion.div key={k.label} className="stat-card"
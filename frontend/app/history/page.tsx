@@ -35,7 +35,7 @@ export default function HistoryPage() {
               <div style={{ display: 'flex', alignItems: 'center', gap: 8, width: '100%' }}>
                 <Search size={15} style={{ color: 'var(--clr-brand-1)', flexShrink: 0 }} />
                 <span style={{ color: '#e2e8f0', fontWeight: 500, flex: 1, fontSize: '0.95rem' }}>{item.query}</span>
-                {item.cached === 1 && <span className="cached-badge"><Zap size={12} /> Cached</span>}
+                {item.cached > 0 && <span className="cached-badge"><Zap size={12} /> Cached</span>}
                 <span className="badge" style={{ background: 'rgba(139,124,248,0.1)', color: 'var(--clr-brand-1)' }}>{item.model}</span>
               </div>
               <div style={{ display: 'flex', gap: 16, fontSize: '0.8rem', color: '#475569' }}>
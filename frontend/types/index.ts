@@ -83,6 +83,10 @@ export interface JobStatus {
   filename: string
   chunks: number
   error: string | null
+  attempts: number
+  total: number | null
+  chunks_per_sec: number | null
+  eta_seconds: number | null
 }
 
 export interface SourceChunk {
@@ -94,9 +98,10 @@ export interface SourceChunk {
 
 export interface AnalyticsData {
   cache_hit_rate: number
+  semantic_cache_hit_rate: number
   chromadb_count: number
   top_queries: { query: string; count: number }[]
-  searches_by_day: { date: string; count: number; cache_hits: number }[]
+  searches_by_day: { date: string; count: number; cache_hits: number; semantic_cache_hits: number }[]
   source_types: { type: string; count: number }[]
   model_usage: { model: string; count: number }[]
 }
@@ -23,9 +23,13 @@ type ScrapeRequest struct {
 
 type ScrapeResult struct {
 	URL     string `json:"url"`
+	Title   string `json:"title,omitempty"`
 	Content string `json:"content"`
 	Success bool   `json:"success"`
 	Error   string `json:"error,omitempty"`
+	// Validators the backend's page cache revalidates the page with
+	ETag         string `json:"etag,omitempty"`
+	LastModified string `json:"last_modified,omitempty"`
 }
 
 type ScrapeResponse struct {
@@ -59,6 +63,21 @@ func extractText(n *html.Node, sb *strings.Builder) {
 	}
 }
 
+func findTitle(n *html.Node) string {
+	if n.Type == html.ElementNode && n.Data == "title" {
+		if n.FirstChild != nil {
+			return strings.TrimSpace(n.FirstChild.Data)
+		}
+		return ""
+	}
+	for c := n.FirstChild; c != nil; c = c.NextSibling {
+		if title := findTitle(c); title != "" {
+			return title
+		}
+	}
+	return ""
+}
+
 // ── Scraper ───────────────────────────────────────────────────────────────────
 
 var httpClient = &http.Client{
@@ -107,7 +126,14 @@ func scrapeURL(url string, maxLength int) ScrapeResult {
 		text = text[:maxLength] + "..."
 	}
 
-	return ScrapeResult{URL: url, Content: text, Success: true}
+	return ScrapeResult{
+		URL:          url,
+		Title:        findTitle(doc),
+		Content:      text,
+		Success:      true,
+		ETag:         resp.Header.Get("ETag"),
+		LastModified: resp.Header.Get("Last-Modified"),
+	}
 }
 
 // ── Handlers ──────────────────────────────────────────────────────────────────